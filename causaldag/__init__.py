@@ -34,3 +34,6 @@ from conditional_independence import *
 from graphical_models import *
 import graphical_models.rand as rand
 from graphical_model_learning import *
+from .graphs import *
+from .structure_learning import *
+from .utils import *
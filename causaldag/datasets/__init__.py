@@ -2,6 +2,7 @@ from graphical_models.rand import *
 import numpy as np
 import random
 from .networks import *
+from .difference_batch import create_synthetic_difference_batch, DifferenceDatasetBatch
 
 
 def create_synthetic_difference(
@@ -0,0 +1,319 @@
+"""
+Batches of synthetic pairs of related Gaussian DAGs and datasets, for benchmarking difference causal inference.
+
+Each pair is drawn from its own ``np.random.Generator``, spawned from the seed of the batch, so that batches can be
+generated across processes without touching the global random state, and the ``k``-th pair only depends on the
+seed and ``k``. Batches can be stored in an on-disk cache keyed by their parameters, as ``.npy`` files which are
+loaded as memory maps.
+"""
+# === IMPORTS: BUILT-IN ===
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from concurrent.futures import Executor
+from typing import Iterator, Optional, Set, Tuple
+
+# === IMPORTS: THIRD-PARTY ===
+import numpy as np
+from scipy.linalg import solve_triangular
+
+# === IMPORTS: LOCAL ===
+from graphical_models import GaussDAG
+from ..graphs.random_batch import _bernoulli_positions
+from ..structure_learning.parallel import run_tasks
+
+# bump when the generating process changes, so that stale cache entries are not loaded
+_CACHE_VERSION = 1
+_ARRAYS = ('weights1', 'weights2', 'X1', 'X2')
+
+
+def _unif_away_zero(rng: np.random.Generator, size: int, low: float, high: float) -> np.ndarray:
+    signs = rng.integers(0, 2, size=size) * 2 - 1
+    return signs * rng.uniform(low, high, size=size)
+
+
+def _unif_away_original(rng: np.random.Generator, original: float, dist_original: float, low: float, high: float):
+    """
+    As ``graphical_models.rand.unif_away_original``, drawing from ``rng``.
+    """
+    if original < 0:
+        regions = [(low, high), (-high, original - dist_original), (original + dist_original, -low)]
+    else:
+        regions = [(-high, -low), (original + dist_original, high), (low, original - dist_original)]
+    regions = [(a, b) for a, b in regions if b >= a]
+    lengths = np.array([b - a for a, b in regions])
+    a, b = regions[rng.choice(len(regions), p=lengths / lengths.sum())]
+    return rng.uniform(a, b)
+
+
+def _difference_pair(
+        rng: np.random.Generator,
+        nnodes: int,
+        nsamples: int,
+        num_altered: int,
+        num_removed: int,
+        num_added: int,
+        exp_nbrs: float,
+        low: float,
+        high: float,
+        dist_original: float
+) -> Tuple[np.ndarray, ...]:
+    """
+    Draw the weight matrices and samples of one pair, in the same way as ``create_synthetic_difference``.
+
+    The graph is drawn with ``0, ..., nnodes-1`` as its topological order, so that the weight matrices are strictly
+    upper triangular and sampling is one triangular solve; the nodes of both graphs are then relabeled by the same
+    random permutation. Graphs with too few arcs for ``num_altered`` and ``num_removed``, or too few missing arcs for
+    ``num_added``, are redrawn.
+    """
+    npairs = nnodes * (nnodes - 1) // 2
+    if num_added > npairs - num_altered - num_removed:
+        raise ValueError(f"Tried adding {num_added} arcs to DAGs on {nnodes} nodes")
+    density = min(exp_nbrs, nnodes - 1) / (nnodes - 1)
+    # with a density of 0 or 1, every draw has the same arcs
+    if density == 0 and num_altered + num_removed > 0:
+        raise ValueError(
+            f"Tried altering {num_altered} arcs and removing {num_removed} arcs, but there are only 0 arcs in this DAG."
+        )
+    if density == 1 and num_added > 0:
+        raise ValueError(f"Tried adding {num_added} arcs but there are only 0 arcs missing from the DAG.")
+    rows, cols = np.triu_indices(nnodes, k=1)
+    while True:
+        positions = _bernoulli_positions(npairs, density, rng)
+        if num_altered + num_removed <= len(positions) <= npairs - num_added:
+            break
+
+    weights1 = np.zeros((nnodes, nnodes))
+    weights1[rows[positions], cols[positions]] = _unif_away_zero(rng, len(positions), low, high)
+    weights2 = weights1.copy()
+
+    changed = rng.choice(positions, num_altered + num_removed, replace=False)
+    for position in changed[:num_altered]:
+        i, j = rows[position], cols[position]
+        weights2[i, j] = _unif_away_original(rng, weights1[i, j], dist_original, low, high)
+    weights2[rows[changed[num_altered:]], cols[changed[num_altered:]]] = 0
+    missing = np.setdiff1d(np.arange(npairs), positions)
+    added = rng.choice(missing, num_added, replace=False)
+    weights2[rows[added], cols[added]] = _unif_away_zero(rng, num_added, low, high)
+
+    samples = []
+    for weights in (weights1, weights2):
+        noise = rng.standard_normal(size=(nsamples, nnodes))
+        # X (I - W) = E, with I - W unit upper triangular
+        samples.append(solve_triangular(np.eye(nnodes) - weights.T, noise.T, lower=True, unit_diagonal=True).T)
+
+    perm = rng.permutation(nnodes)
+    inverse = np.argsort(perm)
+    weights1, weights2 = (weights[np.ix_(inverse, inverse)] for weights in (weights1, weights2))
+    X1, X2 = (X[:, inverse] for X in samples)
+    return weights1, weights2, X1, X2
+
+
+def _difference_pairs(seeds: list, params: dict) -> Tuple[np.ndarray, ...]:
+    pairs = [_difference_pair(np.random.default_rng(seed), **params) for seed in seeds]
+    return tuple(np.stack(arrays) for arrays in zip(*pairs))
+
+
+class DifferenceDatasetBatch:
+    """
+    A batch of pairs of Gaussian DAGs with unit noise variances and zero biases, with a dataset sampled from each.
+
+    The weight matrices and samples of all pairs are stored as stacked arrays (possibly memory maps of a cache
+    entry). Indexing the batch builds the ``(g1, g2, X1, X2, difference, difference_ug)`` tuple of that pair. These are
+    the values returned by ``create_synthetic_difference(..., return_graphs=True)``, which returns them in the order
+    ``(X1, X2, difference, difference_ug, g1, g2)``.
+
+    Parameters
+    ----------
+    weights1, weights2:
+        ``(size x nnodes x nnodes)`` weight matrices of the first and second DAG of each pair.
+    X1, X2:
+        ``(size x nsamples x nnodes)`` samples of the first and second DAG of each pair.
+    path:
+        directory of the cache entry the arrays were loaded from, if any.
+
+    See Also
+    --------
+    create_synthetic_difference_batch
+    """
+    def __init__(
+            self,
+            weights1: np.ndarray,
+            weights2: np.ndarray,
+            X1: np.ndarray,
+            X2: np.ndarray,
+            path: Optional[str] = None
+    ):
+        self.weights1 = weights1
+        self.weights2 = weights2
+        self.X1 = X1
+        self.X2 = X2
+        self.path = path
+
+    def __len__(self):
+        return len(self.weights1)
+
+    def __getitem__(self, k: int) -> tuple:
+        if k < 0:
+            k += len(self)
+        if not 0 <= k < len(self):
+            raise IndexError(k)
+        return self.gdag1(k), self.gdag2(k), self.X1[k], self.X2[k], self.difference(k), self.difference_ug(k)
+
+    def __iter__(self) -> Iterator[tuple]:
+        for k in range(len(self)):
+            yield self[k]
+
+    @staticmethod
+    def _gdag(weights: np.ndarray) -> GaussDAG:
+        sources, targets = np.nonzero(weights)
+        arcs = dict(zip(zip(sources.tolist(), targets.tolist()), weights[sources, targets].tolist()))
+        return GaussDAG(nodes=list(range(weights.shape[0])), arcs=arcs)
+
+    def gdag1(self, k: int) -> GaussDAG:
+        return self._gdag(self.weights1[k])
+
+    def gdag2(self, k: int) -> GaussDAG:
+        return self._gdag(self.weights2[k])
+
+    def difference(self, k: int) -> Set[tuple]:
+        """
+        Arcs of pair ``k`` whose weights differ between the two DAGs, including added and removed arcs.
+        """
+        sources, targets = np.nonzero(self.weights1[k] != self.weights2[k])
+        return set(zip(sources.tolist(), targets.tolist()))
+
+    def difference_ug(self, k: int) -> Set[frozenset]:
+        """
+        Pairs of nodes of pair ``k`` whose entries differ between the precision matrices of the two DAGs.
+        """
+        nnodes = self.weights1.shape[1]
+        precisions = [(np.eye(nnodes) - w) @ (np.eye(nnodes) - w).T for w in (self.weights1[k], self.weights2[k])]
+        sources, targets = np.nonzero(~np.isclose(*precisions) & ~np.eye(nnodes, dtype=bool))
+        return {frozenset({i, j}) for i, j in zip(sources.tolist(), targets.tolist())}
+
+
+def _cache_key(params: dict) -> str:
+    return hashlib.sha1(json.dumps(dict(params, version=_CACHE_VERSION), sort_keys=True).encode()).hexdigest()
+
+
+def _load(path: str, compressed: bool) -> DifferenceDatasetBatch:
+    if compressed:
+        with np.load(os.path.join(path, 'arrays.npz')) as arrays:
+            return DifferenceDatasetBatch(*(arrays[name] for name in _ARRAYS), path=path)
+    return DifferenceDatasetBatch(*(np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r') for name in _ARRAYS), path=path)
+
+
+def create_synthetic_difference_batch(
+        size: int,
+        nnodes: int = 10,
+        nsamples: int = 1000,
+        num_altered: int = 1,
+        num_removed: int = 1,
+        num_added: int = 1,
+        exp_nbrs: float = 2,
+        seed: int = 8181818,
+        low: float = .25,
+        high: float = 1,
+        dist_original: float = .25,
+        n_jobs: Optional[int] = 1,
+        executor: Optional[Executor] = None,
+        chunk_size: int = 64,
+        cache_dir: Optional[str] = None,
+        compressed: bool = False
+) -> DifferenceDatasetBatch:
+    """
+    Create ``size`` pairs of related Gaussian DAGs and datasets, each distributed as the output of
+    ``create_synthetic_difference`` with the default weight functions.
+
+    Pair ``k`` is drawn from a ``np.random.Generator`` seeded by the ``k``-th child of ``np.random.SeedSequence(seed)``,
+    so the batch does not depend on ``n_jobs`` or ``chunk_size``, and the global random state is left untouched.
+
+    Parameters
+    ----------
+    size:
+        Number of pairs.
+    nnodes, nsamples, num_altered, num_removed, num_added, exp_nbrs:
+        As for ``create_synthetic_difference``.
+    seed:
+        Seed of the batch.
+    low, high:
+        Range of the absolute values of the weights, as for ``unif_away_zero``.
+    dist_original:
+        Minimum change of an altered weight, as for ``unif_away_original``.
+    n_jobs:
+        Number of worker processes to start if no executor is given. -1 uses all CPUs.
+    executor:
+        An existing ``concurrent.futures`` executor.
+    chunk_size:
+        Number of pairs generated by each task.
+    cache_dir:
+        If given, the batch is loaded from this directory if it was created before with the same parameters, and
+        stored there otherwise.
+    compressed:
+        If True, cache entries are stored as one compressed ``.npz`` file, which is smaller but has to be loaded into
+        memory. Otherwise, each array is stored as a ``.npy`` file and loaded as a read-only memory map.
+
+    See Also
+    --------
+    create_synthetic_difference, DifferenceDatasetBatch
+
+    Examples
+    --------
+    >>> from causaldag.datasets import create_synthetic_difference_batch
+    >>> batch = create_synthetic_difference_batch(100, nnodes=10, nsamples=500, seed=0)
+    >>> g1, g2, X1, X2, difference, difference_ug = batch[0]
+    >>> X1.shape
+    (500, 10)
+    """
+    params = dict(
+        nnodes=nnodes,
+        nsamples=nsamples,
+        num_altered=num_altered,
+        num_removed=num_removed,
+        num_added=num_added,
+        exp_nbrs=exp_nbrs,
+        low=low,
+        high=high,
+        dist_original=dist_original
+    )
+    path = None
+    if cache_dir is not None:
+        key = _cache_key(dict(params, size=size, seed=seed, compressed=compressed))
+        path = os.path.join(cache_dir, f'difference_{key}')
+        if os.path.isdir(path):
+            return _load(path, compressed)
+
+    if size < 0:
+        raise ValueError(f"size must be nonnegative, got {size}")
+    seeds = np.random.SeedSequence(seed).spawn(size)
+    tasks = [(seeds[start:start+chunk_size], params) for start in range(0, size, chunk_size)]
+    chunks = run_tasks(_difference_pairs, tasks, n_jobs=n_jobs, executor=executor)
+    if chunks:
+        arrays = [np.concatenate(chunk_arrays) for chunk_arrays in zip(*chunks)]
+    else:
+        arrays = [np.zeros((0, nnodes, nnodes))] * 2 + [np.zeros((0, nsamples, nnodes))] * 2
+    if path is None:
+        return DifferenceDatasetBatch(*arrays)
+
+    # write to a temporary directory and move it into place, so that concurrent runs never see a partial entry
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = tempfile.mkdtemp(dir=cache_dir)
+    try:
+        if compressed:
+            np.savez_compressed(os.path.join(tmp_path, 'arrays.npz'), **dict(zip(_ARRAYS, arrays)))
+        else:
+            for name, array in zip(_ARRAYS, arrays):
+                np.save(os.path.join(tmp_path, f'{name}.npy'), array)
+        with open(os.path.join(tmp_path, 'params.json'), 'w') as f:
+            json.dump(dict(params, size=size, seed=seed, version=_CACHE_VERSION), f)
+        os.rename(tmp_path, path)
+    except OSError:
+        # another process stored the same entry first
+        if not os.path.isdir(path):
+            raise
+    finally:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+    return _load(path, compressed)
@@ -0,0 +1,9 @@
+from .amat_dag import AmatDAG
+from .separation import SeparationOracle, dsep_batch, msep_batch
+from .incremental_cpdag import IncrementalCPDAG
+from .mec import iter_dags, mec_size
+from .gauss_sampling import GaussSampler, sample_gauss_dag
+from .random_batch import DAGBatch, GaussDAGBatch, directed_erdos_batch
+from .metrics import stack_amats, shd_batch, shd_skeleton_batch, markov_equivalent_batch, graph_metrics
+from .indexed_ancestral_graph import IndexedAncestralGraph
+from .marginals import marginal_mag, marginal_mags
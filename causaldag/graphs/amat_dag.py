@@ -0,0 +1,387 @@
+"""
+DAG backed by a dense boolean adjacency matrix over integer-indexed nodes.
+"""
+# === IMPORTS: BUILT-IN ===
+from collections import defaultdict
+from typing import Set, List, Iterable, Tuple
+
+# === IMPORTS: THIRD-PARTY ===
+import numpy as np
+
+# === IMPORTS: LOCAL ===
+from graphical_models import DAG, CycleError
+from graphical_models.custom_types import Node, NodeSet
+from .separation import SeparationOracle
+from .marginals import marginal_mag, marginal_mags
+
+
+def _find_cycle(amat: np.ndarray, candidates: np.ndarray) -> list:
+    # every node in ``candidates`` has a parent in ``candidates``, so walking up parents must repeat a node
+    node = int(np.flatnonzero(candidates)[0])
+    path = [node]
+    position = {node: 0}
+    while True:
+        node = int(np.flatnonzero(amat[:, node] & candidates)[0])
+        if node in position:
+            return list(reversed(path[position[node]:] + [node]))
+        position[node] = len(path)
+        path.append(node)
+
+
+class AmatDAG(DAG):
+    """
+    DAG over the nodes ``0, ..., nnodes-1`` stored as a boolean adjacency matrix, i.e. ``amat[i, j]`` is True
+    iff i->j is an arc.
+
+    Graph queries (parents, children, ancestors, descendants, topological sort) run as array operations on the
+    matrix, which makes construction and traversal of large graphs much cheaper than the set-based :class:`DAG`.
+    The dictionaries used by the set-based implementation (``_parents``, ``_children``, ``_arcs``, ...) are
+    derived on demand, so every method inherited from :class:`DAG` keeps working.
+
+    The nodes are always ``0, ..., nnodes-1``, so nodes can only be added at the end, and removing a node relabels
+    the nodes after it. Use :meth:`induced_subgraph` to drop nodes while keeping the labels of the others.
+
+    Parameters
+    ----------
+    nodes:
+        Either the number of nodes, or a collection of nodes which must be exactly ``0, ..., nnodes-1``.
+    arcs:
+        Collection of arcs, or an integer array of shape ``(narcs, 2)``.
+    check_acyclic:
+        If True, raise a CycleError if ``arcs`` contains a cycle.
+
+    Examples
+    --------
+    >>> import causaldag as cd
+    >>> d = cd.AmatDAG(3, arcs={(0, 1), (1, 2)})
+    >>> d.ancestors_of(2)
+    {0, 1}
+    """
+    def __init__(self, nodes=0, arcs: Iterable = frozenset(), check_acyclic=True, amat: np.ndarray = None):
+        if amat is None:
+            nnodes = nodes if isinstance(nodes, (int, np.integer)) else len(nodes)
+            if not isinstance(nodes, (int, np.integer)) and set(nodes) != set(range(nnodes)):
+                raise ValueError('Nodes of an AmatDAG must be the integers 0, ..., nnodes-1')
+            amat = np.zeros((nnodes, nnodes), dtype=bool)
+            arcs = np.asarray(arcs if isinstance(arcs, np.ndarray) else list(arcs), dtype=int).reshape(-1, 2)
+            amat[arcs[:, 0], arcs[:, 1]] = True
+        self._amat = amat
+        self._version = 0
+        self._cache = dict()
+        if check_acyclic:
+            self._check_acyclic()
+
+    def _cached(self, key, compute):
+        if self._cache.get('version') != self._version:
+            self._cache = {'version': self._version}
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def _modified(self):
+        self._version += 1
+
+    def copy(self):
+        """
+        Return a copy of the current DAG, with its own adjacency matrix.
+        """
+        return AmatDAG(amat=self._amat.copy(), check_acyclic=False)
+
+    # === DERIVED SET-BASED STORAGE, USED BY METHODS INHERITED FROM DAG
+    @property
+    def _nodes(self) -> Set[Node]:
+        return self._cached('nodes', lambda: set(range(self._amat.shape[0])))
+
+    @property
+    def _arcs(self) -> Set[Tuple[Node, Node]]:
+        return self._cached('arcs', lambda: set(zip(*map(np.ndarray.tolist, np.nonzero(self._amat)))))
+
+    def _adjacency_dict(self, amat) -> defaultdict:
+        d = defaultdict(set)
+        for node, row in enumerate(amat):
+            d[node] = set(np.flatnonzero(row).tolist())
+        return d
+
+    @property
+    def _parents(self) -> defaultdict:
+        return self._cached('parents', lambda: self._adjacency_dict(self._amat.T))
+
+    @property
+    def _children(self) -> defaultdict:
+        return self._cached('children', lambda: self._adjacency_dict(self._amat))
+
+    @property
+    def _neighbors(self) -> defaultdict:
+        return self._cached('neighbors', lambda: self._adjacency_dict(self._amat | self._amat.T))
+
+    # === PROPERTIES
+    @property
+    def nnodes(self) -> int:
+        return self._amat.shape[0]
+
+    @property
+    def num_arcs(self) -> int:
+        return int(self._amat.sum())
+
+    @property
+    def in_degrees(self):
+        return dict(enumerate(self._amat.sum(axis=0).tolist()))
+
+    @property
+    def out_degrees(self):
+        return dict(enumerate(self._amat.sum(axis=1).tolist()))
+
+    @property
+    def max_in_degree(self) -> int:
+        return int(self._amat.sum(axis=0).max())
+
+    @property
+    def max_out_degree(self) -> int:
+        return int(self._amat.sum(axis=1).max())
+
+    # === NODE PROPERTIES
+    def _indicator(self, nodes: NodeSet) -> np.ndarray:
+        indicator = np.zeros(self._amat.shape[0], dtype=bool)
+        indicator[nodes if isinstance(nodes, (int, np.integer)) else list(nodes)] = True
+        return indicator
+
+    def parents_of(self, nodes: NodeSet) -> Set[Node]:
+        if isinstance(nodes, (int, np.integer)):
+            return set(np.flatnonzero(self._amat[:, nodes]).tolist())
+        return set(np.flatnonzero(self._amat[:, self._indicator(nodes)].any(axis=1)).tolist())
+
+    def children_of(self, nodes: NodeSet) -> Set[Node]:
+        if isinstance(nodes, (int, np.integer)):
+            return set(np.flatnonzero(self._amat[nodes]).tolist())
+        return set(np.flatnonzero(self._amat[self._indicator(nodes)].any(axis=0)).tolist())
+
+    def neighbors_of(self, nodes: NodeSet) -> Set[Node]:
+        return self.parents_of(nodes) | self.children_of(nodes)
+
+    def _reachable(self, start: np.ndarray, amat: np.ndarray) -> np.ndarray:
+        """
+        Boolean indicator of all nodes reachable from the nodes in ``start`` by a (nonempty) path in ``amat``.
+        """
+        reached = np.zeros(amat.shape[0], dtype=bool)
+        frontier = amat[start].any(axis=0)
+        while frontier.any():
+            reached |= frontier
+            frontier = amat[frontier].any(axis=0) & ~reached
+        return reached
+
+    def descendants_of(self, nodes: NodeSet) -> Set[Node]:
+        return set(np.flatnonzero(self._reachable(self._indicator(nodes), self._amat)).tolist())
+
+    def ancestors_of(self, nodes: NodeSet) -> Set[Node]:
+        return set(np.flatnonzero(self._reachable(self._indicator(nodes), self._amat.T)).tolist())
+
+    def is_ancestor_of(self, anc: Node, desc: Node) -> bool:
+        return bool(self._reachable(self._indicator(anc), self._amat)[desc])
+
+    def has_arc(self, source: Node, target: Node) -> bool:
+        return bool(self._amat[source, target])
+
+    def sources(self) -> Set[Node]:
+        return set(np.flatnonzero(~self._amat.any(axis=0)).tolist())
+
+    def sinks(self) -> Set[Node]:
+        return set(np.flatnonzero(~self._amat.any(axis=1)).tolist())
+
+    # === ORDERS
+    def topological_sort(self) -> List[Node]:
+        """
+        Return a topological sort of the nodes in the graph, computed by repeatedly removing all current sources.
+        """
+        return list(self._cached('topological_sort', self._topological_sort))
+
+    def _topological_sort(self) -> List[Node]:
+        amat = self._amat
+        indegrees = amat.sum(axis=0)
+        remaining = np.ones(amat.shape[0], dtype=bool)
+        order = []
+        while remaining.any():
+            sources = remaining & (indegrees == 0)
+            if not sources.any():
+                raise CycleError(_find_cycle(amat, remaining))
+            order.extend(np.flatnonzero(sources).tolist())
+            remaining &= ~sources
+            indegrees = indegrees - amat[sources].sum(axis=0)
+        return order
+
+    def is_topological(self, order: list) -> bool:
+        ranks = np.empty(self._amat.shape[0], dtype=int)
+        ranks[order] = np.arange(len(order))
+        sources, targets = np.nonzero(self._amat)
+        return bool((ranks[sources] < ranks[targets]).all())
+
+    # === GRAPH MODIFICATION
+    def add_node(self, node: Node):
+        """
+        Add ``node`` to the DAG. Only the next unused index, ``nnodes``, can be added; this reallocates the
+        adjacency matrix, so a buffer previously passed to :meth:`from_amat` is no longer shared.
+        """
+        nnodes = self._amat.shape[0]
+        if node < nnodes:
+            return
+        if node != nnodes:
+            raise ValueError('The next node added to an AmatDAG must be %d' % nnodes)
+        amat = np.zeros((nnodes + 1, nnodes + 1), dtype=bool)
+        amat[:nnodes, :nnodes] = self._amat
+        self._amat = amat
+        self._modified()
+
+    def remove_node(self, node: Node, ignore_error=False):
+        """
+        Remove ``node`` from the DAG, relabeling each node ``k > node`` as ``k - 1``. This reallocates the adjacency
+        matrix, so a buffer previously passed to :meth:`from_amat` is no longer shared.
+
+        Parameters
+        ----------
+        node:
+            node to be removed.
+        ignore_error:
+            if True, ignore the KeyError raised when node is not in the DAG.
+        """
+        nnodes = self._amat.shape[0]
+        if not 0 <= node < nnodes:
+            if ignore_error:
+                return
+            raise KeyError(node)
+        keep = np.arange(nnodes) != node
+        self._amat = self._amat[np.ix_(keep, keep)]
+        self._modified()
+
+    def add_arc(self, i: Node, j: Node, check_acyclic=True):
+        if check_acyclic and (i == j or self._reachable(self._indicator(j), self._amat)[i]):
+            path = self._amat_path(j, i)
+            raise CycleError([i] + path)
+        self._amat[i, j] = True
+        self._modified()
+
+    def _amat_path(self, source, target) -> list:
+        predecessor = {source: None}
+        frontier = [source]
+        while target not in predecessor:
+            next_frontier = []
+            for node in frontier:
+                for child in np.flatnonzero(self._amat[node]).tolist():
+                    if child not in predecessor:
+                        predecessor[child] = node
+                        next_frontier.append(child)
+            frontier = next_frontier
+        path = [target]
+        while path[-1] != source:
+            path.append(predecessor[path[-1]])
+        return list(reversed(path))
+
+    def add_arcs_from(self, arcs: Iterable[Tuple], check_acyclic=False):
+        arcs = np.asarray(arcs if isinstance(arcs, np.ndarray) else list(arcs), dtype=int).reshape(-1, 2)
+        new = ~self._amat[arcs[:, 0], arcs[:, 1]]
+        self._amat[arcs[:, 0], arcs[:, 1]] = True
+        self._modified()
+        if check_acyclic:
+            try:
+                self._check_acyclic()
+            except CycleError as e:
+                self._amat[arcs[new, 0], arcs[new, 1]] = False
+                self._modified()
+                raise e
+
+    def remove_arc(self, i: Node, j: Node, ignore_error=False):
+        if not self._amat[i, j]:
+            if ignore_error:
+                return
+            raise KeyError((i, j))
+        self._amat[i, j] = False
+        self._modified()
+
+    def remove_arcs_from(self, arcs: Iterable, ignore_error=False):
+        for i, j in arcs:
+            self.remove_arc(i, j, ignore_error=ignore_error)
+
+    def reverse_arc(self, i: Node, j: Node, ignore_error=False, check_acyclic=False):
+        self.remove_arc(i, j, ignore_error=ignore_error)
+        self.add_arc(j, i, check_acyclic=check_acyclic)
+
+    # === SEPARATIONS
+    def dsep_batch(self, queries: Iterable[Tuple]) -> np.ndarray:
+        """
+        Check d-separation for each query ``(A, B, C)``, returning a boolean array with one entry per query.
+
+        See Also
+        --------
+        causaldag.graphs.separation.SeparationOracle
+        """
+        return SeparationOracle(range(self._amat.shape[0]), self._amat).separated(queries)
+
+    # === MARGINALS
+    def marginal_mag(self, latent_nodes, relabel=None):
+        """
+        Return the maximal ancestral graph of the marginal over the nodes not in ``latent_nodes``.
+
+        See Also
+        --------
+        causaldag.graphs.marginals.marginal_mag
+        """
+        return marginal_mag(self, latent_nodes, relabel=relabel)
+
+    def marginal_mags(self, latent_sets, relabel=None):
+        """
+        Return the maximal ancestral graph of the marginal over the nodes not in each set of ``latent_sets``.
+
+        See Also
+        --------
+        causaldag.graphs.marginals.marginal_mags
+        """
+        return marginal_mags(self, latent_sets, relabel=relabel)
+
+    # === SUBGRAPHS
+    def induced_subgraph(self, nodes: Set[Node]):
+        """
+        Return the induced subgraph over ``nodes``, as a set-based :class:`DAG` keeping the original labels.
+        """
+        return DAG(nodes, {(i, j) for i, j in self._arcs if i in nodes and j in nodes})
+
+    # === NUMPY CONVERSION
+    @classmethod
+    def from_amat(cls, amat: np.ndarray, check_acyclic=True):
+        """
+        Return an AmatDAG with arcs given by ``amat``, i.e. i->j if ``amat[i,j] != 0``.
+
+        If ``amat`` is a boolean array, it is used as the storage of the returned DAG without copying. Array-based
+        queries always see the current contents of the buffer; the derived set-based views (``arcs``, ``parents``,
+        ...) are refreshed whenever the DAG is modified through its own methods.
+
+        Examples
+        --------
+        >>> import causaldag as cd
+        >>> import numpy as np
+        >>> amat = np.array([[0, 0, 1], [0, 0, 1], [0, 0, 0]], dtype=bool)
+        >>> d = cd.AmatDAG.from_amat(amat)
+        >>> d.to_amat()[0] is amat
+        True
+        """
+        if amat.dtype != bool:
+            amat = amat != 0
+        return AmatDAG(amat=amat, check_acyclic=check_acyclic)
+
+    def to_amat(self, node_list=None) -> (np.ndarray, list):
+        """
+        Return the boolean adjacency matrix of this DAG and the list of nodes indexing it.
+
+        When ``node_list`` is omitted or is ``0, ..., nnodes-1``, the matrix is the storage of this DAG itself
+        rather than a copy.
+        """
+        nnodes = self._amat.shape[0]
+        if node_list is None or list(node_list) == list(range(nnodes)):
+            return self._amat, list(range(nnodes))
+        return self._amat[np.ix_(node_list, node_list)], list(node_list)
+
+    @classmethod
+    def from_dag(cls, dag: DAG, node_list=None):
+        """
+        Return an AmatDAG with the same arcs as ``dag``, along with the list mapping indices back to the nodes
+        of ``dag``.
+        """
+        amat, node_list = DAG.to_amat(dag, node_list)
+        return AmatDAG(amat=amat.astype(bool), check_acyclic=False), node_list
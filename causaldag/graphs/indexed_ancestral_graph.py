@@ -0,0 +1,352 @@
+"""
+Ancestral graph with a transitive-closure index, answering ancestry queries by bit tests.
+"""
+# === IMPORTS: BUILT-IN ===
+from collections import deque
+from typing import Dict, Iterable, List, Set
+
+# === IMPORTS: LOCAL ===
+from graphical_models import AncestralGraph
+from graphical_models.classes.mags.ancestral_graph import CycleError, SpouseError
+from graphical_models.custom_types import Node, NodeSet
+from graphical_models.utils import core_utils
+
+
+def _bits(mask: int):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class _Closure:
+    """
+    Ancestors and descendants of each node of a graph, as bitmasks over the positions of the nodes in ``nodes``.
+    """
+    __slots__ = ('nodes', 'node2ix', 'anc', 'desc')
+
+    def __init__(self, nodes: List[Node], anc: List[int], desc: List[int]):
+        self.nodes = nodes
+        self.node2ix = {node: ix for ix, node in enumerate(nodes)}
+        self.anc = anc
+        self.desc = desc
+
+    def copy(self) -> '_Closure':
+        return _Closure(list(self.nodes), list(self.anc), list(self.desc))
+
+    def add_node(self, node: Node):
+        if node not in self.node2ix:
+            self.node2ix[node] = len(self.nodes)
+            self.nodes.append(node)
+            self.anc.append(0)
+            self.desc.append(0)
+
+    def add_arc(self, i: Node, j: Node) -> bool:
+        """
+        Add the ancestors of i, and i, to the ancestors of j and of each of its descendants, and conversely. Return
+        False, without changing the index, if the arc would create a cycle.
+        """
+        self.add_node(i)
+        self.add_node(j)
+        i, j = self.node2ix[i], self.node2ix[j]
+        if i == j or self.anc[i] >> j & 1:
+            return False
+        new_anc = self.anc[i] | 1 << i
+        new_desc = self.desc[j] | 1 << j
+        if self.anc[j] & new_anc == new_anc:
+            return True
+        for k in _bits(new_desc):
+            self.anc[k] |= new_anc
+        for k in _bits(new_anc):
+            self.desc[k] |= new_desc
+        return True
+
+    def mask(self, nodes: NodeSet) -> int:
+        if not isinstance(nodes, (set, frozenset)):
+            nodes = {nodes}
+        return sum(1 << self.node2ix[node] for node in nodes if node in self.node2ix)
+
+    def labels(self, mask: int) -> Set[Node]:
+        nodes, labels = self.nodes, set()
+        while mask:
+            low = mask & -mask
+            labels.add(nodes[low.bit_length() - 1])
+            mask ^= low
+        return labels
+
+    def _union(self, masks: List[int], nodes: NodeSet) -> int:
+        if not isinstance(nodes, (set, frozenset)):
+            ix = self.node2ix.get(nodes)
+            return masks[ix] if ix is not None else 0
+        mask = 0
+        for k in _bits(self.mask(nodes)):
+            mask |= masks[k]
+        return mask
+
+    def ancestors(self, nodes: NodeSet) -> int:
+        return self._union(self.anc, nodes)
+
+    def descendants(self, nodes: NodeSet) -> int:
+        return self._union(self.desc, nodes)
+
+    def is_ancestor(self, anc: Node, desc: Node) -> bool:
+        anc, desc = self.node2ix.get(anc), self.node2ix.get(desc)
+        return anc is not None and desc is not None and bool(self.anc[desc] >> anc & 1)
+
+
+class IndexedAncestralGraph(AncestralGraph):
+    """
+    Ancestral graph which keeps, for each node, its ancestors and descendants as bitmasks, so that ``ancestors_of``,
+    ``descendants_of``, ``is_ancestor_of`` and the ancestral checks of ``add_directed`` and ``add_bidirected`` are
+    read off the index instead of walking the graph, and ``msep`` only walks the ancestors of its arguments.
+
+    The index is built on the first query. Adding an arc i->j updates it in place, by adding the ancestors of i to
+    the ancestors of the descendants of j and the descendants of j to the descendants of the ancestors of i.
+    Removing an arc or a node discards it, and it is rebuilt on the next query, in time linear in the number of
+    nodes and arcs (times the number of nodes divided by the word size). Bidirected and undirected edges do not
+    change ancestry, so they leave the index as it is.
+
+    Unlike :class:`AncestralGraph`, ``add_directed`` raises a ``SpouseError`` (and leaves the graph unchanged) if the
+    arc would create an almost directed cycle, and ``add_bidirected`` raises a ``SpouseError`` if one endpoint is an
+    ancestor of the other.
+
+    Parameters
+    ----------
+    nodes:
+        Nodes of the graph.
+    directed:
+        Directed edges.
+    bidirected:
+        Bidirected edges.
+    undirected:
+        Undirected edges.
+
+    Examples
+    --------
+    >>> import causaldag as cd
+    >>> g = cd.IndexedAncestralGraph(directed={(1, 2), (2, 3)}, bidirected={(3, 4)})
+    >>> g.ancestors_of(3), g.is_ancestor_of(1, 3)
+    ({1, 2}, True)
+    >>> g.add_bidirected(1, 3)
+    Traceback (most recent call last):
+    ...
+    graphical_models.classes.mags.ancestral_graph.SpouseError
+    """
+    def __init__(
+            self,
+            nodes: Set = frozenset(),
+            directed: Set = frozenset(),
+            bidirected: Set = frozenset(),
+            undirected: Set = frozenset()
+    ):
+        self._index = None
+        super().__init__(nodes, directed=directed, bidirected=bidirected, undirected=undirected)
+
+    @classmethod
+    def from_ancestral_graph(cls, graph: AncestralGraph) -> 'IndexedAncestralGraph':
+        return cls(graph.nodes, graph.directed, graph.bidirected, graph.undirected)
+
+    def copy(self) -> 'IndexedAncestralGraph':
+        """
+        Return a copy of this ancestral graph, along with its index.
+        """
+        g = IndexedAncestralGraph(self.nodes, self.directed, self.bidirected, self.undirected)
+        g._index = self._index.copy() if self._index is not None else None
+        return g
+
+    # === INDEX
+    def _closure(self) -> _Closure:
+        if self._index is None:
+            self._index = self._build_index()
+        return self._index
+
+    def _build_index(self) -> _Closure:
+        """
+        Compute the ancestors of each node in a topological order, and the descendants in the reverse order. Raises a
+        ``CycleError`` if the directed edges contain a cycle.
+        """
+        nodes = list(self._nodes)
+        node2ix = {node: ix for ix, node in enumerate(nodes)}
+        parents = [[node2ix[parent] for parent in self._parents[node]] for node in nodes]
+        children = [[node2ix[child] for child in self._children[node]] for node in nodes]
+
+        num_parents = [len(ps) for ps in parents]
+        queue = deque(ix for ix, n in enumerate(num_parents) if n == 0)
+        order = []
+        while queue:
+            k = queue.popleft()
+            order.append(k)
+            for child in children[k]:
+                num_parents[child] -= 1
+                if num_parents[child] == 0:
+                    queue.append(child)
+        if len(order) != len(nodes):
+            raise CycleError()
+
+        anc, desc = [0] * len(nodes), [0] * len(nodes)
+        for k in order:
+            for parent in parents[k]:
+                anc[k] |= anc[parent] | 1 << parent
+        for k in reversed(order):
+            for child in children[k]:
+                desc[k] |= desc[child] | 1 << child
+        return _Closure(nodes, anc, desc)
+
+    # === ANCESTRY QUERIES
+    def ancestors_of(self, nodes: NodeSet, exclude_arcs=set()) -> Set[Node]:
+        if exclude_arcs:
+            return super().ancestors_of(nodes, exclude_arcs=exclude_arcs)
+        closure = self._closure()
+        return closure.labels(closure.ancestors(nodes))
+
+    def descendants_of(self, nodes: NodeSet, exclude_arcs=set()) -> Set[Node]:
+        if exclude_arcs:
+            return super().descendants_of(nodes, exclude_arcs=exclude_arcs)
+        closure = self._closure()
+        return closure.labels(closure.descendants(nodes))
+
+    def is_ancestor_of(self, anc: Node, desc: Node) -> bool:
+        """
+        Check if ``anc`` is an ancestor of ``desc``, i.e. if there is a directed path from ``anc`` to ``desc``.
+        """
+        return self._closure().is_ancestor(anc, desc)
+
+    def ancestor_dict(self) -> Dict[Node, Set[Node]]:
+        closure = self._closure()
+        return {node: closure.labels(closure.anc[ix]) for ix, node in enumerate(closure.nodes)}
+
+    def descendant_dict(self) -> Dict[Node, Set[Node]]:
+        closure = self._closure()
+        return {node: closure.labels(closure.desc[ix]) for ix, node in enumerate(closure.nodes)}
+
+    def topological_sort(self) -> list:
+        """
+        Return the nodes sorted by their number of ancestors, which is consistent with the ancestral relations of the
+        graph. Raises a ``CycleError`` if the graph has a directed cycle, and a ``SpouseError`` if it has an almost
+        directed cycle.
+        """
+        closure = self._closure()
+        for i, j in map(tuple, self._bidirected):
+            if closure.is_ancestor(i, j) or closure.is_ancestor(j, i):
+                raise SpouseError()
+        num_ancestors = [bin(anc).count('1') for anc in closure.anc]
+        return [closure.nodes[ix] for ix in sorted(range(len(closure.nodes)), key=num_ancestors.__getitem__)]
+
+    def _add_upstream(self, upstream: set, node: Node):
+        upstream.update(self.ancestors_of(node))
+
+    def msep(self, A: Set[Node], B: Set[Node], C: Set[Node] = set()) -> bool:
+        """
+        Check whether ``A`` and ``B`` are m-separated given ``C``, using the Bayes ball algorithm on the subgraph
+        induced by the ancestors of ``A``, ``B`` and ``C``, which has the same m-separations between them.
+        """
+        A, B, C = core_utils.to_set(A), core_utils.to_set(B), core_utils.to_set(C)
+        closure = self._closure()
+        relevant = closure.labels(closure.ancestors(A | B | C)) | A | B | C
+        shaded = self.ancestors_of(C) | C
+
+        # nodes reached along an edge ending in a tail, and along an edge ending in an arrowhead
+        tail_visited, head_visited = set(), set()
+        tail_schedule, head_schedule = list(A), []
+        while tail_schedule or head_schedule:
+            if tail_schedule:
+                node = tail_schedule.pop()
+                if node in B:
+                    return False
+                if node in tail_visited:
+                    continue
+                tail_visited.add(node)
+                if node not in C:
+                    tail_schedule.extend(self._parents[node] & relevant)
+                    tail_schedule.extend(self._neighbors[node] & relevant)
+                    head_schedule.extend(self._children[node] & relevant)
+                    head_schedule.extend(self._spouses[node] & relevant)
+            else:
+                node = head_schedule.pop()
+                if node in B:
+                    return False
+                if node in head_visited:
+                    continue
+                head_visited.add(node)
+                if node in shaded:
+                    tail_schedule.extend(self._parents[node] & relevant)
+                    head_schedule.extend(self._spouses[node] & relevant)
+                if node not in C:
+                    head_schedule.extend(self._children[node] & relevant)
+                    head_schedule.extend(self._neighbors[node] & relevant)
+        return True
+
+    # === ANCESTRAL CHECKS
+    def _creates_almost_cycle(self, i: Node, j: Node) -> bool:
+        """
+        Check if adding i->j would make a spouse of j, or of one of its descendants, an ancestor of it.
+        """
+        closure = self._closure()
+        upstream = closure.ancestors(i) | closure.mask(i)
+        downstream = closure.descendants(j) | closure.mask(j)
+        return any(
+            upstream & closure.mask(self._spouses[node])
+            for node in closure.labels(downstream)
+            if self._spouses[node]
+        )
+
+    def add_directed(self, i: Node, j: Node):
+        """
+        Add a directed edge from node ``i`` to node ``j``, raising a ``CycleError`` if it would create a directed
+        cycle and a ``SpouseError`` if it would create an almost directed cycle.
+        """
+        if not self.has_directed(i, j) and i not in self._adjacent[j]:
+            if i == j or self.is_ancestor_of(j, i):
+                raise CycleError()
+            if self._creates_almost_cycle(i, j):
+                raise SpouseError()
+        self._add_directed(i, j)
+
+    def add_bidirected(self, i: Node, j: Node):
+        """
+        Add a bidirected edge between nodes ``i`` and ``j``, raising a ``SpouseError`` if one is an ancestor of the
+        other.
+        """
+        if not self.has_bidirected(i, j) and i not in self._adjacent[j]:
+            if i == j or self.is_ancestor_of(i, j) or self.is_ancestor_of(j, i):
+                raise SpouseError()
+        self._add_bidirected(i, j)
+
+    # === INDEX MAINTENANCE
+    def add_node(self, node: Node):
+        super().add_node(node)
+        if self._index is not None:
+            self._index.add_node(node)
+
+    def add_nodes_from(self, nodes: Iterable[Node]):
+        for node in nodes:
+            self.add_node(node)
+
+    def _add_directed(self, i: Node, j: Node, ignore_error=False):
+        is_new = not self.has_directed(i, j)
+        super()._add_directed(i, j, ignore_error=ignore_error)
+        if self._index is not None and is_new:
+            if not self._index.add_arc(i, j):
+                self._index = None
+
+    def _add_bidirected(self, i: Node, j: Node, ignore_error=False):
+        super()._add_bidirected(i, j, ignore_error=ignore_error)
+        if self._index is not None:
+            self._index.add_node(i)
+            self._index.add_node(j)
+
+    def _add_undirected(self, i: Node, j: Node, ignore_error=False):
+        super()._add_undirected(i, j, ignore_error=ignore_error)
+        if self._index is not None:
+            self._index.add_node(i)
+            self._index.add_node(j)
+
+    def remove_node(self, node: Node, ignore_error=False):
+        super().remove_node(node, ignore_error=ignore_error)
+        self._index = None
+
+    def remove_directed(self, i: Node, j: Node, ignore_error=False):
+        existed = self.has_directed(i, j)
+        super().remove_directed(i, j, ignore_error=ignore_error)
+        if existed:
+            self._index = None
@@ -0,0 +1,235 @@
+"""
+Maximal ancestral graphs of the marginals of a DAG, for all pairs of observed nodes at once.
+
+``DAG.marginal_mag`` checks, for each pair of observed nodes, whether they are m-separated given their observed
+ancestors, each check being one Bayes ball search. Here, the DAG is first projected onto the observed nodes: i->j if
+there is a directed path from i to j whose intermediate nodes are latent, and i<->j if there are such paths into i
+and into j from a common latent node. Two observed nodes are then adjacent in the MAG iff they are joined by an
+inducing path of the projection, i.e. a path i *-> c1 <-> ... <-> ck <-* j whose intermediate nodes c are ancestors
+of i or j. This is a reachability query over the bidirected edges between ancestors of i or j, answered with
+bitmasks over the nodes.
+"""
+# === IMPORTS: BUILT-IN ===
+from typing import Dict, Iterable, List, Optional, Union
+
+# === IMPORTS: LOCAL ===
+from graphical_models import DAG
+from graphical_models.custom_types import Node
+from graphical_models.utils import core_utils
+from .indexed_ancestral_graph import IndexedAncestralGraph, _Closure, _bits
+
+
+class _DAGIndex:
+    """
+    Parents, children and ancestors of each node of a DAG, as bitmasks over the positions of the nodes in a
+    topological order.
+    """
+    def __init__(self, dag: DAG):
+        self.nodes = list(dag.topological_sort())
+        self.node2ix = {node: ix for ix, node in enumerate(self.nodes)}
+        self.parents = [0] * len(self.nodes)
+        self.children = [0] * len(self.nodes)
+        self.anc = [0] * len(self.nodes)
+        for k, node in enumerate(self.nodes):
+            for parent in dag.parents_of(node):
+                parent_ix = self.node2ix[parent]
+                self.parents[k] |= 1 << parent_ix
+                self.children[parent_ix] |= 1 << k
+                self.anc[k] |= self.anc[parent_ix] | 1 << parent_ix
+
+    def mask(self, nodes: Iterable[Node]) -> int:
+        return sum(1 << self.node2ix[node] for node in nodes if node in self.node2ix)
+
+
+def _projection(index: _DAGIndex, latent: int) -> (List[int], List[int]):
+    """
+    Return the children and the spouses of each observed node in the projection of the DAG onto the nodes not in
+    ``latent``.
+    """
+    p = len(index.nodes)
+    children = index.children
+    # observed nodes reached from each latent node by directed paths whose intermediate nodes are latent
+    reached = [0] * p
+    for k in reversed(range(p)):
+        if latent >> k & 1:
+            for child in _bits(children[k]):
+                reached[k] |= reached[child] if latent >> child & 1 else 1 << child
+
+    proj_children, proj_spouses = [0] * p, [0] * p
+    for k in range(p):
+        if latent >> k & 1:
+            # a latent node with a latent parent reaches a subset of the nodes its parent reaches
+            if not index.parents[k] & latent:
+                for node in _bits(reached[k]):
+                    proj_spouses[node] |= reached[k] & ~(1 << node)
+        else:
+            for child in _bits(children[k]):
+                proj_children[k] |= reached[child] if latent >> child & 1 else 1 << child
+    return proj_children, proj_spouses
+
+
+def _districts(spouses: List[int], observed: int) -> List[int]:
+    """
+    Return, for each observed node, the nodes connected to it by bidirected paths, including itself.
+    """
+    district = [0] * len(spouses)
+    for k in _bits(observed):
+        if district[k]:
+            continue
+        component, frontier = 1 << k, 1 << k
+        while frontier:
+            new = 0
+            for node in _bits(frontier):
+                new |= spouses[node]
+            frontier = new & ~component
+            component |= frontier
+        for node in _bits(component):
+            district[node] = component
+    return district
+
+
+def _mag_edges(index: _DAGIndex, latent: int) -> (list, list):
+    """
+    Return the directed and bidirected edges of the MAG of the marginal over the nodes not in ``latent``, as pairs of
+    positions in ``index``.
+    """
+    p = len(index.nodes)
+    observed = (1 << p) - 1 & ~latent
+    anc = [a & observed for a in index.anc]
+    proj_children, proj_spouses = _projection(index, latent)
+    district = _districts(proj_spouses, observed)
+
+    # the nodes each observed node has an edge into, and the districts of those nodes
+    into = [proj_children[k] | proj_spouses[k] for k in range(p)]
+    reachable = [0] * p
+    for k in _bits(observed):
+        for node in _bits(into[k]):
+            reachable[k] |= district[node]
+
+    directed, bidirected = [], []
+    for i in _bits(observed):
+        adjacent = proj_children[i] | proj_spouses[i]
+        for j in _bits(observed & ~((2 << i) - 1)):
+            if not adjacent >> j & 1:
+                if not into[j] & reachable[i]:
+                    continue
+                # search for a collider path i *-> c1 <-> ... <-> ck <-* j through ancestors of i or j
+                allowed = (anc[i] | anc[j]) & ~(1 << i | 1 << j)
+                reached = frontier = into[i] & allowed
+                found = bool(reached & into[j])
+                while frontier and not found:
+                    new = 0
+                    for node in _bits(frontier):
+                        new |= proj_spouses[node]
+                    frontier = new & allowed & ~reached
+                    reached |= frontier
+                    found = bool(frontier & into[j])
+                if not found:
+                    continue
+            if anc[j] >> i & 1:
+                directed.append((i, j))
+            elif anc[i] >> j & 1:
+                directed.append((j, i))
+            else:
+                bidirected.append((i, j))
+    return directed, bidirected
+
+
+def _to_mag(index: _DAGIndex, latent: int, relabel: Optional[Union[str, Dict]]) -> IndexedAncestralGraph:
+    directed, bidirected = _mag_edges(index, latent)
+    p = len(index.nodes)
+    observed = [k for k in range(p) if not latent >> k & 1]
+    labels = list(index.nodes)
+    if relabel is not None:
+        if relabel == 'default':
+            relabel = {node: ix for ix, node in enumerate(sorted(labels[k] for k in observed))}
+        for k in observed:
+            labels[k] = relabel[labels[k]]
+
+    mag = IndexedAncestralGraph(
+        {labels[k] for k in observed},
+        directed={(labels[i], labels[j]) for i, j in directed},
+        bidirected={(labels[i], labels[j]) for i, j in bidirected}
+    )
+
+    # ancestors in the MAG are the observed ancestors in the DAG
+    position = {k: ix for ix, k in enumerate(observed)}
+    anc, desc = [0] * len(observed), [0] * len(observed)
+    for k in observed:
+        for ancestor in _bits(index.anc[k] & ~latent):
+            anc[position[k]] |= 1 << position[ancestor]
+            desc[position[ancestor]] |= 1 << position[k]
+    mag._index = _Closure([labels[k] for k in observed], anc, desc)
+    return mag
+
+
+def marginal_mags(
+        dag: DAG,
+        latent_sets: Iterable[Iterable[Node]],
+        relabel: Optional[Union[str, Dict]] = None
+) -> List[IndexedAncestralGraph]:
+    """
+    Return the maximal ancestral graph of the marginal of ``dag`` over the nodes not in each set of ``latent_sets``.
+
+    The topological order and ancestors of ``dag`` are computed once and shared by all latent sets.
+
+    Parameters
+    ----------
+    dag:
+        A DAG.
+    latent_sets:
+        Sets of nodes to marginalize over.
+    relabel:
+        If 'default', relabel the observed nodes of each MAG as 0, 1, ..., in sorted order of their labels. If a
+        dictionary, relabel each observed node by its value.
+
+    See Also
+    --------
+    marginal_mag
+
+    Return
+    ------
+    List of ``IndexedAncestralGraph``, with the ancestors of each node already indexed.
+
+    Examples
+    --------
+    >>> import causaldag as cd
+    >>> d = cd.DAG(arcs={(1, 2), (1, 3), (2, 3)})
+    >>> [mag.directed for mag in cd.marginal_mags(d, [{1}, {2}])]
+    [{(2, 3)}, {(1, 3)}]
+    """
+    index = _DAGIndex(dag)
+    return [_to_mag(index, index.mask(core_utils.to_set(latent_nodes)), relabel) for latent_nodes in latent_sets]
+
+
+def marginal_mag(
+        dag: DAG,
+        latent_nodes: Iterable[Node],
+        relabel: Optional[Union[str, Dict]] = None
+) -> IndexedAncestralGraph:
+    """
+    Return the maximal ancestral graph of the marginal of ``dag`` over the nodes not in ``latent_nodes``, the same
+    graph as ``dag.marginal_mag(latent_nodes, relabel=relabel)``.
+
+    Parameters
+    ----------
+    dag:
+        A DAG.
+    latent_nodes:
+        Nodes to marginalize over.
+    relabel:
+        If 'default', relabel the observed nodes as 0, 1, ..., in sorted order of their labels. If a dictionary,
+        relabel each observed node by its value.
+
+    See Also
+    --------
+    marginal_mags
+
+    Examples
+    --------
+    >>> import causaldag as cd
+    >>> d = cd.DAG(arcs={(1, 2), (1, 3)})
+    >>> cd.marginal_mag(d, {1}).bidirected
+    {frozenset({2, 3})}
+    """
+    return marginal_mags(dag, [latent_nodes], relabel=relabel)[0]
@@ -0,0 +1,192 @@
+"""
+Comparison metrics between stacks of graphs, given as adjacency matrices, computed with array operations over the
+whole stack at once.
+
+Every function takes adjacency matrices in the convention of ``PDAG.to_amat``: ``amat[i, j]`` is nonzero iff there
+is an arc ``i -> j``, and an undirected edge ``i - j`` is stored in both directions. DAGs and CPDAGs can therefore be
+mixed freely. Stacks have shape ``(ngraphs x nnodes x nnodes)``; a single ``(nnodes x nnodes)`` matrix is broadcast
+against a stack.
+"""
+# === IMPORTS: BUILT-IN ===
+from typing import Dict, Iterable, Optional
+
+# === IMPORTS: THIRD-PARTY ===
+import numpy as np
+
+
+def stack_amats(graphs: Iterable, node_list: Optional[list] = None) -> np.ndarray:
+    """
+    Return the adjacency matrices of ``graphs`` (DAGs or PDAGs) as a ``(ngraphs x nnodes x nnodes)`` boolean array,
+    with rows and columns in the order of ``node_list`` (by default, the sorted nodes of the first graph).
+
+    Examples
+    --------
+    >>> import causaldag as cd
+    >>> amats = cd.stack_amats([cd.DAG(arcs={(0, 1)}), cd.DAG(arcs={(1, 0)})])
+    >>> amats.shape
+    (2, 2, 2)
+    """
+    graphs = list(graphs)
+    if node_list is None:
+        node_list = sorted(graphs[0].nodes) if graphs else []
+    amats = np.zeros((len(graphs), len(node_list), len(node_list)), dtype=bool)
+    for k, graph in enumerate(graphs):
+        amats[k] = graph.to_amat(node_list)[0] != 0
+    return amats
+
+
+def _as_stacks(amats1, amats2) -> tuple:
+    amats1, amats2 = np.broadcast_arrays(np.asarray(amats1) != 0, np.asarray(amats2) != 0)
+    if amats1.ndim == 2:
+        return amats1[None], amats2[None]
+    return amats1, amats2
+
+
+def _upper_count(mats: np.ndarray) -> np.ndarray:
+    """
+    Number of nonzero entries strictly above the diagonal of each matrix in the stack.
+    """
+    nnodes = mats.shape[-1]
+    return np.count_nonzero(mats & np.triu(np.ones((nnodes, nnodes), dtype=bool), k=1), axis=(1, 2))
+
+
+def _skeleton(amats: np.ndarray) -> np.ndarray:
+    return amats | amats.transpose(0, 2, 1)
+
+
+def _directed(amats: np.ndarray) -> np.ndarray:
+    return amats & ~amats.transpose(0, 2, 1)
+
+
+def _squeeze(values: np.ndarray, amats1, amats2):
+    return values if max(np.ndim(amats1), np.ndim(amats2)) == 3 else values[0].item()
+
+
+def shd_batch(amats1, amats2) -> np.ndarray:
+    """
+    Structural Hamming distance between each pair of graphs: the number of pairs of nodes which are joined
+    differently (by no edge, an undirected edge, or an arc in either direction). For DAGs, this is ``DAG.shd``, and
+    for PDAGs, ``PDAG.shd``.
+
+    Examples
+    --------
+    >>> import causaldag as cd
+    >>> g1 = cd.DAG(arcs={(1, 2), (2, 3)}).to_amat()[0]
+    >>> g2 = cd.DAG(arcs={(2, 1), (2, 3)}).to_amat()[0]
+    >>> cd.shd_batch(g1, g2)
+    1
+    """
+    stack1, stack2 = _as_stacks(amats1, amats2)
+    diff = stack1 != stack2
+    return _squeeze(_upper_count(_skeleton(diff)), amats1, amats2)
+
+
+def shd_skeleton_batch(amats1, amats2) -> np.ndarray:
+    """
+    Number of pairs of nodes which are adjacent in exactly one of each pair of graphs, as ``DAG.shd_skeleton``.
+    """
+    stack1, stack2 = _as_stacks(amats1, amats2)
+    return _squeeze(_upper_count(_skeleton(stack1) != _skeleton(stack2)), amats1, amats2)
+
+
+def _num_v_structures(directed: np.ndarray, nonadjacent: np.ndarray) -> np.ndarray:
+    # common[k, i, j] is the number of common children of i and j in graph k
+    directed = directed.astype(np.float32)
+    common = np.matmul(directed, directed.transpose(0, 2, 1))
+    return np.round(np.sum(common * nonadjacent, axis=(1, 2)) / 2).astype(int)
+
+
+def markov_equivalent_batch(amats1, amats2) -> np.ndarray:
+    """
+    Whether each pair of graphs is Markov equivalent, i.e., has the same skeleton and the same v-structures.
+
+    DAGs and CPDAGs may be compared with each other, since the v-structures of a CPDAG are those of every DAG in its
+    Markov equivalence class. The v-structures of each pair are compared by counting those of each graph and those
+    they have in common, with one batched matrix product each.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> import causaldag as cd
+    >>> d1 = cd.DAG(arcs={(0, 1), (1, 2)}).to_amat()[0]
+    >>> d2 = cd.DAG(arcs={(2, 1), (1, 0)}).to_amat()[0]
+    >>> d3 = cd.DAG(arcs={(0, 1), (2, 1)}).to_amat()[0]
+    >>> cd.markov_equivalent_batch(d1, np.stack([d2, d3]))
+    array([ True, False])
+    """
+    stack1, stack2 = _as_stacks(amats1, amats2)
+    skeleton1, skeleton2 = _skeleton(stack1), _skeleton(stack2)
+    same_skeleton = ~np.any(skeleton1 != skeleton2, axis=(1, 2))
+
+    nnodes = stack1.shape[-1]
+    nonadjacent = ~skeleton1 & ~np.eye(nnodes, dtype=bool)
+    directed1, directed2 = _directed(stack1), _directed(stack2)
+    num1 = _num_v_structures(directed1, nonadjacent)
+    num2 = _num_v_structures(directed2, nonadjacent)
+    num_common = _num_v_structures(directed1 & directed2, nonadjacent)
+    equivalent = same_skeleton & (num1 == num_common) & (num2 == num_common)
+    return _squeeze(equivalent, amats1, amats2)
+
+
+def _ratio(numerators: np.ndarray, denominators: np.ndarray) -> np.ndarray:
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominators > 0, numerators / np.maximum(denominators, 1), np.nan)
+
+
+def graph_metrics(estimated, true) -> Dict[str, np.ndarray]:
+    """
+    Compare each estimated graph to the corresponding true graph.
+
+    Parameters
+    ----------
+    estimated:
+        ``(ngraphs x nnodes x nnodes)`` adjacency matrices of the estimated graphs.
+    true:
+        adjacency matrices of the true graphs, either one per estimated graph, or a single matrix shared by all.
+
+    Returns
+    -------
+    dict
+        dictionary of arrays with one entry per graph:
+
+        * ``shd`` -- structural Hamming distance (``shd_batch``).
+        * ``shd_skeleton`` -- structural Hamming distance of the skeletons (``shd_skeleton_batch``).
+        * ``arc_precision``, ``arc_recall`` -- precision and recall of the estimated arcs (directed edges) with
+          respect to the true arcs.
+        * ``edge_precision``, ``edge_recall`` -- precision and recall of the estimated adjacencies, ignoring
+          orientations.
+        * ``markov_equivalent`` -- whether the graphs are Markov equivalent (``markov_equivalent_batch``).
+
+        Precisions and recalls are NaN when there are no estimated, respectively true, arcs or adjacencies.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> import causaldag as cd
+    >>> batch = cd.directed_erdos_batch(10, .3, size=100, rng=np.random.default_rng(0))
+    >>> true = batch.amats()
+    >>> cpdags = cd.stack_amats([dag.cpdag() for dag in batch], node_list=list(range(10)))
+    >>> bool(cd.graph_metrics(cpdags, true)['markov_equivalent'].all())
+    True
+    """
+    stack_est, stack_true = _as_stacks(estimated, true)
+    skeleton_est, skeleton_true = _skeleton(stack_est), _skeleton(stack_true)
+    directed_est, directed_true = _directed(stack_est), _directed(stack_true)
+
+    num_arcs_est = np.count_nonzero(directed_est, axis=(1, 2))
+    num_arcs_true = np.count_nonzero(directed_true, axis=(1, 2))
+    num_arcs_common = np.count_nonzero(directed_est & directed_true, axis=(1, 2))
+    num_edges_est = _upper_count(skeleton_est)
+    num_edges_true = _upper_count(skeleton_true)
+    num_edges_common = _upper_count(skeleton_est & skeleton_true)
+
+    metrics = dict(
+        shd=shd_batch(stack_est, stack_true),
+        shd_skeleton=shd_skeleton_batch(stack_est, stack_true),
+        arc_precision=_ratio(num_arcs_common, num_arcs_est),
+        arc_recall=_ratio(num_arcs_common, num_arcs_true),
+        edge_precision=_ratio(num_edges_common, num_edges_est),
+        edge_recall=_ratio(num_edges_common, num_edges_true),
+        markov_equivalent=markov_equivalent_batch(stack_est, stack_true),
+    )
+    return {key: _squeeze(value, estimated, true) for key, value in metrics.items()}
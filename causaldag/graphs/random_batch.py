@@ -0,0 +1,291 @@
+"""
+Bulk generation of random DAGs, stored as arrays and turned into DAG objects only when accessed.
+"""
+# === IMPORTS: BUILT-IN ===
+from typing import Optional, Iterator
+
+# === IMPORTS: THIRD-PARTY ===
+import numpy as np
+from scipy import sparse
+
+# === IMPORTS: LOCAL ===
+from graphical_models import DAG, GaussDAG
+from graphical_models.rand.graphs import unif_away_zero, RandWeightFn
+
+
+def _bernoulli_positions(total: int, p: float, rng) -> np.ndarray:
+    """
+    Return the sorted positions of the successes among ``total`` independent coin flips with success probability
+    ``p``, in time proportional to the number of successes, by drawing the geometric gaps between them.
+    """
+    if p <= 0 or total == 0:
+        return np.zeros(0, dtype=np.int64)
+    if p >= 1:
+        return np.arange(total, dtype=np.int64)
+    expected = total * p
+    ndraws = int(expected + 5 * np.sqrt(expected) + 16)
+    chunks = []
+    last = -1
+    while True:
+        gaps = rng.geometric(p, size=ndraws)
+        positions = last + np.cumsum(gaps)
+        if positions[-1] >= total:
+            chunks.append(positions[positions < total])
+            break
+        chunks.append(positions)
+        last = positions[-1]
+    return np.concatenate(chunks)
+
+
+def _fill_arcs(dag: DAG, sources: np.ndarray, targets: np.ndarray):
+    """
+    Add arcs to an empty DAG, skipping the acyclicity check, which holds by construction.
+    """
+    arcs = list(zip(sources.tolist(), targets.tolist()))
+    dag._arcs = set(arcs)
+    for i, j in arcs:
+        dag._parents[j].add(i)
+        dag._children[i].add(j)
+        dag._neighbors[i].add(j)
+        dag._neighbors[j].add(i)
+    return dag
+
+
+class DAGBatch:
+    """
+    A batch of random DAGs on the nodes ``0, ..., nnodes-1``, stored as flat arrays of arcs.
+
+    Indexing the batch builds the ``DAG`` object for that graph on first access, so generating a batch costs only
+    the array operations, and objects are built only for the graphs actually used. The arcs of every graph are also
+    available as arrays and (sparse) adjacency matrices, without building any objects.
+
+    Parameters
+    ----------
+    nnodes:
+        Number of nodes in each graph.
+    sources, targets:
+        Arrays of the sources and targets of the arcs of all graphs, concatenated.
+    offsets:
+        Array of length ``size + 1``; the arcs of graph ``k`` are at positions ``offsets[k]:offsets[k+1]``.
+    rng:
+        The ``np.random.Generator`` the batch was drawn from, used by default by :meth:`rand_weights`. None for the
+        global ``np.random`` state.
+
+    See Also
+    --------
+    directed_erdos_batch
+    """
+    def __init__(
+            self,
+            nnodes: int,
+            sources: np.ndarray,
+            targets: np.ndarray,
+            offsets: np.ndarray,
+            rng: Optional[np.random.Generator] = None
+    ):
+        self.nnodes = nnodes
+        self._sources = sources
+        self._targets = targets
+        self._offsets = offsets
+        self.rng = rng
+        self._graphs = dict()
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, k: int) -> DAG:
+        if isinstance(k, slice):
+            return [self[ix] for ix in range(*k.indices(len(self)))]
+        if k < 0:
+            k += len(self)
+        if not 0 <= k < len(self):
+            raise IndexError(k)
+        graph = self._graphs.get(k)
+        if graph is None:
+            graph = self._graphs[k] = self._build(k)
+        return graph
+
+    def __iter__(self) -> Iterator[DAG]:
+        for k in range(len(self)):
+            yield self[k]
+
+    def _build(self, k: int) -> DAG:
+        start, stop = self._offsets[k], self._offsets[k+1]
+        return _fill_arcs(DAG(nodes=set(range(self.nnodes))), self._sources[start:stop], self._targets[start:stop])
+
+    @property
+    def num_arcs(self) -> np.ndarray:
+        """
+        Number of arcs in each graph.
+        """
+        return np.diff(self._offsets)
+
+    def arcs(self, k: int) -> np.ndarray:
+        """
+        Return the arcs of graph ``k`` as an ``(num_arcs x 2)`` array of (source, target) rows.
+        """
+        start, stop = self._offsets[k], self._offsets[k+1]
+        return np.column_stack((self._sources[start:stop], self._targets[start:stop]))
+
+    def amat(self, k: int, sparse_format=False):
+        """
+        Return the adjacency matrix of graph ``k``, as a dense array or, if ``sparse_format``, a CSR matrix.
+        """
+        start, stop = self._offsets[k], self._offsets[k+1]
+        amat = sparse.csr_matrix(
+            (np.ones(stop - start, dtype=np.int8), (self._sources[start:stop], self._targets[start:stop])),
+            shape=(self.nnodes, self.nnodes)
+        )
+        return amat if sparse_format else amat.toarray()
+
+    def amats(self) -> np.ndarray:
+        """
+        Return the adjacency matrices of all graphs as a ``(size x nnodes x nnodes)`` boolean array.
+        """
+        amats = np.zeros((len(self), self.nnodes, self.nnodes), dtype=bool)
+        graph_ixs = np.repeat(np.arange(len(self)), self.num_arcs)
+        amats[graph_ixs, self._sources, self._targets] = True
+        return amats
+
+    def rand_weights(
+            self,
+            rand_weight_fn: Optional[RandWeightFn] = None,
+            rng: Optional[np.random.Generator] = None
+    ) -> 'GaussDAGBatch':
+        """
+        Return a batch of GaussDAGs on these graphs, drawing the weights of all arcs of all graphs in one call to
+        ``rand_weight_fn``, as ``cd.rand.rand_weights`` does for a single graph.
+
+        Parameters
+        ----------
+        rand_weight_fn:
+            Function of ``size`` returning that many weights, which draws from its own random state. Defaults to
+            ``unif_away_zero``, drawn from ``rng``.
+        rng:
+            A ``np.random.Generator`` to draw the default weights from. Defaults to the generator the batch was drawn
+            from, if any, and otherwise the global ``np.random`` state.
+        """
+        size = len(self._sources)
+        rng = rng if rng is not None else self.rng
+        if rand_weight_fn is not None:
+            weights = rand_weight_fn(size=size)
+        elif rng is None:
+            weights = unif_away_zero(size=size)
+        else:
+            weights = (rng.integers(0, 2, size=size) * 2 - 1) * rng.uniform(.25, 1, size=size)
+        weights = np.asarray(weights, dtype=float)
+        return GaussDAGBatch(self.nnodes, self._sources, self._targets, self._offsets, weights, rng=self.rng)
+
+
+class GaussDAGBatch(DAGBatch):
+    """
+    A batch of random GaussDAGs, stored as flat arrays of arcs and weights. Indexing the batch builds the
+    ``GaussDAG`` for that graph on first access. Since a ``GaussDAG`` holds a dense weight matrix, prefer
+    ``weight_mat(k, sparse_format=True)`` for graphs with many thousands of nodes.
+
+    See Also
+    --------
+    DAGBatch.rand_weights
+    """
+    def __init__(self, nnodes: int, sources: np.ndarray, targets: np.ndarray, offsets: np.ndarray,
+                 weights: np.ndarray, rng: Optional[np.random.Generator] = None):
+        super().__init__(nnodes, sources, targets, offsets, rng=rng)
+        self._weights = weights
+
+    def _build(self, k: int) -> GaussDAG:
+        start, stop = self._offsets[k], self._offsets[k+1]
+        sources, targets = self._sources[start:stop], self._targets[start:stop]
+        gdag = _fill_arcs(GaussDAG(nodes=list(range(self.nnodes)), arcs=set()), sources, targets)
+        gdag._weight_mat[sources, targets] = self._weights[start:stop]
+        return gdag
+
+    def weights(self, k: int) -> np.ndarray:
+        """
+        Return the weights of the arcs of graph ``k``, in the order of ``arcs(k)``.
+        """
+        return self._weights[self._offsets[k]:self._offsets[k+1]]
+
+    def weight_mat(self, k: int, sparse_format=False):
+        """
+        Return the weight matrix of graph ``k``, as a dense array or, if ``sparse_format``, a CSR matrix.
+        """
+        start, stop = self._offsets[k], self._offsets[k+1]
+        weight_mat = sparse.csr_matrix(
+            (self._weights[start:stop], (self._sources[start:stop], self._targets[start:stop])),
+            shape=(self.nnodes, self.nnodes)
+        )
+        return weight_mat if sparse_format else weight_mat.toarray()
+
+
+def directed_erdos_batch(
+        nnodes: int,
+        density: Optional[float] = None,
+        exp_nbrs: Optional[float] = None,
+        size: int = 1,
+        random_order=True,
+        rng: Optional[np.random.Generator] = None
+) -> DAGBatch:
+    """
+    Generate a batch of random Erdos-Renyi DAGs on ``nnodes`` nodes with density ``density``, with the same
+    distribution as ``cd.rand.directed_erdos``.
+
+    The strictly upper triangular parts of all the adjacency matrices are treated as one long sequence of coin
+    flips, and only the positions of the arcs are drawn, via the geometric gaps between them. Node orders are then
+    permuted for all graphs at once. The cost is proportional to the total number of arcs, so large sparse graphs
+    are cheap, and no DAG objects are built until the batch is indexed.
+
+    Parameters
+    ----------
+    nnodes:
+        Number of nodes in each graph.
+    density:
+        Probability of any edge.
+    exp_nbrs:
+        Expected number of neighbors of each node; an alternative to ``density``.
+    size:
+        Number of graphs.
+    random_order:
+        If True, relabel the nodes of each graph by a random permutation, so that ``0, ..., nnodes-1`` is not a
+        topological order.
+    rng:
+        A ``np.random.Generator`` to draw from, instead of the global ``np.random`` state. It is kept by the batch,
+        and also used by ``DAGBatch.rand_weights``.
+
+    See Also
+    --------
+    DAGBatch
+
+    Examples
+    --------
+    >>> import causaldag as cd
+    >>> batch = cd.directed_erdos_batch(10000, exp_nbrs=5, size=10)
+    >>> batch.num_arcs.shape
+    (10,)
+    >>> gdags = batch.rand_weights()
+    >>> gdags.weight_mat(0, sparse_format=True).nnz == batch.num_arcs[0]
+    True
+    """
+    if density is None and exp_nbrs is None:
+        raise ValueError("One of density or exp_nbrs must be given")
+    density = density if density is not None else exp_nbrs / (nnodes - 1)
+    batch_rng = rng
+    rng = rng if rng is not None else np.random
+
+    npairs = nnodes * (nnodes - 1) // 2
+    positions = _bernoulli_positions(size * npairs, density, rng)
+    graph_ixs, pair_ixs = np.divmod(positions, npairs) if npairs > 0 else (positions, positions)
+
+    # === CONVERT POSITIONS IN THE ROW-MAJOR STRICT UPPER TRIANGLE TO (ROW, COLUMN)
+    rows = np.arange(nnodes, dtype=np.int64)
+    row_offsets = rows * (2 * nnodes - rows - 1) // 2
+    sources = np.searchsorted(row_offsets, pair_ixs, side='right') - 1
+    targets = pair_ixs - row_offsets[sources] + sources + 1
+
+    if random_order:
+        perms = np.argsort(rng.random((size, nnodes)), axis=1)
+        sources = perms[graph_ixs, sources]
+        targets = perms[graph_ixs, targets]
+
+    offsets = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(graph_ixs, minlength=size), out=offsets[1:])
+    return DAGBatch(nnodes, sources, targets, offsets, rng=batch_rng)
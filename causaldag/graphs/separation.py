@@ -0,0 +1,192 @@
+"""
+Batched d-separation and m-separation queries, answered by Bayes-ball reachability over boolean arrays.
+"""
+# === IMPORTS: BUILT-IN ===
+from collections import defaultdict
+from typing import Iterable, Tuple, Any, List
+
+# === IMPORTS: THIRD-PARTY ===
+import numpy as np
+
+# === IMPORTS: LOCAL ===
+from graphical_models import DAG, AncestralGraph
+from graphical_models.utils import core_utils
+
+Query = Tuple[Any, Any, Any]
+
+
+def _propagate(states: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    return (states.astype(np.float32) @ edges) > 0
+
+
+class SeparationOracle:
+    """
+    Answer many separation queries ``(A, B, C)`` against one fixed graph.
+
+    The edge matrices of the graph are built once. Each distinct pair ``(A, C)`` becomes one row of a boolean
+    state matrix, and Bayes ball is run for all rows simultaneously, with one matrix product per step of the
+    search. Queries sharing ``A`` and ``C`` (e.g. testing many ``B`` against one conditioning set) cost a single
+    row.
+
+    Parameters
+    ----------
+    node_list:
+        List of nodes indexing the rows and columns of the edge matrices.
+    directed:
+        ``directed[i, j]`` is nonzero iff there is an arc i->j.
+    bidirected:
+        Symmetric matrix of bidirected edges, if any.
+    undirected:
+        Symmetric matrix of undirected edges, if any.
+
+    Examples
+    --------
+    >>> import causaldag as cd
+    >>> g = cd.DAG(arcs={(1, 2), (3, 2)})
+    >>> oracle = cd.SeparationOracle.from_dag(g)
+    >>> oracle.separated([(1, 3, set()), (1, 3, {2})])
+    array([ True, False])
+    """
+    def __init__(self, node_list: list, directed: np.ndarray, bidirected: np.ndarray = None,
+                 undirected: np.ndarray = None):
+        self.node_list = list(node_list)
+        self._node2ix = core_utils.ix_map_from_list(self.node_list)
+        self._children = (directed != 0).astype(np.float32)
+        self._parents = np.ascontiguousarray(self._children.T)
+        self._spouses = (bidirected != 0).astype(np.float32) if bidirected is not None and bidirected.any() else None
+        self._neighbors = (undirected != 0).astype(np.float32) if undirected is not None and undirected.any() else None
+
+    @classmethod
+    def from_dag(cls, dag: DAG):
+        """
+        Build an oracle answering d-separation queries in ``dag``.
+        """
+        amat, node_list = dag.to_amat()
+        return SeparationOracle(node_list, amat)
+
+    @classmethod
+    def from_ancestral_graph(cls, graph: AncestralGraph):
+        """
+        Build an oracle answering m-separation queries in the ancestral graph ``graph``.
+        """
+        node_list = sorted(graph.nodes)
+        node2ix = core_utils.ix_map_from_list(node_list)
+        p = len(node_list)
+        directed, bidirected, undirected = np.zeros((p, p)), np.zeros((p, p)), np.zeros((p, p))
+        for i, j in graph.directed:
+            directed[node2ix[i], node2ix[j]] = 1
+        for i, j in graph.bidirected:
+            bidirected[node2ix[i], node2ix[j]] = bidirected[node2ix[j], node2ix[i]] = 1
+        for i, j in graph.undirected:
+            undirected[node2ix[i], node2ix[j]] = undirected[node2ix[j], node2ix[i]] = 1
+        return SeparationOracle(node_list, directed, bidirected=bidirected, undirected=undirected)
+
+    def _indicators(self, node_sets: List) -> np.ndarray:
+        indicators = np.zeros((len(node_sets), len(self.node_list)), dtype=bool)
+        for row, nodes in enumerate(node_sets):
+            indicators[row, [self._node2ix[node] for node in nodes]] = True
+        return indicators
+
+    def reachable(self, starts: np.ndarray, conditioning: np.ndarray) -> np.ndarray:
+        """
+        Run Bayes ball from many start sets at once.
+
+        Parameters
+        ----------
+        starts:
+            ``(k, nnodes)`` boolean matrix, each row indicating a set of start nodes.
+        conditioning:
+            ``(k, nnodes)`` boolean matrix, each row indicating the conditioning set used for that row of
+            ``starts``.
+
+        Returns
+        -------
+        ``(k, nnodes)`` boolean matrix, each row indicating the nodes which are not separated from the start nodes
+        given the conditioning set.
+        """
+        # colliders are open if they are conditioned on or are ancestors of the conditioning set
+        shaded = conditioning.copy()
+        frontier = conditioning
+        while frontier.any():
+            frontier = _propagate(frontier, self._parents) & ~shaded
+            shaded |= frontier
+
+        tail_frontier = starts.copy()
+        head_frontier = np.zeros_like(starts)
+        tail_reached, head_reached = tail_frontier.copy(), head_frontier.copy()
+        while tail_frontier.any() or head_frontier.any():
+            # reached through a tail: nothing is a collider, pass unless conditioned on
+            tail_free = tail_frontier & ~conditioning
+            # reached through an arrowhead: pass through colliders if shaded, otherwise unless conditioned on
+            head_collider = head_frontier & shaded
+            head_free = head_frontier & ~conditioning
+
+            new_tail = _propagate(tail_free | head_collider, self._parents)
+            new_head = _propagate(tail_free | head_free, self._children)
+            if self._spouses is not None:
+                new_head |= _propagate(tail_free | head_collider, self._spouses)
+            if self._neighbors is not None:
+                # an undirected edge arrives at a tail
+                new_tail |= _propagate(tail_free | head_free, self._neighbors)
+
+            tail_frontier = new_tail & ~tail_reached
+            head_frontier = new_head & ~head_reached
+            tail_reached |= tail_frontier
+            head_reached |= head_frontier
+        return tail_reached | head_reached
+
+    def separated(self, queries: Iterable[Query], batch_size: int = 1024) -> np.ndarray:
+        """
+        Return a boolean array whose k-th entry is True iff ``A`` and ``B`` are separated given ``C``, where
+        ``(A, B, C)`` is the k-th query. Each of ``A``, ``B`` and ``C`` may be a node or a set of nodes.
+
+        Queries sharing both ``A`` and ``C`` share one row of the search; at most ``batch_size`` rows are searched
+        at once, to bound memory use.
+        """
+        queries = [tuple(map(core_utils.to_set, query)) for query in queries]
+        results = np.zeros(len(queries), dtype=bool)
+
+        queries_by_row = defaultdict(list)
+        for k, (A, B, C) in enumerate(queries):
+            queries_by_row[(frozenset(A), frozenset(C))].append((k, B))
+        rows = list(queries_by_row)
+
+        for batch_start in range(0, len(rows), batch_size):
+            batch = rows[batch_start:batch_start+batch_size]
+            starts = self._indicators([A for A, _ in batch])
+            conditioning = self._indicators([C for _, C in batch])
+            reached = self.reachable(starts, conditioning)
+            for row, key in enumerate(batch):
+                for k, B in queries_by_row[key]:
+                    results[k] = not reached[row, [self._node2ix[b] for b in B]].any()
+        return results
+
+
+def dsep_batch(dag: DAG, queries: Iterable[Query]) -> np.ndarray:
+    """
+    Check d-separation for each query ``(A, B, C)``, returning a boolean array with one entry per query.
+
+    See Also
+    --------
+    SeparationOracle
+
+    Examples
+    --------
+    >>> import causaldag as cd
+    >>> g = cd.DAG(arcs={(1, 2), (3, 2)})
+    >>> cd.dsep_batch(g, [(1, 3, set()), (1, 3, {2})])
+    array([ True, False])
+    """
+    return SeparationOracle.from_dag(dag).separated(queries)
+
+
+def msep_batch(graph: AncestralGraph, queries: Iterable[Query]) -> np.ndarray:
+    """
+    Check m-separation in the ancestral graph ``graph`` for each query ``(A, B, C)``, returning a boolean array
+    with one entry per query.
+
+    See Also
+    --------
+    SeparationOracle
+    """
+    return SeparationOracle.from_ancestral_graph(graph).separated(queries)
@@ -0,0 +1,6 @@
+from .gsp import gsp, igsp, unknown_target_igsp
+from .imap import permutation2dag, reverse_covered_arc
+from .ges import ges
+from .pc import pcalg, skeleton, Sepsets
+from .dci_stability import dci_grid, dci_stability_grid, DifferenceTester, difference_suffstat, kliep_path
+from .gspo import gspo, MAGWorkspace
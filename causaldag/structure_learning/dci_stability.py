@@ -0,0 +1,540 @@
+"""
+Difference causal inference (DCI) over grids of hyperparameters and bootstrap subsamples.
+
+``dci_grid`` runs the three stages of DCI on one pair of datasets for every combination of hyperparameters, sharing
+the work between combinations: the sufficient statistics are computed once, the difference undirected graphs of the
+whole ``alpha_ug`` grid come from one set of precision matrices (or one warm-started KLIEP path), and the invariance
+tests of the skeleton and orientation stages are memoized in a ``DifferenceTester``, so each is run at most once
+whatever the number of combinations that need it. ``dci_stability_grid`` runs ``dci_grid`` on each bootstrap
+subsample, across processes.
+"""
+# === IMPORTS: BUILT-IN ===
+import itertools as itr
+import operator as op
+import time
+from concurrent.futures import Executor
+from typing import Dict, Optional, Tuple
+
+# === IMPORTS: THIRD-PARTY ===
+import networkx as nx
+import numpy as np
+from numpy.linalg import LinAlgError, inv, pinv
+from scipy.special import logsumexp, ncfdtr
+
+# === IMPORTS: LOCAL ===
+from graphical_model_learning.algorithms.difference._utils import bootstrap_generator
+from graphical_model_learning.utils.core_utils import powerset
+from graphical_model_learning.utils.regression import RegressionHelper
+from ..utils.ci_tests import TesterStats
+from .parallel import attach_arrays, run_tasks, share_arrays
+
+
+def difference_suffstat(X: np.ndarray) -> Dict:
+    """
+    Return the sufficient statistics of one dataset used by every stage of DCI: the sample covariance ``S``, its
+    pseudo-inverse ``P``, and the number of samples ``n``.
+    """
+    S = np.cov(X, rowvar=False)
+    return dict(S=S, P=pinv(S), n=X.shape[0])
+
+
+def _regression(rh: RegressionHelper, i: int, c: list, lam: float = 0) -> tuple:
+    """
+    ``rh.regression(i, c, lam)``, without its per-call overhead in the common case of a small conditioning set, for
+    which the same formulas are used.
+    """
+    n, S = rh.n, rh.S
+    if len(c) == 0:
+        return [], S[i, i] * n / (n + 1), None
+    if len(c) >= rh.p / 2:
+        return rh.regression(i, c, lam=lam)
+    S_cc = S[c][:, c]
+    if lam == 0 and (np.abs(np.diag(S_cc)) <= 1e-8).any():
+        return rh.regression(i, c, lam=lam)
+    try:
+        S_inv = inv(S_cc + lam*np.eye(len(c)) if lam else S_cc)
+    except LinAlgError:
+        return rh.regression(i, c, lam=lam)
+    coefs = S_inv @ S[c, i]
+    var = S[i, i] - S[i, c] @ S_inv @ S[c, i]
+    return coefs, var * n / (n - len(c) + 1), S_inv
+
+
+class DifferenceTester:
+    """
+    Memoized invariance tests between two datasets, as used by the skeleton and orientation stages of DCI.
+
+    Lookups are counted in ``self.stats``, as for ``MemoizedInvarianceTester``.
+
+    Parameters
+    ----------
+    suffstat1, suffstat2:
+        sufficient statistics of each dataset, as returned by ``difference_suffstat``.
+    lam:
+        amount of ridge regularization of the regressions of the skeleton stage.
+    """
+    def __init__(self, suffstat1: Dict, suffstat2: Dict, lam: float = 0):
+        self.suffstat1 = suffstat1
+        self.suffstat2 = suffstat2
+        self.rh1 = RegressionHelper(suffstat1)
+        self.rh2 = RegressionHelper(suffstat2)
+        self.lam = lam
+        self.regression_pvalues = dict()
+        self.variance_pvalues = dict()
+        self.stats = TesterStats('invariance')
+
+    def regression_pvalue(self, i: int, j: int, cond_set: tuple) -> float:
+        """
+        p-value of the test that the coefficient of ``j``, in the regression of ``i`` on ``cond_set`` and ``j``, is
+        the same in both datasets.
+        """
+        index = (i, j, frozenset(cond_set))
+        pvalue = self.regression_pvalues.get(index)
+        if pvalue is not None:
+            self.stats.record(len(cond_set) + 1, True)
+            return pvalue
+
+        start = time.perf_counter()
+        n1, n2 = self.rh1.n, self.rh2.n
+        regressors = [*cond_set, j]
+        beta1, var1, precision1 = _regression(self.rh1, i, regressors, lam=self.lam)
+        beta2, var2, precision2 = _regression(self.rh2, i, regressors, lam=self.lam)
+        stat = (beta1[-1] - beta2[-1]) ** 2 * inv(var1 * precision1 / (n1 - 1) + var2 * precision2 / (n2 - 1))[-1, -1]
+        pvalue = 1 - ncfdtr(1, n1 + n2 - 2 * len(regressors), 0, stat)
+        self.regression_pvalues[index] = pvalue
+        self.stats.record(len(cond_set) + 1, False, time.perf_counter() - start)
+        return pvalue
+
+    def variance_pvalue(self, i: int, cond_set: tuple) -> float:
+        """
+        p-value of the two-sided test that the residual variance of ``i`` regressed on ``cond_set`` is the same in
+        both datasets.
+        """
+        index = (i, frozenset(cond_set))
+        pvalue = self.variance_pvalues.get(index)
+        if pvalue is not None:
+            self.stats.record(len(cond_set), True)
+            return pvalue
+
+        start = time.perf_counter()
+        n1, n2 = self.rh1.n, self.rh2.n
+        _, var1, _ = _regression(self.rh1, i, list(cond_set))
+        _, var2, _ = _regression(self.rh2, i, list(cond_set))
+        pvalue = ncfdtr(n1 - len(cond_set), n2 - len(cond_set), 0, var1 / var2)
+        pvalue = 2 * min(pvalue, 1 - pvalue)
+        self.variance_pvalues[index] = pvalue
+        self.stats.record(len(cond_set), False, time.perf_counter() - start)
+        return pvalue
+
+
+def _constraint_pvalues(suffstat1: Dict, suffstat2: Dict) -> np.ndarray:
+    """
+    p-values of the tests of equality of each entry of the precision matrices of the two datasets.
+    """
+    n1, n2, p = suffstat1['n'], suffstat2['n'], suffstat1['S'].shape[0]
+    K1, K2 = suffstat1['P'], suffstat2['P']
+    D1, D2 = np.diag(K1), np.diag(K2)
+    stats = (K1 - K2)**2 / ((np.outer(D1, D1) + K1**2) / n1 + (np.outer(D2, D2) + K2**2) / n2)
+    return 1 - ncfdtr(1, n1 + n2 - 2*p + 2, 0, stats)
+
+
+def _constraint_ugs(pvalues: np.ndarray, alphas: list) -> Dict[float, tuple]:
+    rows, cols = np.triu_indices(pvalues.shape[0], k=1)
+    pair_pvalues = pvalues[rows, cols]
+    ugs = dict()
+    for alpha in alphas:
+        assert 0 <= alpha <= 1, "alpha must be in [0,1] range."
+        keep = pair_pvalues <= alpha
+        difference_ug = {frozenset({i, j}) for i, j in zip(rows[keep].tolist(), cols[keep].tolist())}
+        ugs[alpha] = (difference_ug, set(rows[keep].tolist()) | set(cols[keep].tolist()))
+    return ugs
+
+
+def _kliep_features(X: np.ndarray) -> np.ndarray:
+    """
+    Pairwise products of the variables of each sample, in the order of the upper triangle, followed by their
+    squares: the features of the KLIEP model of the density ratio.
+    """
+    rows, cols = np.triu_indices(X.shape[1], k=1)
+    return np.concatenate((X[:, rows] * X[:, cols], X**2), axis=1)
+
+
+def kliep_path(
+        X1: np.ndarray,
+        X2: np.ndarray,
+        alphas: list,
+        max_iter: int = 1000,
+        tol: float = 1e-5
+) -> Dict[float, np.ndarray]:
+    """
+    Parameters of the sparse KLIEP estimate of the density ratio of ``X1`` to ``X2`` for each L1 penalty in
+    ``alphas``.
+
+    The penalties are visited from the largest to the smallest, and the subgradient descent for each one starts from
+    the parameters found for the previous one, so that the sparser solutions warm-start the denser ones. The first
+    features are only needed through their mean.
+    """
+    mean1 = _kliep_features(X1).mean(axis=0)
+    features2 = _kliep_features(X2)
+    theta = np.zeros(features2.shape[1])
+    thetas = dict()
+    for alpha in sorted(set(alphas), reverse=True):
+        for iteration in range(max_iter):
+            log_weights = features2 @ theta
+            weights = np.exp(log_weights - logsumexp(log_weights))
+            grad = features2.T @ weights - mean1
+
+            g = np.where(theta != 0, grad + alpha*np.sign(theta), 0.)
+            zero = theta == 0
+            g[zero & (grad > alpha)] = grad[zero & (grad > alpha)] - alpha
+            g[zero & (grad < -alpha)] = grad[zero & (grad < -alpha)] + alpha
+
+            theta = theta - g / (iteration + 1)
+            if np.linalg.norm(g) / (iteration + 1) <= tol:
+                break
+        thetas[alpha] = theta.copy()
+    return thetas
+
+
+def _kliep_ug(theta: np.ndarray, nnodes: int, edge_threshold: float) -> tuple:
+    delta = np.zeros((nnodes, nnodes))
+    delta[np.triu_indices(nnodes, k=1)] = theta[:-nnodes]
+    delta[np.diag_indices(nnodes)] = theta[-nnodes:]
+    delta[np.abs(delta) < edge_threshold] = 0
+    rows, cols = np.nonzero(np.triu(delta))
+    difference_ug = [(i, j) for i, j in zip(rows.tolist(), cols.tolist()) if i != j]
+    return difference_ug, set(rows.tolist()) | set(cols.tolist())
+
+
+def _skeleton_pvalues(
+        tester: DifferenceTester,
+        difference_ug,
+        nodes_cond_set: set,
+        max_set_size: int,
+        max_alpha: float
+) -> Dict[Tuple, float]:
+    """
+    For each edge of ``difference_ug``, the largest p-value of the invariance tests of the skeleton stage, or the
+    first to exceed ``max_alpha``. The edge is in the skeleton at level ``alpha`` iff this p-value is at most
+    ``alpha``.
+    """
+    edge2pvalue = dict()
+    for i, j in difference_ug:
+        largest = 0
+        for cond_set in powerset(nodes_cond_set - {i, j}, r_max=max_set_size):
+            largest = max(largest, tester.regression_pvalue(i, j, cond_set))
+            if largest > max_alpha:
+                break
+            largest = max(largest, tester.regression_pvalue(j, i, cond_set))
+            if largest > max_alpha:
+                break
+        edge2pvalue[(i, j)] = largest
+    return edge2pvalue
+
+
+def _orient(
+        tester: DifferenceTester,
+        skeleton: set,
+        nodes_cond_set: set,
+        nnodes: int,
+        alpha: float,
+        max_set_size: int
+) -> np.ndarray:
+    """
+    Order-independent orientation stage of DCI (``dci_orient``), with the tests looked up in ``tester``.
+    """
+    skeleton = {frozenset({i, j}) for i, j in skeleton}
+    nodes = {i for i, j in skeleton} | {j for i, j in skeleton}
+    d_nx = nx.DiGraph()
+    d_nx.add_nodes_from(nodes)
+    nodes_with_decided_parents = set()
+
+    for parent_set_size in range(max_set_size + 2):
+        pvalue_dict = dict()
+        for i in nodes - nodes_with_decided_parents:
+            for cond_i in itr.combinations(nodes_cond_set - {i}, parent_set_size):
+                pvalue_dict[(i, frozenset(cond_i))] = tester.variance_pvalue(i, cond_i)
+        sorted_pvalues = [
+            (i, cond_i)
+            for (i, cond_i), pvalue in sorted(pvalue_dict.items(), key=op.itemgetter(1), reverse=True)
+            if pvalue > alpha
+        ]
+        for i, cond_i in sorted_pvalues:
+            i_children = {j for j in nodes - cond_i - {i} if frozenset({i, j}) in skeleton}
+
+            # don't use this parent set if it contradicts the existing edges or creates a cycle
+            if any(j in d_nx.successors(i) for j in cond_i):
+                continue
+            if any(j in d_nx.predecessors(i) for j in i_children):
+                continue
+            descendants, ancestors = nx.descendants(d_nx, i), nx.ancestors(d_nx, i)
+            if any(j in descendants for j in cond_i):
+                continue
+            if any(j in ancestors for j in i_children):
+                continue
+
+            edges = {(j, i) for j in cond_i if frozenset({i, j}) in skeleton} | {(i, j) for j in i_children}
+            nodes_with_decided_parents.add(i)
+            d_nx.add_edges_from(edges)
+
+    # orient the remaining edges along the directed paths between their endpoints
+    oriented_edges = set(d_nx.edges)
+    unoriented_edges = skeleton - {frozenset({i, j}) for i, j in oriented_edges}
+    g = nx.DiGraph(list(oriented_edges))
+    g.add_nodes_from(nodes)
+    amat = np.zeros((nnodes, nnodes))
+    for edge in unoriented_edges:
+        i, j = tuple(edge)
+        if nx.has_path(g, i, j):
+            oriented_edges.add((i, j))
+        elif nx.has_path(g, j, i):
+            oriented_edges.add((j, i))
+        else:
+            amat[i, j] = amat[j, i] = 1
+    for i, j in oriented_edges:
+        amat[i, j] = 1
+    return amat
+
+
+def _difference_ugs(
+        X1: np.ndarray,
+        X2: np.ndarray,
+        suffstat1: Dict,
+        suffstat2: Dict,
+        alpha_ug_grid: list,
+        difference_ug_method: str,
+        max_iter: int,
+        edge_threshold: float
+) -> Dict[float, tuple]:
+    if difference_ug_method == 'constraint':
+        return _constraint_ugs(_constraint_pvalues(suffstat1, suffstat2), alpha_ug_grid)
+    if difference_ug_method == 'kliep':
+        thetas = kliep_path(X1, X2, alpha_ug_grid, max_iter=max_iter)
+        return {alpha: _kliep_ug(thetas[alpha], X1.shape[1], edge_threshold) for alpha in alpha_ug_grid}
+    raise ValueError("`difference_ug_method` should be either 'constraint' or 'kliep'")
+
+
+def dci_grid(
+        X1: np.ndarray,
+        X2: np.ndarray,
+        alpha_ug_grid: list = [0.001, 0.01, 0.1],
+        alpha_skeleton_grid: list = [0.1, 0.5],
+        alpha_orient_grid: list = [0.001, 0.1],
+        max_set_size: Optional[int] = 3,
+        difference_ug_method: str = 'constraint',
+        difference_ug: list = None,
+        nodes_cond_set: set = None,
+        max_iter: int = 1000,
+        edge_threshold: float = 0,
+        lam: float = 0,
+        tester: Optional[DifferenceTester] = None
+) -> Dict[Tuple[float, float, float], np.ndarray]:
+    """
+    Run DCI on ``X1`` and ``X2`` for every combination of ``alpha_ug``, ``alpha_skeleton`` and ``alpha_orient``.
+
+    Each combination gives the same difference-DAG as ``dci`` with ``order_independent=True``, but the work shared
+    between combinations is only done once:
+
+    * the precision matrices of the constraint-based difference undirected graph are computed once for the whole
+      ``alpha_ug_grid``; for KLIEP, the grid is solved as one path, warm-started from the largest penalty.
+    * the skeleton is computed for the whole ``alpha_skeleton_grid`` at once, by keeping the largest p-value of the
+      tests of each edge.
+    * the regressions and invariance tests are memoized in ``tester`` across the whole grid.
+
+    Parameters
+    ----------
+    X1, X2:
+        (n_samples x n_features) datasets of each setting.
+    alpha_ug_grid:
+        parameters of the difference undirected graph: significance levels for ``difference_ug_method='constraint'``
+        and L1 penalties for ``'kliep'``. Ignored if ``difference_ug`` and ``nodes_cond_set`` are given.
+    alpha_skeleton_grid:
+        significance levels of the tests for the skeleton of the difference-DAG.
+    alpha_orient_grid:
+        significance levels of the tests for the orientations of the difference-DAG.
+    max_set_size:
+        maximum size of the conditioning sets of the invariance tests.
+    difference_ug_method:
+        'constraint' or 'kliep'.
+    difference_ug, nodes_cond_set:
+        if both are given, the difference undirected graph and the nodes considered for conditioning sets, used for
+        every value of ``alpha_ug``.
+    max_iter:
+        maximum number of iterations of the KLIEP subgradient descent, for each penalty.
+    edge_threshold:
+        minimum absolute KLIEP parameter for an edge of the difference undirected graph.
+    lam:
+        amount of ridge regularization of the regressions of the skeleton stage.
+    tester:
+        a ``DifferenceTester`` of ``X1`` and ``X2`` to reuse, e.g. from an earlier call on the same data.
+
+    See Also
+    --------
+    dci, dci_stability_grid, DifferenceTester
+
+    Returns
+    -------
+    dict
+        dictionary mapping each ``(alpha_ug, alpha_skeleton, alpha_orient)`` to the adjacency matrix of the
+        difference-DAG, in the format returned by ``dci``.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> import causaldag as cd
+    >>> from causaldag.datasets import create_synthetic_difference
+    >>> X1, X2, _ = create_synthetic_difference(10, 500)
+    >>> amats = cd.dci_grid(X1, X2, alpha_ug_grid=[.001, .01], alpha_skeleton_grid=[.1], alpha_orient_grid=[.1])
+    >>> sorted(amats)
+    [(0.001, 0.1, 0.1), (0.01, 0.1, 0.1)]
+    """
+    for alpha in [*alpha_skeleton_grid, *alpha_orient_grid]:
+        assert 0 <= alpha <= 1, "alpha must be in [0,1] range."
+    nnodes = X1.shape[1]
+    if tester is None:
+        tester = DifferenceTester(difference_suffstat(X1), difference_suffstat(X2), lam=lam)
+
+    if difference_ug is not None and nodes_cond_set is not None:
+        ugs = {alpha_ug: (difference_ug, nodes_cond_set) for alpha_ug in alpha_ug_grid}
+    else:
+        ugs = _difference_ugs(
+            X1,
+            X2,
+            tester.suffstat1,
+            tester.suffstat2,
+            alpha_ug_grid,
+            difference_ug_method,
+            max_iter,
+            edge_threshold
+        )
+
+    max_alpha = max(alpha_skeleton_grid)
+    amats = dict()
+    for alpha_ug in alpha_ug_grid:
+        ug, cond_nodes = ugs[alpha_ug]
+        edge2pvalue = _skeleton_pvalues(tester, ug, cond_nodes, max_set_size, max_alpha)
+        for alpha_skeleton in alpha_skeleton_grid:
+            skeleton = {edge for edge, pvalue in edge2pvalue.items() if pvalue <= alpha_skeleton}
+            for alpha_orient in alpha_orient_grid:
+                amat = _orient(tester, skeleton, cond_nodes, nnodes, alpha_orient, max_set_size)
+                amats[(alpha_ug, alpha_skeleton, alpha_orient)] = amat
+    return amats
+
+
+def _dci_bootstrap(data: Dict, subsample1: np.ndarray, subsample2: np.ndarray, kwargs: Dict) -> tuple:
+    blocks = []
+    try:
+        arrays = attach_arrays(data, blocks)
+        X1, X2 = arrays['X1'][subsample1], arrays['X2'][subsample2]
+    finally:
+        for block in blocks:
+            block.close()
+    tester = DifferenceTester(difference_suffstat(X1), difference_suffstat(X2), lam=kwargs.get('lam', 0))
+    amats = dci_grid(X1, X2, tester=tester, **kwargs)
+    return np.stack(list(amats.values())), tester.stats
+
+
+def dci_stability_grid(
+        X1: np.ndarray,
+        X2: np.ndarray,
+        alpha_ug_grid: list = [0.001, 0.01, 0.1],
+        alpha_skeleton_grid: list = [0.1, 0.5],
+        alpha_orient_grid: list = [0.001, 0.1],
+        max_set_size: int = 3,
+        difference_ug_method: str = 'constraint',
+        difference_ug: list = None,
+        nodes_cond_set: set = None,
+        max_iter: int = 1000,
+        edge_threshold: float = 0,
+        sample_fraction: float = 0.7,
+        n_bootstrap_iterations: int = 50,
+        bootstrap_threshold: float = 0.5,
+        n_jobs: Optional[int] = 1,
+        executor: Optional[Executor] = None,
+        random_state: int = None,
+        lam: float = 0,
+        summarize: bool = False
+):
+    """
+    DCI with stability selection, as ``dci_stability_selection``, running ``dci_grid`` once per bootstrap subsample
+    instead of DCI once per subsample and combination of hyperparameters.
+
+    The subsamples are drawn once, in this process, so the results do not depend on ``n_jobs``; with the same
+    ``random_state``, they are the subsamples of ``dci_stability_selection``. Each task computes the sufficient
+    statistics of its subsample once and reuses them, and its memoized tests, across the whole grid. When run across
+    processes, the datasets are sent to the workers through shared memory rather than with each task.
+
+    Parameters
+    ----------
+    X1, X2:
+        (n_samples x n_features) datasets of each setting.
+    alpha_ug_grid, alpha_skeleton_grid, alpha_orient_grid, max_set_size, difference_ug_method, difference_ug,
+    nodes_cond_set, max_iter, edge_threshold, lam:
+        as for ``dci_grid``.
+    sample_fraction:
+        fraction of the samples of each dataset in each subsample.
+    n_bootstrap_iterations:
+        number of subsamples.
+    bootstrap_threshold:
+        edges selected in more than this fraction of the subsamples, for some combination of hyperparameters, are
+        kept.
+    n_jobs:
+        number of worker processes to start if no executor is given. -1 uses all CPUs.
+    executor:
+        an existing ``concurrent.futures`` executor to run the subsamples on.
+    random_state:
+        seed of the subsamples.
+    summarize:
+        if True, also return a dictionary with the ``TesterStats`` of the invariance tests of all subsamples, under
+        ``invariance_stats``.
+
+    See Also
+    --------
+    dci_stability_selection, dci_grid
+
+    Returns
+    -------
+    (adjacency_matrix, stability_scores) or (adjacency_matrix, stability_scores, summary)
+        the adjacency matrix of the stable edges, and the ``(n_params x n_features x n_features)`` fractions of the
+        subsamples in which each edge is selected, for each combination of hyperparameters in the order of
+        ``itertools.product(alpha_ug_grid, alpha_skeleton_grid, alpha_orient_grid)``.
+    """
+    samples = list(zip(
+        bootstrap_generator(n_bootstrap_iterations, sample_fraction, X1, random_state=random_state),
+        bootstrap_generator(n_bootstrap_iterations, sample_fraction, X2, random_state=random_state)
+    ))
+    kwargs = dict(
+        alpha_ug_grid=alpha_ug_grid,
+        alpha_skeleton_grid=alpha_skeleton_grid,
+        alpha_orient_grid=alpha_orient_grid,
+        max_set_size=max_set_size,
+        difference_ug_method=difference_ug_method,
+        difference_ug=difference_ug,
+        nodes_cond_set=nodes_cond_set,
+        max_iter=max_iter,
+        edge_threshold=edge_threshold,
+        lam=lam
+    )
+
+    parallel = executor is not None or (n_jobs is not None and n_jobs != 1 and len(samples) > 1)
+    blocks = []
+    try:
+        data = dict(X1=X1, X2=X2)
+        if parallel:
+            data = share_arrays(data, blocks)
+        tasks = [(data, subsample1, subsample2, kwargs) for subsample1, subsample2 in samples]
+        results = run_tasks(_dci_bootstrap, tasks, n_jobs=n_jobs, executor=executor)
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    stability_scores = np.mean([amats for amats, _ in results], axis=0)
+    adjacency_matrix = (stability_scores.max(axis=0) > bootstrap_threshold).astype('float')
+    if not summarize:
+        return adjacency_matrix, stability_scores
+
+    invariance_stats = TesterStats('invariance')
+    for _, stats in results:
+        invariance_stats.merge(stats)
+    return adjacency_matrix, stability_scores, dict(invariance_stats=invariance_stats)
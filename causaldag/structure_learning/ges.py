@@ -0,0 +1,344 @@
+"""
+Greedy equivalence search over CPDAGs, with a priority queue of operators that is updated incrementally.
+"""
+# === IMPORTS: BUILT-IN ===
+import heapq
+import itertools as itr
+from collections import defaultdict
+from typing import Dict, Set, Union
+
+# === IMPORTS: LOCAL ===
+from graphical_models import DAG, PDAG
+
+# operators whose score changes are below this are not applied
+_TOL = 1e-10
+
+
+class _GESState:
+    """
+    The current CPDAG, stored as parent and undirected neighbor sets, with the GES operators on it.
+    """
+    def __init__(self, nodes: set, score):
+        self.nodes = nodes
+        self.score = score
+        self.parents = {node: set() for node in nodes}
+        self.children = {node: set() for node in nodes}
+        self.undirected = {node: set() for node in nodes}
+
+    def adjacent(self, node) -> set:
+        return self.parents[node] | self.children[node] | self.undirected[node]
+
+    def is_clique(self, nodes) -> bool:
+        return all(j in self.adjacent(i) for i, j in itr.combinations(nodes, 2))
+
+    def _extend_cliques(self, base: set, candidates: set):
+        """
+        Yield every subset ``T`` of ``candidates`` such that ``base | T`` is a clique, assuming ``base`` is one.
+        """
+        candidates = [c for c in candidates if base <= self.adjacent(c)]
+        stack = [(frozenset(), 0)]
+        while stack:
+            subset, start = stack.pop()
+            yield subset
+            for ix in range(start, len(candidates)):
+                c = candidates[ix]
+                if subset <= self.adjacent(c):
+                    stack.append((subset | {c}, ix + 1))
+
+    def _has_unblocked_path(self, source, target, blocked: set) -> bool:
+        """
+        Check for a semi-directed path from ``source`` to ``target`` avoiding the nodes in ``blocked``.
+        """
+        visited = {source} | blocked
+        stack = [source]
+        while stack:
+            node = stack.pop()
+            for nbr in self.children[node] | self.undirected[node]:
+                if nbr == target:
+                    return True
+                if nbr not in visited:
+                    visited.add(nbr)
+                    stack.append(nbr)
+        return False
+
+    # === OPERATORS
+    def best_insert(self, x, y):
+        """
+        Return ``(delta, T)`` for the best valid Insert(x, y, T), or None if no insertion improves the score.
+        """
+        adj_x = self.adjacent(x)
+        na_yx = self.undirected[y] & adj_x
+        if y in adj_x or not self.is_clique(na_yx):
+            return None
+        base = na_yx | self.parents[y]
+        candidates = []
+        for t in self._extend_cliques(na_yx, self.undirected[y] - adj_x):
+            parents = base | t
+            delta = self.score.get_local_score(y, parents | {x}) - self.score.get_local_score(y, parents)
+            if delta > _TOL:
+                candidates.append((delta, t))
+        candidates.sort(key=lambda c: -c[0])
+        for delta, t in candidates:
+            if self.insert_is_valid(x, y, t):
+                return delta, t
+        return None
+
+    def insert_is_valid(self, x, y, t) -> bool:
+        if x in self.adjacent(y):
+            return False
+        na_yx = self.undirected[y] & self.adjacent(x)
+        return self.is_clique(na_yx | t) and not self._has_unblocked_path(y, x, na_yx | t)
+
+    def best_delete(self, x, y):
+        """
+        Return ``(delta, H)`` for the best valid Delete(x, y, H), or None if no deletion improves the score.
+        """
+        if x not in self.parents[y] | self.undirected[y]:
+            return None
+        na_yx = self.undirected[y] & self.adjacent(x)
+        best = None
+        for clique in self._extend_cliques(frozenset(), na_yx):
+            parents = (clique | self.parents[y]) - {x}
+            delta = self.score.get_local_score(y, parents) - self.score.get_local_score(y, parents | {x})
+            if delta > _TOL and (best is None or delta > best[0]):
+                best = delta, frozenset(na_yx - clique)
+        return best
+
+    def delete_is_valid(self, x, y, h) -> bool:
+        if x not in self.parents[y] | self.undirected[y]:
+            return False
+        na_yx = self.undirected[y] & self.adjacent(x)
+        return h <= na_yx and self.is_clique(na_yx - h)
+
+    def apply_insert(self, x, y, t):
+        arcs, edges = self._arcs_and_edges()
+        arcs.add((x, y))
+        for node in t:
+            edges.remove(frozenset({node, y}))
+            arcs.add((node, y))
+        self._complete(arcs, edges)
+
+    def apply_delete(self, x, y, h):
+        arcs, edges = self._arcs_and_edges()
+        arcs.discard((x, y))
+        edges.discard(frozenset({x, y}))
+        for node in h:
+            edges.remove(frozenset({y, node}))
+            arcs.add((y, node))
+            if frozenset({x, node}) in edges:
+                edges.remove(frozenset({x, node}))
+                arcs.add((x, node))
+        self._complete(arcs, edges)
+
+    # === COMPLETION
+    def _arcs_and_edges(self):
+        arcs = {(p, node) for node in self.nodes for p in self.parents[node]}
+        edges = {frozenset({i, j}) for i in self.nodes for j in self.undirected[i]}
+        return arcs, edges
+
+    def _complete(self, arcs: set, edges: set):
+        """
+        Replace the current graph by the CPDAG of a consistent extension of the PDAG with ``arcs`` and ``edges``.
+        """
+        # the extension is acyclic by construction
+        dag = DAG(nodes=self.nodes)
+        dag.add_arcs_from(_consistent_extension(self.nodes, arcs, edges), check_acyclic=False)
+        cpdag = dag.cpdag()
+        self.parents = {node: set(cpdag._parents[node]) for node in self.nodes}
+        self.children = {node: set(cpdag._children[node]) for node in self.nodes}
+        self.undirected = {node: set(cpdag._undirected_neighbors[node]) for node in self.nodes}
+
+    def snapshot(self) -> Dict:
+        return {
+            node: (frozenset(self.parents[node]), frozenset(self.undirected[node]), frozenset(self.children[node]))
+            for node in self.nodes
+        }
+
+    def to_pdag(self) -> PDAG:
+        arcs, edges = self._arcs_and_edges()
+        return PDAG(nodes=self.nodes, arcs=arcs, edges={tuple(edge) for edge in edges})
+
+
+def _consistent_extension(nodes: set, arcs: set, edges: set) -> set:
+    """
+    Return the arcs of a DAG with the same skeleton and v-structures as the PDAG with ``arcs`` and ``edges``, by the
+    algorithm of Dor and Tarsi (1992), which repeatedly removes a sink whose undirected neighbors are adjacent to all
+    of its other neighbors. Only the neighbors of a removed node need to be rechecked.
+    """
+    parents, children, undirected = defaultdict(set), defaultdict(set), defaultdict(set)
+    for i, j in arcs:
+        parents[j].add(i)
+        children[i].add(j)
+    for i, j in edges:
+        undirected[i].add(j)
+        undirected[j].add(i)
+
+    def adjacent(node):
+        return parents[node] | children[node] | undirected[node]
+
+    def removable(node):
+        if children[node]:
+            return False
+        nbrs = adjacent(node)
+        return all(nbrs - {u} <= adjacent(u) for u in undirected[node])
+
+    extension = set()
+    remaining = set(nodes)
+    queue = [node for node in nodes if removable(node)]
+    while queue:
+        node = queue.pop()
+        if node not in remaining or not removable(node):
+            continue
+        nbrs = adjacent(node)
+        extension.update((nbr, node) for nbr in nbrs)
+        remaining.remove(node)
+        for nbr in nbrs:
+            parents[nbr].discard(node)
+            children[nbr].discard(node)
+            undirected[nbr].discard(node)
+        parents[node], undirected[node] = set(), set()
+        queue.extend(nbrs)
+    if remaining:
+        raise ValueError("PDAG has no consistent extension")
+    return extension
+
+
+def _changed_nodes(before: Dict, after: Dict) -> set:
+    return {node for node in before if before[node] != after[node]}
+
+
+def _affected_targets(state: _GESState, changed: set, before: Dict) -> set:
+    """
+    Nodes whose operators as a target may have changed: those whose parents or neighbors changed, and those with two
+    changed neighbors, between which an edge may have been added or removed.
+    """
+    affected = set(changed)
+    for node in state.nodes - changed:
+        nbrs = state.undirected[node] | before[node][1]
+        if len(nbrs & changed) >= 2:
+            affected.add(node)
+    return affected
+
+
+def _affected_pairs_for_source(state: _GESState, x, before: Dict) -> set:
+    """
+    Pairs ``(x, y)`` whose operators may have changed because the adjacencies of ``x`` changed. These only enter the
+    operators through ``NA_yx``, the neighbors of ``y`` adjacent to ``x``, so only the ``y`` with a neighbor whose
+    adjacency to ``x`` changed are affected.
+    """
+    adjacent_before = before[x][0] | before[x][1] | before[x][2]
+    targets = set()
+    for node in adjacent_before ^ state.adjacent(x):
+        targets.update(state.undirected[node], before[node][1])
+    targets.discard(x)
+    return {(x, y) for y in targets}
+
+
+def _search_phase(state: _GESState, forward: bool, verbose=False) -> int:
+    """
+    Apply the best operator of one phase until none improves the score. Returns the number of operators applied.
+    """
+    queue = []
+    versions = defaultdict(int)
+    counter = itr.count()
+
+    def candidate_pairs_for_target(y):
+        if forward:
+            return ((x, y) for x in state.nodes - state.adjacent(y) - {y})
+        return ((x, y) for x in state.parents[y] | state.undirected[y])
+
+    def evaluate(x, y):
+        versions[(x, y)] += 1
+        result = state.best_insert(x, y) if forward else state.best_delete(x, y)
+        if result is not None:
+            delta, subset = result
+            heapq.heappush(queue, (-delta, next(counter), versions[(x, y)], x, y, subset))
+
+    def evaluate_all():
+        for node in state.nodes:
+            for x, y in candidate_pairs_for_target(node):
+                evaluate(x, y)
+
+    num_moves = 0
+    evaluate_all()
+    while True:
+        while queue:
+            neg_delta, _, version, x, y, subset = heapq.heappop(queue)
+            if version != versions[(x, y)]:
+                continue
+            # the path condition of an insertion can be broken by moves elsewhere in the graph
+            valid = state.insert_is_valid(x, y, subset) if forward else state.delete_is_valid(x, y, subset)
+            if not valid:
+                evaluate(x, y)
+                continue
+
+            if verbose:
+                print(f"{'Insert' if forward else 'Delete'}({x}, {y}, {set(subset)}): {-neg_delta:.4f}")
+            before = state.snapshot()
+            if forward:
+                state.apply_insert(x, y, subset)
+            else:
+                state.apply_delete(x, y, subset)
+            num_moves += 1
+            changed = _changed_nodes(before, state.snapshot())
+
+            pairs = set()
+            for node in _affected_targets(state, changed, before):
+                pairs.update(candidate_pairs_for_target(node))
+            for node in changed:
+                pairs.update(_affected_pairs_for_source(state, node, before))
+            for x, y in pairs:
+                evaluate(x, y)
+
+        # operators made valid by moves elsewhere are only found by a full pass
+        evaluate_all()
+        if not queue:
+            return num_moves
+
+
+def ges(score, nodes: Union[int, Set], verbose=False) -> PDAG:
+    """
+    Estimate the Markov equivalence class of a DAG by greedy equivalence search (Chickering, 2002).
+
+    Starting from the empty graph, the forward phase repeatedly applies the Insert operator that most improves the
+    score, and the backward phase then repeatedly applies the best Delete operator, each phase ending when no
+    operator improves the score.
+
+    The best operator for each ordered pair of nodes is kept in a priority queue. After a move, only the operators
+    whose score or validity can have changed are re-evaluated: those with a target whose parents or neighbors changed,
+    or a source whose adjacencies changed. Validity conditions involving paths through the rest of the graph are
+    rechecked when an operator is taken from the queue, and a phase only ends after a full pass finds no improving
+    operator.
+
+    Parameters
+    ----------
+    score:
+        Decomposable score to maximize, with a ``get_local_score(node, parents)`` method, such as
+        ``MemoizedDecomposableScore``, ``DeltaDecomposableScore`` or ``GaussianBGeScore``.
+    nodes:
+        Nodes of the graph, or the number of nodes, in which case the nodes are ``0, ..., nodes-1``.
+    verbose:
+        If True, print each operator as it is applied.
+
+    Returns
+    -------
+    PDAG
+        Estimated CPDAG.
+
+    See Also
+    --------
+    gsp, GaussianBGeScore
+
+    Examples
+    --------
+    >>> import causaldag as cd
+    >>> from causaldag.utils.scores import GaussianBGeScore
+    >>> g = cd.rand.rand_weights(cd.rand.directed_erdos(20, .2))
+    >>> suffstat = cd.partial_correlation_suffstat(g.sample(1000), invert=False)
+    >>> est_cpdag = cd.ges(GaussianBGeScore(suffstat), 20)
+    """
+    nodes = set(range(nodes)) if isinstance(nodes, int) else set(nodes)
+    state = _GESState(nodes, score)
+    _search_phase(state, forward=True, verbose=verbose)
+    _search_phase(state, forward=False, verbose=verbose)
+    return state.to_pdag()
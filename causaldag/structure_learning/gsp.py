@@ -0,0 +1,455 @@
+"""
+Greedy sparsest permutation algorithms, with restarts spread across processes.
+"""
+# === IMPORTS: BUILT-IN ===
+import random
+import time
+from concurrent.futures import Executor
+from typing import Dict, List, Optional, Set, Union
+
+# === IMPORTS: THIRD-PARTY ===
+import numpy as np
+
+# === IMPORTS: LOCAL ===
+from conditional_independence import CI_Tester, InvarianceTester
+from graphical_models import DAG, UndirectedGraph
+from graphical_model_learning.algorithms.dag import min_degree_alg_amat
+from graphical_model_learning.algorithms.dag import gsp as _gsp
+from graphical_model_learning.algorithms.dag import igsp as _igsp
+from graphical_model_learning.algorithms.dag import unknown_target_igsp as _unknown_target_igsp
+from graphical_model_learning.algorithms.undirected import threshold_ug
+from .imap import permutation2dag
+from .parallel import SharedTesters, run_counted_tasks, seeded
+
+
+def _initial_undirected(nodes, ci_tester, initial_permutations, initial_undirected):
+    if initial_permutations is None and isinstance(initial_undirected, str):
+        if initial_undirected == 'threshold':
+            return threshold_ug(nodes, ci_tester)
+        raise ValueError("initial_undirected must be one of 'threshold', or an UndirectedGraph")
+    return initial_undirected
+
+
+def _random_permutations(node_list: list, initial_undirected, seeds: List[int]) -> List[list]:
+    """
+    Draw one starting permutation per seed, from the minimum degree algorithm on ``initial_undirected`` if given,
+    and uniformly at random otherwise.
+    """
+    permutations = []
+    amat = initial_undirected.to_amat(node_list) if initial_undirected else None
+    for seed in seeds:
+        with seeded(seed):
+            if amat is not None:
+                permutations.append([node_list[ix] for ix in min_degree_alg_amat(amat)])
+            else:
+                permutations.append(random.sample(node_list, len(node_list)))
+    return permutations
+
+
+def _seed_generator(seed: Optional[int]) -> random.Random:
+    return random.Random(seed if seed is not None else random.getrandbits(64))
+
+
+def _num_starting_arcs(shared: SharedTesters, perm: list, fixed_adjacencies: set, fixed_gaps: set,
+                       max_arcs: Optional[int] = None, batched: Optional[bool] = None) -> float:
+    """
+    Number of arcs of the minimal IMAP of ``perm``, or infinity if it has more than ``max_arcs``.
+    """
+    ci_tester = shared.get()['ci_tester']
+    dag = permutation2dag(perm, ci_tester, fixed_adjacencies=fixed_adjacencies, fixed_gaps=fixed_gaps,
+                          max_arcs=max_arcs, batched=batched)
+    return dag.num_arcs if dag is not None else float('inf')
+
+
+def _gsp_run(shared: SharedTesters, seed: int, perm: list, kwargs: dict):
+    ci_tester = shared.get()['ci_tester']
+    start = time.time()
+    with seeded(seed):
+        result = _gsp(set(perm), ci_tester, nruns=1, initial_permutations=[perm], **kwargs)
+    dag, trace = result if kwargs['summarize'] else (result, None)
+    return dag, trace, time.time() - start
+
+
+def _igsp_run(shared: SharedTesters, seed: int, perm: list, setting_list: list, kwargs: dict):
+    testers = shared.get()
+    start = time.time()
+    with seeded(seed):
+        dag = _igsp(
+            setting_list,
+            set(perm),
+            testers['ci_tester'],
+            testers['invariance_tester'],
+            nruns=1,
+            initial_permutations=[perm],
+            **kwargs
+        )
+    return dag, time.time() - start
+
+
+def _unknown_target_igsp_run(shared: SharedTesters, seed: int, perm: list, setting_list: list, kwargs: dict):
+    testers = shared.get()
+    start = time.time()
+    with seeded(seed):
+        dag, targets = _unknown_target_igsp(
+            setting_list,
+            set(perm),
+            testers['ci_tester'],
+            testers['invariance_tester'],
+            nruns=1,
+            initial_permutations=[perm],
+            **kwargs
+        )
+    return dag, targets, time.time() - start
+
+
+def gsp(
+        nodes: set,
+        ci_tester: CI_Tester,
+        depth: Optional[int] = 4,
+        nruns: int = 5,
+        verbose: bool = False,
+        initial_undirected: Optional[Union[str, UndirectedGraph]] = 'threshold',
+        initial_permutations: Optional[List] = None,
+        fixed_orders=set(),
+        fixed_adjacencies=set(),
+        fixed_gaps=set(),
+        use_lowest=True,
+        max_iters=float('inf'),
+        factor=2,
+        summarize=False,
+        n_jobs: Optional[int] = 1,
+        executor: Optional[Executor] = None,
+        seed: Optional[int] = None,
+        batched: Optional[bool] = None,
+) -> (DAG, List[Dict]):
+    """
+    Estimate the Markov equivalence class of a DAG using the Greedy Sparsest Permutations (GSP) algorithm.
+
+    Each run is an independent search from its own starting permutation, so runs may be spread across processes.
+    The sufficient statistics of ``ci_tester`` are placed in shared memory once, rather than pickled for each run,
+    and each worker keeps its own memoized tester across the runs it is given. The ``stats`` of the lookups made by
+    the workers' testers are added to those of ``ci_tester`` at the end.
+
+    Each candidate starting permutation and each run is assigned a seed drawn from ``seed``, so the result depends
+    only on ``seed`` (or, if ``seed`` is None, on the state of the ``random`` module), and not on ``n_jobs`` or on
+    the order in which runs finish. Ties between equally sparse DAGs are broken in favor of the earliest run.
+
+    Parameters
+    ----------
+    nodes:
+        Labels of nodes in the graph.
+    ci_tester:
+        A conditional independence tester, which has a method is_ci taking two sets A and B, and a conditioning set C,
+        and returns True/False. When running in parallel, it must be picklable.
+    depth:
+        Maximum depth in depth-first search. Use None for infinite search depth.
+    nruns:
+        Number of runs of the algorithm. The sparsest DAG from all runs is returned.
+    initial_undirected:
+        Option to find the starting permutations by using the minimum degree algorithm on an undirected graph that
+        is Markov to the data. You can provide the undirected graph yourself, use the default 'threshold' to do
+        simple thresholding on the partial correlation matrix, or select None to start at random permutations.
+    initial_permutations:
+        A list of initial permutations with which to start the algorithm, one per run. This option is mutually
+        exclusive with initial_undirected.
+    factor:
+        When using ``initial_undirected``, ``factor * nruns`` candidate starting permutations are drawn, and the
+        runs start from the ``nruns`` candidates with the sparsest minimal IMAPs.
+    summarize:
+        If True, also return a summary of each run.
+    n_jobs:
+        Number of processes to spread the runs across. -1 uses all CPUs.
+    executor:
+        An existing ``concurrent.futures`` executor to run on instead of starting new processes. Runs on a thread
+        pool do not overlap, since they share the state of the ``random`` module.
+    seed:
+        Seed for the starting permutations and the random choices made during each run.
+    batched:
+        As for ``permutation2dag``, for the minimal IMAPs used to rank the candidate starting permutations.
+
+    The remaining parameters are as in ``graphical_model_learning.gsp``.
+
+    See Also
+    --------
+    pcalg, igsp, unknown_target_igsp
+
+    Return
+    ------
+    est_dag, or (est_dag, summaries) if ``summarize`` is True. ``summaries[r]`` is a dictionary holding the seed,
+    starting permutation, final DAG, number of arcs, running time, and search trace of run r, and, if ``ci_tester``
+    keeps statistics, the ``TesterStats`` of the CI tests of run r as ``ci_stats``.
+
+    Examples
+    --------
+    >>> import causaldag as cd
+    >>> import numpy as np
+    >>> np.random.seed(1729)
+    >>> g = cd.rand.rand_weights(cd.rand.directed_erdos(10, .3))
+    >>> suffstat = cd.partial_correlation_suffstat(g.sample(1000))
+    >>> ci_tester = cd.MemoizedCI_Tester(cd.partial_correlation_test, suffstat, alpha=1e-3)
+    >>> est_dag = cd.gsp(set(range(10)), ci_tester, nruns=8, n_jobs=4, seed=0)
+    """
+    node_list = sorted(nodes)
+    seeds = _seed_generator(seed)
+    initial_undirected = _initial_undirected(nodes, ci_tester, initial_permutations, initial_undirected)
+    kwargs = dict(
+        depth=depth,
+        verbose=verbose,
+        fixed_orders=fixed_orders,
+        fixed_adjacencies=fixed_adjacencies,
+        fixed_gaps=fixed_gaps,
+        use_lowest=use_lowest,
+        max_iters=max_iters,
+        summarize=summarize,
+    )
+
+    with SharedTesters(ci_tester=ci_tester) as shared:
+        # === PICK STARTING PERMUTATIONS
+        if initial_permutations is None:
+            if initial_undirected:
+                candidates = _random_permutations(
+                    node_list,
+                    initial_undirected,
+                    [seeds.getrandbits(32) for _ in range(factor * nruns)]
+                )
+                num_arcs, _ = run_counted_tasks(
+                    _num_starting_arcs,
+                    [(shared, perm, fixed_adjacencies, fixed_gaps, None, batched) for perm in candidates[:nruns]],
+                    n_jobs=n_jobs,
+                    executor=executor
+                )
+                # a later candidate only starts a run if it is strictly sparser than one of the first nruns, so its
+                # IMAP is abandoned once it has as many arcs as the densest of them
+                max_arcs = max(num_arcs) - 1 if num_arcs else None
+                num_arcs += run_counted_tasks(
+                    _num_starting_arcs,
+                    [(shared, perm, fixed_adjacencies, fixed_gaps, max_arcs, batched) for perm in candidates[nruns:]],
+                    n_jobs=n_jobs,
+                    executor=executor
+                )[0]
+                initial_permutations = [candidates[ix] for ix in np.argsort(num_arcs, kind='stable')[:nruns]]
+            else:
+                initial_permutations = _random_permutations(
+                    node_list,
+                    None,
+                    [seeds.getrandbits(32) for _ in range(nruns)]
+                )
+
+        # === RUN THE SEARCHES
+        run_seeds = [seeds.getrandbits(32) for _ in initial_permutations]
+        results, run_stats = run_counted_tasks(
+            _gsp_run,
+            [(shared, run_seed, perm, kwargs) for run_seed, perm in zip(run_seeds, initial_permutations)],
+            n_jobs=n_jobs,
+            executor=executor
+        )
+
+    best = min(range(len(results)), key=lambda r: results[r][0].num_arcs)
+    if not summarize:
+        return results[best][0]
+    summaries = [
+        dict(
+            seed=run_seed,
+            initial_permutation=perm,
+            dag=dag,
+            num_arcs=dag.num_arcs,
+            time=elapsed,
+            trace=trace[0],
+            ci_stats=stats.get('ci_tester')
+        )
+        for run_seed, perm, (dag, trace, elapsed), stats in zip(run_seeds, initial_permutations, results, run_stats)
+    ]
+    return results[best][0], summaries
+
+
+def igsp(
+        setting_list: List[Dict],
+        nodes: set,
+        ci_tester: CI_Tester,
+        invariance_tester: InvarianceTester,
+        depth: Optional[int] = 4,
+        nruns: int = 5,
+        initial_undirected: Optional[Union[str, UndirectedGraph]] = 'threshold',
+        initial_permutations: Optional[List] = None,
+        verbose: bool = False,
+        summarize=False,
+        n_jobs: Optional[int] = 1,
+        executor: Optional[Executor] = None,
+        seed: Optional[int] = None,
+):
+    """
+    Estimate the interventional Markov equivalence class of a DAG using the Interventional Greedy Sparsest
+    Permutations (IGSP) algorithm, with runs spread across processes as in ``gsp``.
+
+    The DAG with the fewest arcs over all runs is returned, with ties broken in favor of the earliest run.
+
+    Parameters
+    ----------
+    setting_list:
+        A list of dictionaries that provide meta-information about each non-observational setting.
+    nodes:
+        Nodes in the graph.
+    ci_tester:
+        A conditional independence tester object.
+    invariance_tester:
+        An invariance tester object, which has a method is_invariant taking a node, two settings, and a conditioning
+        set C, and returns True/False.
+    summarize:
+        If True, also return a summary (seed, starting permutation, final DAG, number of arcs, running time, and the
+        ``TesterStats`` of the CI and invariance tests as ``ci_stats`` and ``invariance_stats``) of each run.
+    n_jobs:
+        Number of processes to spread the runs across. -1 uses all CPUs.
+    executor:
+        An existing ``concurrent.futures`` executor to run on instead of starting new processes. Runs on a thread
+        pool do not overlap, since they share the state of the ``random`` module.
+    seed:
+        Seed for the starting permutations and the random choices made during each run.
+
+    The remaining parameters are as in ``gsp``.
+
+    See Also
+    --------
+    gsp, unknown_target_igsp
+    """
+    node_list = sorted(nodes)
+    seeds = _seed_generator(seed)
+    initial_undirected = _initial_undirected(nodes, ci_tester, initial_permutations, initial_undirected)
+    if initial_permutations is None:
+        initial_permutations = _random_permutations(
+            node_list,
+            initial_undirected,
+            [seeds.getrandbits(32) for _ in range(nruns)]
+        )
+    run_seeds = [seeds.getrandbits(32) for _ in initial_permutations]
+    kwargs = dict(depth=depth, verbose=verbose)
+
+    with SharedTesters(ci_tester=ci_tester, invariance_tester=invariance_tester) as shared:
+        results, run_stats = run_counted_tasks(
+            _igsp_run,
+            [(shared, run_seed, perm, setting_list, kwargs) for run_seed, perm in zip(run_seeds, initial_permutations)],
+            n_jobs=n_jobs,
+            executor=executor
+        )
+
+    best = min(range(len(results)), key=lambda r: results[r][0].num_arcs)
+    if not summarize:
+        return results[best][0]
+    summaries = [
+        dict(
+            seed=run_seed,
+            initial_permutation=perm,
+            dag=dag,
+            num_arcs=dag.num_arcs,
+            time=elapsed,
+            ci_stats=stats.get('ci_tester'),
+            invariance_stats=stats.get('invariance_tester')
+        )
+        for run_seed, perm, (dag, elapsed), stats in zip(run_seeds, initial_permutations, results, run_stats)
+    ]
+    return results[best][0], summaries
+
+
+def unknown_target_igsp(
+        setting_list: List[Dict],
+        nodes: set,
+        ci_tester: CI_Tester,
+        invariance_tester: InvarianceTester,
+        depth: Optional[int] = 4,
+        nruns: int = 5,
+        initial_undirected: Optional[Union[str, UndirectedGraph]] = 'threshold',
+        initial_permutations: Optional[List] = None,
+        verbose: bool = False,
+        use_lowest=True,
+        tup_score=True,
+        no_targets=False,
+        summarize=False,
+        n_jobs: Optional[int] = 1,
+        executor: Optional[Executor] = None,
+        seed: Optional[int] = None,
+) -> (DAG, List[Set[int]]):
+    """
+    Use the Unknown Target Interventional Greedy Sparsest Permutation algorithm to estimate a DAG in the I-MEC of the
+    data-generating DAG, with runs spread across processes as in ``gsp``.
+
+    The DAG with the lowest score over all runs is returned, with ties broken in favor of the earliest run.
+
+    Parameters
+    ----------
+    setting_list:
+        A list of dictionaries that provide meta-information about each non-observational setting.
+    nodes:
+        Nodes in the graph.
+    ci_tester:
+        A conditional independence tester object.
+    invariance_tester:
+        An invariance tester object, which has a method is_invariant taking a node, two settings, and a conditioning
+        set C, and returns True/False.
+    tup_score:
+        If True, score DAGs by (number of arcs, number of intervention targets), lexicographically. Otherwise, score
+        them by the sum.
+    summarize:
+        If True, also return a summary (seed, starting permutation, final DAG, score, learned intervention targets,
+        running time, and the ``TesterStats`` of the CI and invariance tests as ``ci_stats`` and
+        ``invariance_stats``) of each run.
+    n_jobs:
+        Number of processes to spread the runs across. -1 uses all CPUs.
+    executor:
+        An existing ``concurrent.futures`` executor to run on instead of starting new processes. Runs on a thread
+        pool do not overlap, since they share the state of the ``random`` module.
+    seed:
+        Seed for the starting permutations and the random choices made during each run.
+
+    The remaining parameters are as in ``graphical_model_learning.unknown_target_igsp``.
+
+    See Also
+    --------
+    gsp, igsp
+
+    Return
+    ------
+    (est_dag, learned_intervention_targets), followed by the list of run summaries if ``summarize`` is True.
+    """
+    node_list = sorted(nodes)
+    seeds = _seed_generator(seed)
+    initial_undirected = _initial_undirected(nodes, ci_tester, initial_permutations, initial_undirected)
+    if initial_permutations is None:
+        initial_permutations = _random_permutations(
+            node_list,
+            initial_undirected,
+            [seeds.getrandbits(32) for _ in range(nruns)]
+        )
+    run_seeds = [seeds.getrandbits(32) for _ in initial_permutations]
+    kwargs = dict(depth=depth, verbose=verbose, use_lowest=use_lowest, tup_score=tup_score, no_targets=no_targets)
+
+    with SharedTesters(ci_tester=ci_tester, invariance_tester=invariance_tester) as shared:
+        results, run_stats = run_counted_tasks(
+            _unknown_target_igsp_run,
+            [(shared, run_seed, perm, setting_list, kwargs) for run_seed, perm in zip(run_seeds, initial_permutations)],
+            n_jobs=n_jobs,
+            executor=executor
+        )
+
+    def _score(dag, targets):
+        num_targets = sum(len(setting_targets) for setting_targets in targets)
+        return (dag.num_arcs, num_targets) if tup_score else dag.num_arcs + num_targets
+
+    scores = [_score(dag, targets) for dag, targets, _ in results]
+    best = min(range(len(results)), key=lambda r: scores[r])
+    est_dag, learned_intervention_targets, _ = results[best]
+    if not summarize:
+        return est_dag, learned_intervention_targets
+    summaries = [
+        dict(
+            seed=run_seed,
+            initial_permutation=perm,
+            dag=dag,
+            score=score,
+            intervention_targets=targets,
+            time=elapsed,
+            ci_stats=stats.get('ci_tester'),
+            invariance_stats=stats.get('invariance_tester')
+        )
+        for run_seed, perm, score, (dag, targets, elapsed), stats
+        in zip(run_seeds, initial_permutations, scores, results, run_stats)
+    ]
+    return est_dag, learned_intervention_targets, summaries
@@ -0,0 +1,558 @@
+"""
+The greedy sparsest poset (GSPo) algorithm, on a MAG workspace that is updated in place after each mark change.
+
+``AncestralGraph.legitimate_mark_changes`` enumerates every discriminating path of the graph and recomputes every
+ancestor set each time it is called, and testing which edges a mark change lets us remove copies the whole graph for
+each candidate. ``MAGWorkspace`` instead keeps the parents, children, spouses and ancestors of each node as bitmasks
+over the node indices, updates the ancestors of the descendants of an edge when the edge is added or removed, and
+only searches for the discriminating paths ending in the edge being checked.
+"""
+# === IMPORTS: BUILT-IN ===
+import itertools as itr
+import random
+import time
+from concurrent.futures import Executor
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+# === IMPORTS: LOCAL ===
+from conditional_independence import CI_Tester
+from graphical_models import AncestralGraph
+from graphical_model_learning.algorithms.dag import gsp as _gsp
+from .gsp import _initial_undirected, _random_permutations, _seed_generator
+from .imap import permutation2dag
+from .parallel import SharedTesters, run_counted_tasks, seeded
+
+
+def _bits(mask: int):
+    """
+    Iterate over the indices of the set bits of ``mask``, in increasing order.
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def _popcount(mask: int) -> int:
+    return bin(mask).count('1')
+
+
+class MAGWorkspace:
+    """
+    A directed MAG (with directed and bidirected edges only) over the nodes ``0, ..., p-1``, which stand for the
+    labels in ``nodes``, with its ancestor relations kept up to date as edges are added and removed.
+
+    Adding the arc i->j adds the ancestors of i, and i, to the ancestors of j and of each descendant of j. Removing
+    it recomputes the ancestors of j and of its descendants from their parents, in order of their previous number of
+    ancestors, which is a topological order of the graph both before and after the removal. Bidirected edges do not
+    change any ancestor relations.
+
+    Parameters
+    ----------
+    nodes:
+        Labels of the nodes.
+    directed:
+        Directed edges ``(i, j)``, as pairs of labels.
+    bidirected:
+        Bidirected edges, as pairs of labels.
+
+    Examples
+    --------
+    >>> from causaldag.structure_learning import MAGWorkspace
+    >>> ws = MAGWorkspace([0, 1, 2], directed={(0, 1)}, bidirected={(1, 2)})
+    >>> ws.legitimate_mark_changes()
+    ([(0, 1)], [(2, 1)])
+    """
+    def __init__(self, nodes: Iterable, directed: Iterable[Tuple] = (), bidirected: Iterable[Tuple] = ()):
+        self.labels = sorted(nodes)
+        self.index = {label: ix for ix, label in enumerate(self.labels)}
+        p = len(self.labels)
+        self.parents = [0] * p
+        self.children = [0] * p
+        self.spouses = [0] * p
+        self.anc = [0] * p
+        for i, j in directed:
+            self.add_directed(self.index[i], self.index[j])
+        for i, j in bidirected:
+            self.add_bidirected(self.index[i], self.index[j])
+
+    @classmethod
+    def from_ancestral_graph(cls, mag: AncestralGraph) -> 'MAGWorkspace':
+        if mag.undirected:
+            raise ValueError('Only defined for DMAGs')
+        return cls(mag.nodes, directed=mag.directed, bidirected=mag.bidirected)
+
+    def to_ancestral_graph(self) -> AncestralGraph:
+        labels = self.labels
+        return AncestralGraph(set(labels), directed=self.directed_labels(), bidirected=self.bidirected_labels())
+
+    def copy(self) -> 'MAGWorkspace':
+        ws = MAGWorkspace.__new__(MAGWorkspace)
+        ws.labels = self.labels
+        ws.index = self.index
+        ws.parents = self.parents.copy()
+        ws.children = self.children.copy()
+        ws.spouses = self.spouses.copy()
+        ws.anc = self.anc.copy()
+        return ws
+
+    # === PROPERTIES
+    @property
+    def nnodes(self) -> int:
+        return len(self.labels)
+
+    @property
+    def num_edges(self) -> int:
+        return sum(map(_popcount, self.parents)) + sum(map(_popcount, self.spouses)) // 2
+
+    def key(self) -> tuple:
+        """
+        Return a hashable key identifying the edges of the graph.
+        """
+        return tuple(self.parents), tuple(self.spouses)
+
+    def directed(self) -> List[Tuple[int, int]]:
+        return [(i, j) for i, children in enumerate(self.children) for j in _bits(children)]
+
+    def bidirected(self) -> List[Tuple[int, int]]:
+        return [(i, j) for i, spouses in enumerate(self.spouses) for j in _bits(spouses >> (i + 1) << (i + 1))]
+
+    def directed_labels(self) -> set:
+        return {(self.labels[i], self.labels[j]) for i, j in self.directed()}
+
+    def bidirected_labels(self) -> set:
+        return {(self.labels[i], self.labels[j]) for i, j in self.bidirected()}
+
+    def has_directed(self, i: int, j: int) -> bool:
+        return bool(self.children[i] >> j & 1)
+
+    def has_bidirected(self, i: int, j: int) -> bool:
+        return bool(self.spouses[i] >> j & 1)
+
+    def descendants(self, i: int) -> int:
+        """
+        Return the descendants of ``i``, not including ``i``, as a bitmask.
+        """
+        children = self.children
+        desc, frontier = 0, children[i]
+        while frontier:
+            desc |= frontier
+            new = 0
+            for k in _bits(frontier):
+                new |= children[k]
+            frontier = new & ~desc
+        return desc
+
+    # === EDGE UPDATES
+    def add_directed(self, i: int, j: int):
+        self.parents[j] |= 1 << i
+        self.children[i] |= 1 << j
+        new_anc = self.anc[i] | 1 << i
+        for k in _bits(self.descendants(j) | 1 << j):
+            self.anc[k] |= new_anc
+
+    def remove_directed(self, i: int, j: int):
+        affected = self.descendants(j) | 1 << j
+        self.parents[j] &= ~(1 << i)
+        self.children[i] &= ~(1 << j)
+        anc = self.anc
+        for k in sorted(_bits(affected), key=lambda k: _popcount(anc[k])):
+            new_anc = 0
+            for parent in _bits(self.parents[k]):
+                new_anc |= anc[parent] | 1 << parent
+            anc[k] = new_anc
+
+    def add_bidirected(self, i: int, j: int):
+        self.spouses[i] |= 1 << j
+        self.spouses[j] |= 1 << i
+
+    def remove_bidirected(self, i: int, j: int):
+        self.spouses[i] &= ~(1 << j)
+        self.spouses[j] &= ~(1 << i)
+
+    def remove_edge(self, i: int, j: int):
+        if self.has_directed(i, j):
+            self.remove_directed(i, j)
+        elif self.has_directed(j, i):
+            self.remove_directed(j, i)
+        else:
+            self.remove_bidirected(i, j)
+
+    def apply_lmc(self, i: int, j: int):
+        """
+        Change the directed edge i->j into i<->j, or the bidirected edge i<->j into i->j.
+        """
+        if self.has_directed(i, j):
+            self.remove_directed(i, j)
+            self.add_bidirected(i, j)
+        else:
+            self.remove_bidirected(i, j)
+            self.add_directed(i, j)
+
+    # === MARK CHANGES
+    def _colliders(self) -> int:
+        return sum(1 << k for k in range(self.nnodes) if _popcount(self.parents[k] | self.spouses[k]) >= 2)
+
+    def _has_discriminating_path(self, i: int, j: int, colliders: int) -> bool:
+        """
+        Check if there is a discriminating path for ``i`` ending in ``j``, i.e. a path a *-> k1 <-> ... <-> kn <-* i
+        *-* j, where a is not adjacent to j and each k is a collider and a parent of j.
+
+        Such a path exists iff one of the colliders that are parents of j, other than i, is adjacent to i by an edge
+        into it, and is connected by bidirected edges through such colliders to a collider with an edge into it from
+        outside the neighborhood of j.
+        """
+        parents, spouses = self.parents, self.spouses
+        candidates = colliders & parents[j] & ~(1 << i)
+        if not candidates:
+            return False
+        nonadjacent = ~(parents[j] | self.children[j] | spouses[j] | 1 << j)
+
+        reached = sum(1 << k for k in _bits(candidates) if (parents[k] | spouses[k]) & nonadjacent)
+        frontier = reached
+        while frontier:
+            new = 0
+            for k in _bits(frontier):
+                new |= spouses[k]
+            frontier = new & candidates & ~reached
+            reached |= frontier
+
+        if self.has_directed(i, j):
+            return bool(reached & (self.children[i] | spouses[i]))
+        return bool(reached & spouses[i])
+
+    def _no_other_path(self, i: int, j: int) -> bool:
+        return not (self.anc[j] & ~(1 << i) & self.children[i])
+
+    def legitimate_mark_changes(self, strict: bool = True) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+        """
+        Return the directed edges that can be changed to bidirected edges, and the bidirected edges that can be changed
+        to directed edges (as the new directed edge), under the same conditions as
+        ``AncestralGraph.legitimate_mark_changes``.
+
+        Parameters
+        ----------
+        strict:
+            If True, check the discriminating path condition. Otherwise, only check the parents and spouses of the
+            endpoints, and that a directed edge is the only directed path between its endpoints.
+        """
+        parents, spouses = self.parents, self.spouses
+        colliders = self._colliders() if strict else 0
+
+        mark_changes_dir = []
+        for i, j in self.directed():
+            if parents[i] & ~parents[j] or spouses[i] & ~(spouses[j] | parents[j]):
+                continue
+            if not self._no_other_path(i, j):
+                continue
+            if strict and self._has_discriminating_path(i, j, colliders):
+                continue
+            mark_changes_dir.append((i, j))
+
+        mark_changes_bidir = []
+        for i, j in sorted(self.bidirected() + [(j, i) for i, j in self.bidirected()]):
+            if parents[i] & ~parents[j] or spouses[i] & ~(1 << j) & ~(spouses[j] | parents[j]):
+                continue
+            if strict and (not self._no_other_path(i, j) or self._has_discriminating_path(i, j, colliders)):
+                continue
+            mark_changes_bidir.append((i, j))
+
+        return mark_changes_dir, mark_changes_bidir
+
+    def _edges_touching(self, nodes: int) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+        """
+        Return the directed and bidirected edges with an endpoint in the bitmask ``nodes``, in the order of
+        ``directed`` and ``bidirected``.
+        """
+        directed, bidirected = [], []
+        for k, (children, spouses) in enumerate(zip(self.children, self.spouses)):
+            spouses = spouses >> (k + 1) << (k + 1)
+            if not nodes >> k & 1:
+                children &= nodes
+                spouses &= nodes
+            if children:
+                directed.extend([(k, child) for child in _bits(children)])
+            if spouses:
+                bidirected.extend([(k, spouse) for spouse in _bits(spouses)])
+        return directed, bidirected
+
+    def lmc_removals(
+            self,
+            i: int,
+            j: int,
+            ci_tester: CI_Tester,
+            cache: Optional[dict] = None,
+            edges: Optional[Tuple[List, List]] = None
+    ) -> Tuple[List, List]:
+        """
+        Return the directed and bidirected edges which can be removed after applying the mark change ``(i, j)``.
+
+        As in ``graphical_model_learning``, each edge with an endpoint in the descendants of j (or in j) is tested
+        in turn, given the ancestors of its endpoints after the mark change and the earlier removals, and removed if
+        its endpoints are independent. The mark change and the removals are made in place and then undone.
+
+        ``cache`` is a dictionary in which to keep the results of the tests, by the indices of the tested nodes and
+        the bitmask of the conditioning set, which saves building the conditioning set of each lookup when the same
+        test is made for many mark changes. ``edges`` are the directed and bidirected edges with an endpoint in the
+        descendants of j or in j, if already known, as they are the same for each mark change ending in j.
+        """
+        if edges is None:
+            edges = self._edges_touching(self.descendants(j) | 1 << j)
+        directed, bidirected = edges
+        saved = self.parents.copy(), self.children.copy(), self.spouses.copy(), self.anc.copy()
+        cache = dict() if cache is None else cache
+
+        labels, anc = self.labels, self.anc
+        lmc = {(i, j), (j, i)}
+        self.apply_lmc(i, j)
+        removed_dir, removed_bidir = [], []
+        for removed, edges in ((removed_dir, directed), (removed_bidir, bidirected)):
+            for k, l in edges:
+                cond_mask = (anc[k] | anc[l]) & ~(1 << k | 1 << l)
+                is_ci = cache.get((k, l, cond_mask))
+                if is_ci is None:
+                    is_ci = cache[(k, l, cond_mask)] = ci_tester.is_ci(
+                        labels[k], labels[l], {labels[m] for m in _bits(cond_mask)}
+                    )
+                if is_ci:
+                    self.remove_edge(k, l)
+                    if (k, l) not in lmc:
+                        removed.append((k, l))
+
+        self.parents, self.children, self.spouses, self.anc = saved
+        return removed_dir, removed_bidir
+
+    def key_after(self, i: int, j: int, removed_dir: List[Tuple], removed_bidir: List[Tuple]) -> tuple:
+        """
+        Return the ``key`` of the graph obtained by applying the mark change ``(i, j)`` and removing the given edges.
+        """
+        parents, spouses = list(self.parents), list(self.spouses)
+        if self.has_directed(i, j):
+            parents[j] &= ~(1 << i)
+            spouses[i] |= 1 << j
+            spouses[j] |= 1 << i
+        else:
+            spouses[i] &= ~(1 << j)
+            spouses[j] &= ~(1 << i)
+            parents[j] |= 1 << i
+        for k, l in removed_dir:
+            parents[l] &= ~(1 << k)
+        for k, l in removed_bidir:
+            spouses[k] &= ~(1 << l)
+            spouses[l] &= ~(1 << k)
+        return tuple(parents), tuple(spouses)
+
+    def __repr__(self):
+        return f"MAGWorkspace(directed={self.directed_labels()}, bidirected={self.bidirected_labels()})"
+
+
+def _neighbors(ws: MAGWorkspace, ci_tester: CI_Tester, strict: bool, cache: dict, visited: Optional[dict] = None) -> list:
+    """
+    Return the legitimate mark changes of ``ws``, each with the edges it lets us remove, leaving out those which lead
+    to a graph in ``visited``.
+    """
+    lmcs_dir, lmcs_bidir = ws.legitimate_mark_changes(strict=strict)
+    neighbors = []
+    edges_by_endpoint = dict()
+    for lmc in lmcs_dir + lmcs_bidir:
+        j = lmc[1]
+        if j not in edges_by_endpoint:
+            edges_by_endpoint[j] = ws._edges_touching(ws.descendants(j) | 1 << j)
+        removed_dir, removed_bidir = ws.lmc_removals(*lmc, ci_tester, cache, edges_by_endpoint[j])
+        if visited is not None and ws.key_after(*lmc, removed_dir, removed_bidir) in visited:
+            continue
+        neighbors.append((lmc, removed_dir, removed_bidir))
+    return neighbors
+
+
+def _gspo_search(
+        ws: MAGWorkspace,
+        ci_tester: CI_Tester,
+        depth: Optional[int],
+        strict: bool,
+        verbose: bool,
+        max_iters: float
+) -> Tuple[MAGWorkspace, int]:
+    """
+    Depth-first search over MAGs starting from ``ws``, moving to the sparsest neighbor whenever one is sparser than
+    the current MAG, and otherwise exploring the neighbors with the same number of edges up to ``depth`` mark changes
+    away. Return the final MAG and the number of MAGs visited.
+    """
+    depth = float('inf') if depth is None else depth
+    cache = dict()
+    neighbors = _neighbors(ws, ci_tester, strict, cache)
+    visited = dict()
+    graph_counter = 0
+    trace = []
+    iters_since_improvement = 0
+    while iters_since_improvement <= max_iters:
+        graph_num = visited.setdefault(ws.key(), graph_counter)
+        if verbose: print(f"Number of visited MAGs: {len(visited)}. Exploring MAG #{graph_num} with {ws.num_edges} edges.")
+        deltas = [len(removed_dir) + len(removed_bidir) for _, removed_dir, removed_bidir in neighbors]
+        max_delta = max(deltas, default=0)
+
+        sparser_exists = max_delta > 0
+        keep_searching_mec = len(trace) != depth and len(neighbors) > 0
+
+        if sparser_exists:
+            trace = []
+            ix = random.choice([ix for ix, delta in enumerate(deltas) if delta == max_delta])
+            (i, j), removed_dir, removed_bidir = neighbors.pop(ix)
+            ws.apply_lmc(i, j)
+            for k, l in removed_dir + removed_bidir:
+                ws.remove_edge(k, l)
+            if verbose: print(f"Starting over at a sparser IMAP with {ws.num_edges} edges")
+        elif keep_searching_mec:
+            if verbose: print(f"{'='*len(trace)}Continuing search through the MEC at {ws.num_edges} edges. "
+                              f"Picking from {len(neighbors)} neighbors of #{graph_num}.")
+            trace.append((ws.copy(), neighbors))
+            (i, j), _, _ = neighbors.pop(0)
+            ws.apply_lmc(i, j)
+        elif trace:
+            if verbose: print(f"{'='*len(trace)}Backtracking")
+            ws, neighbors = trace.pop()
+            iters_since_improvement += 1
+        else:
+            break
+
+        if sparser_exists or keep_searching_mec:
+            graph_counter += 1
+            neighbors = _neighbors(ws, ci_tester, strict, cache, visited)
+    return ws, len(visited)
+
+
+def _starting_workspace(ci_tester: CI_Tester, node_list: list, initial_imap: str, perm: Optional[list],
+                        empty_edges: Optional[set]) -> MAGWorkspace:
+    if initial_imap == 'permutation':
+        dag = permutation2dag(perm, ci_tester)
+        return MAGWorkspace(node_list, directed=dag.arcs)
+    if initial_imap == 'gsp':
+        dag = _gsp(set(perm), ci_tester, nruns=1, initial_permutations=[perm])
+        return MAGWorkspace(node_list, directed=dag.arcs)
+    return MAGWorkspace(node_list, bidirected=empty_edges)
+
+
+def _gspo_run(shared: SharedTesters, seed: int, node_list: list, initial_imap: str, perm: Optional[list],
+              empty_edges: Optional[set], kwargs: dict):
+    ci_tester = shared.get()['ci_tester']
+    start = time.time()
+    with seeded(seed):
+        ws = _starting_workspace(ci_tester, node_list, initial_imap, perm, empty_edges)
+        num_initial_edges = ws.num_edges
+        ws, num_visited = _gspo_search(ws, ci_tester, **kwargs)
+    return ws.to_ancestral_graph(), num_initial_edges, num_visited, time.time() - start
+
+
+def gspo(
+        nodes: set,
+        ci_tester: CI_Tester,
+        depth: Optional[int] = 4,
+        initial_imap: str = 'permutation',
+        strict: bool = True,
+        verbose: bool = False,
+        max_iters: float = float('inf'),
+        nruns: int = 5,
+        summarize: bool = False,
+        n_jobs: Optional[int] = 1,
+        executor: Optional[Executor] = None,
+        seed: Optional[int] = None,
+) -> Union[AncestralGraph, Tuple[AncestralGraph, List[Dict]]]:
+    """
+    Estimate a MAG using the Greedy Sparsest Poset (GSPo) algorithm.
+
+    The search is that of ``graphical_model_learning.gspo``, run on a ``MAGWorkspace``, so that the legitimate mark
+    changes of each MAG and the edges each of them lets us remove are found without copying the MAG or recomputing
+    its ancestors and discriminating paths. Each run is an independent search from its own starting IMAP, so runs
+    may be spread across processes, as in ``gsp``. The sparsest MAG of all runs is returned, ties being broken in
+    favor of the earliest run.
+
+    Parameters
+    ----------
+    nodes:
+        Labels of nodes in the graph.
+    ci_tester:
+        A conditional independence tester, which has a method is_ci taking two sets A and B, and a conditioning set C,
+        and returns True/False. When running in parallel, it must be picklable.
+    depth:
+        Maximum depth in depth-first search. Use None for infinite search depth.
+    initial_imap:
+        String indicating how to obtain the initial IMAP. Must be "permutation" (the minimal IMAP of a permutation
+        from the minimum degree algorithm on a thresholded undirected graph), "empty" (a bidirected edge between each
+        pair of marginally dependent nodes), or "gsp" (the DAG found by GSP from such a permutation).
+    strict:
+        If True, check discriminating paths condition for legitimate mark changes.
+    verbose:
+        If True, print information about algorithm progress.
+    max_iters:
+        Maximum number of depth-first search steps without score improvement before stopping.
+    nruns:
+        Number of times to run the algorithm (each run may vary due to randomness in tie-breaking and/or starting
+        imap).
+    summarize:
+        If True, also return a summary of each run.
+    n_jobs:
+        Number of processes to spread the runs across. -1 uses all CPUs.
+    executor:
+        An existing ``concurrent.futures`` executor to run on instead of starting new processes.
+    seed:
+        Seed for the starting permutations and the random choices made during each run.
+
+    See Also
+    --------
+    gsp, MAGWorkspace
+
+    Return
+    ------
+    est_mag, or (est_mag, summaries) if ``summarize`` is True. ``summaries[r]`` is a dictionary holding the seed,
+    starting permutation (if any), final MAG, numbers of edges of the starting and final MAGs, number of MAGs visited,
+    running time, and, if ``ci_tester`` keeps statistics, the ``TesterStats`` of the CI tests of run r as
+    ``ci_stats``.
+
+    Examples
+    --------
+    >>> import causaldag as cd
+    >>> d = cd.rand.directed_erdos(20, .2)
+    >>> mag = d.marginal_mag({0, 1, 2}, relabel='default')
+    >>> ci_tester = cd.MemoizedCI_Tester(cd.msep_test, mag)
+    >>> est_mag = cd.gspo(mag.nodes, ci_tester, nruns=4, n_jobs=2, seed=0)
+    """
+    if initial_imap not in {'permutation', 'empty', 'gsp'}:
+        raise ValueError("initial_imap must be one of 'permutation', 'empty', or 'gsp'")
+    node_list = sorted(nodes)
+    seeds = _seed_generator(seed)
+    kwargs = dict(depth=depth, strict=strict, verbose=verbose, max_iters=max_iters)
+
+    perms, empty_edges = [None] * nruns, None
+    if initial_imap == 'empty':
+        empty_edges = {(i, j) for i, j in itr.combinations(node_list, 2) if not ci_tester.is_ci(i, j, set())}
+    else:
+        initial_undirected = _initial_undirected(nodes, ci_tester, None, 'threshold')
+        perms = _random_permutations(node_list, initial_undirected, [seeds.getrandbits(32) for _ in range(nruns)])
+
+    run_seeds = [seeds.getrandbits(32) for _ in range(nruns)]
+    with SharedTesters(ci_tester=ci_tester) as shared:
+        results, run_stats = run_counted_tasks(
+            _gspo_run,
+            [(shared, run_seed, node_list, initial_imap, perm, empty_edges, kwargs)
+             for run_seed, perm in zip(run_seeds, perms)],
+            n_jobs=n_jobs,
+            executor=executor
+        )
+
+    best = min(range(nruns), key=lambda r: results[r][0].num_edges)
+    if not summarize:
+        return results[best][0]
+    summaries = [
+        dict(
+            seed=run_seed,
+            initial_permutation=perm,
+            mag=mag,
+            num_initial_edges=num_initial_edges,
+            num_edges=mag.num_edges,
+            num_visited=num_visited,
+            time=elapsed,
+            ci_stats=stats.get('ci_tester')
+        )
+        for run_seed, perm, (mag, num_initial_edges, num_visited, elapsed), stats in zip(run_seeds, perms, results, run_stats)
+    ]
+    return results[best][0], summaries
@@ -0,0 +1,313 @@
+"""
+Minimal IMAPs of permutations, the inner loop of the greedy sparsest permutation algorithms.
+
+For Gaussian testers, all the tests of one position of the permutation against its predecessors are made at once,
+from the precision matrix of the prefix of the permutation, which is updated by one step of an incremental
+Cholesky factorization per position. The results are recorded in the tester, as if made by ``is_ci``.
+"""
+# === IMPORTS: BUILT-IN ===
+from typing import Optional, Set, Tuple
+import time
+
+# === IMPORTS: THIRD-PARTY ===
+import numpy as np
+from scipy.special import erf
+from tqdm import tqdm
+
+# === IMPORTS: LOCAL ===
+from conditional_independence import CI_Tester, partial_correlation_test
+from graphical_models import DAG, UndirectedEdge
+
+
+def _check_fixed(fixed_adjacencies: set, fixed_gaps: set):
+    if fixed_adjacencies and not isinstance(next(iter(fixed_adjacencies)), frozenset):
+        raise ValueError('fixed_adjacencies should contain frozensets')
+    if fixed_gaps and not isinstance(next(iter(fixed_gaps)), frozenset):
+        raise ValueError('fixed_gaps should contain frozensets')
+
+
+def _is_gaussian_tester(ci_tester: CI_Tester) -> bool:
+    return (
+        getattr(ci_tester, 'ci_test', None) is partial_correlation_test
+        and 'C' in ci_tester.suffstat
+        and set(ci_tester.kwargs) <= {'alpha'}
+    )
+
+
+def _gaussian_arcs(
+        perm: list,
+        ci_tester: CI_Tester,
+        verbose: bool,
+        fixed_adjacencies: set,
+        fixed_gaps: set,
+        max_arcs: Optional[int],
+        progress: bool
+) -> Optional[set]:
+    """
+    Test each node of ``perm`` against each of its predecessors, given the other predecessors, with the test of
+    ``partial_correlation_test``. Return the arcs of the dependent pairs, or None once there are more than
+    ``max_arcs`` of them. If ``ci_tester`` has a ``record_batch`` method, the tests are memoized and counted by it.
+
+    ``inv_chol`` is the inverse of the Cholesky factor of the correlation matrix of the predecessors, so that their
+    precision matrix is ``inv_chol.T @ inv_chol``. Adding the node ``s`` with correlations ``c`` to the predecessors
+    adds the row ``[r, d]`` to the Cholesky factor, with ``r = inv_chol @ c`` and ``d**2 = 1 - r @ r``, and so adds
+    the row ``[-(r @ inv_chol) / d, 1 / d]`` to its inverse. Raises ``np.linalg.LinAlgError`` if the correlation
+    matrix is not positive definite.
+    """
+    n = ci_tester.suffstat['n']
+    alpha = ci_tester.kwargs.get('alpha')
+    alpha = 1/n if alpha is None else alpha
+    corr = ci_tester.suffstat['C']
+    record_batch = getattr(ci_tester, 'record_batch', None)
+    detailed = getattr(ci_tester, 'detailed', False)
+    nnodes = len(perm)
+    inv_chol = np.zeros((nnodes, nnodes))
+    precision_diag = np.zeros(nnodes)
+    arcs = set()
+
+    positions = range(nnodes) if not progress else tqdm(range(nnodes))
+    for k in positions:
+        start = time.perf_counter()
+        s = perm[k]
+        prefix = perm[:k]
+        r = inv_chol[:k, :k] @ corr[prefix, s]
+        d2 = corr[s, s] - r @ r
+        if not d2 > 0:
+            raise np.linalg.LinAlgError('The correlation matrix is not positive definite')
+        w = r @ inv_chol[:k, :k]
+        inv_chol[k, :k] = -w / np.sqrt(d2)
+        inv_chol[k, k] = 1 / np.sqrt(d2)
+        precision_diag[:k] += w**2 / d2
+        precision_diag[k] = 1 / d2
+        if k == 0:
+            continue
+
+        # partial correlation of s with each predecessor, given all other predecessors
+        rho = w / d2 / np.sqrt(precision_diag[:k] * precision_diag[k])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            statistic = np.sqrt(n - (k - 1) - 3) * np.abs(.5 * np.log1p(2*rho/(1 - rho)))
+        p_values = 2*(1 - .5*(1 + erf(statistic/np.sqrt(2))))
+        dependent = p_values < alpha
+        elapsed = time.perf_counter() - start
+
+        tested = []
+        for a, pi_a in enumerate(prefix):
+            pair = frozenset({pi_a, s})
+            if pair in fixed_adjacencies:
+                arcs.add((pi_a, s))
+            elif pair not in fixed_gaps:
+                tested.append(a)
+                if dependent[a]:
+                    arcs.add((pi_a, s))
+                if verbose: print(f"{pi_a} is independent of {s} given {set(prefix) - {pi_a}}: {not dependent[a]}")
+        if record_batch is not None:
+            prefix_set = frozenset(prefix)
+            record_batch(
+                [(prefix[a], s, prefix_set - {prefix[a]}) for a in tested],
+                [bool(dependent[a]) for a in tested],
+                elapsed,
+                [
+                    dict(statistic=statistic[a], p_value=p_values[a], reject=bool(dependent[a])) for a in tested
+                ] if detailed else None
+            )
+        if max_arcs is not None and len(arcs) > max_arcs:
+            return None
+
+    return arcs
+
+
+def _generic_imap(
+        perm: list,
+        ci_tester: CI_Tester,
+        verbose: bool,
+        fixed_adjacencies: set,
+        fixed_gaps: set,
+        max_arcs: Optional[int],
+        progress: bool
+) -> Optional[DAG]:
+    d = DAG(nodes=set(perm))
+    positions = range(len(perm)) if not progress else tqdm(range(len(perm)))
+    for s in positions:
+        pi_s = perm[s]
+        for f in range(s):
+            pi_f = perm[f]
+            if frozenset({pi_f, pi_s}) in fixed_adjacencies:
+                d.add_arc(pi_f, pi_s)
+                continue
+            if frozenset({pi_f, pi_s}) in fixed_gaps:
+                continue
+
+            mb = d.markov_blanket_of(pi_f)
+            is_ci = ci_tester.is_ci(pi_f, pi_s, mb)
+            if not is_ci:
+                d.add_arc(pi_f, pi_s)
+            if verbose: print(f"{pi_f} is independent of {pi_s} given {mb}: {is_ci}")
+        if max_arcs is not None and d.num_arcs > max_arcs:
+            return None
+    return d
+
+
+def _swapped_covered_arc(perm: list, previous_perm: list, previous_dag: DAG) -> Optional[Tuple]:
+    """
+    If ``perm`` is ``previous_perm`` with two consecutive nodes ``i, j`` swapped, and ``i -> j`` is a covered arc of
+    ``previous_dag``, return ``(i, j)``.
+    """
+    if len(perm) != len(previous_perm):
+        return None
+    diff = [k for k, (a, b) in enumerate(zip(perm, previous_perm)) if a != b]
+    if len(diff) != 2 or diff[1] != diff[0] + 1:
+        return None
+    i, j = previous_perm[diff[0]], previous_perm[diff[1]]
+    if perm[diff[0]] != j or perm[diff[1]] != i:
+        return None
+    if not previous_dag.has_arc(i, j) or previous_dag.parents_of(j) != previous_dag.parents_of(i) | {i}:
+        return None
+    return i, j
+
+
+def reverse_covered_arc(
+        dag: DAG,
+        i,
+        j,
+        ci_tester: CI_Tester,
+        fixed_adjacencies: Set[UndirectedEdge] = set(),
+        fixed_gaps: Set[UndirectedEdge] = set(),
+        verbose: bool = False
+) -> DAG:
+    """
+    Update the minimal IMAP ``dag`` of a permutation in which ``i`` comes just before ``j``, and ``i -> j`` is a
+    covered arc, to the minimal IMAP of the permutation with ``i`` and ``j`` swapped.
+
+    Only the arcs from the common parents of ``i`` and ``j`` can be removed, so only those are tested: the arc
+    ``p -> j`` is kept if ``j`` and ``p`` are dependent given the other parents, and the arc ``p -> i`` if ``i`` and
+    ``p`` are dependent given ``j`` and the other parents.
+
+    Parameters
+    ----------
+    dag:
+        minimal IMAP of the current permutation.
+    i, j:
+        endpoints of the covered arc ``i -> j``.
+    ci_tester:
+        object for testing conditional independence.
+    fixed_adjacencies:
+        set of nodes known to be adjacent.
+    fixed_gaps:
+        set of nodes known not to be adjacent.
+    verbose:
+        if True, log each CI test.
+
+    Returns
+    -------
+    new_dag
+        a copy of ``dag`` with the arc reversed and the arcs found to be superfluous removed.
+
+    Examples
+    --------
+    >>> import causaldag as cd
+    >>> ci_tester = cd.MemoizedCI_Tester(cd.dsep_test, cd.DAG(arcs={(1, 0), (0, 2)}))
+    >>> dag = cd.permutation2dag([1, 2, 0], ci_tester)
+    >>> sorted(dag.arcs)
+    [(1, 0), (1, 2), (2, 0)]
+    >>> sorted(cd.reverse_covered_arc(dag, 2, 0, ci_tester).arcs)
+    [(0, 2), (1, 0)]
+    """
+    parents = dag.parents_of(i)
+    new_dag = dag.copy()
+    new_dag.reverse_arc(i, j)
+    for parent in parents:
+        rest = parents - {parent}
+        for child, cond_set in [(j, rest), (i, rest | {j})]:
+            pair = frozenset({child, parent})
+            if pair in fixed_adjacencies or pair in fixed_gaps:
+                continue
+            is_ci = ci_tester.is_ci(child, parent, cond_set)
+            if is_ci:
+                new_dag.remove_arc(parent, child)
+            if verbose: print(f"{child} is independent of {parent} given {cond_set}: {is_ci}")
+    return new_dag
+
+
+def permutation2dag(
+        perm: list,
+        ci_tester: CI_Tester,
+        verbose=False,
+        fixed_adjacencies: Set[UndirectedEdge] = set(),
+        fixed_gaps: Set[UndirectedEdge] = set(),
+        progress=False,
+        max_arcs: Optional[int] = None,
+        previous: Optional[Tuple[list, DAG]] = None,
+        batched: Optional[bool] = None
+) -> Optional[DAG]:
+    """
+    Estimate the minimal IMAP of a DAG which is consistent with the given permutation.
+
+    If ``batched``, each node is tested against all of its predecessors, given the other predecessors, with one
+    vectorized partial correlation test per position of the permutation, in ``O(p^3 / 3)`` time overall.
+    Otherwise, each node is tested against each predecessor, given the Markov blanket of the predecessor in the DAG
+    built so far. The two give the same IMAP for a perfect tester, but may differ on finite samples.
+
+    Parameters
+    ----------
+    perm:
+        list of nodes representing the permutation.
+    ci_tester:
+        object for testing conditional independence.
+    verbose:
+        if True, log each CI test.
+    fixed_adjacencies:
+        set of nodes known to be adjacent.
+    fixed_gaps:
+        set of nodes known not to be adjacent.
+    progress:
+        if True, show a progress bar over the positions of the permutation.
+    max_arcs:
+        if given, stop and return None as soon as the minimal IMAP is known to have more than ``max_arcs`` arcs.
+    previous:
+        a permutation and its minimal IMAP. If ``perm`` only swaps two consecutive nodes of that permutation which
+        are joined by a covered arc of its IMAP, the IMAP is updated by ``reverse_covered_arc`` instead of being
+        built from scratch.
+    batched:
+        whether to make the tests of each position at once. This requires ``ci_tester`` to use
+        ``partial_correlation_test`` with no keyword arguments other than ``alpha``. If None, the tests are batched
+        whenever possible, falling back to separate tests if the correlation matrix is singular.
+
+    See Also
+    --------
+    reverse_covered_arc
+
+    Examples
+    --------
+    >>> import causaldag as cd
+    >>> g = cd.rand.rand_weights(cd.rand.directed_erdos(10, .3))
+    >>> suffstat = cd.partial_correlation_suffstat(g.sample(1000))
+    >>> ci_tester = cd.MemoizedCI_Tester(cd.partial_correlation_test, suffstat, alpha=1e-3)
+    >>> dag = cd.permutation2dag(list(range(10)), ci_tester, fixed_gaps={frozenset({1, 2})})
+    """
+    _check_fixed(fixed_adjacencies, fixed_gaps)
+    if batched and not _is_gaussian_tester(ci_tester):
+        raise ValueError('Batched tests require a tester using partial_correlation_test')
+
+    if previous is not None:
+        covered_arc = _swapped_covered_arc(perm, *previous)
+        if covered_arc is not None:
+            dag = reverse_covered_arc(previous[1], *covered_arc, ci_tester, fixed_adjacencies, fixed_gaps, verbose)
+            return dag if max_arcs is None or dag.num_arcs <= max_arcs else None
+
+    if batched or (batched is None and _is_gaussian_tester(ci_tester)):
+        try:
+            arcs = _gaussian_arcs(
+                perm,
+                ci_tester,
+                verbose,
+                fixed_adjacencies,
+                fixed_gaps,
+                max_arcs,
+                progress
+            )
+            return DAG(nodes=set(perm), arcs=arcs) if arcs is not None else None
+        except np.linalg.LinAlgError:
+            if batched:
+                raise
+
+    return _generic_imap(perm, ci_tester, verbose, fixed_adjacencies, fixed_gaps, max_arcs, progress)
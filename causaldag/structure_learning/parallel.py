@@ -0,0 +1,231 @@
+"""
+Utilities for running independent restarts of a structure learning algorithm across processes.
+
+The sufficient statistics of the testers are copied once into shared memory blocks, and only the names of the blocks
+are sent with each task. A worker attaches to the blocks the first time it sees them and reuses the attached testers
+(and their memoized results) for every later task of the same call.
+"""
+# === IMPORTS: BUILT-IN ===
+import copy
+import os
+import random
+import threading
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from typing import Callable, Dict, List, Optional
+
+# === IMPORTS: THIRD-PARTY ===
+import numpy as np
+
+# testers attached by this worker process, keyed by the token of the SharedTesters they came from
+_ATTACHED = dict()
+# the global random state is shared by the threads of a process, so seeded blocks in different threads must not overlap
+_RANDOM_LOCK = threading.RLock()
+
+
+class SharedArray:
+    """
+    Picklable handle to a numpy array stored in a shared memory block.
+    """
+    def __init__(self, name: str, shape: tuple, dtype: np.dtype):
+        self.name = name
+        self.shape = shape
+        self.dtype = dtype
+
+    def attach(self, blocks: list) -> np.ndarray:
+        block = shared_memory.SharedMemory(name=self.name)
+        blocks.append(block)
+        return np.ndarray(self.shape, dtype=self.dtype, buffer=block.buf)
+
+
+def share_arrays(obj, blocks: list):
+    """
+    Copy each numpy array inside the (possibly nested) dicts, lists and tuples of ``obj`` into a new shared memory
+    block, returning a copy of ``obj`` with the arrays replaced by ``SharedArray`` handles. The blocks are appended to
+    ``blocks``; the caller is responsible for unlinking them.
+    """
+    if isinstance(obj, np.ndarray) and obj.dtype != object:
+        block = shared_memory.SharedMemory(create=True, size=max(obj.nbytes, 1))
+        blocks.append(block)
+        np.ndarray(obj.shape, dtype=obj.dtype, buffer=block.buf)[...] = obj
+        return SharedArray(block.name, obj.shape, obj.dtype)
+    if isinstance(obj, dict):
+        return {key: share_arrays(value, blocks) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(share_arrays(value, blocks) for value in obj)
+    return obj
+
+
+def attach_arrays(obj, blocks: list):
+    """
+    Inverse of ``share_arrays``: replace each ``SharedArray`` handle inside ``obj`` by a view of its block.
+    """
+    if isinstance(obj, SharedArray):
+        return obj.attach(blocks)
+    if isinstance(obj, dict):
+        return {key: attach_arrays(value, blocks) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(attach_arrays(value, blocks) for value in obj)
+    return obj
+
+
+class SharedTesters:
+    """
+    Context manager making CI testers and invariance testers available to worker processes.
+
+    On entry, the ``suffstat`` of each tester is copied into shared memory, and a copy of the tester holding only
+    handles to the shared blocks is kept for pickling. The blocks are unlinked on exit.
+
+    Within the process that created it, ``get()`` returns the original testers, so that serial runs share their
+    memoized results with the caller.
+
+    Parameters
+    ----------
+    **testers:
+        Testers to share, by name. ``None`` values are passed through.
+    """
+    def __init__(self, **testers):
+        self.token = uuid.uuid4().hex
+        self._testers = testers
+        self._pid = os.getpid()
+        self._payload = None
+        self._blocks = []
+
+    def __enter__(self):
+        payload = dict()
+        for name, tester in self._testers.items():
+            if tester is not None and isinstance(getattr(tester, 'suffstat', None), dict):
+                tester = copy.copy(tester)
+                if hasattr(tester, 'clear'):
+                    tester.clear()
+                tester.suffstat = share_arrays(tester.suffstat, self._blocks)
+            payload[name] = tester
+        self._payload = payload
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+    def __getstate__(self):
+        return dict(token=self.token, _payload=self._payload, _pid=self._pid)
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._testers = None
+        self._blocks = []
+
+    def get(self) -> Dict:
+        """
+        Return the testers, attaching to the shared memory blocks if called from a worker process.
+        """
+        if self._testers is not None and os.getpid() == self._pid:
+            return self._testers
+        attached = _ATTACHED.get(self.token)
+        if attached is None:
+            # only keep the testers of the most recent call, so long-lived executors don't accumulate blocks
+            for _, blocks in _ATTACHED.values():
+                for block in blocks:
+                    block.close()
+            _ATTACHED.clear()
+
+            testers, blocks = dict(), []
+            for name, tester in self._payload.items():
+                if tester is not None and isinstance(getattr(tester, 'suffstat', None), dict):
+                    tester = copy.copy(tester)
+                    tester.suffstat = attach_arrays(tester.suffstat, blocks)
+                testers[name] = tester
+            attached = _ATTACHED[self.token] = (testers, blocks)
+        return attached[0]
+
+
+@contextmanager
+def seeded(seed: int):
+    """
+    Seed the global ``random`` module for the duration of the block, restoring its previous state afterwards.
+
+    Blocks in different threads of the same process run one at a time.
+    """
+    with _RANDOM_LOCK:
+        state = random.getstate()
+        random.seed(seed)
+        try:
+            yield
+        finally:
+            random.setstate(state)
+
+
+def run_tasks(fn: Callable, tasks: List[tuple], n_jobs: Optional[int] = 1, executor: Optional[Executor] = None) -> list:
+    """
+    Return ``[fn(*task) for task in tasks]``, computed in parallel if ``executor`` is given or ``n_jobs`` is not 1.
+
+    Parameters
+    ----------
+    fn:
+        A module-level (hence picklable) function.
+    tasks:
+        List of argument tuples.
+    n_jobs:
+        Number of worker processes to start if no executor is given. -1 uses all CPUs.
+    executor:
+        An existing ``concurrent.futures`` executor. It is not shut down.
+    """
+    if executor is not None:
+        futures = [executor.submit(fn, *task) for task in tasks]
+        return [future.result() for future in futures]
+    if n_jobs == -1:
+        n_jobs = os.cpu_count()
+    if n_jobs is None or n_jobs <= 1 or len(tasks) <= 1:
+        return [fn(*task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=min(n_jobs, len(tasks))) as pool:
+        futures = [pool.submit(fn, *task) for task in tasks]
+        return [future.result() for future in futures]
+
+
+def _stats_of(testers: Dict) -> Dict:
+    return {
+        name: tester.stats.copy()
+        for name, tester in testers.items()
+        if getattr(tester, 'stats', None) is not None
+    }
+
+
+def _call_counted(fn: Callable, shared: SharedTesters, *args):
+    testers = shared.get()
+    before = _stats_of(testers)
+    result = fn(shared, *args)
+    after = _stats_of(testers)
+    return result, os.getpid(), {name: after[name] - before[name] for name in after}
+
+
+def run_counted_tasks(
+        fn: Callable,
+        tasks: List[tuple],
+        n_jobs: Optional[int] = 1,
+        executor: Optional[Executor] = None
+) -> tuple:
+    """
+    Like ``run_tasks``, for tasks whose first argument is a ``SharedTesters``, additionally returning, for each task,
+    the ``TesterStats`` of the lookups it made with each tester that keeps statistics.
+
+    The statistics of tasks run in worker processes are added to those of the original testers, so that these count
+    every lookup made on their behalf. Tasks run on threads of this process already update the original testers; the
+    statistics of such a task then also count the lookups of any task running at the same time.
+
+    Returns
+    -------
+    (results, stats)
+    """
+    outputs = run_tasks(_call_counted, [(fn,) + tuple(task) for task in tasks], n_jobs=n_jobs, executor=executor)
+    pid = os.getpid()
+    for task, (_, task_pid, task_stats) in zip(tasks, outputs):
+        if task_pid == pid:
+            continue
+        testers = task[0].get()
+        for name, stats in task_stats.items():
+            testers[name].stats.merge(stats)
+    return [output[0] for output in outputs], [output[2] for output in outputs]
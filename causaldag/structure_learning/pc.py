@@ -0,0 +1,299 @@
+"""
+Order-independent PC algorithm, with the edge tests of each conditioning set size spread across processes.
+"""
+# === IMPORTS: BUILT-IN ===
+import contextlib
+import itertools as itr
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# === IMPORTS: THIRD-PARTY ===
+import numpy as np
+
+# === IMPORTS: LOCAL ===
+from conditional_independence import CI_Tester
+from graphical_models import UndirectedGraph
+from graphical_model_learning.algorithms.dag import pcalg as _pcalg
+from .parallel import SharedTesters, run_counted_tasks
+
+# number of tasks per worker in each level, to balance the load between workers
+_TASKS_PER_JOB = 4
+
+
+class Sepsets:
+    """
+    Separating sets of the pairs of nodes removed from the skeleton, stored in two (p x p) integer matrices of
+    offsets and sizes into one flat array of node indices.
+
+    Supports the mapping interface of the ``sepset`` dictionaries of ``graphical_model_learning``: ``sepsets[key]``
+    for ``key = frozenset({i, j})`` is the tuple of nodes separating ``i`` and ``j``.
+
+    Parameters
+    ----------
+    node_list:
+        Labels of the nodes, in the order of the rows and columns of the matrices.
+    """
+    def __init__(self, node_list: list):
+        p = len(node_list)
+        self.node_list = node_list
+        self.node2ix = {node: ix for ix, node in enumerate(node_list)}
+        self._offsets = np.full((p, p), -1, dtype=np.int64)
+        self._sizes = np.zeros((p, p), dtype=np.int32)
+        self._members = np.zeros(0, dtype=np.int32)
+
+    def add(self, pairs: List[Tuple[int, int]], cond_sets: List[tuple]):
+        """
+        Record the separating sets ``cond_sets`` (tuples of node indices) of the pairs of node indices ``pairs``.
+        """
+        if not pairs:
+            return
+        sizes = np.array([len(cond_set) for cond_set in cond_sets], dtype=np.int32)
+        offsets = len(self._members) + np.concatenate(([0], np.cumsum(sizes)[:-1]))
+        members = [ix for cond_set in cond_sets for ix in cond_set]
+        self._members = np.concatenate((self._members, np.array(members, dtype=np.int32)))
+        rows, cols = np.array(pairs).T
+        self._offsets[rows, cols] = self._offsets[cols, rows] = offsets
+        self._sizes[rows, cols] = self._sizes[cols, rows] = sizes
+
+    def _get_ixs(self, i: int, j: int) -> Optional[tuple]:
+        offset = self._offsets[i, j]
+        if offset < 0:
+            return None
+        return tuple(self._members[offset:offset+self._sizes[i, j]])
+
+    def __getitem__(self, key) -> tuple:
+        i, j = (self.node2ix[node] for node in key)
+        ixs = self._get_ixs(i, j)
+        if ixs is None:
+            raise KeyError(key)
+        return tuple(self.node_list[ix] for ix in ixs)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key) -> bool:
+        i, j = (self.node2ix[node] for node in key)
+        return self._offsets[i, j] >= 0
+
+    def __len__(self) -> int:
+        return int(np.sum(self._offsets >= 0)) // 2
+
+    def keys(self) -> Iterator[frozenset]:
+        for i, j in zip(*np.nonzero(np.triu(self._offsets >= 0))):
+            yield frozenset({self.node_list[i], self.node_list[j]})
+
+    def __iter__(self) -> Iterator[frozenset]:
+        return self.keys()
+
+    def items(self) -> Iterator[Tuple[frozenset, tuple]]:
+        for key in self.keys():
+            yield key, self[key]
+
+    def to_dict(self) -> Dict[frozenset, tuple]:
+        return dict(self.items())
+
+
+def _neighbors(adjacency: np.ndarray, i: int, nnodes: int) -> np.ndarray:
+    """
+    Indices of the neighbors of ``i`` in a bit matrix with rows packed by ``np.packbits(..., bitorder='little')``.
+    """
+    return np.flatnonzero(np.unpackbits(adjacency[i], count=nnodes, bitorder='little'))
+
+
+def _test_edges(shared: SharedTesters, node_list: list, adjacency: np.ndarray, edges: list, level: int) -> list:
+    """
+    For each edge ``(i, j)``, search for a subset of size ``level`` of the neighbors of ``i``, then of ``j``, in
+    ``adjacency``, that makes ``i`` and ``j`` conditionally independent. Return the first such subset of each edge,
+    or None.
+    """
+    ci_tester = shared.get()['ci_tester']
+    nnodes = len(node_list)
+    neighbors = dict()
+    sepsets = []
+    for i, j in edges:
+        sepset = None
+        for a, b in [(i, j), (j, i)]:
+            if a not in neighbors:
+                neighbors[a] = _neighbors(adjacency, a, nnodes)
+            candidates = neighbors[a][neighbors[a] != b]
+            for cond_set in itr.combinations(candidates.tolist(), level):
+                if ci_tester.is_ci(node_list[i], node_list[j], [node_list[c] for c in cond_set]):
+                    sepset = cond_set
+                    break
+            if sepset is not None:
+                break
+        sepsets.append(sepset)
+    return sepsets
+
+
+def skeleton(
+        nodes: set,
+        ci_tester: CI_Tester,
+        max_cond_set: Optional[int] = None,
+        verbose: bool = False,
+        n_jobs: Optional[int] = 1,
+        executor: Optional[Executor] = None,
+) -> Tuple[UndirectedGraph, Sepsets]:
+    """
+    Estimate the skeleton of an underlying DAG using the order-independent skeleton estimation method of
+    Colombo and Maathuis (2014).
+
+    For each size of conditioning set, every remaining edge ``i - j`` is tested against the subsets of the neighbors
+    of ``i``, then of ``j``, as they were at the start of that size, and edges are only removed once all of them have
+    been tested. The edges of a size are therefore independent tasks, and may be spread across processes; the result
+    does not depend on their order, nor on ``n_jobs``.
+
+    The adjacency matrix is kept as a bit matrix, and the separating sets in a ``Sepsets`` object.
+
+    Parameters
+    ----------
+    nodes:
+        Labels of nodes in the graph.
+    ci_tester:
+        A conditional independence tester, which has a method is_ci taking two sets A and B, and a conditioning set C,
+        and returns True/False. When running in parallel, it must be picklable.
+    max_cond_set:
+        Maximum size of conditioning set tested to separate nodes.
+    verbose:
+        If True, print edges as they are removed, along with the separating set responsible for removing them.
+    n_jobs:
+        Number of processes to spread the tests of each conditioning set size across. -1 uses all CPUs. The processes
+        are started once and reused for every conditioning set size.
+    executor:
+        An existing ``concurrent.futures`` executor to run on instead of starting new processes.
+
+    See Also
+    --------
+    pcalg, Sepsets
+
+    Returns
+    -------
+    (skeleton, sepset)
+
+    Example
+    -------
+    >>> import causaldag as cd
+    >>> g = cd.rand.rand_weights(cd.rand.directed_erdos(20, .1))
+    >>> suffstat = cd.partial_correlation_suffstat(g.sample(1000))
+    >>> ci_tester = cd.MemoizedCI_Tester(cd.partial_correlation_test, suffstat)
+    >>> skel, sepset = cd.skeleton(set(range(20)), ci_tester, n_jobs=2)
+    """
+    node_list = sorted(nodes)
+    nnodes = len(node_list)
+    adjacency = np.packbits(~np.eye(nnodes, dtype=bool), axis=1, bitorder='little')
+    sepsets = Sepsets(node_list)
+    max_cond_set = max_cond_set if max_cond_set is not None else nnodes - 2
+    if executor is not None:
+        n_workers = getattr(executor, '_max_workers', os.cpu_count())
+    else:
+        n_workers = os.cpu_count() if n_jobs == -1 else max(n_jobs or 1, 1)
+
+    with contextlib.ExitStack() as stack:
+        shared = stack.enter_context(SharedTesters(ci_tester=ci_tester))
+        # one pool for all levels, so that workers keep their memoized tests between levels
+        if executor is None and n_workers > 1:
+            executor = stack.enter_context(ProcessPoolExecutor(max_workers=n_workers))
+        for level in range(max_cond_set + 1):
+            full = np.unpackbits(adjacency, axis=1, count=nnodes, bitorder='little').astype(bool)
+            degrees = full.sum(axis=1)
+            rows, cols = np.nonzero(np.triu(full))
+            # an edge can only be removed at this level if one of its endpoints has enough other neighbors
+            testable = np.maximum(degrees[rows], degrees[cols]) - 1 >= level
+            edges = list(zip(rows[testable].tolist(), cols[testable].tolist()))
+            if not edges:
+                break
+
+            chunks = [edges[k::n_workers * _TASKS_PER_JOB] for k in range(min(len(edges), n_workers * _TASKS_PER_JOB))]
+            results, _ = run_counted_tasks(
+                _test_edges,
+                [(shared, node_list, adjacency, chunk, level) for chunk in chunks],
+                n_jobs=n_jobs,
+                executor=executor
+            )
+
+            removed, cond_sets = [], []
+            for chunk, chunk_results in zip(chunks, results):
+                for (i, j), sepset in zip(chunk, chunk_results):
+                    if sepset is not None:
+                        removed.append((i, j))
+                        cond_sets.append(sepset)
+            for (i, j), cond_set in sorted(zip(removed, cond_sets)):
+                adjacency[i, j >> 3] &= ~np.uint8(1 << (j & 7))
+                adjacency[j, i >> 3] &= ~np.uint8(1 << (i & 7))
+                if verbose:
+                    print(f"Removing {node_list[i]}-{node_list[j]}, separated by {[node_list[c] for c in cond_set]}")
+            sepsets.add(removed, cond_sets)
+
+    full = np.unpackbits(adjacency, axis=1, count=nnodes, bitorder='little').astype(bool)
+    edges = {(node_list[i], node_list[j]) for i, j in zip(*np.nonzero(np.triu(full)))}
+    return UndirectedGraph(nodes=set(nodes), edges=edges), sepsets
+
+
+def pcalg(
+        nodes,
+        ci_tester: CI_Tester = None,
+        skel: Optional[UndirectedGraph] = None,
+        sepset=None,
+        solve_conflict: bool = False,
+        max_cond_set: Optional[int] = None,
+        verbose: bool = False,
+        summarize: bool = False,
+        n_jobs: Optional[int] = 1,
+        executor: Optional[Executor] = None,
+):
+    """
+    Use the PC (Peters-Clark) algorithm to estimate the Markov equivalence class of the data-generating DAG, with
+    the skeleton estimated by ``skeleton``.
+
+    Parameters
+    ----------
+    nodes:
+        Labels of nodes in the graph.
+    ci_tester:
+        A conditional independence tester, which has a method is_ci taking two sets A and B, and a conditioning set C,
+        and returns True/False.
+    skel:
+        An estimated skeleton. If not provided, uses the `skeleton` method to estimate.
+    sepset:
+        The separating sets for non-adjacent nodes in the estimated skeleton.
+    summarize:
+        If True, also return a summary of the run.
+    n_jobs:
+        Number of processes to spread the tests of each conditioning set size across. -1 uses all CPUs. The processes
+        are started once and reused for every conditioning set size.
+    executor:
+        An existing ``concurrent.futures`` executor to run on instead of starting new processes.
+
+    The remaining parameters are as in ``graphical_model_learning.pcalg``.
+
+    See Also
+    --------
+    skeleton
+
+    Returns
+    -------
+    est_dag, or (est_dag, summary) if ``summarize`` is True. ``summary`` is a dictionary holding the running time,
+    and, if ``ci_tester`` keeps statistics, the ``TesterStats`` of the CI tests made by this call as ``ci_stats``.
+    """
+    start = time.time()
+    stats = getattr(ci_tester, 'stats', None)
+    before = stats.copy() if stats is not None else None
+    if ci_tester is not None:
+        skel, sepset = skeleton(
+            nodes,
+            ci_tester,
+            max_cond_set=max_cond_set,
+            verbose=verbose,
+            n_jobs=n_jobs,
+            executor=executor
+        )
+    est_cpdag = _pcalg(nodes, skel=skel, sepset=sepset, solve_conflict=solve_conflict, verbose=verbose)
+    if not summarize:
+        return est_cpdag
+    summary = dict(time=time.time() - start, ci_stats=ci_tester.stats - before if before is not None else None)
+    return est_cpdag, summary
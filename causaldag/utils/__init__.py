@@ -0,0 +1,12 @@
+from .ci_tests import TesterStats, MemoizedCI_Tester, MemoizedInvarianceTester
+from .ci_tests import CachedCI_Tester, LRUCache, SharedCache, SqliteCache, ci_fingerprint
+from .ci_tests import compute_partial_correlations, partial_correlation_test_batch
+from .ci_tests import SuffstatAccumulator, partial_correlation_suffstat_streaming
+from .ci_tests import kernel_suffstat, kernel_invariance_suffstat, rbf_factor
+from .ci_tests import hsic_test_vector_low_rank, ki_test_vector_low_rank, kci_test_vector_low_rank
+from .ci_tests import hsic_test_low_rank, kci_test_low_rank
+from .ci_tests import hsic_invariance_test_low_rank, kci_invariance_test_low_rank
+from .ci_tests import KernelWorkspace, hsic_test_workspace, kci_test_workspace
+from .ci_tests import hsic_invariance_test_workspace, kci_invariance_test_workspace
+from .ci_tests import permutation_statistics, chi2_mixture_draws, permutation_p_value
+from .scores import MemoizedDecomposableScore, DeltaDecomposableScore, GaussianBGeScore
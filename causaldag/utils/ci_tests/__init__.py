@@ -0,0 +1,14 @@
+from conditional_independence.ci_tests import *
+from .stats import TesterStats
+from .memoized_tester import MemoizedCI_Tester, MemoizedInvarianceTester
+from .ci_cache import LRUCache, SharedCache, SqliteCache, ci_fingerprint
+from .cached_ci_tester import CachedCI_Tester
+from .partial_correlation_batch import compute_partial_correlations, partial_correlation_test_batch
+from .suffstat_accumulator import SuffstatAccumulator, partial_correlation_suffstat_streaming
+from .low_rank_kernel import kernel_suffstat, kernel_invariance_suffstat, rbf_factor
+from .low_rank_kernel import hsic_test_vector_low_rank, ki_test_vector_low_rank, kci_test_vector_low_rank
+from .low_rank_kernel import hsic_test_low_rank, kci_test_low_rank
+from .low_rank_kernel import hsic_invariance_test_low_rank, kci_invariance_test_low_rank
+from .kernel_workspace import KernelWorkspace, hsic_test_workspace, kci_test_workspace
+from .kernel_workspace import hsic_invariance_test_workspace, kci_invariance_test_workspace
+from .permutation import permutation_statistics, chi2_mixture_draws, permutation_p_value
@@ -0,0 +1,103 @@
+"""
+CI tester memoizing its results in a pluggable, possibly shared or persistent, cache.
+"""
+# === IMPORTS: BUILT-IN ===
+from typing import Dict, Optional
+import time
+
+# === IMPORTS: LOCAL ===
+from conditional_independence.ci_tests.ci_tester import CI_Test
+from .ci_cache import LRUCache, ci_fingerprint
+from .memoized_tester import MemoizedCI_Tester
+
+
+class CachedCI_Tester(MemoizedCI_Tester):
+    def __init__(
+            self,
+            ci_test: CI_Test,
+            suffstat: Dict,
+            cache=None,
+            fingerprint: Optional[str] = None,
+            track_times=False,
+            detailed=False,
+            **kwargs
+    ):
+        """
+        Class for memoizing the results of conditional independence tests in a cache which may outlive the tester,
+        be shared between testers and processes, or be stored on disk.
+
+        Results are keyed by ``(frozenset({i, j}), frozenset(cond_set), fingerprint)``, where the fingerprint
+        identifies the data, the test and its keyword arguments, so one cache can safely serve testers for different
+        datasets or significance levels, and a new tester on the same data starts warm.
+
+        Parameters
+        ----------
+        ci_test:
+            Function taking suffstat, i, j, and cond_set, and returning a dictionary that includes the key 'reject'.
+        suffstat:
+            dictionary of sufficient statistics for the conditional independence test.
+        cache:
+            Cache backend, such as ``LRUCache``, ``SharedCache``, ``SqliteCache``, or a dict. Defaults to a new
+            ``LRUCache``.
+        fingerprint:
+            Identifier of the data and test configuration. Defaults to ``ci_fingerprint(suffstat, ci_test, **kwargs)``.
+        track_times:
+            if True, keep a dictionary mapping each conditional independence test to the time taken to perform it.
+        detailed:
+            if True, keep a dictionary mapping each conditional independence test to its full set of results.
+        **kwargs:
+            Additional keyword arguments to be passed to the conditional independence test.
+
+        See Also
+        --------
+        MemoizedCI_Tester, ci_fingerprint
+
+        Example
+        -------
+        >>> import causaldag as cd
+        >>> import numpy as np
+        >>> suffstat = cd.partial_correlation_suffstat(np.random.normal(size=(100, 3)))
+        >>> cache = cd.SqliteCache('ci_results.db')
+        >>> ci_tester = cd.CachedCI_Tester(cd.partial_correlation_test, suffstat, cache=cache, alpha=1e-3)
+        >>> est_cpdag = cd.pcalg(set(range(3)), ci_tester)
+        """
+        MemoizedCI_Tester.__init__(self, ci_test, suffstat, track_times=track_times, detailed=detailed, **kwargs)
+        self.cache = cache if cache is not None else LRUCache()
+        self.fingerprint = fingerprint if fingerprint is not None else ci_fingerprint(suffstat, ci_test, **kwargs)
+
+    def is_ci(self, i, j, cond_set=set()):
+        index = (frozenset({i, j}), frozenset(cond_set))
+        key = index + (self.fingerprint,)
+
+        # check if result exists and return
+        _is_ci = self.cache.get(key)
+        if _is_ci is not None:
+            self.stats.record(len(index[1]), True)
+            return _is_ci
+
+        # otherwise, compute result and save
+        start = time.perf_counter()
+        test_results = self.ci_test(self.suffstat, i, j, cond_set=cond_set, **self.kwargs)
+        elapsed = time.perf_counter() - start
+        if self.track_times:
+            self.ci_times[index] = elapsed
+        if self.detailed:
+            self.ci_dict_detailed[index] = test_results
+        _is_ci = bool(not test_results['reject'])
+        self.cache[key] = _is_ci
+        self.stats.record(len(index[1]), False, elapsed)
+
+        return _is_ci
+
+    def _memoized(self, index: tuple) -> Optional[bool]:
+        return self.cache.get(index + (self.fingerprint,))
+
+    def _memoize(self, index: tuple, is_ci: bool):
+        self.cache[index + (self.fingerprint,)] = bool(is_ci)
+
+    def clear(self):
+        """
+        Clear the detailed results and times, and reset the counts of ``self.stats``. The cache is left alone, since
+        it may be shared; use ``self.cache.clear()`` to empty it.
+        """
+        MemoizedCI_Tester.clear(self)
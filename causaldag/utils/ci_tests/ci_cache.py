@@ -0,0 +1,211 @@
+"""
+Cache backends for the results of conditional independence tests.
+
+A backend maps keys ``(frozenset({i, j}), frozenset(cond_set), fingerprint)`` to booleans, where ``fingerprint``
+identifies the data and test configuration (see ``ci_fingerprint``). Backends only need ``get``, ``__setitem__``,
+``__len__`` and ``clear``, so a plain dict also works.
+"""
+# === IMPORTS: BUILT-IN ===
+import hashlib
+import os
+import sqlite3
+from collections import OrderedDict
+from multiprocessing import Manager
+from typing import Callable, Hashable, Optional
+
+# === IMPORTS: THIRD-PARTY ===
+import numpy as np
+
+
+def _update_hash(h, obj):
+    if isinstance(obj, np.ndarray):
+        h.update(repr((obj.shape, obj.dtype.str)).encode())
+        h.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, dict):
+        h.update(b'{')
+        for key in sorted(obj, key=repr):
+            h.update(repr(key).encode())
+            _update_hash(h, obj[key])
+        h.update(b'}')
+    elif isinstance(obj, (list, tuple)):
+        h.update(b'[')
+        for value in obj:
+            _update_hash(h, value)
+        h.update(b']')
+    elif isinstance(obj, np.generic):
+        h.update(repr(obj.item()).encode())
+    else:
+        h.update(repr(obj).encode())
+
+
+def ci_fingerprint(suffstat, ci_test: Optional[Callable] = None, **kwargs) -> str:
+    """
+    Return a hex digest identifying a dataset, and optionally the test run on it and the test's keyword arguments.
+
+    Arrays are hashed by shape, dtype and contents; nested dicts, lists and tuples are hashed recursively; anything
+    else is hashed by its ``repr``.
+
+    Examples
+    --------
+    >>> import causaldag as cd
+    >>> import numpy as np
+    >>> suffstat = cd.partial_correlation_suffstat(np.random.normal(size=(100, 3)))
+    >>> cd.ci_fingerprint(suffstat, cd.partial_correlation_test, alpha=.01) == cd.ci_fingerprint(suffstat, cd.partial_correlation_test, alpha=.05)
+    False
+    """
+    h = hashlib.sha1()
+    _update_hash(h, suffstat)
+    if ci_test is not None:
+        func = getattr(ci_test, 'func', ci_test)  # unwrap functools.partial
+        h.update(f"{getattr(func, '__module__', '')}.{getattr(func, '__qualname__', repr(func))}".encode())
+        _update_hash(h, getattr(ci_test, 'args', ()))
+        _update_hash(h, getattr(ci_test, 'keywords', {}))
+    _update_hash(h, kwargs)
+    return h.hexdigest()
+
+
+class LRUCache:
+    """
+    In-memory cache holding at most ``maxsize`` results, evicting the least recently used.
+
+    Parameters
+    ----------
+    maxsize:
+        Maximum number of results kept. None for no bound.
+    """
+    def __init__(self, maxsize: Optional[int] = 100000):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+
+    def get(self, key: Hashable, default=None):
+        value = self._data.get(key, default)
+        if key in self._data:
+            self._data.move_to_end(key)
+        return value
+
+    def __setitem__(self, key: Hashable, value: bool):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if self.maxsize is not None and len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def __contains__(self, key: Hashable):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def clear(self):
+        self._data.clear()
+
+
+class SharedCache:
+    """
+    Cache living in a ``multiprocessing`` manager process, so that it is shared by every process it is sent to, e.g.
+    the workers of a process pool running restarts of ``gsp``.
+
+    Parameters
+    ----------
+    manager:
+        A started ``multiprocessing.Manager()``. If None, a new one is started, and shut down when this cache is
+        garbage collected in the process that created it.
+    """
+    def __init__(self, manager=None):
+        self._manager = manager if manager is not None else Manager()
+        self._owns_manager = manager is None
+        self._data = self._manager.dict()
+
+    def __getstate__(self):
+        return dict(_data=self._data)
+
+    def __setstate__(self, state):
+        self._manager = None
+        self._owns_manager = False
+        self._data = state['_data']
+
+    def __del__(self):
+        if getattr(self, '_owns_manager', False):
+            self._manager.shutdown()
+
+    def get(self, key: Hashable, default=None):
+        return self._data.get(key, default)
+
+    def __setitem__(self, key: Hashable, value: bool):
+        self._data[key] = value
+
+    def __contains__(self, key: Hashable):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def clear(self):
+        self._data.clear()
+
+
+def _node_repr(node) -> str:
+    return repr(node.item() if isinstance(node, np.generic) else node)
+
+
+def _key_repr(key) -> str:
+    nodes, cond_set, fingerprint = key
+    nodes = ','.join(sorted(map(_node_repr, nodes)))
+    cond_set = ','.join(sorted(map(_node_repr, cond_set)))
+    return f"{fingerprint}|{nodes}|{cond_set}"
+
+
+class SqliteCache:
+    """
+    Cache stored in a sqlite database on disk, so that results persist across sessions and are shared by every
+    process opening the same file.
+
+    Nodes are stored by their ``repr``, so they should be ints or strings.
+
+    Parameters
+    ----------
+    path:
+        Path to the database file, created if it does not exist.
+    """
+    def __init__(self, path: str):
+        self.path = os.fspath(path)
+        self._connection = None
+
+    def __getstate__(self):
+        return dict(path=self.path)
+
+    def __setstate__(self, state):
+        self.path = state['path']
+        self._connection = None
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('PRAGMA synchronous=NORMAL')
+            self._connection.execute('CREATE TABLE IF NOT EXISTS ci_results (key TEXT PRIMARY KEY, is_ci INTEGER)')
+        return self._connection
+
+    def get(self, key, default=None):
+        row = self.connection.execute('SELECT is_ci FROM ci_results WHERE key = ?', (_key_repr(key),)).fetchone()
+        return bool(row[0]) if row is not None else default
+
+    def __setitem__(self, key, value: bool):
+        self.connection.execute(
+            'INSERT OR REPLACE INTO ci_results (key, is_ci) VALUES (?, ?)',
+            (_key_repr(key), int(value))
+        )
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __len__(self):
+        return self.connection.execute('SELECT COUNT(*) FROM ci_results').fetchone()[0]
+
+    def clear(self):
+        self.connection.execute('DELETE FROM ci_results')
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
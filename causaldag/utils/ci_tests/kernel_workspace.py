@@ -0,0 +1,550 @@
+"""
+Workspace caching the kernel matrices and regression residuals used by kernel CI and invariance tests on one dataset.
+
+Within a run of e.g. ``igsp`` or ``unknown_target_igsp``, the same columns are kernelized, and regressed on the same
+conditioning sets, by many tests. The tests in this module take a ``KernelWorkspace`` and look these up before
+computing them. Their results are the same as those of ``hsic_test``, ``kci_test``, ``hsic_invariance_test`` and
+``kci_invariance_test``.
+"""
+# === IMPORTS: BUILT-IN ===
+import itertools as itr
+from collections import Counter, OrderedDict
+from concurrent.futures import Executor
+from typing import Callable, Dict, Hashable, List, Optional, Union
+
+# === IMPORTS: THIRD-PARTY ===
+import numpy as np
+import pygam
+from scipy.special import gdtr
+from scipy.stats import gamma
+from sklearn.metrics.pairwise import euclidean_distances
+from sklearn.preprocessing import scale
+
+# === IMPORTS: LOCAL ===
+from conditional_independence.utils import combined_mat, to_list
+from conditional_independence.utils.kernels import center_fast_mutate, rbf_kernel
+from .permutation import chi2_mixture_draws, permutation_p_value, permutation_statistics
+
+
+def _nbytes(value) -> int:
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sum(_nbytes(v) for v in value)
+    return 0
+
+
+class KernelWorkspace:
+    """
+    Memory-bounded cache of kernel matrices, kernel widths and regression residuals, evicting the least recently
+    used entries once their arrays take more than ``max_bytes``.
+
+    Entries are grouped by kind (``'gram'``, ``'residuals'``, ...), and hits and misses are counted per kind in
+    ``hits`` and ``misses``.
+
+    Parameters
+    ----------
+    max_bytes:
+        Maximum total size of the cached arrays, in bytes. None for no bound.
+
+    Examples
+    --------
+    >>> import causaldag as cd
+    >>> import numpy as np
+    >>> samples = np.random.normal(size=(500, 3))
+    >>> workspace = cd.KernelWorkspace(max_bytes=10**8)
+    >>> ci_tester = cd.MemoizedCI_Tester(cd.hsic_test_workspace, samples, workspace=workspace)
+    >>> ci_tester.is_ci(0, 1)
+    True
+    >>> ci_tester.is_ci(0, 2)
+    True
+    >>> workspace.hits['gram']
+    1
+    """
+    def __init__(self, max_bytes: Optional[int] = 2**30):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = Counter()
+        self.misses = Counter()
+        self.evictions = 0
+        self._data = OrderedDict()
+
+    def __repr__(self):
+        # the contents never change test results, so they are left out of ci_fingerprint
+        return f"KernelWorkspace(max_bytes={self.max_bytes})"
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key: Hashable):
+        return key in self._data
+
+    def cached(self, kind: str, key: Hashable, compute: Callable):
+        """
+        Return the entry of the given kind and key, computing and storing it with ``compute()`` if it is missing.
+        Entries larger than ``max_bytes`` are returned without being stored.
+        """
+        full_key = (kind, key)
+        entry = self._data.get(full_key)
+        if entry is not None:
+            self._data.move_to_end(full_key)
+            self.hits[kind] += 1
+            return entry[0]
+
+        self.misses[kind] += 1
+        value = compute()
+        size = _nbytes(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return value
+        self._data[full_key] = (value, size)
+        self.nbytes += size
+        while self.max_bytes is not None and self.nbytes > self.max_bytes:
+            _, (_, evicted_size) = self._data.popitem(last=False)
+            self.nbytes -= evicted_size
+            self.evictions += 1
+        return value
+
+    def stats(self) -> Dict:
+        """
+        Return the number of entries, their size in bytes, the number of evictions, and the hits and misses per kind.
+        """
+        return dict(
+            entries=len(self._data),
+            nbytes=self.nbytes,
+            evictions=self.evictions,
+            hits=dict(self.hits),
+            misses=dict(self.misses)
+        )
+
+    def clear(self):
+        """
+        Remove all entries and reset the counters.
+        """
+        self._data.clear()
+        self.nbytes = 0
+        self.hits.clear()
+        self.misses.clear()
+        self.evictions = 0
+
+
+# === CACHED BUILDING BLOCKS
+class _View:
+    """
+    Columns of a sample matrix, named so that the same variable gets the same cache keys in every matrix it appears
+    in.
+    """
+    def __init__(self, samples: np.ndarray, names: list, namespace: tuple = ()):
+        self.samples = samples
+        self.names = names
+        self.namespace = namespace
+
+    def key(self, *parts) -> tuple:
+        return self.namespace + parts
+
+    def column_key(self, i) -> tuple:
+        return self.key('column', self.names[i])
+
+    def cond_key(self, cond_set: list) -> frozenset:
+        return frozenset(self.names[c] for c in cond_set)
+
+
+def _residual(workspace: KernelWorkspace, view: _View, i, cond_set: list) -> np.ndarray:
+    """
+    Residuals of a GAM regression of column ``i`` on the columns in ``cond_set``, as in ``residuals``.
+    """
+    def compute():
+        g = pygam.GAM()
+        g.fit(view.samples[:, cond_set], view.samples[:, i])
+        return g.deviance_residuals(view.samples[:, cond_set], view.samples[:, i])
+
+    return workspace.cached('residuals', view.key(view.names[i], view.cond_key(cond_set)), compute)
+
+
+def _values(workspace: KernelWorkspace, view: _View, i, cond_set: list):
+    """
+    Return a cache key and the values of column ``i``, or of its residuals given ``cond_set``.
+    """
+    if len(cond_set) == 0:
+        return view.column_key(i), view.samples[:, i]
+    return view.key('residuals', view.names[i], view.cond_key(cond_set)), _residual(workspace, view, i, cond_set)
+
+
+def _as_matrix(x: np.ndarray) -> np.ndarray:
+    return x.reshape((len(x), 1)) if x.ndim == 1 else x
+
+
+def _hsic_gram(workspace: KernelWorkspace, key: tuple, x: np.ndarray, precision: float) -> tuple:
+    def compute():
+        k = rbf_kernel(_as_matrix(x), precision)
+        off_diag_sum = k.sum() - k.trace()
+        return center_fast_mutate(k), off_diag_sum
+
+    return workspace.cached('gram', ('hsic', key, precision), compute)
+
+
+def _ki_gram(workspace: KernelWorkspace, key: tuple, x: np.ndarray, width: float) -> np.ndarray:
+    x = _as_matrix(x)
+    if width == 0:
+        width = workspace.cached('width', key, lambda: np.median(euclidean_distances(x)))
+
+    def compute():
+        n = x.shape[0]
+        H = np.eye(n) - np.ones([n, n]) / n
+        return H @ rbf_kernel(scale(x), 1 / (width ** 2)) @ H
+
+    return workspace.cached('gram', ('ki', key, width), compute)
+
+
+# === TESTS ON GRAM MATRICES
+def _hsic_from_grams(gram_x: tuple, gram_y: tuple, alpha: float, null: Optional[Dict] = None) -> Dict:
+    kx_centered, kx_off_diag_sum = gram_x
+    ky_centered, ky_off_diag_sum = gram_y
+    n = kx_centered.shape[0]
+    statistic = 1/n**2 * np.sum(kx_centered * ky_centered)
+    if null is not None:
+        null_statistics = permutation_statistics(kx_centered, ky_centered, **null) / n**2
+        p_value = permutation_p_value(statistic, null_statistics)
+        return dict(statistic=statistic, p_value=p_value, reject=p_value < alpha)
+
+    # Theorem 3
+    mu_x = 1/(n*(n-1)) * kx_off_diag_sum
+    mu_y = 1/(n*(n-1)) * ky_off_diag_sum
+    mean_approx = 1/n * (1 + mu_x*mu_y - mu_x - mu_y)
+    # Theorem 4
+    var_coef = 2*(n-4)*(n-5)/(n*(n-1)*(n-2)*(n-3))
+    B = (kx_centered * ky_centered)**2
+    var_approx = var_coef * (B.sum() - np.trace(B)) / n**2
+
+    shape = mean_approx ** 2 / var_approx
+    scale_ = var_approx / mean_approx
+    p_value = 1 - gdtr(1/scale_, shape, statistic)
+    return dict(
+        statistic=statistic,
+        p_value=p_value,
+        reject=p_value < alpha,
+        mean_approx=mean_approx,
+        var_approx=var_approx
+    )
+
+
+def _gamma_result(statistic: float, mean_approx: float, var_approx: float, alpha: float) -> Dict:
+    shape = mean_approx ** 2 / var_approx
+    scale_ = var_approx / mean_approx
+    critval = gamma.ppf(1 - alpha, shape, scale=scale_)
+    p_value = 1 - gamma.cdf(statistic, shape, scale=scale_)
+    return dict(statistic=statistic, critval=critval, p_value=p_value, reject=statistic > critval)
+
+
+def _sampled_result(statistic: float, null_statistics: np.ndarray, alpha: float) -> Dict:
+    critval = np.quantile(null_statistics, 1 - alpha)
+    p_value = permutation_p_value(statistic, null_statistics)
+    return dict(statistic=statistic, critval=critval, p_value=p_value, reject=statistic > critval)
+
+
+def _ki_from_grams(ky: np.ndarray, kx: np.ndarray, alpha: float, null: Optional[Dict] = None) -> Dict:
+    n = kx.shape[0]
+    statistic = np.sum(kx * ky.T) / n
+    if null is not None:
+        return _sampled_result(statistic, permutation_statistics(kx, ky.T, **null) / n, alpha)
+    mean_approx = 1 / n ** 2 * np.trace(kx) * np.trace(ky)
+    var_approx = 2 / n ** 4 * np.sum(kx * kx) * np.sum(ky * ky)
+    return _gamma_result(statistic, mean_approx, var_approx, alpha)
+
+
+def _thresholded_eigprod(k: np.ndarray, thresh: float) -> np.ndarray:
+    eigvecs, eigvals, _ = np.linalg.svd((k + k.T) / 2)
+    ixs = eigvals > np.max(eigvals) * thresh
+    return eigvecs[:, ixs] * np.sqrt(eigvals[ixs])[None, :]
+
+
+def _kci_from_grams(kyx: np.ndarray, ke: np.ndarray, rx: np.ndarray, alpha: float, thresh: float,
+                    null: Optional[Dict] = None) -> Dict:
+    n = kyx.shape[0]
+    kyx = rx @ kyx @ rx.T  # Equation (11)
+    kex = rx @ ke @ rx.T  # Equation (12)
+    statistic = np.sum(kyx * kex.T)
+
+    eigprod_kyx = _thresholded_eigprod(kyx, thresh)
+    eigprod_kex = _thresholded_eigprod(kex, thresh)
+    d_yx = eigprod_kyx.shape[1]
+    d_ex = eigprod_kex.shape[1]
+    if null is not None:
+        # the null distribution is a mixture of chi-squares weighted by the eigenvalues of W^T W
+        w = (eigprod_kyx[:, :, None] * eigprod_kex[:, None, :]).reshape(n, d_yx * d_ex)
+        ww = w @ w.T if n < d_yx * d_ex else w.T @ w
+        weights = np.maximum(np.linalg.eigvalsh(ww), 0)
+        return _sampled_result(statistic, chi2_mixture_draws(weights, **null), alpha)
+
+    # rows are filled as in kci_test_vector, so that the results match
+    w = np.zeros([d_yx * d_ex, n])
+    for a, b in itr.product(range(d_yx), range(d_ex)):
+        w[(a - 1) * d_ex + b] = eigprod_kyx[:, a] * eigprod_kex[:, b]
+    ww = w @ w.T if d_yx * d_ex < n else w.T @ w
+    return _gamma_result(statistic, np.sum(np.diag(ww)), 2 * np.sum(np.diag(ww ** 2)), alpha)
+
+
+def _null_options(gamma_approx: bool, n_draws: int, seed, n_jobs: Optional[int],
+                  executor: Optional[Executor]) -> Optional[Dict]:
+    if gamma_approx:
+        return None
+    return dict(n_draws=n_draws, seed=seed, n_jobs=n_jobs, executor=executor)
+
+
+def _hsic(workspace: KernelWorkspace, view: _View, i, j, cond_set: list, alpha: float,
+          null: Optional[Dict] = None) -> Dict:
+    precision = 2.  # sig = 1/sqrt(2), as in hsic_test
+    gram_i = _hsic_gram(workspace, *_values(workspace, view, i, cond_set), precision)
+    gram_j = _hsic_gram(workspace, *_values(workspace, view, j, cond_set), precision)
+    return _hsic_from_grams(gram_i, gram_j, alpha, null)
+
+
+def _kci(workspace: KernelWorkspace, view: _View, i, j, cond_set: list, width: float, alpha: float, regress: bool,
+         lam: float, thresh: float, null: Optional[Dict] = None) -> Dict:
+    if len(cond_set) == 0 or regress:
+        # kci_test passes the values of i as Y and those of j as X
+        ky = _ki_gram(workspace, *_values(workspace, view, i, cond_set), width)
+        kx = _ki_gram(workspace, *_values(workspace, view, j, cond_set), width)
+        return _ki_from_grams(ky, kx, alpha, null)
+
+    samples = view.samples
+    n, d = samples.shape[0], len(cond_set)
+    if width == 0:
+        width = 0.8 if n <= 200 else 0.5 if n < 1200 else 0.3
+    precision = 1 / (width ** 2 * d)
+    cond_key = view.cond_key(cond_set)
+    H = np.eye(n) - np.ones([n, n]) / n
+
+    def kyx():
+        yx = np.concatenate((scale(samples[:, [i]]), scale(samples[:, cond_set]) / 2), axis=1)
+        return H @ rbf_kernel(yx, precision) @ H
+
+    def ke():
+        return H @ rbf_kernel(scale(samples[:, [j]]), precision) @ H
+
+    def rx():
+        kx = H @ rbf_kernel(scale(samples[:, cond_set]), precision) @ H
+        return np.eye(n) - kx @ np.linalg.inv(kx + lam * np.eye(n))
+
+    return _kci_from_grams(
+        workspace.cached('gram', ('kci_yx', view.column_key(i), cond_key, precision), kyx),
+        workspace.cached('gram', ('kci_e', view.column_key(j), precision), ke),
+        workspace.cached('gram', ('kci_rx', view.key(cond_key), precision, lam), rx),
+        alpha,
+        thresh,
+        null
+    )
+
+
+# === CI TESTS
+def hsic_test_workspace(
+        suffstat: np.ndarray,
+        i: int,
+        j: int,
+        cond_set: Union[List[int], int] = None,
+        alpha: float = 0.05,
+        gamma_approx: bool = True,
+        n_draws: int = 500,
+        seed=None,
+        n_jobs: Optional[int] = 1,
+        executor: Optional[Executor] = None,
+        workspace: Optional[KernelWorkspace] = None
+) -> Dict:
+    """
+    ``hsic_test``, looking up kernel matrices and residuals in ``workspace``.
+
+    With ``gamma_approx=False``, the null distribution is sampled by permuting the samples of ``j``, i.e. the rows and
+    columns of its kernel matrix, in batches (see ``permutation_statistics``).
+
+    Parameters
+    ----------
+    suffstat:
+        Matrix of samples.
+    i:
+        column position of first variable.
+    j:
+        column position of second variable.
+    cond_set:
+        column positions of conditioning set.
+    alpha:
+        Significance level of the test.
+    gamma_approx:
+        If True, approximate the null distribution by a Gamma distribution. Otherwise, compare the statistic with
+        ``n_draws`` draws from the null distribution.
+    n_draws:
+        Number of draws from the null distribution if ``gamma_approx=False``.
+    seed:
+        Seed for the draws from the null distribution.
+    n_jobs:
+        Number of threads to spread the draws across. -1 uses all CPUs.
+    executor:
+        An existing ``concurrent.futures`` executor to spread the draws across, instead of starting new threads.
+    workspace:
+        ``KernelWorkspace`` used for every test on ``suffstat``. If None, nothing is reused.
+
+    See Also
+    --------
+    KernelWorkspace, hsic_test
+    """
+    workspace = workspace if workspace is not None else KernelWorkspace()
+    view = _View(suffstat, list(range(suffstat.shape[1])))
+    null = _null_options(gamma_approx, n_draws, seed, n_jobs, executor)
+    return _hsic(workspace, view, i, j, to_list(cond_set), alpha, null)
+
+
+def kci_test_workspace(
+        suffstat: np.ndarray,
+        i: int,
+        j: int,
+        cond_set: Union[List[int], int] = None,
+        width: float = 0.,
+        alpha: float = 0.05,
+        regress: bool = True,
+        lam: float = 1e-3,
+        thresh: float = 1e-5,
+        gamma_approx: bool = True,
+        n_draws: int = 500,
+        seed=None,
+        n_jobs: Optional[int] = 1,
+        executor: Optional[Executor] = None,
+        workspace: Optional[KernelWorkspace] = None
+) -> Dict:
+    """
+    ``kci_test``, looking up kernel matrices and residuals in ``workspace``.
+
+    With ``gamma_approx=False``, the null distribution of the unconditional test (used when ``regress=True``) is
+    sampled by permutations, and that of the conditional test by drawing from its asymptotic distribution, a
+    mixture of chi-squares weighted by the eigenvalues of ``W^T W`` (Zhang et al., 2011).
+
+    Parameters
+    ----------
+    suffstat:
+        Matrix of samples.
+    i:
+        column position of first variable.
+    j:
+        column position of second variable.
+    cond_set:
+        column positions of conditioning set.
+    width:
+        Kernel width. If 0, chosen automatically.
+    alpha:
+        Significance level of the test.
+    regress:
+        If True, test the residuals of non-parametric regressions on the conditioning set.
+    lam:
+        Regularization parameter for matrix inversions.
+    thresh:
+        Lower threshold for eigenvalues.
+    gamma_approx:
+        If True, approximate the null distribution by a Gamma distribution. Otherwise, compare the statistic with
+        ``n_draws`` draws from the null distribution.
+    n_draws:
+        Number of draws from the null distribution if ``gamma_approx=False``.
+    seed:
+        Seed for the draws from the null distribution.
+    n_jobs:
+        Number of threads to spread the draws across. -1 uses all CPUs.
+    executor:
+        An existing ``concurrent.futures`` executor to spread the draws across, instead of starting new threads.
+    workspace:
+        ``KernelWorkspace`` used for every test on ``suffstat``. If None, nothing is reused.
+
+    See Also
+    --------
+    KernelWorkspace, kci_test
+    """
+    workspace = workspace if workspace is not None else KernelWorkspace()
+    view = _View(suffstat, list(range(suffstat.shape[1])))
+    null = _null_options(gamma_approx, n_draws, seed, n_jobs, executor)
+    return _kci(workspace, view, i, j, to_list(cond_set), width, alpha, regress, lam, thresh, null)
+
+
+# === INVARIANCE TESTS
+def _invariance_view(suffstat: Dict, context, i: int, cond_set: list) -> _View:
+    mat = combined_mat(suffstat['obs_samples'], suffstat[context], i, cond_set)
+    return _View(mat, [i, 'label'] + cond_set, namespace=('context', context))
+
+
+def hsic_invariance_test_workspace(
+        suffstat: Dict,
+        context,
+        i: int,
+        cond_set: Optional[Union[List[int], int]] = None,
+        alpha: float = 0.05,
+        gamma_approx: bool = True,
+        n_draws: int = 500,
+        seed=None,
+        n_jobs: Optional[int] = 1,
+        executor: Optional[Executor] = None,
+        workspace: Optional[KernelWorkspace] = None
+) -> Dict:
+    """
+    ``hsic_invariance_test``, looking up kernel matrices and residuals in ``workspace``.
+
+    Parameters
+    ----------
+    suffstat:
+        dictionary containing the observational samples under ``'obs_samples'`` and the samples of each context.
+    context:
+        context to compare with the observational data.
+    i:
+        column position of the variable.
+    cond_set:
+        column positions of conditioning set.
+    alpha:
+        Significance level of the test.
+    gamma_approx:
+        If True, approximate the null distribution by a Gamma distribution. Otherwise, compare the statistic with
+        ``n_draws`` draws from the null distribution.
+    n_draws:
+        Number of draws from the null distribution if ``gamma_approx=False``.
+    seed:
+        Seed for the draws from the null distribution.
+    n_jobs:
+        Number of threads to spread the draws across. -1 uses all CPUs.
+    executor:
+        An existing ``concurrent.futures`` executor to spread the draws across, instead of starting new threads.
+    workspace:
+        ``KernelWorkspace`` used for every test on ``suffstat``. If None, nothing is reused.
+
+    See Also
+    --------
+    KernelWorkspace, hsic_invariance_test, hsic_test_workspace
+    """
+    workspace = workspace if workspace is not None else KernelWorkspace()
+    cond_set = to_list(cond_set)
+    view = _invariance_view(suffstat, context, i, cond_set)
+    null = _null_options(gamma_approx, n_draws, seed, n_jobs, executor)
+    return _hsic(workspace, view, 0, 1, list(range(2, 2+len(cond_set))), alpha, null)
+
+
+def kci_invariance_test_workspace(
+        suffstat: Dict,
+        context,
+        i: int,
+        cond_set: Optional[Union[List[int], int]] = None,
+        width: float = 0.,
+        alpha: float = 0.05,
+        regress: bool = True,
+        lam: float = 1e-3,
+        thresh: float = 1e-5,
+        gamma_approx: bool = True,
+        n_draws: int = 500,
+        seed=None,
+        n_jobs: Optional[int] = 1,
+        executor: Optional[Executor] = None,
+        workspace: Optional[KernelWorkspace] = None
+) -> Dict:
+    """
+    ``kci_invariance_test``, looking up kernel matrices and residuals in ``workspace``. See ``kci_test_workspace``
+    for the parameters.
+
+    See Also
+    --------
+    KernelWorkspace, kci_invariance_test
+    """
+    workspace = workspace if workspace is not None else KernelWorkspace()
+    cond_set = to_list(cond_set)
+    view = _invariance_view(suffstat, context, i, cond_set)
+    null = _null_options(gamma_approx, n_draws, seed, n_jobs, executor)
+    return _kci(workspace, view, 0, 1, list(range(2, 2+len(cond_set))), width, alpha, regress, lam, thresh, null)
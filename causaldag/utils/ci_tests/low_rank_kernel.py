@@ -0,0 +1,592 @@
+"""
+Kernel (conditional) independence and invariance tests with low-rank approximations of the Gram matrices.
+
+Each RBF Gram matrix ``K`` is replaced by ``F F^T`` for an ``(n x m)`` factor ``F``, built either by the Nystrom
+method from ``m`` random landmark samples or from ``m`` random Fourier features. Every quantity used by the tests is
+then computed from the factors, in ``O(n m^2)`` time and ``O(n m)`` memory instead of ``O(n^2)`` memory and up to
+``O(n^3)`` time. The one exception is the variance of the null distribution of HSIC, a sum over all pairs of
+samples: on more than ``_VARIANCE_SUBSAMPLE`` samples, its off-diagonal part is estimated from that many random rows,
+in ``O(n m)`` time per row. With the Nystrom method and ``rank >= n``, the factors are exact.
+
+The ``suffstat`` of the tests is built by ``kernel_suffstat`` or ``kernel_invariance_suffstat``. It holds a
+``KernelWorkspace`` of centered factors and kernel widths, keyed by the variables they were computed from, so repeated
+tests on the same columns reuse them.
+"""
+# === IMPORTS: BUILT-IN ===
+from typing import Dict, List, NamedTuple, Optional, Union
+
+# === IMPORTS: THIRD-PARTY ===
+import numpy as np
+from scipy.special import gdtr
+from scipy.stats import gamma
+
+# === IMPORTS: LOCAL ===
+from conditional_independence.utils import combined_mat, residuals, to_list
+from .kernel_workspace import KernelWorkspace
+
+METHODS = {'nystrom', 'rff'}
+# number of samples used for the median heuristic
+_MEDIAN_SUBSAMPLE = 1000
+# number of rows used to estimate the null variance in _sum_sq_hadamard
+_VARIANCE_SUBSAMPLE = 500
+# number of entries of the largest temporary array in _sum_sq_hadamard
+_MAX_BLOCK_ENTRIES = 2 ** 22
+
+
+class KernelFactor(NamedTuple):
+    """
+    Low-rank factor ``F`` of a Gram matrix ``K ~ F F^T``, centered so that ``H K H ~ centered @ centered.T``, with the
+    sum and trace of the uncentered ``K``.
+    """
+    centered: np.ndarray
+    sum: float
+    trace: float
+
+
+def _scale(X: np.ndarray) -> np.ndarray:
+    """
+    Standardize each column, as ``sklearn.preprocessing.scale``.
+    """
+    std = X.std(axis=0)
+    std[std == 0] = 1
+    return (X - X.mean(axis=0)) / std
+
+
+def _as_matrix(x: np.ndarray) -> np.ndarray:
+    x = np.asarray(x, dtype=float)
+    return x.reshape((len(x), 1)) if x.ndim == 1 else x
+
+
+def _rbf_cross(X: np.ndarray, Z: np.ndarray, precision: float) -> np.ndarray:
+    sq_dists = (X**2).sum(axis=1)[:, None] + (Z**2).sum(axis=1)[None, :] - 2 * X @ Z.T
+    return np.exp(-precision / 2 * np.maximum(sq_dists, 0))
+
+
+def rbf_factor(
+        X: np.ndarray,
+        precision: float,
+        rank: int = 100,
+        method: str = 'nystrom',
+        seed: Optional[int] = 0
+) -> KernelFactor:
+    """
+    Return a low-rank factor of the RBF Gram matrix ``K[a, b] = exp(-precision/2 * ||X[a] - X[b]||^2)``.
+
+    Parameters
+    ----------
+    X:
+        (n x d) matrix of samples.
+    precision:
+        inverse squared kernel width.
+    rank:
+        number of landmarks (Nystrom) or features (random Fourier features).
+    method:
+        ``'nystrom'`` or ``'rff'``.
+    seed:
+        seed for the choice of landmarks or features.
+    """
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {sorted(METHODS)}, got '{method}'")
+    X = _as_matrix(X)
+    n, d = X.shape
+    rng = np.random.default_rng(seed)
+    if method == 'nystrom':
+        landmarks = X if rank >= n else X[np.sort(rng.choice(n, rank, replace=False))]
+        eigvals, eigvecs = np.linalg.eigh(_rbf_cross(landmarks, landmarks, precision))
+        keep = eigvals > eigvals.max() * 1e-10
+        factor = _rbf_cross(X, landmarks, precision) @ (eigvecs[:, keep] / np.sqrt(eigvals[keep]))
+    else:
+        weights = rng.normal(scale=np.sqrt(precision), size=(d, rank))
+        offsets = rng.uniform(0, 2 * np.pi, size=rank)
+        factor = np.sqrt(2 / rank) * np.cos(X @ weights + offsets)
+
+    column_sums = factor.sum(axis=0)
+    return KernelFactor(
+        centered=factor - column_sums / n,
+        sum=float(column_sums @ column_sums),
+        trace=float(np.sum(factor**2))
+    )
+
+
+def _sum_sq_hadamard(A: np.ndarray, B: np.ndarray, seed: Optional[int] = 0) -> float:
+    """
+    Return ``sum((A A^T * B B^T)**2)`` without forming the ``(n x n)`` matrices.
+
+    The sum is exact through the Gram matrix of the row-wise Kronecker products of ``A`` and ``B`` when they have few
+    columns, or when ``n <= _VARIANCE_SUBSAMPLE``. Otherwise, the diagonal terms are exact and the off-diagonal ones
+    are estimated from ``_VARIANCE_SUBSAMPLE`` random rows, which is unbiased.
+    """
+    n, ma = A.shape
+    mb = B.shape[1]
+    if (ma * mb) ** 2 <= n * (ma + mb) and n * ma * mb <= _MAX_BLOCK_ENTRIES:
+        kron = (A[:, :, None] * B[:, None, :]).reshape(n, ma * mb)
+        gram = kron.T @ kron
+        return float(np.sum(gram**2))
+
+    rows = np.arange(n)
+    if n > _VARIANCE_SUBSAMPLE:
+        rows = np.sort(np.random.default_rng(seed).choice(n, _VARIANCE_SUBSAMPLE, replace=False))
+    diag = (np.sum(A**2, axis=1) * np.sum(B**2, axis=1))**2
+    block = max(1, _MAX_BLOCK_ENTRIES // n)
+    total = 0.
+    for start in range(0, len(rows), block):
+        block_rows = rows[start:start+block]
+        total += np.sum((A[block_rows] @ A.T * (B[block_rows] @ B.T))**2)
+    off_diag = (total - diag[rows].sum()) * n / len(rows)
+    return float(diag.sum() + off_diag)
+
+
+def _median_width(X: np.ndarray, seed: Optional[int]) -> float:
+    """
+    Median of the pairwise distances between samples (including the zero self-distances), on at most
+    ``_MEDIAN_SUBSAMPLE`` samples.
+    """
+    n = X.shape[0]
+    if n > _MEDIAN_SUBSAMPLE:
+        X = X[np.random.default_rng(seed).choice(n, _MEDIAN_SUBSAMPLE, replace=False)]
+    sq_norms = (X**2).sum(axis=1)
+    return float(np.median(np.sqrt(np.maximum(sq_norms[:, None] + sq_norms[None, :] - 2 * X @ X.T, 0))))
+
+
+def _kci_width(n: int) -> float:
+    if n <= 200:
+        return 0.8
+    if n < 1200:
+        return 0.5
+    return 0.3
+
+
+# === TESTS ON FACTORS
+def _hsic_from_factors(fx: KernelFactor, fy: KernelFactor, n: int, alpha: float, seed: Optional[int] = 0) -> Dict:
+    cx, cy = fx.centered, fy.centered
+    statistic = np.sum((cx.T @ cy)**2) / n**2
+
+    # Theorem 3
+    mu_x = (fx.sum - fx.trace) / (n*(n-1))
+    mu_y = (fy.sum - fy.trace) / (n*(n-1))
+    mean_approx = 1/n * (1 + mu_x*mu_y - mu_x - mu_y)
+    # Theorem 4
+    var_coef = 2*(n-4)*(n-5)/(n*(n-1)*(n-2)*(n-3))
+    diag = (np.sum(cx**2, axis=1) * np.sum(cy**2, axis=1))**2
+    var_approx = var_coef * (_sum_sq_hadamard(cx, cy, seed) - diag.sum()) / n**2
+
+    shape = mean_approx ** 2 / var_approx
+    scale = var_approx / mean_approx
+    p_value = 1 - gdtr(1/scale, shape, statistic)
+    return dict(
+        statistic=statistic,
+        p_value=p_value,
+        reject=p_value < alpha,
+        mean_approx=mean_approx,
+        var_approx=var_approx
+    )
+
+
+def _ki_from_factors(fx: KernelFactor, fy: KernelFactor, n: int, alpha: float) -> Dict:
+    cx, cy = fx.centered, fy.centered
+    statistic = np.sum((cx.T @ cy)**2) / n
+    mean_approx = 1 / n ** 2 * np.sum(cx**2) * np.sum(cy**2)
+    var_approx = 2 / n ** 4 * np.sum((cx.T @ cx)**2) * np.sum((cy.T @ cy)**2)
+    shape = mean_approx ** 2 / var_approx
+    scale = var_approx / mean_approx
+    critval = gamma.ppf(1 - alpha, shape, scale=scale)
+    p_value = gamma.sf(statistic, shape, scale=scale)
+    return dict(statistic=statistic, critval=critval, p_value=p_value, reject=statistic > critval)
+
+
+def _eigen_factor(A: np.ndarray, thresh: float) -> np.ndarray:
+    """
+    Return ``U sqrt(L)`` for the eigenvectors ``U`` and eigenvalues ``L`` of ``A A^T`` above ``thresh`` times the
+    largest, from the SVD of ``A``.
+    """
+    U, s, _ = np.linalg.svd(A, full_matrices=False)
+    eigvals = s**2
+    keep = eigvals > eigvals.max() * thresh
+    return U[:, keep] * s[keep]
+
+
+def _kci_from_factors(fyx: KernelFactor, fe: KernelFactor, fx: KernelFactor, alpha: float, lam: float,
+                      thresh: float) -> Dict:
+    cx = fx.centered
+    # R = I - Kx (Kx + lam I)^{-1} = I - Fx (Fx^T Fx + lam I)^{-1} Fx^T, by the Woodbury identity
+    gram = cx.T @ cx + lam * np.eye(cx.shape[1])
+
+    def residualize(F):
+        return F - cx @ np.linalg.solve(gram, cx.T @ F)
+
+    ryx, re = residualize(fyx.centered), residualize(fe.centered)
+    statistic = np.sum((ryx.T @ re)**2)
+
+    # W has one row per pair of columns of the eigen-factors, and one column per sample. As in kci_test_vector, the
+    # mean is tr(W W^T) and the variance is twice the sum of the squared diagonal entries of the smaller of W W^T and
+    # W^T W, i.e. of the fourth powers of the norms of the rows or columns of W
+    sq_yx, sq_ex = _eigen_factor(ryx, thresh)**2, _eigen_factor(re, thresh)**2
+    column_norms = np.sum(sq_yx, axis=1) * np.sum(sq_ex, axis=1)
+    mean_approx = np.sum(column_norms)
+    if sq_yx.shape[1] * sq_ex.shape[1] < ryx.shape[0]:
+        var_approx = 2 * np.sum((sq_yx.T @ sq_ex)**2)
+    else:
+        var_approx = 2 * np.sum(column_norms**2)
+    shape = mean_approx ** 2 / var_approx
+    scale = var_approx / mean_approx
+    critval = gamma.ppf(1 - alpha, shape, scale=scale)
+    p_value = gamma.sf(statistic, shape, scale=scale)
+    return dict(statistic=statistic, critval=critval, p_value=p_value, reject=statistic > critval)
+
+
+# === VECTOR TESTS
+def hsic_test_vector_low_rank(
+        x: np.ndarray,
+        y: np.ndarray,
+        sig: float = 1/np.sqrt(2),
+        alpha: float = 0.05,
+        rank: int = 100,
+        method: str = 'nystrom',
+        seed: Optional[int] = 0
+) -> Dict:
+    """
+    Low-rank version of ``hsic_test_vector``: test for independence of X and Y using the Hilbert-Schmidt Information
+    Criterion, with the Gram matrices approximated by rank ``rank`` factors.
+
+    Parameters
+    ----------
+    x:
+        vector of samples from X.
+    y:
+        vector of samples from Y.
+    sig:
+        width parameter.
+    alpha:
+        significance level.
+    rank:
+        rank of the approximation.
+    method:
+        ``'nystrom'`` or ``'rff'``.
+    seed:
+        seed for the choice of landmarks or features.
+    """
+    x, y = _as_matrix(x), _as_matrix(y)
+    n = x.shape[0]
+    if y.shape[0] != n:
+        raise ValueError("Y should have the same number of samples as X")
+    precision = 1/(sig**2)
+    fx = rbf_factor(x, precision, rank, method, seed)
+    fy = rbf_factor(y, precision, rank, method, seed)
+    return _hsic_from_factors(fx, fy, n, alpha, seed)
+
+
+def ki_test_vector_low_rank(
+        Y: np.ndarray,
+        X: np.ndarray,
+        width_x: float = 0.,
+        width_y: float = 0.,
+        alpha: float = 0.05,
+        rank: int = 100,
+        method: str = 'nystrom',
+        seed: Optional[int] = 0
+) -> Dict:
+    """
+    Low-rank version of ``ki_test_vector``: test the null hypothesis that Y and X are independent. Kernel widths of 0
+    are chosen by the median heuristic, on a subsample of at most 1000 samples.
+    """
+    X, Y = _as_matrix(X), _as_matrix(Y)
+    n = X.shape[0]
+    if Y.shape[0] != n:
+        raise ValueError("Y should have the same number of samples as X")
+    width_x = width_x if width_x != 0 else _median_width(X, seed)
+    width_y = width_y if width_y != 0 else _median_width(Y, seed)
+    fx = rbf_factor(_scale(X), 1 / width_x**2, rank, method, seed)
+    fy = rbf_factor(_scale(Y), 1 / width_y**2, rank, method, seed)
+    return _ki_from_factors(fx, fy, n, alpha)
+
+
+def kci_test_vector_low_rank(
+        Y: np.ndarray,
+        E: np.ndarray,
+        X: np.ndarray,
+        width: float = 0.,
+        alpha: float = 0.05,
+        lam: float = 1e-3,
+        thresh: float = 1e-5,
+        rank: int = 100,
+        method: str = 'nystrom',
+        seed: Optional[int] = 0
+) -> Dict:
+    """
+    Low-rank version of ``kci_test_vector``: test the null hypothesis that Y and E are independent given X.
+
+    The null distribution is approximated by a Gamma distribution with the same mean and variance as in
+    ``kci_test_vector`` and ``kci_test_workspace``, so the results match those of ``kci_test_vector`` at full rank.
+    """
+    X, Y, E = _as_matrix(X), _as_matrix(Y), _as_matrix(E)
+    n, d = X.shape
+    if Y.shape[0] != n:
+        raise ValueError("Y should have the same number of samples as X")
+    if E.shape[0] != n:
+        raise ValueError("E should have the same number of samples as X and Y")
+    width = width if width != 0 else _kci_width(n)
+    precision = 1 / (width ** 2 * d)
+    X, Y, E = _scale(X), _scale(Y), _scale(E)
+    fyx = rbf_factor(np.concatenate((Y, X / 2), axis=1), precision, rank, method, seed)
+    fe = rbf_factor(E, precision, rank, method, seed)
+    fx = rbf_factor(X, precision, rank, method, seed)
+    return _kci_from_factors(fyx, fe, fx, alpha, lam, thresh)
+
+
+# === SUFFICIENT STATISTICS
+def kernel_suffstat(
+        samples: np.ndarray,
+        rank: int = 100,
+        method: str = 'nystrom',
+        seed: Optional[int] = 0,
+        max_bytes: Optional[int] = None
+) -> Dict:
+    """
+    Return the sufficient statistics for ``hsic_test_low_rank`` and ``kci_test_low_rank``: the samples, the settings
+    of the approximation, and an empty ``KernelWorkspace`` for kernel factors and widths.
+
+    Parameters
+    ----------
+    samples:
+        (n x p) matrix of samples.
+    rank:
+        rank of the approximation.
+    method:
+        ``'nystrom'`` or ``'rff'``.
+    seed:
+        seed for the choice of landmarks or features.
+    max_bytes:
+        memory budget of the workspace, in bytes. None for no bound.
+    """
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {sorted(METHODS)}, got '{method}'")
+    return dict(samples=samples, rank=rank, method=method, seed=seed, cache=KernelWorkspace(max_bytes))
+
+
+def kernel_invariance_suffstat(
+        obs_samples: np.ndarray,
+        context_samples_list: List[np.ndarray],
+        rank: int = 100,
+        method: str = 'nystrom',
+        seed: Optional[int] = 0,
+        max_bytes: Optional[int] = None
+) -> Dict:
+    """
+    Return the sufficient statistics for ``hsic_invariance_test_low_rank`` and ``kci_invariance_test_low_rank``,
+    with contexts numbered by their position in ``context_samples_list``.
+    """
+    suffstat = kernel_suffstat(obs_samples, rank, method, seed, max_bytes)
+    suffstat['obs_samples'] = obs_samples
+    for context, samples in enumerate(context_samples_list):
+        suffstat[context] = samples
+    return suffstat
+
+
+def _cached(suffstat: Dict, kind: str, key: tuple, compute):
+    return suffstat['cache'].cached(kind, key, compute)
+
+
+def _cached_factor(suffstat: Dict, key: tuple, values, precision: float) -> KernelFactor:
+    return _cached(
+        suffstat,
+        'factor',
+        (key, precision),
+        lambda: rbf_factor(values(), precision, suffstat['rank'], suffstat['method'], suffstat['seed'])
+    )
+
+
+def _hsic(suffstat: Dict, samples: np.ndarray, namespace: tuple, i, j, cond_set: list, alpha: float) -> Dict:
+    precision = 2.  # sig = 1/sqrt(2), as in hsic_test
+    if len(cond_set) == 0:
+        keys, values = [('column', i), ('column', j)], [lambda: samples[:, i], lambda: samples[:, j]]
+    else:
+        res = _cached(suffstat, 'residuals', namespace + (i, j, tuple(cond_set)),
+                      lambda: residuals(samples, i, j, cond_set))
+        keys = [('residuals', i, j, tuple(cond_set), 0), ('residuals', i, j, tuple(cond_set), 1)]
+        values = [lambda: res[0], lambda: res[1]]
+    fx, fy = (_cached_factor(suffstat, namespace + key, value, precision) for key, value in zip(keys, values))
+    return _hsic_from_factors(fx, fy, samples.shape[0], alpha, suffstat['seed'])
+
+
+def _kci(suffstat: Dict, samples: np.ndarray, namespace: tuple, i, j, cond_set: list, width: float, alpha: float,
+         regress: bool, lam: float, thresh: float) -> Dict:
+    n = samples.shape[0]
+    seed = suffstat['seed']
+    if len(cond_set) == 0 or regress:
+        if len(cond_set) == 0:
+            keys, values = [('column', i), ('column', j)], [lambda: samples[:, i], lambda: samples[:, j]]
+        else:
+            res = _cached(suffstat, 'residuals', namespace + (i, j, tuple(cond_set)),
+                          lambda: residuals(samples, i, j, cond_set))
+            keys = [('residuals', i, j, tuple(cond_set), 0), ('residuals', i, j, tuple(cond_set), 1)]
+            values = [lambda: res[0], lambda: res[1]]
+        factors = []
+        for key, value in zip(keys, values):
+            w = width if width != 0 else _cached(
+                suffstat, 'width', namespace + key, lambda: _median_width(_as_matrix(value()), seed)
+            )
+            factors.append(_cached_factor(suffstat, namespace + ('scaled',) + key,
+                                          lambda: _scale(_as_matrix(value())), 1 / w**2))
+        # ki_test_vector tests Y against X, so the first factor is for j
+        return _ki_from_factors(factors[0], factors[1], n, alpha)
+
+    cond_key = tuple(cond_set)
+    width = width if width != 0 else _kci_width(n)
+    precision = 1 / (width ** 2 * len(cond_set))
+
+    def scaled_cond():
+        return _scale(samples[:, cond_set])
+
+    fyx = _cached_factor(
+        suffstat, namespace + ('kci_yx', i, cond_key),
+        lambda: np.concatenate((_scale(samples[:, [i]]), scaled_cond() / 2), axis=1), precision
+    )
+    fe = _cached_factor(suffstat, namespace + ('scaled', 'column', j), lambda: _scale(samples[:, [j]]), precision)
+    fx = _cached_factor(suffstat, namespace + ('kci_x', cond_key), scaled_cond, precision)
+    return _kci_from_factors(fyx, fe, fx, alpha, lam, thresh)
+
+
+# === CI TESTS
+def hsic_test_low_rank(
+        suffstat: Dict,
+        i: int,
+        j: int,
+        cond_set: Union[List[int], int] = None,
+        alpha: float = 0.05
+) -> Dict:
+    """
+    Low-rank version of ``hsic_test``: test for (conditional) independence using the Hilbert-Schmidt Information
+    Criterion. If a conditioning set is specified, first perform non-parametric regression, then test residuals.
+
+    Parameters
+    ----------
+    suffstat:
+        output of ``kernel_suffstat``.
+    i:
+        column position of first variable.
+    j:
+        column position of second variable.
+    cond_set:
+        column positions of conditioning set.
+    alpha:
+        Significance level of the test.
+
+    See Also
+    --------
+    kernel_suffstat, hsic_test_vector_low_rank
+
+    Examples
+    --------
+    >>> import causaldag as cd
+    >>> import numpy as np
+    >>> samples = np.random.normal(size=(5000, 3))
+    >>> suffstat = cd.kernel_suffstat(samples, rank=50)
+    >>> ci_tester = cd.MemoizedCI_Tester(cd.hsic_test_low_rank, suffstat)
+    >>> ci_tester.is_ci(0, 1)
+    True
+    """
+    return _hsic(suffstat, suffstat['samples'], (), i, j, to_list(cond_set), alpha)
+
+
+def kci_test_low_rank(
+        suffstat: Dict,
+        i: int,
+        j: int,
+        cond_set: Union[List[int], int] = None,
+        width: float = 0.,
+        alpha: float = 0.05,
+        regress: bool = True,
+        lam: float = 1e-3,
+        thresh: float = 1e-5
+) -> Dict:
+    """
+    Low-rank version of ``kci_test``. Without a conditioning set, or with ``regress=True``, the kernel independence
+    test is applied to the variables or to their residuals; otherwise the kernel conditional independence test is
+    used.
+
+    Parameters
+    ----------
+    suffstat:
+        output of ``kernel_suffstat``.
+    i:
+        column position of first variable.
+    j:
+        column position of second variable.
+    cond_set:
+        column positions of conditioning set.
+    width:
+        Kernel width. If 0, chosen automatically.
+    alpha:
+        Significance level of the test.
+    regress:
+        If True, test the residuals of non-parametric regressions on the conditioning set.
+    lam:
+        Regularization parameter for matrix inversions.
+    thresh:
+        Lower threshold for eigenvalues, relative to the largest.
+
+    See Also
+    --------
+    kernel_suffstat, ki_test_vector_low_rank, kci_test_vector_low_rank
+    """
+    return _kci(suffstat, suffstat['samples'], (), i, j, to_list(cond_set), width, alpha, regress, lam, thresh)
+
+
+# === INVARIANCE TESTS
+def _combined_samples(suffstat: Dict, context, i: int, cond_set: list) -> np.ndarray:
+    return _cached(
+        suffstat,
+        'combined',
+        (context, i, tuple(cond_set)),
+        lambda: combined_mat(suffstat['obs_samples'], suffstat[context], i, cond_set)
+    )
+
+
+def hsic_invariance_test_low_rank(
+        suffstat: Dict,
+        context,
+        i: int,
+        cond_set: Optional[Union[List[int], int]] = None,
+        alpha: float = 0.05
+) -> Dict:
+    """
+    Low-rank version of ``hsic_invariance_test``: test whether the distribution of ``i`` given ``cond_set`` is the
+    same in the observational data and in ``context``.
+
+    Parameters
+    ----------
+    suffstat:
+        output of ``kernel_invariance_suffstat``.
+    context:
+        context to compare with the observational data.
+    i:
+        column position of the variable.
+    cond_set:
+        column positions of conditioning set.
+    alpha:
+        Significance level of the test.
+    """
+    cond_set = to_list(cond_set)
+    mat = _combined_samples(suffstat, context, i, cond_set)
+    namespace = ('invariance', context, i, tuple(cond_set))
+    return _hsic(suffstat, mat, namespace, 0, 1, list(range(2, 2+len(cond_set))), alpha)
+
+
+def kci_invariance_test_low_rank(
+        suffstat: Dict,
+        context,
+        i: int,
+        cond_set: Optional[Union[List[int], int]] = None,
+        width: float = 0.,
+        alpha: float = 0.05,
+        regress: bool = True,
+        lam: float = 1e-3,
+        thresh: float = 1e-5
+) -> Dict:
+    """
+    Low-rank version of ``kci_invariance_test``. See ``kci_test_low_rank`` for the parameters.
+    """
+    cond_set = to_list(cond_set)
+    mat = _combined_samples(suffstat, context, i, cond_set)
+    namespace = ('invariance', context, i, tuple(cond_set))
+    return _kci(suffstat, mat, namespace, 0, 1, list(range(2, 2+len(cond_set))), width, alpha, regress, lam, thresh)
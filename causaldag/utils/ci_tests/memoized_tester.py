@@ -0,0 +1,206 @@
+"""
+Memoized CI and invariance testers which count their lookups in a ``TesterStats``.
+"""
+# === IMPORTS: BUILT-IN ===
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+import time
+
+# === IMPORTS: LOCAL ===
+from conditional_independence import MemoizedCI_Tester as _MemoizedCI_Tester
+from conditional_independence import MemoizedInvarianceTester as _MemoizedInvarianceTester
+from conditional_independence.ci_tests.ci_tester import CI_Test
+from conditional_independence.invariance_tests.invariance_tester import InvarianceTest
+from conditional_independence.utils import to_set
+from .stats import TesterStats
+
+
+class MemoizedCI_Tester(_MemoizedCI_Tester):
+    def __init__(self, ci_test: CI_Test, suffstat: Dict, track_times=False, detailed=False, **kwargs):
+        """
+        Class for memoizing the results of conditional independence tests, counting the tests run and the results
+        reused, by size of conditioning set, in ``self.stats``.
+
+        Parameters
+        ----------
+        ci_test:
+            Function taking suffstat, i, j, and cond_set, and returning a dictionary that includes the key 'reject'.
+        suffstat:
+            dictionary of sufficient statistics for the conditional independence test.
+        track_times:
+            if True, keep a dictionary mapping each conditional independence test to the time taken to perform it.
+        detailed:
+            if True, keep a dictionary mapping each conditional independence test to its full set of results.
+        **kwargs:
+            Additional keyword arguments to be passed to the conditional independence test.
+
+        See Also
+        --------
+        TesterStats, CachedCI_Tester
+
+        Example
+        -------
+        >>> import causaldag as cd
+        >>> import numpy as np
+        >>> suffstat = cd.partial_correlation_suffstat(np.random.normal(size=(100, 5)))
+        >>> ci_tester = cd.MemoizedCI_Tester(cd.partial_correlation_test, suffstat, alpha=1e-3)
+        >>> est_cpdag = cd.pcalg(set(range(5)), ci_tester)
+        >>> histogram = ci_tester.stats.histogram()
+        """
+        _MemoizedCI_Tester.__init__(self, ci_test, suffstat, track_times=track_times, detailed=detailed, **kwargs)
+        self.stats = TesterStats('ci')
+
+    def is_ci(self, i, j, cond_set=set()):
+        index = (frozenset({i, j}), frozenset(cond_set))
+
+        # check if result exists and return
+        _is_ci = self.ci_dict.get(index)
+        if _is_ci is not None:
+            self.stats.record(len(index[1]), True)
+            return _is_ci
+
+        # otherwise, compute result and save
+        start = time.perf_counter()
+        test_results = self.ci_test(self.suffstat, i, j, cond_set=cond_set, **self.kwargs)
+        elapsed = time.perf_counter() - start
+        if self.track_times:
+            self.ci_times[index] = elapsed
+        if self.detailed:
+            self.ci_dict_detailed[index] = test_results
+        _is_ci = not test_results['reject']
+        self.ci_dict[index] = _is_ci
+        self.stats.record(len(index[1]), False, elapsed)
+
+        return _is_ci
+
+    def _memoized(self, index: tuple) -> Optional[bool]:
+        return self.ci_dict.get(index)
+
+    def _memoize(self, index: tuple, is_ci: bool):
+        self.ci_dict[index] = is_ci
+
+    def record_batch(self, queries: List[Tuple], reject: Sequence[bool], elapsed: float = 0., test_results=None):
+        """
+        Memoize the results of tests run outside of ``is_ci``, e.g. all at once by a batched test, and count them in
+        ``self.stats``: a query with a memoized result counts as a hit, and the others as tests run, each taking an
+        equal share of ``elapsed``.
+
+        Parameters
+        ----------
+        queries:
+            list of ``(i, j, cond_set)`` tested.
+        reject:
+            for each query, whether the test rejected independence.
+        elapsed:
+            total time taken by the tests.
+        test_results:
+            if given, the full results of each test, kept if ``self.detailed``.
+        """
+        misses = []
+        hits = Counter()
+        for k, (i, j, cond_set) in enumerate(queries):
+            index = (frozenset({i, j}), frozenset(cond_set))
+            if self._memoized(index) is None:
+                misses.append((k, index))
+            else:
+                hits[len(index[1])] += 1
+        for size, count in hits.items():
+            self.stats.record(size, True, count=count)
+        if not misses:
+            return
+
+        elapsed_per_test = elapsed / len(misses)
+        miss_sizes = Counter()
+        for k, index in misses:
+            if self.track_times:
+                self.ci_times[index] = elapsed_per_test
+            if self.detailed and test_results is not None:
+                self.ci_dict_detailed[index] = test_results[k]
+            self._memoize(index, not reject[k])
+            miss_sizes[len(index[1])] += 1
+        for size, count in miss_sizes.items():
+            self.stats.record(size, False, elapsed_per_test * count, count=count)
+
+    def clear(self):
+        """
+        Clear the memoized results and reset the counts of ``self.stats``.
+        """
+        _MemoizedCI_Tester.clear(self)
+        self.stats = self.stats.fresh()
+
+
+class MemoizedInvarianceTester(_MemoizedInvarianceTester):
+    def __init__(self, invariance_test: InvarianceTest, suffstat: Dict, track_times=False, detailed=False, **kwargs):
+        """
+        Class for memoizing the results of invariance tests, counting the tests run and the results reused, by size
+        of conditioning set, in ``self.stats``.
+
+        Parameters
+        ----------
+        invariance_test:
+            Function taking suffstat, context, node, and conditioning set, and returning a dictionary that includes
+            the key 'reject'.
+        suffstat:
+            Dictionary containing sufficient statistics for all contexts.
+        track_times:
+            If True, keep a dictionary mapping each invariance test to the time taken to perform it.
+        detailed:
+            If True, keep a dictionary mapping each invariance test to its full set of results.
+        **kwargs:
+            Additional keyword arguments to be passed to the invariance test.
+
+        See Also
+        --------
+        TesterStats
+        """
+        _MemoizedInvarianceTester.__init__(
+            self,
+            invariance_test,
+            suffstat,
+            track_times=track_times,
+            detailed=detailed,
+            **kwargs
+        )
+        self.stats = TesterStats('invariance')
+
+    def is_invariant(self, node, context, cond_set=set()):
+        """
+        Check if the conditional distribution of node, given cond_set, is invariant to the context.
+        """
+        cond_set = to_set(cond_set)
+        index = (node, context, frozenset(cond_set))
+
+        # check if result exists and return
+        _is_invariant = self.invariance_dict.get(index)
+        if _is_invariant is not None:
+            self.stats.record(len(cond_set), True)
+            return _is_invariant
+
+        # otherwise, compute result and save
+        start = time.perf_counter()
+        test_results = self.invariance_test(
+            self.suffstat,
+            context,
+            node,
+            cond_set=cond_set,
+            **self.kwargs
+        )
+        elapsed = time.perf_counter() - start
+        if self.track_times:
+            self.invariance_times[index] = elapsed
+        if self.detailed:
+            self.invariance_dict_detailed[index] = test_results
+        _is_invariant = not test_results['reject']
+        self.invariance_dict[index] = _is_invariant
+        self.stats.record(len(cond_set), False, elapsed)
+
+        return _is_invariant
+
+    def clear(self):
+        """
+        Clear the memoized results and reset the counts of ``self.stats``.
+        """
+        self.invariance_dict_detailed = dict()
+        self.invariance_dict = dict()
+        self.invariance_times = dict()
+        self.stats = self.stats.fresh()
@@ -0,0 +1,138 @@
+"""
+Batched partial correlation tests, sharing work between tests with the same or nested conditioning sets.
+"""
+# === IMPORTS: BUILT-IN ===
+from collections import defaultdict
+from typing import Dict, Iterable, Tuple, Any
+
+# === IMPORTS: THIRD-PARTY ===
+import numpy as np
+from scipy.special import erfc
+
+CIQuery = Tuple[int, int, Any]
+
+# residual variances below this are treated as zero, i.e. the variable is determined by the conditioning set
+_TOL = 1e-10
+
+
+def _sweep(residual: np.ndarray, k: int) -> np.ndarray:
+    """
+    Return the residual covariance after additionally conditioning on position ``k``: a rank-one update.
+    """
+    pivot = residual[k, k]
+    if pivot <= _TOL:
+        return residual
+    return residual - np.outer(residual[:, k], residual[k, :]) / pivot
+
+
+def compute_partial_correlations(suffstat: Dict, queries: Iterable[CIQuery]) -> np.ndarray:
+    """
+    Compute the partial correlation between ``i`` and ``j`` given ``cond_set`` for each query
+    ``(i, j, cond_set)``.
+
+    Queries are grouped by conditioning set, and the conditioning sets are arranged in a prefix tree of their
+    sorted elements. Each node of the tree holds the correlation matrix of the variables involved in any query,
+    conditioned on the node's prefix, obtained from its parent by one rank-one update. Every query is then read off
+    the matrix of its conditioning set, so each group costs at most one update per new conditioning variable rather
+    than one matrix inversion per query, and nested conditioning sets (e.g. {1, 2} and {1, 2, 3}) share all but
+    the last update.
+
+    Parameters
+    ----------
+    suffstat:
+        dictionary containing ``C``, the correlation (or covariance) matrix.
+    queries:
+        triples ``(i, j, cond_set)`` of positions in the correlation matrix.
+
+    Returns
+    -------
+    np.ndarray
+        partial correlation for each query.
+
+    See Also
+    --------
+    partial_correlation_test_batch
+    """
+    C = suffstat['C']
+    queries = [(i, j, tuple(sorted(cond_set)) if cond_set is not None else ()) for i, j, cond_set in queries]
+    r = np.zeros(len(queries))
+    if not queries:
+        return r
+
+    # === RESTRICT TO THE VARIABLES THAT APPEAR IN SOME QUERY
+    involved = sorted({ix for i, j, cond_set in queries for ix in (i, j, *cond_set)})
+    local_ix = {ix: local for local, ix in enumerate(involved)}
+    C_local = C[np.ix_(involved, involved)].astype(float)
+
+    queries_by_cond_set = defaultdict(list)
+    for q, (i, j, cond_set) in enumerate(queries):
+        queries_by_cond_set[cond_set].append((q, local_ix[i], local_ix[j]))
+
+    # === DEPTH-FIRST SEARCH OVER THE PREFIX TREE OF CONDITIONING SETS
+    # visiting the sets in sorted order, the stack holds the residual matrices for the prefixes of the current set
+    stack = [((), C_local)]
+    for cond_set in sorted(queries_by_cond_set):
+        while cond_set[:len(stack[-1][0])] != stack[-1][0]:
+            stack.pop()
+        prefix, residual = stack[-1]
+        for k in cond_set[len(prefix):]:
+            prefix = prefix + (k,)
+            residual = _sweep(residual, local_ix[k])
+            stack.append((prefix, residual))
+
+        qs, i_ixs, j_ixs = map(np.array, zip(*queries_by_cond_set[cond_set]))
+        diag = np.diag(residual)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            r[qs] = residual[i_ixs, j_ixs] / np.sqrt(diag[i_ixs] * diag[j_ixs])
+    return np.clip(r, -1, 1)
+
+
+def partial_correlation_test_batch(suffstat: Dict, queries: Iterable[CIQuery], alpha=None) -> Dict:
+    """
+    Test the null hypothesis that ``i`` and ``j`` are conditionally independent given ``cond_set``, for each query
+    ``(i, j, cond_set)``.
+
+    Uses Fisher's z-transform, as in ``partial_correlation_test``, with the partial correlations computed by
+    ``compute_partial_correlations``.
+
+    Parameters
+    ----------
+    suffstat:
+        dictionary containing:
+
+        * ``n`` -- number of samples
+        * ``C`` -- correlation matrix
+    queries:
+        triples ``(i, j, cond_set)`` of positions in the correlation matrix.
+    alpha:
+        Significance level.
+
+    Returns
+    -------
+    dict
+        dictionary containing arrays, with one entry per query:
+
+        * ``statistic``
+        * ``p_value``
+        * ``reject``
+
+    Examples
+    --------
+    >>> import causaldag as cd
+    >>> import numpy as np
+    >>> samples = np.random.normal(size=(1000, 4))
+    >>> suffstat = cd.partial_correlation_suffstat(samples)
+    >>> results = cd.partial_correlation_test_batch(suffstat, [(0, 1, set()), (0, 1, {2}), (0, 1, {2, 3})])
+    >>> results['p_value'].shape
+    (3,)
+    """
+    queries = list(queries)
+    n = suffstat['n']
+    alpha = 1/n if alpha is None else alpha
+    n_cond = np.array([0 if cond_set is None else len(cond_set) for _, _, cond_set in queries])
+
+    r = compute_partial_correlations(suffstat, queries)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        statistic = np.sqrt(n - n_cond - 3) * np.abs(np.arctanh(r))
+    p_value = erfc(statistic / np.sqrt(2))
+    return dict(statistic=statistic, p_value=p_value, reject=p_value < alpha)
@@ -0,0 +1,146 @@
+"""
+Vectorized draws from the null distributions of kernel test statistics.
+
+Null draws are made in batches of fixed size, each with its own seed spawned from a single ``SeedSequence``, so
+the draws depend only on the seed, and not on how the batches are spread across workers.
+"""
+# === IMPORTS: BUILT-IN ===
+import os
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Callable, Optional
+
+# === IMPORTS: THIRD-PARTY ===
+import numpy as np
+
+# number of entries of the largest temporary array made by a batch
+_MAX_BATCH_ENTRIES = 2 ** 24
+# a randomly gathered matrix entry costs about as much as this many multiply-adds in a matrix product
+_GATHER_COST = 16
+
+
+def _batch_sizes(n_draws: int, batch_size: int) -> list:
+    nbatches, remainder = divmod(n_draws, batch_size)
+    return [batch_size] * nbatches + ([remainder] if remainder else [])
+
+
+def _run_batches(fn: Callable, args: tuple, n_draws: int, batch_size: int, seed, n_jobs: Optional[int],
+                 executor: Optional[Executor]) -> np.ndarray:
+    sizes = _batch_sizes(n_draws, batch_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [args + (size, child) for size, child in zip(sizes, seeds)]
+    if n_jobs == -1:
+        n_jobs = os.cpu_count()
+    if executor is None and (n_jobs is None or n_jobs <= 1 or len(tasks) <= 1):
+        return np.concatenate([fn(*task) for task in tasks])
+    if executor is not None:
+        futures = [executor.submit(fn, *task) for task in tasks]
+        return np.concatenate([future.result() for future in futures])
+    with ThreadPoolExecutor(max_workers=min(n_jobs, len(tasks))) as pool:
+        return np.concatenate(list(pool.map(lambda task: fn(*task), tasks)))
+
+
+def _permutations(n: int, size: int, seed) -> np.ndarray:
+    return np.random.default_rng(seed).permuted(np.tile(np.arange(n), (size, 1)), axis=1)
+
+
+def _permuted_batch(kx: np.ndarray, ky: np.ndarray, size: int, seed) -> np.ndarray:
+    perms = _permutations(kx.shape[0], size, seed)
+    ky_permuted = ky[perms[:, :, None], perms[:, None, :]]
+    return np.einsum('ab,kab->k', kx, ky_permuted)
+
+
+def _permuted_factor_batch(vecs_x: np.ndarray, vals_x: np.ndarray, vecs_y: np.ndarray, vals_y: np.ndarray,
+                           size: int, seed) -> np.ndarray:
+    perms = _permutations(vecs_x.shape[0], size, seed)
+    products = np.matmul(vecs_x.T, vecs_y[perms])
+    return np.einsum('krs,r,s->k', products**2, vals_x, vals_y)
+
+
+def _eigen_factor(k: np.ndarray, thresh: float) -> tuple:
+    eigvals, eigvecs = np.linalg.eigh(k)
+    keep = np.abs(eigvals) > np.abs(eigvals).max() * thresh
+    return eigvecs[:, keep], eigvals[keep]
+
+
+def permutation_statistics(
+        kx: np.ndarray,
+        ky: np.ndarray,
+        n_draws: int = 500,
+        seed=None,
+        batch_size: Optional[int] = None,
+        n_jobs: Optional[int] = 1,
+        executor: Optional[Executor] = None,
+        thresh: float = 1e-8
+) -> np.ndarray:
+    """
+    Return ``sum(kx * ky[p][:, p])`` for ``n_draws`` uniformly random permutations ``p`` of the samples, for
+    symmetric kernel matrices ``kx`` and ``ky``.
+
+    Permutations are drawn a whole batch at a time. With ``kx = U diag(a) U^T`` and ``ky = V diag(b) V^T``, keeping
+    the ``r`` and ``s`` eigenvalues above ``thresh`` times the largest, the sum is
+    ``sum(a[:, None] * b[None, :] * (U^T V[p])**2)``, computed by one batched matrix product in ``O(n r s)`` per
+    permutation. Kernel matrices of a few variables have quickly decaying spectra, so ``r`` and ``s`` are small.
+    If they are not, the permuted matrices are instead gathered from ``ky``, in ``O(n^2)`` per permutation.
+
+    Parameters
+    ----------
+    kx, ky:
+        symmetric (n x n) kernel matrices.
+    n_draws:
+        Number of permutations.
+    seed:
+        Seed of the ``SeedSequence`` from which the seed of each batch is spawned.
+    batch_size:
+        Number of permutations per batch. By default, batches use about 128MB of temporary memory.
+    n_jobs:
+        Number of threads to spread the batches across, if no executor is given. -1 uses all CPUs.
+    executor:
+        An existing ``concurrent.futures`` executor to spread the batches across. It is not shut down.
+    thresh:
+        Eigenvalues below ``thresh`` times the largest are treated as 0. The default is below the precision of the
+        single-precision kernel matrices of ``rbf_kernel``.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from causaldag.utils.ci_tests.permutation import permutation_statistics
+    >>> kx, ky = np.eye(4), np.ones((4, 4))
+    >>> permutation_statistics(kx, ky, n_draws=3, seed=0)
+    array([4., 4., 4.])
+    """
+    n = kx.shape[0]
+    vecs_x, vals_x = _eigen_factor(kx, thresh)
+    vecs_y, vals_y = _eigen_factor(ky, thresh)
+    if len(vals_x) * len(vals_y) <= _GATHER_COST * n:
+        batch_size = batch_size if batch_size is not None else max(1, _MAX_BATCH_ENTRIES // (n * max(len(vals_y), 1)))
+        args = (vecs_x, vals_x, vecs_y, vals_y)
+        return _run_batches(_permuted_factor_batch, args, n_draws, batch_size, seed, n_jobs, executor)
+    batch_size = batch_size if batch_size is not None else max(1, _MAX_BATCH_ENTRIES // n**2)
+    return _run_batches(_permuted_batch, (kx, ky), n_draws, batch_size, seed, n_jobs, executor)
+
+
+def _chi2_mixture_batch(weights: np.ndarray, size: int, seed) -> np.ndarray:
+    return np.random.default_rng(seed).chisquare(1, size=(size, len(weights))) @ weights
+
+
+def chi2_mixture_draws(
+        weights: np.ndarray,
+        n_draws: int = 500,
+        seed=None,
+        batch_size: Optional[int] = None,
+        n_jobs: Optional[int] = 1,
+        executor: Optional[Executor] = None
+) -> np.ndarray:
+    """
+    Return ``n_draws`` draws of ``sum_k weights[k] * z_k**2`` for independent standard normal ``z_k``, the
+    asymptotic null distribution of the KCI statistic. See ``permutation_statistics`` for the parameters.
+    """
+    batch_size = batch_size if batch_size is not None else max(1, _MAX_BATCH_ENTRIES // max(len(weights), 1))
+    return _run_batches(_chi2_mixture_batch, (weights,), n_draws, batch_size, seed, n_jobs, executor)
+
+
+def permutation_p_value(statistic: float, null_statistics: np.ndarray) -> float:
+    """
+    Return the fraction of null draws, counting the observed statistic as one, that are at least ``statistic``.
+    """
+    return (1 + np.sum(null_statistics >= statistic)) / (1 + len(null_statistics))
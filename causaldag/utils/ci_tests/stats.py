@@ -0,0 +1,172 @@
+"""
+Counters of the lookups made by memoized testers and scores.
+"""
+# === IMPORTS: BUILT-IN ===
+from collections import Counter, defaultdict
+from typing import Callable, Dict, List
+
+
+class TesterStats:
+    """
+    Counts of the lookups of a memoized CI tester, invariance tester or decomposable score, by size of the
+    conditioning set (or parent set, for scores): how many were answered from the cache (``hits``), how many ran the
+    test (``misses``), and the total time spent running tests.
+
+    Hooks are called after every lookup with a dictionary holding the ``kind`` of tester, the ``size`` of the
+    conditioning set, whether the lookup was a ``hit``, and the ``time`` taken by the test (0 for hits), so the
+    lookups can be streamed elsewhere as they happen. Hooks are not pickled, so they only see the lookups made in the
+    process that added them; the statistics of worker processes are merged back by the structure learners.
+
+    Parameters
+    ----------
+    kind:
+        Kind of lookup counted, such as ``'ci'``, ``'invariance'`` or ``'score'``.
+
+    Examples
+    --------
+    >>> import causaldag as cd
+    >>> import numpy as np
+    >>> suffstat = cd.partial_correlation_suffstat(np.random.normal(size=(100, 3)))
+    >>> ci_tester = cd.MemoizedCI_Tester(cd.partial_correlation_test, suffstat)
+    >>> events = []
+    >>> ci_tester.stats.add_hook(events.append)
+    >>> _ = ci_tester.is_ci(0, 1, {2}), ci_tester.is_ci(0, 1, {2})
+    >>> ci_tester.stats.num_misses, ci_tester.stats.num_hits, len(events)
+    (1, 1, 2)
+    """
+    def __init__(self, kind: str = 'ci'):
+        self.kind = kind
+        self.hits = Counter()
+        self.misses = Counter()
+        self.times = defaultdict(float)
+        self._hooks = []
+
+    def record(self, size: int, hit: bool, elapsed: float = 0., count: int = 1):
+        """
+        Record ``count`` lookups with a conditioning set of size ``size``, taking ``elapsed`` seconds in total.
+        """
+        if hit:
+            self.hits[size] += count
+        else:
+            self.misses[size] += count
+            self.times[size] += elapsed
+        if self._hooks:
+            event = dict(kind=self.kind, size=size, hit=hit, time=elapsed / count if count else 0.)
+            for _ in range(count):
+                for hook in self._hooks:
+                    hook(dict(event))
+
+    def add_hook(self, hook: Callable[[Dict], None]):
+        """
+        Call ``hook`` with a dictionary describing each later lookup.
+        """
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook: Callable[[Dict], None]):
+        self._hooks.remove(hook)
+
+    @property
+    def hooks(self) -> List[Callable]:
+        return list(self._hooks)
+
+    @property
+    def num_hits(self) -> int:
+        return sum(self.hits.values())
+
+    @property
+    def num_misses(self) -> int:
+        return sum(self.misses.values())
+
+    @property
+    def num_lookups(self) -> int:
+        return self.num_hits + self.num_misses
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        Fraction of lookups answered from the cache, or NaN if there were none.
+        """
+        num_lookups = self.num_lookups
+        return self.num_hits / num_lookups if num_lookups else float('nan')
+
+    @property
+    def total_time(self) -> float:
+        return sum(self.times.values())
+
+    def histogram(self) -> Dict[int, Dict]:
+        """
+        Return, for each size of conditioning set, the number of hits and misses and the time spent running tests.
+        """
+        sizes = sorted(set(self.hits) | set(self.misses))
+        return {size: dict(hits=self.hits[size], misses=self.misses[size], time=self.times[size]) for size in sizes}
+
+    def to_dict(self) -> Dict:
+        """
+        Return the statistics as a dictionary of plain Python values, e.g. for writing to JSON.
+        """
+        return dict(
+            kind=self.kind,
+            lookups=self.num_lookups,
+            hits=self.num_hits,
+            misses=self.num_misses,
+            hit_rate=self.hit_rate,
+            time=self.total_time,
+            by_size=self.histogram(),
+        )
+
+    def copy(self) -> 'TesterStats':
+        """
+        Return a copy of the counts, without the hooks.
+        """
+        stats = TesterStats(self.kind)
+        stats.merge(self)
+        return stats
+
+    def fresh(self) -> 'TesterStats':
+        """
+        Return new, empty statistics of the same kind, with the same hooks. Testers replace their statistics by
+        fresh ones when cleared, so that a copy of a tester never shares its counts with the original.
+        """
+        stats = TesterStats(self.kind)
+        stats._hooks = list(self._hooks)
+        return stats
+
+    def merge(self, other: 'TesterStats'):
+        """
+        Add the counts of ``other`` to these. Hooks are not called.
+        """
+        self.hits.update(other.hits)
+        self.misses.update(other.misses)
+        for size, elapsed in other.times.items():
+            self.times[size] += elapsed
+
+    def __sub__(self, other: 'TesterStats') -> 'TesterStats':
+        """
+        Return the counts of the lookups made since ``other``, an earlier copy of these statistics.
+        """
+        stats = TesterStats(self.kind)
+        stats.hits = self.hits - other.hits
+        stats.misses = self.misses - other.misses
+        for size, elapsed in self.times.items():
+            if self.misses[size] > other.misses[size]:
+                stats.times[size] = elapsed - other.times.get(size, 0.)
+        return stats
+
+    def reset(self):
+        """
+        Set all counts to 0. Hooks are kept.
+        """
+        self.hits.clear()
+        self.misses.clear()
+        self.times.clear()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_hooks'] = []
+        return state
+
+    def __repr__(self):
+        return (
+            f"TesterStats(kind={self.kind!r}, lookups={self.num_lookups}, hit_rate={self.hit_rate:.3f}, "
+            f"time={self.total_time:.3f}s)"
+        )
@@ -0,0 +1,222 @@
+"""
+Streaming computation of the sufficient statistics for partial correlation testing.
+"""
+# === IMPORTS: BUILT-IN ===
+import os
+from typing import Dict, Iterable, Optional, Union
+
+# === IMPORTS: THIRD-PARTY ===
+import numpy as np
+from numpy.linalg import pinv
+
+DataSource = Union[np.ndarray, str, os.PathLike, Iterable]
+
+
+class SuffstatAccumulator:
+    """
+    Online accumulator of the mean and covariance of a stream of samples, producing the same sufficient statistics
+    as ``partial_correlation_suffstat``.
+
+    Each chunk of samples is reduced to its count, mean, and centered sum of squares, which are combined with the
+    running totals by the pairwise update of Chan, Golub and LeVeque (a batched version of Welford's algorithm). This
+    avoids the cancellation of the naive sum-of-squares formula, and gives the same result whichever way the data is
+    split, so accumulators filled by different workers can be merged.
+
+    Parameters
+    ----------
+    nvars:
+        Number of variables. If not given, it is taken from the first chunk.
+
+    See Also
+    --------
+    partial_correlation_suffstat_streaming
+
+    Examples
+    --------
+    >>> import causaldag as cd
+    >>> import numpy as np
+    >>> samples = np.random.normal(size=(1000, 5))
+    >>> acc1, acc2 = cd.SuffstatAccumulator(), cd.SuffstatAccumulator()
+    >>> _ = acc1.update(samples[:400])
+    >>> _ = acc2.update(samples[400:])
+    >>> suffstat = acc1.merge(acc2).suffstat()
+    >>> np.allclose(suffstat['C'], cd.partial_correlation_suffstat(samples)['C'])
+    True
+    """
+    def __init__(self, nvars: Optional[int] = None):
+        self.n = 0
+        self.mean = np.zeros(nvars) if nvars is not None else None
+        self.M2 = np.zeros((nvars, nvars)) if nvars is not None else None
+
+    @property
+    def nvars(self) -> Optional[int]:
+        return len(self.mean) if self.mean is not None else None
+
+    def _combine(self, n: int, mean: np.ndarray, M2: np.ndarray):
+        if self.mean is None:
+            self.mean = np.zeros(len(mean))
+            self.M2 = np.zeros((len(mean), len(mean)))
+        if len(mean) != len(self.mean):
+            raise ValueError(f"Expected {len(self.mean)} variables, got {len(mean)}")
+        if n == 0:
+            return self
+        total = self.n + n
+        delta = mean - self.mean
+        self.M2 += M2 + np.outer(delta, delta) * (self.n * n / total)
+        self.mean += delta * (n / total)
+        self.n = total
+        return self
+
+    def update(self, chunk) -> 'SuffstatAccumulator':
+        """
+        Add an ``(n x p)`` chunk of samples, e.g. a numpy array, a slice of a memory-mapped array, or a DataFrame.
+        """
+        chunk = np.asarray(chunk, dtype=float)
+        if chunk.ndim == 1:
+            chunk = chunk[None, :]
+        n = chunk.shape[0]
+        if n == 0:
+            return self._combine(0, np.zeros(chunk.shape[1]), None)
+        mean = chunk.mean(axis=0)
+        centered = chunk - mean
+        return self._combine(n, mean, centered.T @ centered)
+
+    def update_from(self, source: DataSource, chunk_size: int = 100000, **read_kwargs) -> 'SuffstatAccumulator':
+        """
+        Add all samples from ``source``, reading at most ``chunk_size`` rows at a time.
+
+        Parameters
+        ----------
+        source:
+            One of:
+
+            * a numpy array, including a ``np.memmap``;
+            * the path of a ``.npy`` file, which is memory-mapped;
+            * the path of a ``.csv`` file, read with ``pandas.read_csv``;
+            * the path of a ``.parquet`` file, read with ``pyarrow``;
+            * an iterable of chunks, such as the reader returned by ``pandas.read_csv(..., chunksize=...)``.
+        chunk_size:
+            Maximum number of rows to hold in memory at once.
+        read_kwargs:
+            Extra arguments passed to ``pandas.read_csv``, e.g. ``usecols``, or, for parquet files, to
+            ``pyarrow.parquet.ParquetFile.iter_batches``, e.g. ``columns``.
+        """
+        for chunk in iter_chunks(source, chunk_size, **read_kwargs):
+            self.update(chunk)
+        return self
+
+    def merge(self, other: 'SuffstatAccumulator') -> 'SuffstatAccumulator':
+        """
+        Add the samples seen by ``other``, e.g. an accumulator filled by a worker process, to this accumulator.
+        """
+        if other.mean is None:
+            return self
+        return self._combine(other.n, other.mean, other.M2)
+
+    def __add__(self, other: 'SuffstatAccumulator') -> 'SuffstatAccumulator':
+        return self.copy().merge(other)
+
+    def copy(self) -> 'SuffstatAccumulator':
+        acc = SuffstatAccumulator()
+        acc.n = self.n
+        acc.mean = self.mean.copy() if self.mean is not None else None
+        acc.M2 = self.M2.copy() if self.M2 is not None else None
+        return acc
+
+    @property
+    def cov(self) -> np.ndarray:
+        """
+        Sample covariance matrix, normalized by ``n - 1`` as in ``np.cov``.
+        """
+        if self.n < 2:
+            raise ValueError("At least two samples are needed to compute a covariance matrix")
+        return self.M2 / (self.n - 1)
+
+    def suffstat(self, invert=True) -> Dict:
+        """
+        Return the sufficient statistics for partial correlation testing, with the same keys as
+        ``partial_correlation_suffstat`` except ``samples``, which are not kept.
+
+        Parameters
+        ----------
+        invert:
+            if True, also compute the inverse covariance and correlation matrices, and the partial correlation matrix.
+        """
+        S = self.cov
+        std = np.sqrt(np.diag(S))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            C = S / std / std[:, None]
+        C = np.clip(C, -1, 1)
+        mu = self.mean.copy()
+        if invert:
+            K = pinv(C)
+            P = pinv(S)
+            rho = K/np.sqrt(np.diag(K))/np.sqrt(np.diag(K))[:, None]
+            return dict(P=P, S=S, C=C, n=self.n, K=K, rho=rho, mu=mu)
+        return dict(S=S, C=C, n=self.n, mu=mu)
+
+
+def iter_chunks(source: DataSource, chunk_size: int = 100000, **read_kwargs):
+    """
+    Yield the rows of ``source`` in chunks of at most ``chunk_size`` rows. See ``SuffstatAccumulator.update_from``
+    for the supported sources.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        path = os.fspath(source)
+        ext = os.path.splitext(path)[1].lower()
+        if ext == '.npy':
+            source = np.load(path, mmap_mode='r')
+        elif ext in {'.csv', '.txt', '.gz'}:
+            import pandas as pd
+            source = pd.read_csv(path, chunksize=chunk_size, **read_kwargs)
+        elif ext in {'.parquet', '.pq'}:
+            try:
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise ImportError("Reading parquet files requires pyarrow")
+            batches = pq.ParquetFile(path).iter_batches(batch_size=chunk_size, **read_kwargs)
+            source = (np.column_stack([column.to_numpy(zero_copy_only=False) for column in batch.columns])
+                      for batch in batches)
+        else:
+            raise ValueError(f"Unsupported file type '{ext}'")
+
+    if isinstance(source, np.ndarray):
+        for start in range(0, source.shape[0], chunk_size):
+            yield source[start:start+chunk_size]
+    else:
+        yield from source
+
+
+def partial_correlation_suffstat_streaming(
+        source: DataSource,
+        chunk_size: int = 100000,
+        invert=True,
+        **read_kwargs
+) -> Dict:
+    """
+    Return the sufficient statistics for partial correlation testing, as in ``partial_correlation_suffstat``, reading
+    the samples from ``source`` in chunks so that they never need to be in memory at once.
+
+    Parameters
+    ----------
+    source:
+        Array, file path or iterable of chunks; see ``SuffstatAccumulator.update_from``.
+    chunk_size:
+        Maximum number of rows to hold in memory at once.
+    invert:
+        if True, compute the inverse correlation matrix, and normalize it into the partial correlation matrix.
+
+    See Also
+    --------
+    SuffstatAccumulator
+
+    Examples
+    --------
+    >>> import causaldag as cd
+    >>> import numpy as np
+    >>> np.save('samples.npy', np.random.normal(size=(100000, 10)))
+    >>> suffstat = cd.partial_correlation_suffstat_streaming('samples.npy', chunk_size=10000)
+    >>> suffstat['n']
+    100000
+    """
+    return SuffstatAccumulator().update_from(source, chunk_size, **read_kwargs).suffstat(invert=invert)
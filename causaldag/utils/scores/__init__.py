@@ -0,0 +1,3 @@
+from graphical_model_learning.scores import *
+from .decomposable_score import MemoizedDecomposableScore, DeltaDecomposableScore
+from .gaussian_bge_score import GaussianBGeScore
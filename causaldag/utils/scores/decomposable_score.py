@@ -0,0 +1,130 @@
+"""
+Decomposable scores with a bounded cache of local scores and score differences for single-arc moves.
+"""
+# === IMPORTS: BUILT-IN ===
+import time
+from typing import Callable, Dict, Optional
+
+# === IMPORTS: LOCAL ===
+from graphical_model_learning.scores import MemoizedDecomposableScore as _MemoizedDecomposableScore
+from ..ci_tests.ci_cache import LRUCache
+from ..ci_tests.stats import TesterStats
+
+MOVES = {'add', 'remove', 'reverse'}
+
+
+class MemoizedDecomposableScore(_MemoizedDecomposableScore):
+    def __init__(self, local_score: Callable, suffstat: Dict, **kwargs):
+        """
+        Memoized decomposable score, counting the local scores computed and reused, by number of parents, in
+        ``self.stats``.
+
+        Parameters
+        ----------
+        local_score:
+            Function taking node, parents, and suffstat, and returning the local score.
+        suffstat:
+            dictionary of sufficient statistics for the local score.
+        **kwargs:
+            Additional keyword arguments to be passed to the local score.
+
+        See Also
+        --------
+        DeltaDecomposableScore, TesterStats
+        """
+        _MemoizedDecomposableScore.__init__(self, local_score, suffstat, **kwargs)
+        self.stats = TesterStats('score')
+
+    def _compute_local_score(self, node, parents: frozenset) -> float:
+        return self.local_score(node, parents, self.suffstat, **self.kwargs)
+
+    def get_local_score(self, node, parents) -> float:
+        key = (node, frozenset(parents))
+        score = self.score_dict.get(key)
+        if score is not None:
+            self.stats.record(len(key[1]), True)
+            return score
+        start = time.perf_counter()
+        score = self._compute_local_score(node, key[1])
+        self.stats.record(len(key[1]), False, time.perf_counter() - start)
+        self.score_dict[key] = score
+        return score
+
+
+class DeltaDecomposableScore(MemoizedDecomposableScore):
+    def __init__(self, local_score: Callable, suffstat: Dict, maxsize: Optional[int] = 100000, **kwargs):
+        """
+        Memoized decomposable score, additionally returning the change in score caused by adding, removing or
+        reversing a single arc, which only involves the local scores of the one or two nodes whose parents change.
+
+        Local scores are kept in an ``LRUCache`` keyed by ``(node, frozenset(parents))``, so the memory used by long
+        searches stays bounded.
+
+        Parameters
+        ----------
+        local_score:
+            Function taking node, parents, and suffstat, and returning the local score.
+        suffstat:
+            dictionary of sufficient statistics for the local score.
+        maxsize:
+            Maximum number of local scores kept. None for no bound.
+        **kwargs:
+            Additional keyword arguments to be passed to the local score.
+
+        See Also
+        --------
+        GaussianBGeScore
+
+        Example
+        -------
+        >>> import causaldag as cd
+        >>> from causaldag.utils.scores import DeltaDecomposableScore, local_gaussian_bge_score
+        >>> g = cd.rand.rand_weights(cd.rand.directed_erdos(10, .3))
+        >>> suffstat = cd.partial_correlation_suffstat(g.sample(100))
+        >>> scorer = DeltaDecomposableScore(local_gaussian_bge_score, suffstat)
+        >>> dag = cd.DAG(nodes=set(range(10)))
+        >>> diff = scorer.score_diff(dag, 0, 1, 'add')
+        """
+        MemoizedDecomposableScore.__init__(self, local_score, suffstat, **kwargs)
+        self.score_dict = LRUCache(maxsize)
+
+    def local_score_diff(self, node, old_parents, new_parents) -> float:
+        """
+        Return the change in the local score of ``node`` when its parents change from ``old_parents`` to
+        ``new_parents``.
+        """
+        return self.get_local_score(node, new_parents) - self.get_local_score(node, old_parents)
+
+    def score_diff(self, dag, i, j, move: str = 'add') -> float:
+        """
+        Return the change in the score of ``dag`` caused by a single-arc move, without changing ``dag``.
+
+        Parameters
+        ----------
+        dag:
+            The current DAG.
+        i, j:
+            Endpoints of the arc ``i -> j``.
+        move:
+            One of:
+
+            * ``'add'`` -- add the arc ``i -> j``, which must not be in ``dag``;
+            * ``'remove'`` -- remove the arc ``i -> j``, which must be in ``dag``;
+            * ``'reverse'`` -- replace the arc ``i -> j``, which must be in ``dag``, by ``j -> i``.
+
+            Acyclicity of the resulting graph is not checked.
+        """
+        if move not in MOVES:
+            raise ValueError(f"move must be one of {sorted(MOVES)}, got '{move}'")
+        parents_j = dag.parents_of(j)
+        if move == 'add':
+            if i in parents_j:
+                raise ValueError(f"Arc {(i, j)} already in DAG")
+            return self.local_score_diff(j, parents_j, parents_j | {i})
+        if i not in parents_j:
+            raise ValueError(f"Arc {(i, j)} not in DAG")
+        diff = self.local_score_diff(j, parents_j, parents_j - {i})
+        if move == 'reverse':
+            parents_i = dag.parents_of(i)
+            diff += self.local_score_diff(i, parents_i, parents_i | {j})
+        return diff
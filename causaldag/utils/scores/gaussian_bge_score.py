@@ -0,0 +1,150 @@
+"""
+BGe score with log-determinants computed from Cholesky factors that are shared between parent sets.
+"""
+# === IMPORTS: BUILT-IN ===
+import math
+from typing import Dict, Optional
+
+# === IMPORTS: THIRD-PARTY ===
+import numpy as np
+from scipy.linalg.blas import dtrsv
+
+# === IMPORTS: LOCAL ===
+from graphical_model_learning.scores import local_gaussian_bge_score
+from ..ci_tests.ci_cache import LRUCache
+from .decomposable_score import DeltaDecomposableScore
+
+
+class GaussianBGeScore(DeltaDecomposableScore):
+    def __init__(
+            self,
+            suffstat: Dict,
+            alpha_mu: Optional[float] = None,
+            alpha_w: Optional[float] = None,
+            inverse_scale_matrix: Optional[np.ndarray] = None,
+            parameter_mean: Optional[np.ndarray] = None,
+            maxsize: Optional[int] = 100000,
+            factor_maxsize: Optional[int] = 10000
+    ):
+        """
+        BGe score with cached local scores and single-arc score differences, equal to
+        ``MemoizedDecomposableScore(local_gaussian_bge_score, suffstat, ...)``.
+
+        The local score of a node given parents ``P`` depends on the data through ``log det R[P, P]`` and
+        ``log det R[P + node, P + node]``, where ``R`` is the posterior scale matrix. Both come from a Cholesky factor
+        of ``R[P, P]``: the second adds the log of the Schur complement of the node, found by one triangular solve.
+        Factors are cached by parent set, and the factor of a new parent set is built from the cached factor of the
+        set with one parent fewer by appending a row, at ``O(k^2)`` cost instead of ``O(k^3)``. Since a search that
+        adds ``i`` to the parents of ``j`` has already scored ``j`` with its current parents, almost every factor is
+        obtained this way.
+
+        Parameters
+        ----------
+        suffstat:
+            dictionary containing:
+
+            * ``n`` -- number of samples
+            * ``S`` -- sample covariance matrix
+            * ``mu`` -- sample mean
+        alpha_mu, alpha_w, inverse_scale_matrix, parameter_mean:
+            Prior parameters, with the same defaults as ``local_gaussian_bge_score``. Only diagonal
+            ``inverse_scale_matrix`` are supported.
+        maxsize:
+            Maximum number of local scores kept. None for no bound.
+        factor_maxsize:
+            Maximum number of Cholesky factors kept. None for no bound.
+
+        See Also
+        --------
+        DeltaDecomposableScore, local_gaussian_bge_score
+
+        Example
+        -------
+        >>> import causaldag as cd
+        >>> from causaldag.utils.scores import GaussianBGeScore
+        >>> g = cd.rand.rand_weights(cd.rand.directed_erdos(10, .3))
+        >>> suffstat = cd.partial_correlation_suffstat(g.sample(100))
+        >>> scorer = GaussianBGeScore(suffstat)
+        >>> dag = cd.DAG(nodes=set(range(10)), arcs={(0, 1)})
+        >>> diff = scorer.score_diff(dag, 0, 1, 'reverse')
+        """
+        kwargs = dict(
+            alpha_mu=alpha_mu,
+            alpha_w=alpha_w,
+            inverse_scale_matrix=inverse_scale_matrix,
+            parameter_mean=parameter_mean
+        )
+        DeltaDecomposableScore.__init__(self, local_gaussian_bge_score, suffstat, maxsize=maxsize, **kwargs)
+
+        n, S, sample_mean = suffstat['n'], suffstat['S'], suffstat['mu']
+        p = S.shape[0]
+        alpha_mu = alpha_mu if alpha_mu is not None else p
+        alpha_w = alpha_w if alpha_w is not None else p + alpha_mu + 1
+        if inverse_scale_matrix is None:
+            inverse_scale_matrix = np.eye(p) * alpha_mu * (alpha_w - p - 1) / (alpha_mu + 1)
+        elif np.count_nonzero(inverse_scale_matrix - np.diag(np.diagonal(inverse_scale_matrix))):
+            raise NotImplementedError("BGE score not implemented for non-diagonal matrix.")
+        parameter_mean = parameter_mean if parameter_mean is not None else np.zeros(p)
+
+        mean_diff = parameter_mean - sample_mean
+        self._R = inverse_scale_matrix + (n-1) * S + (n * alpha_mu) / (n + alpha_mu) * np.outer(mean_diff, mean_diff)
+        self._log_prior_diag = np.log(np.diagonal(inverse_scale_matrix))
+        self._n = n
+        self._p = p
+        self._alpha_mu = alpha_mu
+        self._alpha_w = alpha_w
+        self._factors = LRUCache(factor_maxsize)
+        self._factors[frozenset()] = ((), np.zeros((0, 0)))
+
+    def _extend_factor(self, order: tuple, L: np.ndarray, new) -> tuple:
+        """
+        Return the Cholesky factor of ``R[order + (new,), order + (new,)]`` from the factor ``L`` of
+        ``R[order, order]``.
+        """
+        k = len(order)
+        row = dtrsv(L, self._R[list(order), new], lower=1) if k else np.zeros(0)
+        L_new = np.zeros((k+1, k+1))
+        L_new[:k, :k] = L
+        L_new[k, :k] = row
+        L_new[k, k] = math.sqrt(self._R[new, new] - row @ row)
+        return order + (new,), L_new
+
+    def _factor(self, parents: frozenset) -> tuple:
+        """
+        Return an ordering of ``parents`` and the Cholesky factor of ``R`` restricted to that ordering.
+        """
+        factor = self._factors.get(parents)
+        if factor is not None:
+            return factor
+        for parent in parents:
+            smaller = self._factors.get(parents - {parent})
+            if smaller is not None:
+                factor = self._extend_factor(*smaller, parent)
+                break
+        else:
+            order = tuple(parents)
+            factor = order, np.linalg.cholesky(self._R[np.ix_(order, order)])
+        self._factors[parents] = factor
+        return factor
+
+    def _compute_local_score(self, node, parents: frozenset) -> float:
+        n, p, alpha_mu, alpha_w = self._n, self._p, self._alpha_mu, self._alpha_w
+        k = len(parents)
+        order, L = self._factor(parents)
+        logdet_parents = 2 * np.sum(np.log(np.diagonal(L)))
+        if k:
+            z = dtrsv(L, self._R[list(order), node], lower=1)
+            schur = self._R[node, node] - z @ z
+        else:
+            schur = self._R[node, node]
+        logdet_family = logdet_parents + math.log(schur)
+        log_prior_parents = self._log_prior_diag[list(order)].sum()
+
+        score = .5 * math.log(alpha_mu / (n + alpha_mu))
+        score += math.lgamma((n + alpha_w - p + k + 1)/2) - math.lgamma((alpha_w - p + k + 1)/2)
+        score -= n/2 * math.log(math.pi)
+        score += (alpha_w - p + k + 1)/2 * (log_prior_parents + self._log_prior_diag[node])
+        score += (n + alpha_w - p + k)/2 * logdet_parents
+        score -= (alpha_w - p + k)/2 * log_prior_parents
+        score -= (n + alpha_w - p + k + 1)/2 * logdet_family
+        return float(score)
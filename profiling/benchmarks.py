@@ -0,0 +1,339 @@
+"""
+Benchmark suite for the structure learning algorithms.
+
+Each benchmark runs one registered algorithm on data sampled from a random Gaussian DAG of one graph family, at one
+sample size, and records its wall time, number of distinct CI and invariance tests, peak memory, and the SHD of its
+estimate. Results are written to JSON, and compared against a stored baseline, so that regressions in speed, memory,
+or accuracy show up.
+
+Usage::
+
+    python -m profiling.benchmarks --suite quick --output results.json --baseline profiling/benchmarks_baseline.json
+
+exits with status 1 if any benchmark regressed with respect to the baseline.
+"""
+# === IMPORTS: BUILT-IN ===
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+# === IMPORTS: THIRD-PARTY ===
+import numpy as np
+
+# === IMPORTS: LOCAL ===
+import causaldag as cd
+
+ALGORITHMS: Dict[str, Callable] = dict()
+
+GRAPH_FAMILIES = {
+    'erdos-10-2': dict(nnodes=10, exp_nbrs=2),
+    'erdos-20-2': dict(nnodes=20, exp_nbrs=2),
+    'erdos-20-4': dict(nnodes=20, exp_nbrs=4),
+    'erdos-50-2': dict(nnodes=50, exp_nbrs=2),
+    'erdos-100-2': dict(nnodes=100, exp_nbrs=2),
+}
+
+SUITES = {
+    'quick': dict(
+        algorithms=['gsp', 'igsp', 'unknown_target_igsp', 'pcalg', 'dci'],
+        families=['erdos-10-2', 'erdos-20-2'],
+        sample_sizes=[500],
+        seeds=[0],
+    ),
+    'full': dict(
+        algorithms=['gsp', 'igsp', 'unknown_target_igsp', 'pcalg', 'dci'],
+        families=list(GRAPH_FAMILIES),
+        sample_sizes=[100, 1000, 10000],
+        seeds=[0, 1, 2],
+    ),
+}
+
+# metrics for which larger values are worse, with the relative and absolute increase tolerated before a regression
+TOLERANCES = {
+    'time': (.25, .05),
+    'peak_memory_mb': (.25, 1.),
+    'ci_tests': (0., 0),
+    'invariance_tests': (0., 0),
+    'shd': (0., 0),
+}
+
+
+class Problem(NamedTuple):
+    """
+    Data sampled from a random Gaussian DAG ``gdag``: observational samples, samples under an intervention on
+    ``iv_node``, and samples from ``changed_gdag``, a copy of ``gdag`` in which the weights of some arcs were changed.
+    """
+    family: str
+    nsamples: int
+    seed: int
+    gdag: cd.GaussDAG
+    samples: np.ndarray
+    iv_node: int
+    iv_samples: np.ndarray
+    changed_gdag: cd.GaussDAG
+    changed_samples: np.ndarray
+
+
+def make_problem(family: str, nsamples: int, seed: int) -> Problem:
+    np.random.seed(seed)
+    random.seed(seed)
+    params = GRAPH_FAMILIES[family]
+    nnodes = params['nnodes']
+    gdag = cd.rand.rand_weights(cd.rand.directed_erdos(nnodes, params['exp_nbrs'] / (nnodes - 1)))
+    iv_node = random.randrange(nnodes)
+
+    weights = gdag.to_amat()
+    sources, targets = np.nonzero(weights)
+    changed = np.random.rand(len(sources)) < .2
+    changed_weights = weights.copy()
+    changed_weights[sources[changed], targets[changed]] = 0
+    changed_gdag = cd.GaussDAG.from_amat(changed_weights, nodes=list(range(nnodes)))
+
+    return Problem(
+        family=family,
+        nsamples=nsamples,
+        seed=seed,
+        gdag=gdag,
+        samples=gdag.sample(nsamples),
+        iv_node=iv_node,
+        iv_samples=gdag.sample_interventional({iv_node: cd.GaussIntervention(1, .1)}, nsamples),
+        changed_gdag=changed_gdag,
+        changed_samples=changed_gdag.sample(nsamples),
+    )
+
+
+def register(name: str):
+    """
+    Register a benchmark function under ``name``. The function takes a ``Problem``, and returns a dictionary with
+    ``estimate`` and ``truth``, adjacency matrices in the convention of ``PDAG.to_amat``, and optionally the
+    ``ci_tester`` and ``invariance_tester`` it used, whose memoized tests are counted.
+    """
+    def decorator(fn: Callable) -> Callable:
+        ALGORITHMS[name] = fn
+        return fn
+    return decorator
+
+
+def _cpdag_amat(graph, nnodes: int) -> np.ndarray:
+    return graph.to_amat(list(range(nnodes)))[0]
+
+
+def _testers(problem: Problem) -> tuple:
+    ci_tester = cd.MemoizedCI_Tester(cd.partial_correlation_test, cd.partial_correlation_suffstat(problem.samples),
+                                     alpha=1e-3)
+    invariance_suffstat = cd.gauss_invariance_suffstat(problem.samples, [problem.iv_samples])
+    invariance_tester = cd.MemoizedInvarianceTester(cd.gauss_invariance_test, invariance_suffstat, alpha=1e-3)
+    return ci_tester, invariance_tester
+
+
+@register('gsp')
+def _gsp(problem: Problem) -> dict:
+    ci_tester, _ = _testers(problem)
+    nnodes = problem.gdag.nnodes
+    est_dag = cd.gsp(set(range(nnodes)), ci_tester, seed=problem.seed)
+    return dict(
+        estimate=_cpdag_amat(est_dag.cpdag(), nnodes),
+        truth=_cpdag_amat(problem.gdag.cpdag(), nnodes),
+        ci_tester=ci_tester
+    )
+
+
+@register('igsp')
+def _igsp(problem: Problem) -> dict:
+    ci_tester, invariance_tester = _testers(problem)
+    nnodes = problem.gdag.nnodes
+    setting_list = [dict(interventions={problem.iv_node})]
+    est_dag = cd.igsp(setting_list, set(range(nnodes)), ci_tester, invariance_tester, seed=problem.seed)
+    return dict(
+        estimate=_cpdag_amat(est_dag.cpdag(), nnodes),
+        truth=_cpdag_amat(problem.gdag.cpdag(), nnodes),
+        ci_tester=ci_tester,
+        invariance_tester=invariance_tester
+    )
+
+
+@register('unknown_target_igsp')
+def _unknown_target_igsp(problem: Problem) -> dict:
+    ci_tester, invariance_tester = _testers(problem)
+    nnodes = problem.gdag.nnodes
+    setting_list = [dict(known_interventions=set())]
+    est_dag, _ = cd.unknown_target_igsp(setting_list, set(range(nnodes)), ci_tester, invariance_tester,
+                                        seed=problem.seed)
+    return dict(
+        estimate=_cpdag_amat(est_dag.cpdag(), nnodes),
+        truth=_cpdag_amat(problem.gdag.cpdag(), nnodes),
+        ci_tester=ci_tester,
+        invariance_tester=invariance_tester
+    )
+
+
+@register('pcalg')
+def _pcalg(problem: Problem) -> dict:
+    ci_tester, _ = _testers(problem)
+    nnodes = problem.gdag.nnodes
+    est_cpdag = cd.pcalg(set(range(nnodes)), ci_tester)
+    return dict(
+        estimate=_cpdag_amat(est_cpdag, nnodes),
+        truth=_cpdag_amat(problem.gdag.cpdag(), nnodes),
+        ci_tester=ci_tester
+    )
+
+
+@register('dci')
+def _dci(problem: Problem) -> dict:
+    estimate = cd.dci(problem.samples, problem.changed_samples, max_set_size=2)
+    truth = problem.gdag.to_amat() != problem.changed_gdag.to_amat()
+    return dict(estimate=estimate != 0, truth=truth)
+
+
+def run_benchmark(algorithm: str, problem: Problem, repeat: int = 1) -> dict:
+    """
+    Run ``algorithm`` on ``problem`` once under ``tracemalloc``, to measure its peak memory and accuracy, then
+    ``repeat`` more times without it. The recorded time is the fastest of those runs.
+    """
+    tracemalloc.start()
+    result = ALGORITHMS[algorithm](problem)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        ALGORITHMS[algorithm](problem)
+        times.append(time.perf_counter() - start)
+
+    metrics = cd.graph_metrics(result['estimate'], result['truth'])
+    ci_tester, invariance_tester = result.get('ci_tester'), result.get('invariance_tester')
+    return dict(
+        algorithm=algorithm,
+        family=problem.family,
+        nsamples=problem.nsamples,
+        seed=problem.seed,
+        time=min(times) if times else None,
+        peak_memory_mb=peak / 2**20,
+        ci_tests=ci_tester.stats.num_misses if ci_tester is not None else None,
+        invariance_tests=invariance_tester.stats.num_misses if invariance_tester is not None else None,
+        shd=metrics['shd'],
+        shd_skeleton=metrics['shd_skeleton'],
+    )
+
+
+def run_suite(
+        algorithms: List[str],
+        families: List[str],
+        sample_sizes: List[int],
+        seeds: List[int],
+        repeat: int = 1,
+        verbose: bool = True
+) -> dict:
+    """
+    Run every algorithm on every combination of graph family, sample size and seed, and return the results along with
+    a description of the environment they were run in.
+    """
+    results = []
+    for family in families:
+        for nsamples in sample_sizes:
+            for seed in seeds:
+                problem = make_problem(family, nsamples, seed)
+                for algorithm in algorithms:
+                    result = run_benchmark(algorithm, problem, repeat=repeat)
+                    results.append(result)
+                    if verbose: print(_format_result(result))
+    return dict(
+        meta=dict(
+            date=datetime.now().isoformat(timespec='seconds'),
+            python=platform.python_version(),
+            numpy=np.__version__,
+            machine=platform.platform(),
+        ),
+        results=results
+    )
+
+
+def _key(result: dict) -> tuple:
+    return result['algorithm'], result['family'], result['nsamples'], result['seed']
+
+
+def _format_result(result: dict) -> str:
+    algorithm, family, nsamples, seed = _key(result)
+    return (
+        f"{algorithm:>20} {family:>12} n={nsamples:<6} seed={seed:<3}"
+        f" time={result['time']:.3f}s memory={result['peak_memory_mb']:.1f}MB"
+        f" ci_tests={result['ci_tests']} invariance_tests={result['invariance_tests']} shd={result['shd']}"
+    )
+
+
+def compare(results: dict, baseline: dict, tolerances: Optional[Dict[str, tuple]] = None) -> List[dict]:
+    """
+    Return the regressions of ``results`` with respect to ``baseline``: for each benchmark run in both, each metric
+    of ``tolerances`` which grew by more than both its relative and its absolute tolerance.
+    """
+    tolerances = tolerances if tolerances is not None else TOLERANCES
+    baseline_results = {_key(result): result for result in baseline['results']}
+    regressions = []
+    for result in results['results']:
+        base = baseline_results.get(_key(result))
+        if base is None:
+            continue
+        for metric, (relative, absolute) in tolerances.items():
+            new, old = result.get(metric), base.get(metric)
+            if new is None or old is None:
+                continue
+            if new - old > absolute and new > old * (1 + relative):
+                regressions.append(dict(
+                    algorithm=result['algorithm'],
+                    family=result['family'],
+                    nsamples=result['nsamples'],
+                    seed=result['seed'],
+                    metric=metric,
+                    baseline=old,
+                    value=new
+                ))
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--suite', choices=list(SUITES), default='quick')
+    parser.add_argument('--algorithms', nargs='+', choices=list(ALGORITHMS), help='override the algorithms of the suite')
+    parser.add_argument('--families', nargs='+', choices=list(GRAPH_FAMILIES), help='override the graph families')
+    parser.add_argument('--sample-sizes', nargs='+', type=int, help='override the sample sizes')
+    parser.add_argument('--seeds', nargs='+', type=int, help='override the seeds')
+    parser.add_argument('--repeat', type=int, default=1, help='number of timed runs of each benchmark')
+    parser.add_argument('--output', help='path of the JSON file to write the results to')
+    parser.add_argument('--baseline', help='path of a JSON file of results to compare against')
+    args = parser.parse_args(argv)
+
+    suite = dict(SUITES[args.suite])
+    for option in ['algorithms', 'families', 'sample_sizes', 'seeds']:
+        if getattr(args, option) is not None:
+            suite[option] = getattr(args, option)
+    results = run_suite(**suite, repeat=args.repeat)
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline is None:
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline)
+    for regression in regressions:
+        print(
+            f"REGRESSION {regression['algorithm']} {regression['family']} n={regression['nsamples']}"
+            f" seed={regression['seed']}: {regression['metric']} {regression['baseline']} -> {regression['value']}"
+        )
+    if not regressions:
+        print(f"No regressions with respect to {args.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
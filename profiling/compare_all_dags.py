@@ -1,10 +1,9 @@
 import causaldag as cd
 import time
 import numpy as np
-import matplotlib.pyplot as plt
 
 np.random.seed(1729)
-dags = cd.rand.directed_erdos(8, .5, 50)
+dags = cd.rand.directed_erdos(8, .5, size=50)
 cpdags = [dag.cpdag() for dag in dags]
 arcs = np.array([len(dag.arcs) for dag in dags])
 dir_arcs = np.array([len(cpdag.arcs) for cpdag in cpdags])
@@ -24,25 +23,39 @@ def run_all_dags():
     return all_dags_times, all_dags_list
 
 
-def run_all_dags2():
-    all_dags2_times = np.zeros(len(dags))
+def run_iter_dags():
+    iter_dags_times = np.zeros(len(dags))
     all_dags_list = []
     for i, cpdag in enumerate(cpdags):
         print(i)
 
         start = time.time()
-        all_dags = cpdag.all_dags2()
-        all_dags2_times[i] = time.time() - start
+        all_dags = set(cd.iter_dags(cpdag, output='arcs'))
+        iter_dags_times[i] = time.time() - start
         all_dags_list.append(all_dags)
-    return all_dags2_times, all_dags_list
+    return iter_dags_times, all_dags_list
+
+
+def run_mec_size():
+    mec_size_times = np.zeros(len(dags))
+    sizes = []
+    for i, cpdag in enumerate(cpdags):
+        start = time.time()
+        sizes.append(cd.mec_size(cpdag))
+        mec_size_times[i] = time.time() - start
+    return mec_size_times, sizes
 
 
 times1, all_dags = run_all_dags()
-times2, all_dags2 = run_all_dags2()
+times2, all_dags2 = run_iter_dags()
+times3, sizes = run_mec_size()
 print(all(d1 == d2 for d1, d2 in zip(all_dags, all_dags2)))
+print(all(len(d1) == size for d1, size in zip(all_dags, sizes)))
 
 mean1 = times1.mean()
 mean2 = times2.mean()
+mean3 = times3.mean()
 
 median1 = np.median(times1)
-median2 = np.median(times2)
\ No newline at end of file
+median2 = np.median(times2)
+median3 = np.median(times3)
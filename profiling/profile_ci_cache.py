@@ -0,0 +1,35 @@
+import causaldag as cd
+import numpy as np
+import os
+import random
+import tempfile
+import time
+np.random.seed(1729)
+random.seed(1729)
+
+nnodes = 30
+nodes = set(range(nnodes))
+nruns = 10
+g = cd.rand.rand_weights(cd.rand.directed_erdos(nnodes, 3/(nnodes-1)))
+samples = g.sample(1000)
+suffstat = cd.partial_correlation_suffstat(samples)
+
+
+def run_pc(make_tester):
+    start = time.time()
+    for _ in range(nruns):
+        cd.pcalg(nodes, make_tester())
+    return (time.time() - start) / nruns
+
+
+cold = run_pc(lambda: cd.MemoizedCI_Tester(cd.partial_correlation_test, suffstat, alpha=1e-3))
+lru = cd.LRUCache()
+warm_lru = run_pc(lambda: cd.CachedCI_Tester(cd.partial_correlation_test, suffstat, cache=lru, alpha=1e-3))
+with tempfile.TemporaryDirectory() as tmpdir:
+    sqlite = cd.SqliteCache(os.path.join(tmpdir, 'ci.db'))
+    warm_sqlite = run_pc(lambda: cd.CachedCI_Tester(cd.partial_correlation_test, suffstat, cache=sqlite, alpha=1e-3))
+    sqlite.close()
+
+print(f"MemoizedCI_Tester, new tester per run: {cold*1000:.1f}ms per run")
+print(f"CachedCI_Tester, shared LRUCache: {warm_lru*1000:.1f}ms per run")
+print(f"CachedCI_Tester, shared SqliteCache: {warm_sqlite*1000:.1f}ms per run")
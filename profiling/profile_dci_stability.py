@@ -0,0 +1,24 @@
+import time
+import numpy as np
+import causaldag as cd
+from causaldag.datasets import create_synthetic_difference
+
+grids = dict(alpha_ug_grid=[0.001, 0.01, 0.1], alpha_skeleton_grid=[0.1, 0.5], alpha_orient_grid=[0.001, 0.1])
+
+X1, X2, _ = create_synthetic_difference(12, 500, num_altered=2)
+start = time.time()
+_, scores = cd.dci_stability_selection(X1, X2, **grids, n_bootstrap_iterations=10, random_state=0)
+print(f"dci_stability_selection, 12 nodes: {time.time() - start:.2f}s")
+start = time.time()
+_, grid_scores = cd.dci_stability_grid(X1, X2, **grids, n_bootstrap_iterations=10, random_state=0)
+print(f"dci_stability_grid, 12 nodes: {time.time() - start:.2f}s, same scores: {np.array_equal(scores, grid_scores)}")
+
+# with many genes, the difference UG must be sparse for the skeleton and orientation tests to stay tractable
+grids['alpha_ug_grid'] = [1e-6, 1e-5, 1e-4]
+X1, X2, _ = create_synthetic_difference(200, 2000, num_altered=5, num_added=5, num_removed=5)
+for n_jobs in [1, 4]:
+    start = time.time()
+    _, _, summary = cd.dci_stability_grid(
+        X1, X2, **grids, max_set_size=2, n_bootstrap_iterations=4, random_state=0, n_jobs=n_jobs, summarize=True
+    )
+    print(f"dci_stability_grid, 200 nodes, n_jobs={n_jobs}: {time.time() - start:.2f}s, {summary['invariance_stats']}")
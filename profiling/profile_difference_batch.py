@@ -0,0 +1,23 @@
+import tempfile
+import time
+from causaldag.datasets import create_synthetic_difference, create_synthetic_difference_batch
+
+size, nnodes, nsamples = 1000, 20, 1000
+
+start = time.time()
+for seed in range(size):
+    create_synthetic_difference(nnodes, nsamples, seed=seed, return_graphs=True)
+print(f"create_synthetic_difference x{size}: {time.time() - start:.2f}s")
+
+start = time.time()
+create_synthetic_difference_batch(size, nnodes=nnodes, nsamples=nsamples)
+print(f"create_synthetic_difference_batch: {time.time() - start:.2f}s")
+
+with tempfile.TemporaryDirectory() as cache_dir:
+    start = time.time()
+    create_synthetic_difference_batch(size, nnodes=nnodes, nsamples=nsamples, cache_dir=cache_dir)
+    print(f"create_synthetic_difference_batch, stored in cache: {time.time() - start:.2f}s")
+    start = time.time()
+    batch = create_synthetic_difference_batch(size, nnodes=nnodes, nsamples=nsamples, cache_dir=cache_dir)
+    differences = [batch.difference_ug(k) for k in range(size)]
+    print(f"create_synthetic_difference_batch, loaded from cache, with difference UGs: {time.time() - start:.2f}s")
@@ -0,0 +1,42 @@
+import causaldag as cd
+import numpy as np
+import random
+import time
+np.random.seed(1729)
+random.seed(1729)
+
+nnodes = 100
+nqueries = 2000
+cond_set_sizes = [0, 1, 2, 3]
+dag = cd.rand.directed_erdos(nnodes, 3/(nnodes-1))
+nodes = list(range(nnodes))
+
+
+def random_queries(shared_cond_set):
+    queries = []
+    for _ in range(nqueries):
+        i, j = random.sample(nodes, 2)
+        if shared_cond_set is not None:
+            queries.append((i, j, shared_cond_set - {i, j}))
+        else:
+            size = random.choice(cond_set_sizes)
+            queries.append((i, j, set(random.sample(list(set(nodes) - {i, j}), size))))
+    return queries
+
+
+for label, queries in [
+    ('shared conditioning set', random_queries({0, 1, 2})),
+    ('random conditioning sets', random_queries(None))
+]:
+    start = time.time()
+    single = [dag.dsep(i, j, cond_set) for i, j, cond_set in queries]
+    single_time = time.time() - start
+
+    start = time.time()
+    batch = cd.dsep_batch(dag, queries)
+    batch_time = time.time() - start
+
+    assert list(batch) == single
+    print('=== %s ===' % label)
+    print('dsep:       %.0f queries/s' % (nqueries / single_time))
+    print('dsep_batch: %.0f queries/s' % (nqueries / batch_time))
@@ -0,0 +1,27 @@
+import causaldag as cd
+import numpy as np
+import time
+np.random.seed(1729)
+
+nsamples = 20000
+for nnodes, density in [(1000, 3/999), (200, .5)]:
+    g = cd.rand.rand_weights(cd.rand.directed_erdos(nnodes, density))
+    intervention = {node: cd.GaussIntervention(1, .1) for node in range(0, nnodes, 50)}
+
+    start = time.time()
+    g.sample(nsamples)
+    g.sample_interventional_perfect(intervention, nsamples)
+    upstream_time = time.time() - start
+
+    start = time.time()
+    cd.sample_gauss_dag(g, nsamples)
+    cd.sample_gauss_dag(g, nsamples, intervention)
+    vectorized_time = time.time() - start
+
+    rng = np.random.default_rng(1729)
+    start = time.time()
+    cd.sample_gauss_dag(g, nsamples, rng=rng)
+    cd.sample_gauss_dag(g, nsamples, intervention, rng=rng)
+    rng_time = time.time() - start
+    print(f"{nnodes} nodes, density {density:.3f}: GaussDAG {upstream_time:.2f}s, "
+          f"sample_gauss_dag {vectorized_time:.2f}s, with Generator {rng_time:.2f}s")
@@ -0,0 +1,37 @@
+import causaldag as cd
+from causaldag.utils.scores import GaussianBGeScore
+import numpy as np
+import random
+import time
+np.random.seed(1729)
+random.seed(1729)
+
+nsamples = 5000
+ngraphs = 3
+
+for nnodes in [25, 50, 100, 200]:
+    ges_times, gsp_times, ges_shds, gsp_shds = [], [], [], []
+    for _ in range(ngraphs):
+        dag = cd.rand.directed_erdos(nnodes, 1.5/(nnodes-1))
+        dag = cd.DAG(nodes=set(range(nnodes)), arcs={(int(i), int(j)) for i, j in dag.arcs})
+        samples = cd.rand.rand_weights(dag).sample(nsamples)
+        true_cpdag = dag.cpdag()
+
+        start = time.time()
+        # the default alpha_mu = nnodes is a strong prior, under which BGe adds many spurious arcs on larger graphs
+        scorer = GaussianBGeScore(cd.partial_correlation_suffstat(samples, invert=False), alpha_mu=1)
+        est_cpdag = cd.ges(scorer, nnodes)
+        ges_times.append(time.time() - start)
+        ges_shds.append(est_cpdag.shd(true_cpdag))
+
+        start = time.time()
+        ci_tester = cd.MemoizedCI_Tester(cd.partial_correlation_test, cd.partial_correlation_suffstat(samples), alpha=1e-3)
+        est_dag = cd.gsp(set(range(nnodes)), ci_tester, nruns=5, seed=0)
+        gsp_times.append(time.time() - start)
+        gsp_shds.append(est_dag.cpdag().shd(true_cpdag))
+
+    print(
+        f"{nnodes} nodes: "
+        f"ges {np.mean(ges_times):.2f}s (SHD {np.mean(ges_shds):.1f}), "
+        f"gsp {np.mean(gsp_times):.2f}s (SHD {np.mean(gsp_shds):.1f})"
+    )
@@ -0,0 +1,21 @@
+import time
+import numpy as np
+import causaldag as cd
+
+rng = np.random.default_rng(1729)
+nnodes = 30
+ngraphs = 5000
+true = cd.directed_erdos_batch(nnodes, exp_nbrs=3, size=ngraphs, rng=rng)
+est = cd.directed_erdos_batch(nnodes, exp_nbrs=3, size=ngraphs, rng=rng)
+true_dags, est_dags = list(true), list(est)
+
+start = time.time()
+metrics = cd.graph_metrics(est.amats(), true.amats())
+print(f"graph_metrics: {time.time() - start:.2f}s")
+
+start = time.time()
+shds = [e.shd(t) for e, t in zip(est_dags, true_dags)]
+shd_skeletons = [e.shd_skeleton(t) for e, t in zip(est_dags, true_dags)]
+equivalent = [e.markov_equivalent(t) for e, t in zip(est_dags, true_dags)]
+print(f"DAG.shd, DAG.shd_skeleton, DAG.markov_equivalent: {time.time() - start:.2f}s")
+assert (metrics['shd'] == shds).all() and (metrics['markov_equivalent'] == equivalent).all()
@@ -0,0 +1,32 @@
+import causaldag as cd
+import numpy as np
+import random
+import time
+from functools import partial
+np.random.seed(1729)
+random.seed(1729)
+
+nnodes = 40
+nsamples = 1000
+nruns = 8
+g = cd.rand.rand_weights(cd.rand.directed_erdos(nnodes, 3/(nnodes-1)))
+samples = g.sample(nsamples)
+suffstat = cd.partial_correlation_suffstat(samples)
+# wrapped, so that permutation2dag runs the CI tests instead of reading the DAG off the precision matrix
+ci_test = partial(cd.partial_correlation_test)
+
+
+def run_gsp(n_jobs):
+    ci_tester = cd.MemoizedCI_Tester(ci_test, suffstat, alpha=1e-3)
+    start = time.time()
+    est_dag = cd.gsp(set(range(nnodes)), ci_tester, nruns=nruns, n_jobs=n_jobs, seed=0)
+    return est_dag, time.time() - start
+
+
+if __name__ == '__main__':
+    serial_dag, serial_time = run_gsp(1)
+    print(f"n_jobs=1: {serial_time:.2f}s, {serial_dag.num_arcs} arcs")
+    for n_jobs in [2, 4]:
+        est_dag, elapsed = run_gsp(n_jobs)
+        assert est_dag.arcs == serial_dag.arcs
+        print(f"n_jobs={n_jobs}: {elapsed:.2f}s ({serial_time/elapsed:.1f}x)")
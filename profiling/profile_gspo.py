@@ -0,0 +1,38 @@
+import causaldag as cd
+import numpy as np
+import random
+import time
+from graphical_model_learning.algorithms.mag.gspo import gspo as gspo_upstream
+np.random.seed(1729)
+random.seed(1729)
+
+nruns = 1
+max_upstream_nodes = 30
+
+
+def random_mag(nobserved):
+    nlatent = nobserved // 5
+    d = cd.rand.directed_erdos(nobserved + nlatent, 2 / (nobserved + nlatent))
+    return d.marginal_mag(set(random.sample(range(nobserved + nlatent), nlatent)), relabel='default')
+
+
+if __name__ == '__main__':
+    for nobserved in [10, 20, 30, 50, 60]:
+        true_mag = random_mag(nobserved)
+
+        ci_tester = cd.MemoizedCI_Tester(cd.msep_test, true_mag)
+        start = time.time()
+        est_mag = cd.gspo(true_mag.nodes, ci_tester, nruns=nruns, seed=0)
+        elapsed = time.time() - start
+        line = (
+            f"{nobserved} nodes, {true_mag.num_edges} edges: workspace {elapsed:.2f}s, {est_mag.num_edges} edges, "
+            f"equivalent={est_mag.markov_equivalent(true_mag)}"
+        )
+
+        if nobserved <= max_upstream_nodes:
+            ci_tester = cd.MemoizedCI_Tester(cd.msep_test, true_mag)
+            start = time.time()
+            upstream_mag = gspo_upstream(true_mag.nodes, ci_tester, nruns=nruns)
+            upstream_elapsed = time.time() - start
+            line += f"; upstream {upstream_elapsed:.2f}s, {upstream_mag.num_edges} edges"
+        print(line)
@@ -0,0 +1,49 @@
+import causaldag as cd
+import numpy as np
+import random
+import time
+from graphical_models import AncestralGraph
+np.random.seed(1729)
+random.seed(1729)
+
+nnodes = 300
+nqueries = 2000
+d = cd.rand.directed_erdos(nnodes, 5/(nnodes-1))
+arcs = list(d.arcs)
+mag = AncestralGraph(d.nodes, directed=d.arcs)
+queries = [random.sample(range(nnodes), 3) for _ in range(nqueries)]
+
+
+def build(cls):
+    g = cls(d.nodes)
+    start = time.time()
+    for i, j in arcs:
+        g.add_directed(i, j)
+    return g, time.time() - start
+
+
+def ancestry(g):
+    start = time.time()
+    for a, b, _ in queries:
+        g.ancestors_of(a), g.descendants_of(b)
+    return time.time() - start
+
+
+def msep(g):
+    start = time.time()
+    results = [g.msep({a}, {b}, {c} | g.parents_of(c)) for a, b, c in queries]
+    return results, time.time() - start
+
+
+if __name__ == '__main__':
+    plain, plain_time = build(AncestralGraph)
+    indexed, indexed_time = build(cd.IndexedAncestralGraph)
+    print(f"add_directed x{len(arcs)}: {plain_time:.2f}s -> {indexed_time:.2f}s ({plain_time/indexed_time:.1f}x)")
+
+    plain_time, indexed_time = ancestry(plain), ancestry(indexed)
+    print(f"ancestors/descendants x{nqueries}: {plain_time:.2f}s -> {indexed_time:.2f}s ({plain_time/indexed_time:.1f}x)")
+
+    plain_results, plain_time = msep(plain)
+    indexed_results, indexed_time = msep(indexed)
+    assert plain_results == indexed_results
+    print(f"msep x{nqueries}: {plain_time:.2f}s -> {indexed_time:.2f}s ({plain_time/indexed_time:.1f}x)")
@@ -0,0 +1,26 @@
+import time
+import random
+import causaldag as cd
+from conditional_independence.invariance_tests.nonparametric.hsic import hsic_invariance_test
+
+nnodes = 6
+nsamples = 300
+nruns = 40
+
+g = cd.rand.rand_weights(cd.rand.directed_erdos(nnodes, .5))
+suffstat = {'obs_samples': g.sample(nsamples), 0: g.sample_interventional({0: cd.GaussIntervention(1, .1)}, nsamples)}
+random.seed(0)
+tests = [(i, random.sample(sorted(set(range(nnodes)) - {i}), random.randint(0, 2))) for i in range(nnodes)]
+tests = [random.choice(tests) for _ in range(nruns)]
+
+start = time.time()
+for i, cond_set in tests:
+    hsic_invariance_test(suffstat, 0, i, cond_set)
+print(f"hsic_invariance_test: {time.time() - start:.2f}s")
+
+workspace = cd.KernelWorkspace(max_bytes=2**28)
+start = time.time()
+for i, cond_set in tests:
+    cd.hsic_invariance_test_workspace(suffstat, 0, i, cond_set, workspace=workspace)
+print(f"hsic_invariance_test_workspace: {time.time() - start:.2f}s")
+print(workspace.stats())
@@ -0,0 +1,25 @@
+import time
+import random
+import causaldag as cd
+from conditional_independence.ci_tests.nonparametric.hsic import hsic_test_vector
+
+nnodes = 10
+nsamples = 2000
+nruns = 30
+rank = 100
+
+g = cd.rand.directed_erdos(nnodes, .5)
+g = cd.rand.rand_weights(g)
+samples = g.sample(nsamples)
+pairs = [tuple(random.sample(list(range(nnodes)), 2)) for _ in range(nruns)]
+
+start = time.time()
+for i, j in pairs:
+    hsic_test_vector(samples[:, i], samples[:, j])
+print(f"hsic_test_vector: {time.time() - start:.2f}s")
+
+suffstat = cd.kernel_suffstat(samples, rank=rank)
+start = time.time()
+for i, j in pairs:
+    cd.hsic_test_low_rank(suffstat, i, j)
+print(f"hsic_test_low_rank (rank {rank}): {time.time() - start:.2f}s")
@@ -0,0 +1,29 @@
+import causaldag as cd
+import numpy as np
+import random
+import time
+np.random.seed(1729)
+random.seed(1729)
+
+nnodes = 300
+nbatch = 5
+d = cd.rand.directed_erdos(nnodes, 3/(nnodes-1))
+
+
+if __name__ == '__main__':
+    for nlatent in [10, 50, 150]:
+        latent_sets = [set(random.sample(range(nnodes), nlatent)) for _ in range(nbatch)]
+
+        start = time.time()
+        upstream = [d.marginal_mag(latent, relabel='default') for latent in latent_sets]
+        upstream_time = time.time() - start
+
+        start = time.time()
+        mags = cd.marginal_mags(d, latent_sets, relabel='default')
+        batch_time = time.time() - start
+
+        assert mags == upstream
+        print(
+            f"{nlatent} latent x{nbatch}: {upstream_time:.2f}s -> {batch_time:.2f}s "
+            f"({upstream_time/batch_time:.1f}x), {sum(mag.num_edges for mag in mags)} edges"
+        )
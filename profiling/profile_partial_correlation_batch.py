@@ -0,0 +1,31 @@
+import causaldag as cd
+import itertools as itr
+import numpy as np
+import random
+import time
+np.random.seed(1729)
+random.seed(1729)
+
+nnodes = 30
+g = cd.rand.rand_weights(cd.rand.directed_erdos(nnodes, 3/(nnodes-1)))
+suffstat = cd.partial_correlation_suffstat(g.sample(1000))
+
+# all the tests of one level of PC, with conditioning sets drawn from a shared neighborhood
+level_queries = [
+    (i, j, set(cond_set))
+    for i, j in itr.combinations(range(nnodes), 2)
+    for cond_set in itr.combinations(set(range(12)) - {i, j}, 2)
+]
+# the tests of permutation2dag, which condition on growing prefixes of the permutation
+prefix_queries = [(i, j, set(range(j)) - {i}) for j in range(nnodes) for i in range(j)]
+
+for name, queries in [('PC level', level_queries), ('prefixes', prefix_queries)]:
+    start = time.time()
+    for i, j, cond_set in queries:
+        cd.partial_correlation_test(suffstat, i, j, cond_set=cond_set)
+    single_time = time.time() - start
+
+    start = time.time()
+    cd.partial_correlation_test_batch(suffstat, queries)
+    batch_time = time.time() - start
+    print(f"{name} ({len(queries)} tests): single {single_time:.3f}s, batched {batch_time:.3f}s")
@@ -0,0 +1,25 @@
+import time
+import random
+import numpy as np
+import causaldag as cd
+from graphical_model_learning.algorithms.dag.pcalg import skeleton as serial_skeleton
+
+np.random.seed(1729)
+random.seed(1729)
+
+nnodes = 500
+nsamples = 5000
+nodes = set(range(nnodes))
+g = cd.rand.rand_weights(cd.rand.directed_erdos(nnodes, 2/(nnodes-1)))
+suffstat = cd.partial_correlation_suffstat(g.sample(nsamples))
+
+for n_jobs in [1, -1]:
+    ci_tester = cd.MemoizedCI_Tester(cd.partial_correlation_test, suffstat)
+    start = time.time()
+    skel, sepset = cd.skeleton(nodes, ci_tester, n_jobs=n_jobs)
+    print(f"skeleton (n_jobs={n_jobs}): {time.time() - start:.2f}s, {len(skel.edges)} edges")
+
+ci_tester = cd.MemoizedCI_Tester(cd.partial_correlation_test, suffstat)
+start = time.time()
+skel, sepset = serial_skeleton(nodes, ci_tester)
+print(f"graphical_model_learning skeleton: {time.time() - start:.2f}s, {len(skel.edges)} edges")
@@ -0,0 +1,40 @@
+import time
+import random
+import numpy as np
+import causaldag as cd
+from graphical_model_learning.algorithms.dag import permutation2dag as serial_permutation2dag
+
+np.random.seed(1729)
+random.seed(1729)
+
+nnodes = 100
+nsamples = 1000
+g = cd.rand.rand_weights(cd.rand.directed_erdos(nnodes, 3/(nnodes-1)))
+suffstat = cd.partial_correlation_suffstat(g.sample(nsamples))
+# without the precision matrix, graphical_model_learning tests each pair given a Markov blanket
+generic_suffstat = {key: value for key, value in suffstat.items() if key != 'P'}
+perms = [random.sample(range(nnodes), nnodes) for _ in range(10)]
+
+start = time.time()
+dags = [cd.permutation2dag(perm, cd.MemoizedCI_Tester(cd.partial_correlation_test, suffstat)) for perm in perms]
+print(f"permutation2dag: {time.time() - start:.2f}s, {np.mean([d.num_arcs for d in dags]):.1f} arcs")
+
+start = time.time()
+dags = [
+    serial_permutation2dag(perm, cd.MemoizedCI_Tester(cd.partial_correlation_test, generic_suffstat))
+    for perm in perms
+]
+print(f"graphical_model_learning permutation2dag: {time.time() - start:.2f}s, {np.mean([d.num_arcs for d in dags]):.1f} arcs")
+
+ci_tester = cd.MemoizedCI_Tester(cd.dsep_test, g)
+perm = perms[0]
+imap = cd.permutation2dag(perm, ci_tester)
+swaps = [k for k in range(nnodes - 1) if (perm[k], perm[k+1]) in imap.reversible_arcs()]
+start = time.time()
+for k in swaps:
+    cd.permutation2dag(perm[:k] + [perm[k+1], perm[k]] + perm[k+2:], ci_tester)
+print(f"{len(swaps)} covered arc reversals, rebuilt: {time.time() - start:.2f}s")
+start = time.time()
+for k in swaps:
+    cd.permutation2dag(perm[:k] + [perm[k+1], perm[k]] + perm[k+2:], ci_tester, previous=(perm, imap))
+print(f"{len(swaps)} covered arc reversals, updated: {time.time() - start:.2f}s")
@@ -0,0 +1,22 @@
+import time
+import numpy as np
+import causaldag as cd
+from conditional_independence.utils.kernels import center_fast_mutate, rbf_kernel
+
+nsamples = 1000
+n_draws = 1000
+
+rng = np.random.default_rng(0)
+x = rng.normal(size=(nsamples, 1))
+y = np.sin(x) + rng.normal(size=(nsamples, 1))
+kx = center_fast_mutate(rbf_kernel(x, 2.))
+ky = center_fast_mutate(rbf_kernel(y, 2.))
+
+start = time.time()
+loop_statistics = np.array([np.sum(kx * ky[perm][:, perm]) for perm in (rng.permutation(nsamples) for _ in range(n_draws))])
+print(f"loop: {time.time() - start:.2f}s")
+
+for n_jobs in [1, -1]:
+    start = time.time()
+    statistics = cd.permutation_statistics(kx, ky, n_draws=n_draws, seed=0, n_jobs=n_jobs)
+    print(f"permutation_statistics (n_jobs={n_jobs}): {time.time() - start:.2f}s")
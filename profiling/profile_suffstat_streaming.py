@@ -0,0 +1,25 @@
+import causaldag as cd
+import numpy as np
+import os
+import tempfile
+import time
+np.random.seed(1729)
+
+nnodes = 50
+nsamples = 1000000
+g = cd.rand.rand_weights(cd.rand.directed_erdos(nnodes, 3/(nnodes-1)))
+
+with tempfile.TemporaryDirectory() as tmp:
+    path = os.path.join(tmp, 'samples.npy')
+    samples = np.lib.format.open_memmap(path, mode='w+', shape=(nsamples, nnodes))
+    cd.sample_gauss_dag(g, nsamples, chunk_size=100000, out=samples)
+    del samples
+
+    start = time.time()
+    expected = cd.partial_correlation_suffstat(np.load(path))
+    print(f"in memory: {time.time() - start:.3f}s")
+
+    start = time.time()
+    suffstat = cd.partial_correlation_suffstat_streaming(path, chunk_size=100000)
+    print(f"streaming from memmap: {time.time() - start:.3f}s")
+    print(f"max difference in C: {np.abs(suffstat['C'] - expected['C']).max():.2e}")
@@ -47,6 +47,13 @@ def test_create_dag_large():
         g = cd.DAG(nodes=range(nnodes_large), arcs=arcs)
 
 
+@timed
+def test_create_amat_dag_large():
+    for i in range(10):
+        print(i)
+        g = cd.AmatDAG(nodes=range(nnodes_large), arcs=arcs)
+
+
 @timed
 def test_diff():
     for i in range(5):
@@ -62,3 +69,26 @@ def test_all_at_once():
 test_diff()
 test_all_at_once()
 
+
+
+@timed
+def test_batch():
+    for i in range(5):
+        gs = list(cd.directed_erdos_batch(200, .5, size=10))
+
+
+@timed
+def test_batch_lazy():
+    for i in range(5):
+        gs = cd.directed_erdos_batch(200, .5, size=10)
+
+
+@timed
+def test_batch_large_sparse():
+    for i in range(5):
+        gs = cd.directed_erdos_batch(10000, exp_nbrs=5, size=10).rand_weights()
+
+
+test_batch()
+test_batch_lazy()
+test_batch_large_sparse()
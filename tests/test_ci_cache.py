@@ -0,0 +1,83 @@
+from unittest import TestCase
+import unittest
+import numpy as np
+import causaldag as cd
+import os
+import pickle
+import tempfile
+
+
+class TestCICache(TestCase):
+    def setUp(self):
+        np.random.seed(1729)
+        self.nnodes = 8
+        self.nodes = set(range(self.nnodes))
+        g = cd.rand.rand_weights(cd.rand.directed_erdos(self.nnodes, .3))
+        self.suffstat = cd.partial_correlation_suffstat(g.sample(500))
+
+    def make_tester(self, cache, **kwargs):
+        kwargs = {'alpha': 1e-3, **kwargs}
+        return cd.CachedCI_Tester(cd.partial_correlation_test, self.suffstat, cache=cache, **kwargs)
+
+    def test_matches_memoized(self):
+        memoized = cd.MemoizedCI_Tester(cd.partial_correlation_test, self.suffstat, alpha=1e-3)
+        cached = self.make_tester(cd.LRUCache())
+        self.assertEqual(cd.pcalg(self.nodes, memoized), cd.pcalg(self.nodes, cached))
+
+    def test_reuse(self):
+        cache = cd.LRUCache()
+        cd.pcalg(self.nodes, self.make_tester(cache))
+        num_results = len(cache)
+        self.assertGreater(num_results, 0)
+
+        # a new tester on the same data computes nothing new
+        tester = self.make_tester(cache, detailed=True)
+        cd.pcalg(self.nodes, tester)
+        self.assertEqual(len(cache), num_results)
+        self.assertEqual(len(tester.ci_dict_detailed), 0)
+
+        # a different significance level gets its own results
+        cd.pcalg(self.nodes, self.make_tester(cache, alpha=.05))
+        self.assertGreater(len(cache), num_results)
+
+    def test_lru_bound(self):
+        cache = cd.LRUCache(maxsize=5)
+        tester = self.make_tester(cache)
+        for j in range(1, self.nnodes):
+            tester.is_ci(0, j)
+        self.assertEqual(len(cache), 5)
+        self.assertNotIn((frozenset({0, 1}), frozenset(), tester.fingerprint), cache)
+        self.assertIn((frozenset({0, 7}), frozenset(), tester.fingerprint), cache)
+
+    def test_sqlite(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'ci.db')
+            cache = cd.SqliteCache(path)
+            est_cpdag = cd.pcalg(self.nodes, self.make_tester(cache))
+            num_results = len(cache)
+            cache.close()
+
+            # results persist, and survive pickling of the cache
+            reopened = pickle.loads(pickle.dumps(cd.SqliteCache(path)))
+            self.assertEqual(len(reopened), num_results)
+            tester = self.make_tester(reopened, detailed=True)
+            self.assertEqual(cd.pcalg(self.nodes, tester), est_cpdag)
+            self.assertEqual(len(tester.ci_dict_detailed), 0)
+            reopened.close()
+
+    def test_shared(self):
+        cache = cd.SharedCache()
+        cd.pcalg(self.nodes, self.make_tester(cache))
+        copied = pickle.loads(pickle.dumps(cache))
+        self.assertEqual(len(copied), len(cache))
+        self.assertGreater(len(cache), 0)
+
+    def test_fingerprint(self):
+        fingerprint = cd.ci_fingerprint(self.suffstat, cd.partial_correlation_test, alpha=1e-3)
+        self.assertEqual(fingerprint, cd.ci_fingerprint(dict(self.suffstat), cd.partial_correlation_test, alpha=1e-3))
+        other_suffstat = dict(self.suffstat, n=self.suffstat['n'] + 1)
+        self.assertNotEqual(fingerprint, cd.ci_fingerprint(other_suffstat, cd.partial_correlation_test, alpha=1e-3))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+from unittest import TestCase
+import unittest
+import numpy as np
+import causaldag as cd
+
+
+class TestAmatDAG(TestCase):
+    def setUp(self):
+        np.random.seed(1729)
+        self.dags = cd.rand.directed_erdos(30, .2, size=10)
+
+    def test_queries_match_dag(self):
+        for d in self.dags:
+            amat_dag = cd.AmatDAG(d.nnodes, d.arcs)
+            self.assertEqual(amat_dag.arcs, d.arcs)
+            self.assertEqual(amat_dag, d)
+            for node in d.nodes:
+                self.assertEqual(amat_dag.parents_of(node), d.parents_of(node))
+                self.assertEqual(amat_dag.children_of(node), d.children_of(node))
+                self.assertEqual(amat_dag.ancestors_of(node), d.ancestors_of(node))
+                self.assertEqual(amat_dag.descendants_of(node), d.descendants_of(node))
+            self.assertEqual(amat_dag.descendants_of({0, 1}), d.descendants_of({0, 1}))
+            for nodes in [{2, 3}, frozenset({2, 3}), [2, 3], (2, 3)]:
+                self.assertEqual(amat_dag.parents_of(nodes), d.parents_of({2, 3}))
+                self.assertEqual(amat_dag.children_of(nodes), d.children_of({2, 3}))
+            self.assertTrue(d.is_topological(amat_dag.topological_sort()))
+            self.assertEqual(amat_dag.cpdag(), d.cpdag())
+
+    def test_from_amat_shares_buffer(self):
+        amat = np.array([[0, 1, 1], [0, 0, 1], [0, 0, 0]], dtype=bool)
+        d = cd.AmatDAG.from_amat(amat)
+        self.assertIs(d.to_amat()[0], amat)
+        d.remove_arc(0, 2)
+        self.assertFalse(amat[0, 2])
+        self.assertEqual(d.arcs, {(0, 1), (1, 2)})
+
+    def test_add_arc_cycle(self):
+        d = cd.AmatDAG(3, arcs={(0, 1), (1, 2)})
+        with self.assertRaises(cd.CycleError) as e:
+            d.add_arc(2, 0)
+        self.assertEqual(e.exception.cycle, [2, 0, 1, 2])
+        self.assertEqual(d.arcs, {(0, 1), (1, 2)})
+        with self.assertRaises(cd.CycleError):
+            cd.AmatDAG(3, arcs={(0, 1), (1, 2), (2, 0)})
+
+    def test_remove_node(self):
+        d = cd.AmatDAG(4, arcs={(0, 1), (1, 2), (0, 3), (3, 2)})
+        d.topological_sort()
+        d.remove_node(1)
+        self.assertEqual(d.nodes, {0, 1, 2})
+        self.assertEqual(d.arcs, {(0, 2), (2, 1)})
+        self.assertEqual(d.parents_of(1), {2})
+        self.assertEqual(d.topological_sort(), [0, 2, 1])
+        with self.assertRaises(KeyError):
+            d.remove_node(3)
+        d.remove_node(3, ignore_error=True)
+        self.assertEqual(d.nnodes, 3)
+
+    def test_reverse_arc(self):
+        d = cd.AmatDAG(3, arcs={(0, 1), (1, 2)})
+        d.reverse_arc(0, 1)
+        self.assertEqual(d.arcs, {(1, 0), (1, 2)})
+        self.assertEqual(d.topological_sort()[0], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+from unittest import TestCase
+import unittest
+import numpy as np
+import causaldag as cd
+
+
+class TestGraphMetrics(TestCase):
+    def setUp(self):
+        self.nnodes = 8
+        self.node_list = list(range(self.nnodes))
+        rng = np.random.default_rng(1729)
+        self.true = cd.directed_erdos_batch(self.nnodes, .3, size=200, rng=rng)
+        self.est = cd.directed_erdos_batch(self.nnodes, .3, size=200, rng=rng)
+        self.true_amats = self.true.amats()
+        self.est_amats = self.est.amats()
+
+    def test_dags(self):
+        metrics = cd.graph_metrics(self.est_amats, self.true_amats)
+        for k, (est, true) in enumerate(zip(self.est, self.true)):
+            self.assertEqual(metrics['shd'][k], est.shd(true))
+            self.assertEqual(metrics['shd_skeleton'][k], est.shd_skeleton(true))
+            self.assertEqual(metrics['markov_equivalent'][k], est.markov_equivalent(true))
+            if est.num_arcs > 0:
+                self.assertAlmostEqual(metrics['arc_precision'][k], len(est.arcs & true.arcs) / est.num_arcs)
+            if true.num_arcs > 0:
+                self.assertAlmostEqual(metrics['edge_recall'][k], len(est.skeleton & true.skeleton) / true.num_arcs)
+
+    def test_cpdags(self):
+        true_cpdags = cd.stack_amats([dag.cpdag() for dag in self.true], self.node_list)
+        est_cpdags = cd.stack_amats([dag.cpdag() for dag in self.est], self.node_list)
+        shds = cd.shd_batch(est_cpdags, true_cpdags)
+        equivalent = cd.markov_equivalent_batch(est_cpdags, true_cpdags)
+        for k, (est, true) in enumerate(zip(self.est, self.true)):
+            self.assertEqual(shds[k], est.cpdag().shd(true.cpdag()))
+            self.assertEqual(equivalent[k], est.markov_equivalent(true))
+
+    def test_equivalent_dags(self):
+        # every DAG is Markov equivalent to its CPDAG and to the DAG with a covered arc reversed
+        true_cpdags = cd.stack_amats([dag.cpdag() for dag in self.true], self.node_list)
+        self.assertTrue(cd.markov_equivalent_batch(self.true_amats, true_cpdags).all())
+        reversed_amats = self.true_amats.copy()
+        for k, dag in enumerate(self.true):
+            for i, j in list(dag.reversible_arcs())[:1]:
+                reversed_amats[k, i, j], reversed_amats[k, j, i] = False, True
+        self.assertTrue(cd.markov_equivalent_batch(reversed_amats, self.true_amats).all())
+        self.assertTrue(cd.markov_equivalent_batch(reversed_amats, true_cpdags).all())
+
+    def test_broadcast(self):
+        metrics = cd.graph_metrics(self.est_amats, self.true_amats[0])
+        self.assertEqual(metrics['shd'][3], self.est[3].shd(self.true[0]))
+        self.assertEqual(cd.shd_batch(self.est_amats[3], self.true_amats[0]), self.est[3].shd(self.true[0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
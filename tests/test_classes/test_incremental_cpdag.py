@@ -0,0 +1,66 @@
+from unittest import TestCase
+import unittest
+import random
+import numpy as np
+import causaldag as cd
+
+
+class TestIncrementalCPDAG(TestCase):
+    def setUp(self):
+        np.random.seed(1729)
+        random.seed(1729)
+
+    def random_moves(self, incremental, nmoves):
+        for _ in range(nmoves):
+            d = incremental.dag
+            move = random.choice(['add', 'remove', 'reverse'])
+            if move != 'add' and d.num_arcs > 0:
+                i, j = random.choice(sorted(d.arcs))
+                if move == 'remove':
+                    incremental.remove_arc(i, j)
+                else:
+                    try:
+                        incremental.reverse_arc(i, j, check_acyclic=True)
+                    except cd.CycleError:
+                        self.assertTrue(incremental.dag.has_arc(i, j))
+            else:
+                i, j = random.sample(sorted(d.nodes), 2)
+                if not d.has_arc(i, j) and not d.has_arc(j, i):
+                    try:
+                        incremental.add_arc(i, j)
+                    except cd.CycleError:
+                        pass
+            yield incremental
+
+    def test_initial(self):
+        for d in cd.rand.directed_erdos(10, .4, size=20):
+            self.assertEqual(cd.IncrementalCPDAG(d).cpdag(), d.cpdag())
+
+    def test_matches_full_recompute(self):
+        for d in cd.rand.directed_erdos(10, .3, size=10):
+            incremental = cd.IncrementalCPDAG(d)
+            for incremental in self.random_moves(incremental, 30):
+                self.assertEqual(incremental.cpdag(), incremental.dag.cpdag())
+
+    def test_covered_arc_reversals(self):
+        d = cd.rand.directed_erdos(15, .4)
+        incremental = cd.IncrementalCPDAG(d)
+        for _ in range(30):
+            covered_arcs = incremental.dag.reversible_arcs()
+            if not covered_arcs:
+                break
+            incremental.reverse_arc(*random.choice(sorted(covered_arcs)))
+            self.assertEqual(incremental.cpdag(), d.cpdag())
+
+    def test_interventional(self):
+        interventions = [{0}, {3, 4}]
+        for d in cd.rand.directed_erdos(8, .4, size=10):
+            incremental = cd.IncrementalCPDAG(d, interventions)
+            for incremental in self.random_moves(incremental, 20):
+                dag = incremental.dag
+                expected = dag.interventional_cpdag(interventions, cpdag=dag.cpdag())
+                self.assertEqual(incremental.cpdag(), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+from unittest import TestCase
+import unittest
+import numpy as np
+import random
+import causaldag as cd
+from graphical_models.classes.mags.ancestral_graph import CycleError, SpouseError
+
+
+class TestIndexedAncestralGraph(TestCase):
+    def setUp(self):
+        np.random.seed(1729)
+        random.seed(1729)
+        self.mags = [
+            cd.rand.directed_erdos(15, .3).marginal_mag(set(random.sample(range(15), 3)), relabel='default')
+            for _ in range(10)
+        ]
+
+    def assert_same_ancestry(self, g, mag):
+        for node in mag.nodes:
+            self.assertEqual(g.ancestors_of(node), mag.ancestors_of(node))
+            self.assertEqual(g.descendants_of(node), mag.descendants_of(node))
+        self.assertEqual(g.ancestor_dict(), mag.ancestor_dict())
+        self.assertEqual(g.descendant_dict(), mag.descendant_dict())
+
+    def test_queries_match_ancestral_graph(self):
+        for mag in self.mags:
+            g = cd.IndexedAncestralGraph.from_ancestral_graph(mag)
+            self.assertEqual(g, mag)
+            self.assert_same_ancestry(g, mag)
+            self.assertEqual(g.ancestors_of({0, 1}), mag.ancestors_of({0, 1}))
+            order = {node: ix for ix, node in enumerate(g.topological_sort())}
+            self.assertTrue(all(order[i] < order[j] for i, j in g.directed))
+            for _ in range(20):
+                a, b, *c = random.sample(sorted(mag.nodes), 5)
+                self.assertEqual(g.msep({a}, {b}, set(c)), mag.msep({a}, {b}, set(c)))
+
+    def test_index_after_edits(self):
+        for mag in self.mags:
+            g = cd.IndexedAncestralGraph.from_ancestral_graph(mag)
+            g.ancestor_dict()
+            for _ in range(20):
+                i, j = random.sample(sorted(mag.nodes), 2)
+                if random.random() < .5:
+                    g.remove_edge(i, j, ignore_error=True)
+                    mag.remove_edge(i, j, ignore_error=True)
+                elif not mag.has_any_edge(i, j):
+                    try:
+                        g.add_directed(i, j)
+                        mag._add_directed(i, j)
+                    except (CycleError, SpouseError):
+                        self.assertEqual(g, mag)
+                self.assert_same_ancestry(g, mag)
+            g.copy().remove_node(0)
+            self.assert_same_ancestry(g, mag)
+
+    def test_ancestral_checks(self):
+        g = cd.IndexedAncestralGraph(directed={(1, 2), (2, 3)}, bidirected={(3, 4)})
+        with self.assertRaises(CycleError):
+            g.add_directed(3, 1)
+        with self.assertRaises(SpouseError):
+            g.add_bidirected(1, 3)
+        with self.assertRaises(SpouseError):
+            g.add_directed(4, 1)
+        self.assertEqual(g.directed, {(1, 2), (2, 3)})
+        self.assertEqual(g.num_bidirected, 1)
+        g.add_directed(1, 3)
+        g.add_bidirected(1, 4)
+        self.assertTrue(g.is_ancestor_of(1, 3))
+        self.assertFalse(g.is_ancestor_of(4, 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+from unittest import TestCase
+import unittest
+import numpy as np
+import random
+import causaldag as cd
+
+
+class TestMarginalMAG(TestCase):
+    def setUp(self):
+        np.random.seed(1729)
+        random.seed(1729)
+        self.dags = [cd.rand.directed_erdos(15, density) for density in [.1, .2, .3, .5] for _ in range(5)]
+
+    def test_matches_dag_marginal_mag(self):
+        for d in self.dags:
+            for nlatent in [0, 3, 7]:
+                latent = set(random.sample(range(15), nlatent))
+                self.assertEqual(cd.marginal_mag(d, latent), d.marginal_mag(latent))
+                self.assertEqual(
+                    cd.marginal_mag(d, latent, relabel='default'),
+                    d.marginal_mag(latent, relabel='default')
+                )
+
+    def test_batch(self):
+        for d in self.dags:
+            latent_sets = [set(random.sample(range(15), 4)) for _ in range(5)]
+            mags = cd.marginal_mags(d, latent_sets, relabel='default')
+            self.assertEqual(mags, [d.marginal_mag(latent, relabel='default') for latent in latent_sets])
+            amat_dag, _ = cd.AmatDAG.from_dag(d, node_list=list(range(15)))
+            self.assertEqual(amat_dag.marginal_mags(latent_sets, relabel='default'), mags)
+
+    def test_ancestry_index(self):
+        for d in self.dags:
+            mag = cd.marginal_mag(d, set(random.sample(range(15), 5)))
+            rebuilt = cd.IndexedAncestralGraph.from_ancestral_graph(mag)
+            self.assertEqual(mag.ancestor_dict(), rebuilt.ancestor_dict())
+            self.assertEqual(mag.descendant_dict(), rebuilt.descendant_dict())
+
+    def test_small(self):
+        d = cd.DAG(arcs={(1, 2), (1, 3)})
+        self.assertEqual(cd.marginal_mag(d, 1), cd.AncestralGraph(bidirected={(2, 3)}))
+        d.add_arc(2, 3)
+        self.assertEqual(cd.marginal_mag(d, 1), cd.AncestralGraph(directed={(2, 3)}))
+        # inducing path 1 -> 2 <-> 3 <-> 4 through the latent nodes 5, 6, with 2 and 3 ancestors of 4
+        d = cd.DAG(arcs={(1, 2), (5, 2), (5, 3), (6, 3), (6, 4), (2, 7), (3, 7), (7, 4)})
+        self.assertEqual(cd.marginal_mag(d, {5, 6}), d.marginal_mag({5, 6}))
+        self.assertTrue(cd.marginal_mag(d, {5, 6}).has_directed(1, 4))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+from unittest import TestCase
+import unittest
+import numpy as np
+import causaldag as cd
+
+
+class TestMEC(TestCase):
+    def setUp(self):
+        np.random.seed(1729)
+        self.dags = cd.rand.directed_erdos(8, .5, size=20)
+
+    def test_iter_dags(self):
+        for d in self.dags:
+            cpdag = d.cpdag()
+            arc_sets = list(cd.iter_dags(cpdag, output='arcs'))
+            self.assertEqual(len(arc_sets), len(set(arc_sets)))
+            self.assertEqual(set(arc_sets), cpdag.all_dags())
+            self.assertTrue(all(dag.cpdag() == cpdag for dag in cd.iter_dags(cpdag)))
+
+    def test_iter_dags_amat(self):
+        cpdag = cd.DAG(arcs={(0, 1), (1, 2)}).cpdag()
+        amats = list(cd.iter_dags(cpdag, output='amat'))
+        self.assertEqual(len(amats), 3)
+        self.assertTrue(all(amat.sum() == 2 for amat in amats))
+
+    def test_iter_dags_interventional(self):
+        for d in self.dags:
+            icpdag = d.interventional_cpdag([{0}], cpdag=d.cpdag())
+            for dag in cd.iter_dags(icpdag):
+                self.assertEqual(dag.interventional_cpdag([{0}], cpdag=dag.cpdag()), icpdag)
+
+    def test_mec_size(self):
+        for d in self.dags:
+            cpdag = d.cpdag()
+            self.assertEqual(cd.mec_size(cpdag), len(cpdag.all_dags()))
+
+    def test_mec_size_clique(self):
+        cpdag = cd.DAG(arcs={(i, j) for i in range(6) for j in range(i+1, 6)}).cpdag()
+        self.assertEqual(cd.mec_size(cpdag), 720)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+from unittest import TestCase
+import unittest
+import numpy as np
+import causaldag as cd
+
+
+class TestRandomBatch(TestCase):
+    def setUp(self):
+        np.random.seed(1729)
+
+    def test_arc_frequencies(self):
+        batch = cd.directed_erdos_batch(6, .3, size=20000, random_order=False)
+        frequencies = batch.amats().mean(axis=0)
+        self.assertTrue(np.allclose(np.triu(frequencies, 1), np.triu(np.full((6, 6), .3), 1), atol=.02))
+        self.assertTrue((np.tril(frequencies) == 0).all())
+
+    def test_random_order(self):
+        batch = cd.directed_erdos_batch(6, .3, size=20000)
+        frequencies = batch.amats().mean(axis=0)
+        expected = np.full((6, 6), .15) - .15 * np.eye(6)
+        self.assertTrue(np.allclose(frequencies, expected, atol=.02))
+
+    def test_objects(self):
+        batch = cd.directed_erdos_batch(20, exp_nbrs=3, size=5)
+        self.assertEqual(len(batch), 5)
+        for k, dag in enumerate(batch):
+            self.assertEqual(dag.nodes, set(range(20)))
+            self.assertEqual(dag.arcs, set(map(tuple, batch.arcs(k).tolist())))
+            self.assertTrue((dag.to_amat(list(range(20)))[0] == batch.amat(k)).all())
+        self.assertIs(batch[0], batch[0])
+        self.assertIs(batch[-1], batch[4])
+
+    def test_weights(self):
+        gdags = cd.directed_erdos_batch(20, exp_nbrs=3, size=5).rand_weights()
+        for k in range(len(gdags)):
+            self.assertTrue(np.allclose(gdags[k].weight_mat, gdags.weight_mat(k)))
+            self.assertTrue((np.abs(gdags.weights(k)) >= .25).all())
+
+    def test_seeded_weights(self):
+        def all_weights(gdags):
+            return np.concatenate([gdags.weights(k) for k in range(len(gdags))])
+
+        weights = [
+            all_weights(cd.directed_erdos_batch(20, exp_nbrs=3, size=5, rng=np.random.default_rng(0)).rand_weights())
+            for _ in range(2)
+        ]
+        np.testing.assert_array_equal(*weights)
+        batch = cd.directed_erdos_batch(20, exp_nbrs=3, size=5)
+        weights = [all_weights(batch.rand_weights(rng=np.random.default_rng(1))) for _ in range(2)]
+        np.testing.assert_array_equal(*weights)
+        self.assertTrue((np.abs(weights[0]) >= .25).all())
+
+    def test_large_sparse(self):
+        batch = cd.directed_erdos_batch(10000, exp_nbrs=5, size=2)
+        self.assertTrue(np.allclose(batch.num_arcs, 25000, rtol=.05))
+        self.assertEqual(batch.amat(0, sparse_format=True).shape, (10000, 10000))
+
+    def test_edge_cases(self):
+        self.assertEqual(cd.directed_erdos_batch(1, .5).num_arcs.tolist(), [0])
+        self.assertEqual(cd.directed_erdos_batch(5, 0., size=2).num_arcs.tolist(), [0, 0])
+        self.assertEqual(cd.directed_erdos_batch(4, 1., size=2).num_arcs.tolist(), [6, 6])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+from unittest import TestCase
+import unittest
+import itertools as itr
+import random
+import numpy as np
+import causaldag as cd
+
+
+class TestSeparation(TestCase):
+    def setUp(self):
+        np.random.seed(1729)
+        random.seed(1729)
+
+    def random_queries(self, nodes, nqueries):
+        queries = []
+        for _ in range(nqueries):
+            i, j = random.sample(nodes, 2)
+            cond_set = set(random.sample([k for k in nodes if k not in {i, j}], random.randint(0, 3)))
+            queries.append((i, j, cond_set))
+        return queries
+
+    def test_dsep_batch(self):
+        for d in cd.rand.directed_erdos(12, .3, size=10):
+            queries = self.random_queries(list(d.nodes), 50)
+            queries.append(({0, 1}, {2, 3}, {4}))
+            expected = [d.dsep(A, B, C) for A, B, C in queries]
+            self.assertEqual(list(cd.dsep_batch(d, queries)), expected)
+            amat_dag = cd.AmatDAG(d.nnodes, d.arcs)
+            self.assertEqual(list(amat_dag.dsep_batch(queries)), expected)
+
+    def test_dsep_batch_shared_cond_set(self):
+        d = cd.rand.directed_erdos(15, .3)
+        queries = [(i, j, {0}) for i, j in itr.combinations(range(1, 15), 2)]
+        expected = [d.dsep(A, B, C) for A, B, C in queries]
+        self.assertEqual(list(cd.dsep_batch(d, queries)), expected)
+
+    def test_msep_batch(self):
+        for d in cd.rand.directed_erdos(12, .3, size=10):
+            mag = d.marginal_mag({0, 1})
+            nodes = list(mag.nodes)
+            queries = self.random_queries(nodes, 50)
+            expected = [mag.msep(A, B, C) for A, B, C in queries]
+            self.assertEqual(list(cd.msep_batch(mag, queries)), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+from unittest import TestCase
+import unittest
+import os
+import tempfile
+import numpy as np
+from causaldag.datasets import create_synthetic_difference_batch
+
+
+class TestDifferenceBatch(TestCase):
+    def test_independent_of_chunks(self):
+        batch = create_synthetic_difference_batch(20, nnodes=8, nsamples=50, seed=1)
+        chunked = create_synthetic_difference_batch(20, nnodes=8, nsamples=50, seed=1, chunk_size=3, n_jobs=2)
+        prefix = create_synthetic_difference_batch(5, nnodes=8, nsamples=50, seed=1)
+        for name in ['weights1', 'weights2', 'X1', 'X2']:
+            np.testing.assert_array_equal(getattr(batch, name), getattr(chunked, name))
+            np.testing.assert_array_equal(getattr(batch, name)[:5], getattr(prefix, name))
+
+    def test_global_state_untouched(self):
+        np.random.seed(0)
+        expected = np.random.random()
+        np.random.seed(0)
+        create_synthetic_difference_batch(3, nnodes=8, nsamples=50)
+        self.assertEqual(np.random.random(), expected)
+
+    def test_differences(self):
+        batch = create_synthetic_difference_batch(10, nnodes=10, nsamples=50, num_altered=2, num_removed=1, num_added=2)
+        for g1, g2, X1, X2, difference, difference_ug in batch:
+            self.assertEqual(X1.shape, (50, 10))
+            self.assertEqual(len(difference), 5)
+            self.assertEqual(difference, set(zip(*np.where(g1.to_amat() != g2.to_amat()))))
+            expected_ug = {
+                frozenset({i, j}) for i, j in zip(*np.where(~np.isclose(g1.precision, g2.precision))) if i != j
+            }
+            self.assertEqual(difference_ug, expected_ug)
+
+    def test_dense(self):
+        batch = create_synthetic_difference_batch(50, nnodes=5, nsamples=10, exp_nbrs=3.5, num_added=2, seed=0)
+        for g1, g2, _, _, difference, _ in batch:
+            self.assertEqual(len(difference), 4)
+            self.assertEqual(g2.num_arcs, g1.num_arcs + 1)
+        with self.assertRaises(ValueError):
+            create_synthetic_difference_batch(1, nnodes=4, nsamples=10, exp_nbrs=3)
+
+    def test_empty(self):
+        batch = create_synthetic_difference_batch(0, nnodes=6, nsamples=20)
+        self.assertEqual(len(batch), 0)
+        self.assertEqual(batch.X1.shape, (0, 20, 6))
+        self.assertEqual(list(batch), [])
+        with self.assertRaises(ValueError):
+            create_synthetic_difference_batch(-1)
+
+    def test_cache(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            for compressed in [False, True]:
+                batch = create_synthetic_difference_batch(4, nnodes=6, nsamples=20, cache_dir=cache_dir,
+                                                          compressed=compressed)
+                loaded = create_synthetic_difference_batch(4, nnodes=6, nsamples=20, cache_dir=cache_dir,
+                                                           compressed=compressed)
+                self.assertEqual(batch.path, loaded.path)
+                np.testing.assert_array_equal(batch.X2, loaded.X2)
+            self.assertIsInstance(loaded.X1, np.ndarray)
+            self.assertEqual(len(os.listdir(cache_dir)), 2)
+            other = create_synthetic_difference_batch(4, nnodes=6, nsamples=20, seed=2, cache_dir=cache_dir)
+            self.assertEqual(len(os.listdir(cache_dir)), 3)
+            self.assertFalse(np.array_equal(other.X1, batch.X1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+from unittest import TestCase
+import unittest
+import numpy as np
+import causaldag as cd
+import os
+import tempfile
+
+
+class SquaredSumIntervention(cd.SoftInterventionalDistribution):
+    def sample(self, parent_values, dag, node):
+        return parent_values.sum(axis=1) ** 2
+
+
+class TestGaussSampling(TestCase):
+    def setUp(self):
+        np.random.seed(1729)
+        self.gdag = cd.rand.rand_weights(cd.rand.directed_erdos(8, .4))
+
+    def test_covariance(self):
+        samples = cd.sample_gauss_dag(self.gdag, 200000)
+        self.assertTrue(np.allclose(np.cov(samples, rowvar=False), self.gdag.covariance, atol=.05))
+
+    def test_dense_matches_sparse(self):
+        interventions = [
+            None,
+            {2: cd.GaussIntervention(1, .1)},
+            {3: cd.ShiftIntervention(2)},
+            {3: cd.ScalingIntervention(.5, 2)},
+        ]
+        for intervention in interventions:
+            np.random.seed(0)
+            dense = cd.GaussSampler(self.gdag, intervention, dense=True).sample(1000)
+            np.random.seed(0)
+            sparse = cd.GaussSampler(self.gdag, intervention, dense=False).sample(1000)
+            self.assertTrue(np.allclose(dense, sparse))
+
+    def test_perfect_intervention(self):
+        iv_node = self.gdag.topological_sort()[-1]
+        intervention = {iv_node: cd.ConstantIntervention(val=3)}
+        samples = cd.sample_gauss_dag(self.gdag, 100, intervention)
+        self.assertTrue((samples[:, self.gdag._node2ix[iv_node]] == 3).all())
+
+    def test_soft_intervention(self):
+        node = max(self.gdag.nodes, key=lambda node: len(self.gdag.parents_of(node)))
+        samples = cd.sample_gauss_dag(self.gdag, 100, {node: SquaredSumIntervention()})
+        parent_ixs = [self.gdag._node2ix[p] for p in self.gdag._parents[node]]
+        expected = samples[:, parent_ixs].sum(axis=1) ** 2
+        self.assertTrue(np.allclose(samples[:, self.gdag._node2ix[node]], expected))
+
+    def test_chunks(self):
+        np.random.seed(0)
+        full = cd.sample_gauss_dag(self.gdag, 1000)
+        np.random.seed(0)
+        chunks = list(cd.GaussSampler(self.gdag).iter_chunks(1000, 300))
+        self.assertEqual([len(chunk) for chunk in chunks], [300, 300, 300, 100])
+        # noise is drawn row by row, so chunking does not change the samples
+        self.assertTrue(np.allclose(np.vstack(chunks), full))
+
+    def test_memmap(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'samples.npy')
+            out = np.lib.format.open_memmap(path, mode='w+', shape=(1000, 8))
+            cd.sample_gauss_dag(self.gdag, 1000, chunk_size=250, out=out)
+            out.flush()
+            del out
+            samples = np.load(path)
+            self.assertEqual(samples.shape, (1000, 8))
+            self.assertTrue(np.isfinite(samples).all())
+            self.assertTrue((samples[-1] != 0).any())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+from unittest import TestCase
+import unittest
+import numpy as np
+import causaldag as cd
+from conditional_independence.ci_tests.nonparametric.hsic import hsic_test
+from conditional_independence.ci_tests.nonparametric.kci import kci_test
+from conditional_independence.invariance_tests.nonparametric.hsic import hsic_invariance_test
+
+
+class TestKernelWorkspace(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(1729)
+        self.samples = rng.normal(size=(150, 4))
+        self.samples[:, 1] += np.sin(self.samples[:, 0])
+        self.samples[:, 2] += self.samples[:, 1]
+        self.iv_samples = rng.normal(size=(100, 4))
+
+    def test_same_results(self):
+        workspace = cd.KernelWorkspace()
+        for i, j, cond_set in [(0, 1, []), (0, 2, [1]), (0, 2, [1, 3])]:
+            self.assertAlmostEqual(
+                cd.hsic_test_workspace(self.samples, i, j, cond_set, workspace=workspace)['p_value'],
+                hsic_test(self.samples, i, j, cond_set)['p_value']
+            )
+            for regress in [True, False]:
+                self.assertAlmostEqual(
+                    cd.kci_test_workspace(self.samples, i, j, cond_set, regress=regress, workspace=workspace)['p_value'],
+                    kci_test(self.samples, i, j, cond_set, regress=regress)['p_value']
+                )
+        suffstat = {'obs_samples': self.samples, 0: self.iv_samples}
+        for i, cond_set in [(0, []), (2, [1])]:
+            self.assertAlmostEqual(
+                cd.hsic_invariance_test_workspace(suffstat, 0, i, cond_set, workspace=workspace)['p_value'],
+                hsic_invariance_test(suffstat, 0, i, cond_set)['p_value']
+            )
+
+    def test_reuse(self):
+        workspace = cd.KernelWorkspace()
+        cd.hsic_test_workspace(self.samples, 0, 2, [1], workspace=workspace)
+        self.assertEqual(workspace.misses['residuals'], 2)
+        cd.hsic_test_workspace(self.samples, 0, 3, [1], workspace=workspace)
+        self.assertEqual(workspace.hits['residuals'], 1)
+        self.assertEqual(workspace.hits['gram'], 1)
+
+    def test_budget(self):
+        gram_bytes = self.samples.shape[0] ** 2 * 8
+        workspace = cd.KernelWorkspace(max_bytes=2 * gram_bytes)
+        for j in [1, 2, 3]:
+            cd.hsic_test_workspace(self.samples, 0, j, workspace=workspace)
+        self.assertLessEqual(workspace.nbytes, workspace.max_bytes)
+        self.assertEqual(len(workspace), 2)
+        self.assertEqual(workspace.evictions, 2)
+        self.assertEqual(workspace.hits['gram'], 2)  # column 0 is kept as the most recently used
+
+        workspace.clear()
+        self.assertEqual(workspace.stats(), dict(entries=0, nbytes=0, evictions=0, hits={}, misses={}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+from unittest import TestCase
+import unittest
+import numpy as np
+import causaldag as cd
+from conditional_independence.ci_tests.nonparametric.hsic import hsic_test_vector
+from conditional_independence.ci_tests.nonparametric.kci import ki_test_vector, kci_test_vector
+
+
+class TestLowRankKernel(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(1729)
+        self.x = rng.normal(size=300)
+        self.y = self.x**2 + .5 * rng.normal(size=300)
+        self.z = rng.normal(size=300)
+
+    def test_full_rank_hsic(self):
+        for x, y in [(self.x, self.y), (self.x, self.z)]:
+            expected = hsic_test_vector(x, y)
+            result = cd.hsic_test_vector_low_rank(x, y, rank=300)
+            for key in ['statistic', 'mean_approx', 'var_approx']:
+                self.assertAlmostEqual(result[key], expected[key], delta=1e-6 * abs(expected[key]))
+
+    def test_full_rank_ki(self):
+        for x, y in [(self.x, self.y), (self.x, self.z)]:
+            expected = ki_test_vector(y.reshape(-1, 1), x.reshape(-1, 1))
+            result = cd.ki_test_vector_low_rank(y, x, rank=300)
+            for key in ['statistic', 'critval']:
+                self.assertAlmostEqual(result[key], expected[key], delta=1e-5 * abs(expected[key]))
+
+    def test_full_rank_kci(self):
+        for y, e in [(self.y, self.z), (self.x + self.z, self.y + self.z)]:
+            expected = kci_test_vector(y, e, self.x)
+            result = cd.kci_test_vector_low_rank(y, e, self.x, rank=300)
+            for key in ['statistic', 'critval']:
+                self.assertAlmostEqual(result[key], expected[key], delta=1e-3 * abs(expected[key]))
+            self.assertAlmostEqual(result['p_value'], expected['p_value'], delta=1e-3)
+            self.assertEqual(result['reject'], expected['reject'])
+
+    def test_sum_sq_hadamard(self):
+        from causaldag.utils.ci_tests.low_rank_kernel import _sum_sq_hadamard
+        rng = np.random.default_rng(0)
+        for ma, mb in [(2, 3), (40, 50)]:
+            A, B = rng.normal(size=(100, ma)), rng.normal(size=(100, mb))
+            expected = np.sum((A @ A.T * (B @ B.T))**2)
+            self.assertAlmostEqual(_sum_sq_hadamard(A, B) / expected, 1)
+        # on more than _VARIANCE_SUBSAMPLE samples, the off-diagonal terms are estimated from a subsample of rows
+        A, B = rng.normal(size=(3000, 40)), rng.normal(size=(3000, 40))
+        expected = sum(
+            np.sum((A[start:start+500] @ A.T * (B[start:start+500] @ B.T))**2) for start in range(0, 3000, 500)
+        )
+        self.assertAlmostEqual(_sum_sq_hadamard(A, B) / expected, 1, delta=.05)
+        self.assertEqual(_sum_sq_hadamard(A, B, seed=1), _sum_sq_hadamard(A, B, seed=1))
+
+    def test_dependence(self):
+        rng = np.random.default_rng(0)
+        samples = rng.normal(size=(2000, 3))
+        samples[:, 1] += np.sin(2 * samples[:, 0])
+        for method in ['nystrom', 'rff']:
+            suffstat = cd.kernel_suffstat(samples, rank=50, method=method)
+            self.assertTrue(cd.hsic_test_low_rank(suffstat, 0, 1)['reject'])
+            self.assertTrue(cd.kci_test_low_rank(suffstat, 0, 1)['reject'])
+            self.assertGreater(cd.hsic_test_low_rank(suffstat, 0, 2)['p_value'], .01)
+            self.assertGreater(cd.kci_test_low_rank(suffstat, 0, 2)['p_value'], .01)
+
+    def test_cache_reuse(self):
+        rng = np.random.default_rng(0)
+        suffstat = cd.kernel_suffstat(rng.normal(size=(500, 4)), rank=20)
+        first = cd.hsic_test_low_rank(suffstat, 0, 1)
+        nentries = len(suffstat['cache'])
+        self.assertEqual(cd.hsic_test_low_rank(suffstat, 0, 1), first)
+        self.assertEqual(len(suffstat['cache']), nentries)
+        cd.hsic_test_low_rank(suffstat, 0, 2)
+        self.assertEqual(len(suffstat['cache']), nentries + 1)
+
+    def test_invariance(self):
+        rng = np.random.default_rng(0)
+        obs = rng.normal(size=(500, 2))
+        same = rng.normal(size=(500, 2))
+        shifted = rng.normal(size=(500, 2)) + [2, 0]
+        suffstat = cd.kernel_invariance_suffstat(obs, [same, shifted], rank=30)
+        self.assertGreater(cd.hsic_invariance_test_low_rank(suffstat, 0, 0)['p_value'], .01)
+        self.assertTrue(cd.hsic_invariance_test_low_rank(suffstat, 1, 0)['reject'])
+        self.assertTrue(cd.kci_invariance_test_low_rank(suffstat, 1, 0)['reject'])
+
+    def test_invalid_method(self):
+        with self.assertRaises(ValueError):
+            cd.kernel_suffstat(np.zeros((10, 2)), method='svd')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+from unittest import TestCase
+import unittest
+import itertools as itr
+import numpy as np
+import causaldag as cd
+
+
+class TestPartialCorrelationBatch(TestCase):
+    def setUp(self):
+        np.random.seed(1729)
+        self.nnodes = 10
+        g = cd.rand.rand_weights(cd.rand.directed_erdos(self.nnodes, .3))
+        self.suffstat = cd.partial_correlation_suffstat(g.sample(500))
+
+    def check(self, queries):
+        batch = cd.partial_correlation_test_batch(self.suffstat, queries, alpha=.01)
+        for q, (i, j, cond_set) in enumerate(queries):
+            single = cd.partial_correlation_test(self.suffstat, i, j, cond_set=cond_set, alpha=.01)
+            self.assertAlmostEqual(batch['statistic'][q], single['statistic'], places=8)
+            self.assertAlmostEqual(batch['p_value'][q], single['p_value'], places=8)
+            self.assertEqual(batch['reject'][q], single['reject'])
+
+    def test_nested(self):
+        queries = [(0, 1, set(range(2, k))) for k in range(2, self.nnodes)]
+        self.check(queries)
+
+    def test_all_pairs(self):
+        queries = [
+            (i, j, set(cond_set))
+            for i, j in itr.combinations(range(self.nnodes), 2)
+            for cond_set in itr.combinations(set(range(5)) - {i, j}, 2)
+        ]
+        self.check(queries)
+
+    def test_random(self):
+        queries = []
+        for _ in range(100):
+            i, j, *cond_set = np.random.permutation(self.nnodes)[:np.random.randint(2, self.nnodes)]
+            queries.append((i, j, set(cond_set)))
+        self.check(queries)
+
+    def test_empty(self):
+        results = cd.partial_correlation_test_batch(self.suffstat, [])
+        self.assertEqual(results['p_value'].shape, (0,))
+
+
+if __name__ == '__main__':
+    unittest.main()
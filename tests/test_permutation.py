@@ -0,0 +1,59 @@
+from unittest import TestCase
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import causaldag as cd
+from conditional_independence.utils.kernels import center_fast_mutate, rbf_kernel
+
+
+class TestPermutation(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(1729)
+        x = rng.normal(size=(200, 1))
+        y = x + rng.normal(size=(200, 1))
+        self.kx = center_fast_mutate(rbf_kernel(x, 2.))
+        self.ky = center_fast_mutate(rbf_kernel(y, 2.))
+
+    def test_statistics(self):
+        n = self.kx.shape[0]
+        # thresh=0 keeps every eigenvalue, so the permuted matrices are gathered instead of using eigenvectors
+        gathered = cd.permutation_statistics(self.kx, self.ky, n_draws=50, seed=0, batch_size=20, thresh=0)
+        factored = cd.permutation_statistics(self.kx, self.ky, n_draws=50, seed=0, batch_size=20)
+        self.assertTrue(np.allclose(gathered, factored, rtol=1e-6))
+
+        seeds = np.random.SeedSequence(0).spawn(3)
+        perm = np.random.default_rng(seeds[0]).permuted(np.tile(np.arange(n), (20, 1)), axis=1)[0]
+        self.assertAlmostEqual(gathered[0], np.sum(self.kx * self.ky[perm][:, perm]))
+
+    def test_reproducible(self):
+        serial = cd.permutation_statistics(self.kx, self.ky, n_draws=100, seed=3, batch_size=30)
+        threaded = cd.permutation_statistics(self.kx, self.ky, n_draws=100, seed=3, batch_size=30, n_jobs=3)
+        with ThreadPoolExecutor(2) as executor:
+            executed = cd.permutation_statistics(self.kx, self.ky, n_draws=100, seed=3, batch_size=30,
+                                                 executor=executor)
+        self.assertTrue(np.array_equal(serial, threaded))
+        self.assertTrue(np.array_equal(serial, executed))
+
+    def test_chi2_mixture(self):
+        weights = np.array([3., 1., .5])
+        draws = cd.chi2_mixture_draws(weights, n_draws=20000, seed=0)
+        self.assertAlmostEqual(draws.mean(), weights.sum(), delta=.1)
+        self.assertAlmostEqual(draws.var(), 2 * np.sum(weights**2), delta=1)
+
+    def test_tests(self):
+        rng = np.random.default_rng(0)
+        samples = rng.normal(size=(200, 3))
+        samples[:, 1] += samples[:, 0]
+        workspace = cd.KernelWorkspace()
+        for test in [cd.hsic_test_workspace, cd.kci_test_workspace]:
+            dependent = test(samples, 0, 1, gamma_approx=False, n_draws=200, seed=0, workspace=workspace)
+            independent = test(samples, 0, 2, gamma_approx=False, n_draws=200, seed=0, workspace=workspace)
+            self.assertTrue(dependent['reject'])
+            self.assertEqual(dependent['p_value'], 1 / 201)
+            self.assertFalse(independent['reject'])
+        result = cd.kci_test_workspace(samples, 0, 2, [1], regress=False, gamma_approx=False, seed=0)
+        self.assertFalse(result['reject'])
+
+
+if __name__ == '__main__':
+    unittest.main()
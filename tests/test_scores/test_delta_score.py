@@ -0,0 +1,67 @@
+from unittest import TestCase
+import unittest
+import itertools as itr
+import numpy as np
+import causaldag as cd
+from causaldag.utils.scores import local_gaussian_bge_score, MemoizedDecomposableScore
+from causaldag.utils.scores import DeltaDecomposableScore, GaussianBGeScore
+
+
+class TestDeltaScore(TestCase):
+    def setUp(self):
+        np.random.seed(1729)
+        self.nnodes = 8
+        self.dag = cd.rand.directed_erdos(self.nnodes, .4)
+        g = cd.rand.rand_weights(self.dag)
+        self.suffstat = cd.partial_correlation_suffstat(g.sample(200), invert=False)
+
+    def test_bge_matches_upstream(self):
+        scorer = GaussianBGeScore(self.suffstat)
+        for node in range(self.nnodes):
+            others = set(range(self.nnodes)) - {node}
+            for size in range(4):
+                for parents in itr.combinations(others, size):
+                    expected = local_gaussian_bge_score(node, parents, self.suffstat)
+                    self.assertAlmostEqual(scorer.get_local_score(node, parents), expected, places=6)
+        expected = MemoizedDecomposableScore(local_gaussian_bge_score, self.suffstat).get_score(self.dag)
+        self.assertAlmostEqual(scorer.get_score(self.dag), expected, places=6)
+
+    def test_bge_prior_parameters(self):
+        kwargs = dict(alpha_mu=2, alpha_w=self.nnodes + 5, inverse_scale_matrix=np.eye(self.nnodes) * 3)
+        scorer = GaussianBGeScore(self.suffstat, **kwargs)
+        expected = local_gaussian_bge_score(0, {1, 2}, self.suffstat, **kwargs)
+        self.assertAlmostEqual(scorer.get_local_score(0, {1, 2}), expected, places=6)
+
+    def test_score_diff(self):
+        scorers = [
+            (DeltaDecomposableScore(local_gaussian_bge_score, self.suffstat), 100000),
+            (GaussianBGeScore(self.suffstat, maxsize=10, factor_maxsize=5), 10)
+        ]
+        for scorer, maxsize in scorers:
+            score = scorer.get_score(self.dag)
+            for i, j in itr.permutations(range(self.nnodes), 2):
+                new_dag = self.dag.copy()
+                if (i, j) in self.dag.arcs:
+                    new_dag.remove_arc(i, j)
+                    self.assertAlmostEqual(scorer.score_diff(self.dag, i, j, 'remove'), scorer.get_score(new_dag) - score)
+                    new_dag.add_arc(j, i)
+                    self.assertAlmostEqual(scorer.score_diff(self.dag, i, j, 'reverse'), scorer.get_score(new_dag) - score)
+                elif (j, i) not in self.dag.arcs:
+                    new_dag.add_arc(i, j, check_acyclic=False)
+                    self.assertAlmostEqual(scorer.score_diff(self.dag, i, j, 'add'), scorer.get_score(new_dag) - score)
+            self.assertEqual(scorer.score_dict.maxsize, maxsize)
+            self.assertLessEqual(len(scorer.score_dict), scorer.score_dict.maxsize)
+
+    def test_invalid_move(self):
+        scorer = GaussianBGeScore(self.suffstat)
+        i, j = next(iter(self.dag.arcs))
+        with self.assertRaises(ValueError):
+            scorer.score_diff(self.dag, i, j, 'add')
+        with self.assertRaises(ValueError):
+            scorer.score_diff(self.dag, j, i, 'remove')
+        with self.assertRaises(ValueError):
+            scorer.score_diff(self.dag, i, j, 'flip')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+from unittest import TestCase
+import unittest
+import itertools as itr
+import numpy as np
+import causaldag as cd
+from causaldag.datasets import create_synthetic_difference
+
+
+class TestDCIGrid(TestCase):
+    def setUp(self):
+        self.X1, self.X2, _ = create_synthetic_difference(8, 400, num_altered=2, seed=1729)
+        self.alpha_ug_grid = [.001, .1]
+        self.alpha_skeleton_grid = [.1, .5]
+        self.alpha_orient_grid = [.001, .1]
+
+    def test_grid_matches_dci(self):
+        amats = cd.dci_grid(
+            self.X1, self.X2, self.alpha_ug_grid, self.alpha_skeleton_grid, self.alpha_orient_grid, max_set_size=2
+        )
+        for alpha_ug, alpha_skeleton, alpha_orient in itr.product(
+                self.alpha_ug_grid, self.alpha_skeleton_grid, self.alpha_orient_grid
+        ):
+            expected = cd.dci(
+                self.X1,
+                self.X2,
+                alpha_ug=alpha_ug,
+                alpha_skeleton=alpha_skeleton,
+                alpha_orient=alpha_orient,
+                max_set_size=2
+            )
+            np.testing.assert_array_equal(amats[(alpha_ug, alpha_skeleton, alpha_orient)], expected)
+
+    def test_tests_shared_across_grid(self):
+        tester = cd.DifferenceTester(cd.difference_suffstat(self.X1), cd.difference_suffstat(self.X2))
+        cd.dci_grid(self.X1, self.X2, self.alpha_ug_grid, self.alpha_skeleton_grid, self.alpha_orient_grid, tester=tester)
+        self.assertGreater(tester.stats.num_hits, tester.stats.num_misses)
+        num_misses = tester.stats.num_misses
+        cd.dci_grid(self.X1, self.X2, self.alpha_ug_grid, self.alpha_skeleton_grid, self.alpha_orient_grid, tester=tester)
+        self.assertEqual(tester.stats.num_misses, num_misses)
+
+    def test_stability_matches_dci_stability_selection(self):
+        grids = dict(alpha_ug_grid=[.01, .1], alpha_skeleton_grid=[.5], alpha_orient_grid=[.1])
+        expected_amat, expected_scores = cd.dci_stability_selection(
+            self.X1, self.X2, **grids, max_set_size=2, n_bootstrap_iterations=3, random_state=0
+        )
+        amat, scores = cd.dci_stability_grid(
+            self.X1, self.X2, **grids, max_set_size=2, n_bootstrap_iterations=3, random_state=0
+        )
+        np.testing.assert_array_equal(amat, expected_amat)
+        np.testing.assert_array_equal(scores, expected_scores)
+
+        parallel_amat, parallel_scores, summary = cd.dci_stability_grid(
+            self.X1, self.X2, **grids, max_set_size=2, n_bootstrap_iterations=3, random_state=0, n_jobs=2,
+            summarize=True
+        )
+        np.testing.assert_array_equal(parallel_scores, scores)
+        self.assertGreater(summary['invariance_stats'].num_misses, 0)
+
+    def test_kliep_path(self):
+        thetas = cd.kliep_path(self.X1, self.X2, [.01, 1.], max_iter=100)
+        self.assertEqual(set(thetas), {.01, 1.})
+        self.assertEqual(thetas[1.].shape, (8 * 7 // 2 + 8,))
+        amats = cd.dci_grid(
+            self.X1, self.X2, [1., .01], [.5], [.1], difference_ug_method='kliep', max_iter=100, edge_threshold=.05
+        )
+        self.assertEqual(len(amats), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+from unittest import TestCase
+import unittest
+import itertools as itr
+import numpy as np
+import causaldag as cd
+from causaldag.utils.scores import GaussianBGeScore
+from causaldag.structure_learning.ges import _GESState
+
+
+def full_rescan_ges(score, nnodes):
+    # GES without the priority queue: every operator is re-evaluated after every move
+    state = _GESState(set(range(nnodes)), score)
+    for forward in [True, False]:
+        while True:
+            best = None
+            for x, y in itr.permutations(range(nnodes), 2):
+                result = state.best_insert(x, y) if forward else state.best_delete(x, y)
+                if result is not None and (best is None or result[0] > best[0]):
+                    best = (result[0], x, y, result[1])
+            if best is None:
+                break
+            (state.apply_insert if forward else state.apply_delete)(*best[1:])
+    return state.to_pdag()
+
+
+class TestGES(TestCase):
+    def setUp(self):
+        np.random.seed(1729)
+
+    def random_problem(self, nnodes, density, nsamples):
+        dag = cd.rand.directed_erdos(nnodes, density)
+        dag = cd.DAG(nodes=set(range(nnodes)), arcs={(int(i), int(j)) for i, j in dag.arcs})
+        suffstat = cd.partial_correlation_suffstat(cd.rand.rand_weights(dag).sample(nsamples), invert=False)
+        return dag, suffstat
+
+    def test_recovers_cpdag(self):
+        dag, suffstat = self.random_problem(10, .2, 100000)
+        est_cpdag = cd.ges(GaussianBGeScore(suffstat), 10)
+        self.assertEqual(est_cpdag, dag.cpdag())
+
+    def test_matches_full_rescan(self):
+        for _ in range(5):
+            dag, suffstat = self.random_problem(10, .3, 500)
+            scorer = GaussianBGeScore(suffstat)
+            self.assertEqual(cd.ges(scorer, 10), full_rescan_ges(scorer, 10))
+
+    def test_output_is_cpdag(self):
+        dag, suffstat = self.random_problem(15, .2, 500)
+        est_cpdag = cd.ges(GaussianBGeScore(suffstat), set(range(15)))
+        extension = cd.DAG(nodes=set(range(15)), arcs=est_cpdag.to_dag().arcs)
+        self.assertEqual(extension.cpdag(), est_cpdag)
+
+    def test_empty(self):
+        suffstat = cd.partial_correlation_suffstat(np.random.normal(size=(1000, 5)), invert=False)
+        est_cpdag = cd.ges(GaussianBGeScore(suffstat), 5)
+        self.assertEqual(est_cpdag.num_arcs + est_cpdag.num_edges, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
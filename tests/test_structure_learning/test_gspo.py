@@ -0,0 +1,95 @@
+from unittest import TestCase
+import unittest
+import numpy as np
+import random
+import causaldag as cd
+from causaldag.structure_learning import MAGWorkspace
+from graphical_models import AncestralGraph
+from graphical_model_learning.algorithms.mag.gspo import get_lmc_altered_edges
+
+
+class TestGSPo(TestCase):
+    def setUp(self):
+        np.random.seed(1729)
+        random.seed(1729)
+
+    def random_mag(self, nnodes, density, nlatent):
+        d = cd.rand.directed_erdos(nnodes, density)
+        return d.marginal_mag(set(random.sample(range(nnodes), nlatent)), relabel='default')
+
+    def test_legitimate_mark_changes(self):
+        for _ in range(50):
+            mag = self.random_mag(12, .4, 3)
+            ws = MAGWorkspace.from_ancestral_graph(mag)
+            lmcs_dir, lmcs_bidir = mag.legitimate_mark_changes()
+            ws_lmcs_dir, ws_lmcs_bidir = ws.legitimate_mark_changes()
+            self.assertEqual(lmcs_dir, {(ws.labels[i], ws.labels[j]) for i, j in ws_lmcs_dir})
+            self.assertEqual(lmcs_bidir, {(ws.labels[i], ws.labels[j]) for i, j in ws_lmcs_bidir})
+
+    def test_ancestors_after_mark_changes(self):
+        for _ in range(20):
+            mag = self.random_mag(12, .4, 3)
+            ws = MAGWorkspace.from_ancestral_graph(mag)
+            lmcs_dir, lmcs_bidir = ws.legitimate_mark_changes()
+            for i, j in lmcs_dir + lmcs_bidir:
+                changed = ws.copy()
+                changed.apply_lmc(i, j)
+                expected = MAGWorkspace.from_ancestral_graph(changed.to_ancestral_graph())
+                self.assertEqual(changed.anc, expected.anc)
+                self.assertEqual(changed.legitimate_mark_changes(), expected.legitimate_mark_changes())
+
+    def test_lmc_removals(self):
+        for _ in range(20):
+            true_mag = self.random_mag(10, .4, 2)
+            ci_tester = cd.MemoizedCI_Tester(cd.msep_test, true_mag)
+            dag = cd.permutation2dag(random.sample(sorted(true_mag.nodes), true_mag.nnodes), ci_tester)
+            imap = AncestralGraph(dag.nodes, directed=dag.arcs)
+            ws = MAGWorkspace.from_ancestral_graph(imap)
+            lmcs_dir, lmcs_bidir = ws.legitimate_mark_changes()
+            for i, j in lmcs_dir + lmcs_bidir:
+                removed_dir, removed_bidir = get_lmc_altered_edges(imap, ws.labels[i], ws.labels[j], ci_tester)
+                ws_removed_dir, ws_removed_bidir = ws.lmc_removals(i, j, ci_tester)
+                self.assertEqual(removed_dir, {(ws.labels[k], ws.labels[l]) for k, l in ws_removed_dir})
+                self.assertEqual(
+                    {frozenset(e) for e in removed_bidir},
+                    {frozenset({ws.labels[k], ws.labels[l]}) for k, l in ws_removed_bidir}
+                )
+            self.assertEqual(ws.to_ancestral_graph(), imap)
+
+    def test_gspo_oracle(self):
+        for _ in range(10):
+            true_mag = self.random_mag(15, .15, 3)
+            ci_tester = cd.MemoizedCI_Tester(cd.msep_test, true_mag)
+            est_mag = cd.gspo(true_mag.nodes, ci_tester, nruns=4, seed=0)
+            self.assertTrue(est_mag.markov_equivalent(true_mag))
+
+    def test_gspo_summaries(self):
+        true_mag = self.random_mag(15, .3, 3)
+        for initial_imap in ['permutation', 'empty', 'gsp']:
+            est_mag, summaries = cd.gspo(
+                true_mag.nodes, cd.MemoizedCI_Tester(cd.msep_test, true_mag), initial_imap=initial_imap, nruns=2,
+                seed=0, summarize=True
+            )
+            self.assertEqual(len(summaries), 2)
+            for summary in summaries:
+                self.assertLessEqual(summary['num_edges'], summary['num_initial_edges'])
+            self.assertEqual(est_mag.num_edges, min(summary['num_edges'] for summary in summaries))
+
+    def test_gspo_deterministic(self):
+        true_mag = self.random_mag(15, .3, 3)
+        serial_mag, serial_summaries = cd.gspo(
+            true_mag.nodes, cd.MemoizedCI_Tester(cd.msep_test, true_mag), nruns=3, seed=0, summarize=True
+        )
+        parallel_mag, parallel_summaries = cd.gspo(
+            true_mag.nodes, cd.MemoizedCI_Tester(cd.msep_test, true_mag), nruns=3, seed=0, summarize=True, n_jobs=2
+        )
+        self.assertEqual(serial_mag, parallel_mag)
+        self.assertEqual(
+            [summary['mag'] for summary in serial_summaries],
+            [summary['mag'] for summary in parallel_summaries]
+        )
+        self.assertEqual(serial_mag.num_edges, min(summary['num_edges'] for summary in parallel_summaries))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+from unittest import TestCase
+import unittest
+import numpy as np
+import random
+import causaldag as cd
+
+
+class TestPermutation2DAG(TestCase):
+    def setUp(self):
+        np.random.seed(1729)
+        random.seed(1729)
+        self.nnodes = 20
+        self.dag = cd.rand.directed_erdos(self.nnodes, 3 / (self.nnodes - 1))
+        self.gdag = cd.rand.rand_weights(self.dag)
+        self.suffstat = cd.partial_correlation_suffstat(self.gdag.sample(500))
+
+    def test_gaussian_matches_tester(self):
+        ci_tester = cd.MemoizedCI_Tester(cd.partial_correlation_test, self.suffstat, alpha=1e-2)
+        for _ in range(3):
+            perm = random.sample(range(self.nnodes), self.nnodes)
+            expected = {
+                (perm[f], perm[s])
+                for s in range(self.nnodes) for f in range(s)
+                if not ci_tester.is_ci(perm[f], perm[s], set(perm[:s]) - {perm[f]})
+            }
+            self.assertEqual(cd.permutation2dag(perm, ci_tester).arcs, expected)
+
+    def test_gaussian_stats(self):
+        perm = random.sample(range(self.nnodes), self.nnodes)
+        fixed_gaps = {frozenset(perm[:2])}
+        npairs = self.nnodes * (self.nnodes - 1) // 2 - len(fixed_gaps)
+        ci_tester = cd.MemoizedCI_Tester(cd.partial_correlation_test, self.suffstat, alpha=1e-2)
+        events = []
+        ci_tester.stats.add_hook(events.append)
+        cd.permutation2dag(perm, ci_tester, fixed_gaps=fixed_gaps)
+        self.assertEqual(ci_tester.stats.num_misses, npairs)
+        self.assertEqual(len(ci_tester.ci_dict), npairs)
+        self.assertEqual(len(events), npairs)
+        self.assertEqual(ci_tester.stats.misses[self.nnodes - 2], self.nnodes - 1)
+        cd.permutation2dag(perm, ci_tester, fixed_gaps=fixed_gaps)
+        self.assertEqual((ci_tester.stats.num_hits, ci_tester.stats.num_misses), (npairs, npairs))
+
+        plain_tester = cd.MemoizedCI_Tester(cd.partial_correlation_test, self.suffstat, alpha=1e-2)
+        for (pair, cond_set), is_ci in ci_tester.ci_dict.items():
+            self.assertEqual(plain_tester.is_ci(*pair, cond_set), is_ci)
+
+        cached_tester = cd.CachedCI_Tester(cd.partial_correlation_test, self.suffstat, alpha=1e-2)
+        cd.permutation2dag(perm, cached_tester, fixed_gaps=fixed_gaps)
+        self.assertEqual(len(cached_tester.cache), npairs)
+
+    def test_batched_keyword(self):
+        from graphical_model_learning.algorithms.dag import permutation2dag as serial_permutation2dag
+        # without the precision matrix, graphical_model_learning tests each pair given a Markov blanket
+        generic_suffstat = {key: value for key, value in self.suffstat.items() if key != 'P'}
+        perm = random.sample(range(self.nnodes), self.nnodes)
+        ci_tester = cd.MemoizedCI_Tester(cd.partial_correlation_test, self.suffstat, alpha=1e-2)
+        expected = serial_permutation2dag(
+            perm, cd.MemoizedCI_Tester(cd.partial_correlation_test, generic_suffstat, alpha=1e-2)
+        )
+        self.assertEqual(cd.permutation2dag(perm, ci_tester, batched=False).arcs, expected.arcs)
+        self.assertLess(max(ci_tester.stats.histogram()), self.nnodes - 2)
+        self.assertEqual(
+            cd.permutation2dag(perm, ci_tester, batched=True).arcs,
+            cd.permutation2dag(perm, ci_tester).arcs
+        )
+        with self.assertRaises(ValueError):
+            cd.permutation2dag(perm, cd.MemoizedCI_Tester(cd.dsep_test, self.dag), batched=True)
+
+    def test_fixed(self):
+        ci_tester = cd.MemoizedCI_Tester(cd.partial_correlation_test, self.suffstat)
+        perm = list(range(self.nnodes))
+        arcs = cd.permutation2dag(perm, ci_tester).arcs
+        present, absent = next(iter(arcs)), next((i, j) for i, j in zip(perm, perm[1:]) if (i, j) not in arcs)
+        dag = cd.permutation2dag(perm, ci_tester, fixed_adjacencies={frozenset(absent)}, fixed_gaps={frozenset(present)})
+        self.assertEqual(dag.arcs, arcs - {present} | {absent})
+
+    def test_max_arcs(self):
+        ci_tester = cd.MemoizedCI_Tester(cd.partial_correlation_test, self.suffstat, alpha=1e-3)
+        oracle = cd.MemoizedCI_Tester(cd.dsep_test, self.dag)
+        perm = random.sample(range(self.nnodes), self.nnodes)
+        for tester in [ci_tester, oracle]:
+            num_arcs = cd.permutation2dag(perm, tester).num_arcs
+            self.assertEqual(cd.permutation2dag(perm, tester, max_arcs=num_arcs).num_arcs, num_arcs)
+            self.assertIsNone(cd.permutation2dag(perm, tester, max_arcs=num_arcs - 1))
+
+    def test_reverse_covered_arc(self):
+        ci_tester = cd.MemoizedCI_Tester(cd.dsep_test, self.dag)
+        perm = random.sample(range(self.nnodes), self.nnodes)
+        imap = cd.permutation2dag(perm, ci_tester)
+        num_reversed = 0
+        for k in range(self.nnodes - 1):
+            i, j = perm[k], perm[k+1]
+            if (i, j) not in imap.reversible_arcs():
+                continue
+            new_perm = perm[:k] + [j, i] + perm[k+2:]
+            fresh = cd.permutation2dag(new_perm, cd.MemoizedCI_Tester(cd.dsep_test, self.dag))
+            self.assertEqual(cd.reverse_covered_arc(imap, i, j, ci_tester), fresh)
+            self.assertEqual(cd.permutation2dag(new_perm, ci_tester, previous=(perm, imap)), fresh)
+            num_reversed += 1
+        self.assertGreater(num_reversed, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+from unittest import TestCase
+import unittest
+import numpy as np
+import random
+import causaldag as cd
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TestParallelGSP(TestCase):
+    def setUp(self):
+        np.random.seed(1729)
+        random.seed(1729)
+        self.nnodes = 12
+        self.nodes = set(range(self.nnodes))
+        self.gdag = cd.rand.rand_weights(cd.rand.directed_erdos(self.nnodes, .2))
+        self.suffstat = cd.partial_correlation_suffstat(self.gdag.sample(500))
+
+        iv_node = 3
+        iv_samples = self.gdag.sample_interventional({iv_node: cd.GaussIntervention(1, .1)}, 500)
+        self.setting_list = [dict(interventions={iv_node}, known_interventions={iv_node})]
+        self.invariance_suffstat = cd.gauss_invariance_suffstat(self.gdag.sample(500), [iv_samples])
+
+    def ci_tester(self):
+        return cd.MemoizedCI_Tester(cd.partial_correlation_test, self.suffstat, alpha=1e-3)
+
+    def invariance_tester(self):
+        return cd.MemoizedInvarianceTester(cd.gauss_invariance_test, self.invariance_suffstat, alpha=1e-3)
+
+    def test_gsp_deterministic(self):
+        for initial_undirected in ['threshold', None]:
+            serial_dag, serial_summaries = cd.gsp(
+                self.nodes, self.ci_tester(), nruns=4, seed=0, initial_undirected=initial_undirected, summarize=True
+            )
+            parallel_dag, parallel_summaries = cd.gsp(
+                self.nodes, self.ci_tester(), nruns=4, seed=0, initial_undirected=initial_undirected, summarize=True,
+                n_jobs=2
+            )
+            self.assertEqual(serial_dag, parallel_dag)
+            self.assertEqual(len(parallel_summaries), 4)
+            self.assertEqual(
+                [summary['dag'] for summary in serial_summaries],
+                [summary['dag'] for summary in parallel_summaries]
+            )
+            self.assertEqual(serial_dag.num_arcs, min(summary['num_arcs'] for summary in parallel_summaries))
+
+    def test_gsp_executor(self):
+        serial_dag = cd.gsp(self.nodes, self.ci_tester(), nruns=4, seed=1)
+        with ThreadPoolExecutor(2) as executor:
+            threaded_dag = cd.gsp(self.nodes, self.ci_tester(), nruns=4, seed=1, executor=executor)
+        self.assertEqual(serial_dag, threaded_dag)
+
+    def test_gsp_initial_permutations(self):
+        perms = [list(range(self.nnodes)), list(reversed(range(self.nnodes)))]
+        est_dag, summaries = cd.gsp(self.nodes, self.ci_tester(), initial_permutations=perms, summarize=True, n_jobs=2)
+        self.assertEqual([summary['initial_permutation'] for summary in summaries], perms)
+
+    def test_igsp_deterministic(self):
+        serial_dag = cd.igsp(self.setting_list, self.nodes, self.ci_tester(), self.invariance_tester(), nruns=3, seed=0)
+        parallel_dag = cd.igsp(
+            self.setting_list, self.nodes, self.ci_tester(), self.invariance_tester(), nruns=3, seed=0, n_jobs=2
+        )
+        self.assertEqual(serial_dag, parallel_dag)
+
+    def test_unknown_target_igsp_deterministic(self):
+        serial_dag, serial_targets = cd.unknown_target_igsp(
+            self.setting_list, self.nodes, self.ci_tester(), self.invariance_tester(), nruns=3, seed=0
+        )
+        parallel_dag, parallel_targets, summaries = cd.unknown_target_igsp(
+            self.setting_list, self.nodes, self.ci_tester(), self.invariance_tester(), nruns=3, seed=0, n_jobs=2,
+            summarize=True
+        )
+        self.assertEqual(serial_dag, parallel_dag)
+        self.assertEqual(serial_targets, parallel_targets)
+        self.assertEqual(len(summaries), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+from unittest import TestCase
+import unittest
+import numpy as np
+import random
+import causaldag as cd
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from unittest import mock
+
+
+class TestPC(TestCase):
+    def setUp(self):
+        np.random.seed(1729)
+        random.seed(1729)
+        self.nnodes = 30
+        self.nodes = set(range(self.nnodes))
+        self.gdag = cd.rand.rand_weights(cd.rand.directed_erdos(self.nnodes, 3 / (self.nnodes - 1)))
+        self.suffstat = cd.partial_correlation_suffstat(self.gdag.sample(2000))
+
+    def ci_tester(self):
+        return cd.MemoizedCI_Tester(cd.partial_correlation_test, self.suffstat, alpha=1e-3)
+
+    def test_oracle(self):
+        dag = cd.rand.directed_erdos(self.nnodes, 3 / (self.nnodes - 1))
+        ci_tester = cd.MemoizedCI_Tester(cd.dsep_test, dag)
+        skel, sepset = cd.skeleton(self.nodes, ci_tester)
+        self.assertEqual({frozenset(edge) for edge in skel.edges}, dag.skeleton)
+        for pair, cond_set in sepset.items():
+            i, j = pair
+            self.assertTrue(dag.dsep(i, j, set(cond_set)))
+        self.assertEqual(cd.pcalg(self.nodes, ci_tester), dag.cpdag())
+
+    def test_order_independent(self):
+        samples = self.gdag.sample(2000)
+        suffstat = cd.partial_correlation_suffstat(samples)
+        skel, _ = cd.skeleton(self.nodes, cd.MemoizedCI_Tester(cd.partial_correlation_test, suffstat, alpha=1e-3))
+
+        # relabel node k as nnodes-1-k, which reverses the order in which edges and conditioning sets are visited
+        reversed_suffstat = cd.partial_correlation_suffstat(samples[:, ::-1])
+        ci_tester = cd.MemoizedCI_Tester(cd.partial_correlation_test, reversed_suffstat, alpha=1e-3)
+        reversed_skel, _ = cd.skeleton(self.nodes, ci_tester)
+        relabeled = {frozenset({self.nnodes - 1 - i, self.nnodes - 1 - j}) for i, j in reversed_skel.edges}
+        self.assertEqual({frozenset(edge) for edge in skel.edges}, relabeled)
+
+    def test_parallel_deterministic(self):
+        skel, sepset = cd.skeleton(self.nodes, self.ci_tester())
+        parallel_skel, parallel_sepset = cd.skeleton(self.nodes, self.ci_tester(), n_jobs=2)
+        with ThreadPoolExecutor(3) as executor:
+            threaded_skel, threaded_sepset = cd.skeleton(self.nodes, self.ci_tester(), executor=executor)
+        self.assertEqual(skel.edges, parallel_skel.edges)
+        self.assertEqual(skel.edges, threaded_skel.edges)
+        self.assertEqual(sepset.to_dict(), parallel_sepset.to_dict())
+        self.assertEqual(sepset.to_dict(), threaded_sepset.to_dict())
+
+    def test_single_pool(self):
+        with mock.patch('causaldag.structure_learning.pc.ProcessPoolExecutor', wraps=ProcessPoolExecutor) as pool:
+            cd.skeleton(self.nodes, self.ci_tester(), n_jobs=2)
+        self.assertEqual(pool.call_count, 1)
+
+    def test_max_cond_set(self):
+        skel, sepset = cd.skeleton(self.nodes, self.ci_tester(), max_cond_set=0)
+        self.assertTrue(all(len(cond_set) == 0 for _, cond_set in sepset.items()))
+        self.assertEqual(len(skel.edges) + len(sepset), self.nnodes * (self.nnodes - 1) // 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
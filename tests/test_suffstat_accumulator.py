@@ -0,0 +1,66 @@
+from unittest import TestCase
+import unittest
+import os
+import pickle
+import tempfile
+import numpy as np
+import pandas as pd
+import causaldag as cd
+
+
+class TestSuffstatAccumulator(TestCase):
+    def setUp(self):
+        np.random.seed(1729)
+        g = cd.rand.rand_weights(cd.rand.directed_erdos(6, .5))
+        self.samples = g.sample(1000) + 1e4  # large offset, where the naive formula loses precision
+        self.expected = cd.partial_correlation_suffstat(self.samples)
+
+    def check(self, suffstat):
+        self.assertEqual(suffstat['n'], self.expected['n'])
+        for key in ['mu', 'S', 'C', 'K', 'rho', 'P']:
+            self.assertTrue(np.allclose(suffstat[key], self.expected[key], rtol=1e-6, atol=1e-8), key)
+
+    def test_chunks(self):
+        acc = cd.SuffstatAccumulator()
+        for chunk in np.array_split(self.samples, 7):
+            acc.update(chunk)
+        self.check(acc.suffstat())
+
+    def test_merge(self):
+        accs = [cd.SuffstatAccumulator().update(chunk) for chunk in np.array_split(self.samples, [1, 10, 500])]
+        accs = [pickle.loads(pickle.dumps(acc)) for acc in accs]
+        merged = cd.SuffstatAccumulator()
+        for acc in accs:
+            merged.merge(acc)
+        self.check(merged.suffstat())
+        self.check((accs[0] + accs[1] + accs[2] + accs[3]).suffstat())
+        self.assertEqual(accs[0].n, 1)
+
+    def test_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            npy_path = os.path.join(tmp, 'samples.npy')
+            np.save(npy_path, self.samples)
+            self.check(cd.partial_correlation_suffstat_streaming(npy_path, chunk_size=64))
+
+            csv_path = os.path.join(tmp, 'samples.csv')
+            pd.DataFrame(self.samples).to_csv(csv_path, index=False, float_format='%.17g')
+            self.check(cd.partial_correlation_suffstat_streaming(csv_path, chunk_size=64))
+
+            reader = pd.read_csv(csv_path, chunksize=100)
+            self.check(cd.partial_correlation_suffstat_streaming(reader))
+
+    def test_no_invert(self):
+        suffstat = cd.partial_correlation_suffstat_streaming(self.samples, chunk_size=100, invert=False)
+        self.assertEqual(set(suffstat), {'S', 'C', 'n', 'mu'})
+        result = cd.partial_correlation_test(suffstat, 0, 1, {2, 3})
+        expected = cd.partial_correlation_test(self.expected, 0, 1, {2, 3})
+        self.assertAlmostEqual(result['p_value'], expected['p_value'])
+
+    def test_wrong_width(self):
+        acc = cd.SuffstatAccumulator(6)
+        with self.assertRaises(ValueError):
+            acc.update(self.samples[:, :3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+from unittest import TestCase
+import unittest
+import numpy as np
+import random
+import causaldag as cd
+import pickle
+
+
+class TestTesterStats(TestCase):
+    def setUp(self):
+        np.random.seed(1729)
+        random.seed(1729)
+        self.nnodes = 10
+        self.nodes = set(range(self.nnodes))
+        self.gdag = cd.rand.rand_weights(cd.rand.directed_erdos(self.nnodes, .3))
+        self.suffstat = cd.partial_correlation_suffstat(self.gdag.sample(500))
+
+    def ci_tester(self):
+        return cd.MemoizedCI_Tester(cd.partial_correlation_test, self.suffstat, alpha=1e-3)
+
+    def test_counts(self):
+        ci_tester = self.ci_tester()
+        events = []
+        ci_tester.stats.add_hook(events.append)
+        ci_tester.is_ci(0, 1)
+        ci_tester.is_ci(0, 1, {2, 3})
+        ci_tester.is_ci(1, 0, {3, 2})
+        histogram = ci_tester.stats.histogram()
+        self.assertEqual(histogram[0]['misses'], 1)
+        self.assertEqual((histogram[2]['misses'], histogram[2]['hits']), (1, 1))
+        self.assertAlmostEqual(ci_tester.stats.hit_rate, 1 / 3)
+        self.assertEqual([(event['size'], event['hit']) for event in events], [(0, False), (2, False), (2, True)])
+        self.assertEqual(ci_tester.stats.num_misses, len(ci_tester.ci_dict))
+
+        copied = pickle.loads(pickle.dumps(ci_tester))
+        self.assertEqual(copied.stats.hooks, [])
+        self.assertEqual(copied.stats.num_lookups, 3)
+        ci_tester.clear()
+        self.assertEqual(ci_tester.stats.num_lookups, 0)
+        self.assertEqual(ci_tester.stats.hooks, [events.append])
+
+    def test_pcalg_summary(self):
+        for n_jobs in [1, 2]:
+            ci_tester = self.ci_tester()
+            est_cpdag, summary = cd.pcalg(self.nodes, ci_tester, summarize=True, n_jobs=n_jobs)
+            self.assertEqual(est_cpdag, cd.pcalg(self.nodes, self.ci_tester()))
+            self.assertGreater(summary['ci_stats'].num_misses, 0)
+            self.assertEqual(ci_tester.stats.num_lookups, summary['ci_stats'].num_lookups)
+
+    def test_gsp_summaries(self):
+        for n_jobs in [1, 2]:
+            ci_tester = self.ci_tester()
+            _, summaries = cd.gsp(self.nodes, ci_tester, nruns=3, initial_undirected=None, summarize=True,
+                                  n_jobs=n_jobs, seed=0)
+            num_lookups = sum(summary['ci_stats'].num_lookups for summary in summaries)
+            self.assertGreater(num_lookups, 0)
+            self.assertEqual(ci_tester.stats.num_lookups, num_lookups)
+
+    def test_invariance_and_score(self):
+        iv_samples = self.gdag.sample_interventional({3: cd.GaussIntervention(1, .1)}, 500)
+        invariance_suffstat = cd.gauss_invariance_suffstat(self.gdag.sample(500), [iv_samples])
+        invariance_tester = cd.MemoizedInvarianceTester(cd.gauss_invariance_test, invariance_suffstat, alpha=1e-3)
+        setting_list = [dict(interventions={3})]
+        _, summaries = cd.igsp(setting_list, self.nodes, self.ci_tester(), invariance_tester, nruns=2,
+                               summarize=True, seed=0)
+        self.assertEqual(
+            invariance_tester.stats.num_lookups,
+            sum(summary['invariance_stats'].num_lookups for summary in summaries)
+        )
+
+        scorer = cd.DeltaDecomposableScore(cd.local_gaussian_bge_score, self.suffstat)
+        scorer.get_score(self.gdag)
+        scorer.get_score(self.gdag)
+        self.assertEqual((scorer.stats.num_misses, scorer.stats.num_hits), (self.nnodes, self.nnodes))
+        self.assertEqual(set(scorer.stats.histogram()), {len(self.gdag.parents_of(node)) for node in self.nodes})
+
+
+if __name__ == '__main__':
+    unittest.main()